@@ -0,0 +1,239 @@
+# async variant of api/main.py - same endpoints, non-blocking SQS/SSM calls
+# run with: uvicorn api.async_main:app --host 0.0.0.0 --port 8000
+import asyncio
+import json
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import List, Optional
+
+from aiobotocore.config import AioConfig
+from aiobotocore.session import get_session
+from fastapi import FastAPI, HTTPException, Depends, Request, Security
+from fastapi.security import HTTPAuthorizationCredentials
+
+from api import common
+from api.common import (ENDPOINT_URL, REDRIVE_MAX_MESSAGES, REDRIVE_MAX_SECONDS, REGION, TRACE_NAME, generate_token,
+                        root, security)
+from api.models import Order, build_order_message
+from app.claim_check import build_claim_check
+from app.config import get_client_options
+from app.database import ORDER_STATUS_NAMES, ORDER_STATUS_PROJECTION, order_cache, parse_order_item
+from app.dlq_catalog import (DEFAULT_PAGE_SIZE, browse_request, counts_requests, dlq_depth_cache, parse_browse_response,
+                             parse_counts, parse_depth)
+from app.notifier import batch_entries, chunk_entries, chunk_results, merge_results
+from app.redrive import redrive_dlq
+from app.tracing import FileExporter, tracer, with_header
+
+# Queue URLs / table names / claim-check bucket resolved once at startup instead of per request
+PREFETCH_PARAMETERS = ["poc-task-queue-url", "poc-dlq-queue-url", "poc-orders-table-name", "poc-dlq-catalog-table-name",
+                       "poc-results-bucket-name"]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients share one aiohttp connection pool each for the life of the process
+    session = get_session()
+    kwargs = {"region_name": REGION, "endpoint_url": ENDPOINT_URL, "config": AioConfig(**get_client_options())}
+
+    async with AsyncExitStack() as stack:
+        app.state.sqs = await stack.enter_async_context(session.create_client("sqs", **kwargs))
+        app.state.ssm = await stack.enter_async_context(session.create_client("ssm", **kwargs))
+        app.state.dynamodb = await stack.enter_async_context(session.create_client("dynamodb", **kwargs))
+        app.state.s3 = await stack.enter_async_context(session.create_client("s3", **kwargs))
+        response = await app.state.ssm.get_parameters(Names=PREFETCH_PARAMETERS)
+        app.state.parameters = {param["Name"]: param["Value"] for param in response["Parameters"]}
+        yield
+
+app = FastAPI(title="Order Processing API (async)", version="1.0.0", lifespan=lifespan)
+
+app.get("/")(root)
+app.post("/token")(generate_token)
+
+async def verify_jwt(credentials: HTTPAuthorizationCredentials = Security(security)):
+    # Token check is CPU-only, so it runs on the event loop instead of a threadpool worker
+    return common.verify_jwt(credentials)
+
+async def get_param(request: Request, param_name):
+    parameters = request.app.state.parameters
+    if param_name not in parameters:
+        response = await request.app.state.ssm.get_parameter(Name=param_name)
+        parameters[param_name] = response["Parameter"]["Value"]
+    return parameters[param_name]
+
+async def check_in(request, message):
+    """Async counterpart of app.claim_check.check_in: the body to send, an oversized payload is put in S3"""
+    bucket = await get_param(request, "poc-results-bucket-name")
+    body, put_request = build_claim_check(json.dumps(message), message, bucket)
+    if put_request is not None:
+        with tracer.span("S3.PutObject"):
+            await request.app.state.s3.put_object(**put_request)
+    return body
+
+async def flush_traces():
+    """tracer.flush(); file export is blocking I/O under a lock, so it runs in a worker thread"""
+    if isinstance(tracer.exporter, FileExporter):
+        await asyncio.to_thread(tracer.flush)
+    else:
+        tracer.flush()
+
+async def send_batch(sqs, queue_url, bodies, attributes=None):
+    """Async counterpart of app.notifier.send_batch for serialized bodies - all chunks are sent concurrently"""
+    chunks, too_large = chunk_entries(bodies, attributes)
+
+    async def send_chunk(chunk):
+        try:
+            response = await sqs.send_message_batch(QueueUrl=queue_url, Entries=batch_entries(chunk, attributes))
+        except Exception as e:
+            return {index: {"error": str(e)} for index, _ in chunk}
+        return chunk_results(response)
+
+    all_chunk_results = await asyncio.gather(*(send_chunk(chunk) for chunk in chunks))
+    return merge_results(len(bodies), too_large, all_chunk_results)
+
+@app.post("/orders")
+async def submit_order(order: dict, request: Request, user_id: str = Depends(verify_jwt)):
+    try:
+        order_obj = Order(**order)
+        order_obj.validate()
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    message = build_order_message(order, user_id)
+
+    queue_url = await get_param(request, "poc-task-queue-url")
+    try:
+        with tracer.start_trace(TRACE_NAME, order_id=message["order_id"], correlation_id=message["correlation_id"]):
+            # Large orders go to S3; the message carries a claim check (app/claim_check.py)
+            body = await check_in(request, message)
+            with tracer.span("SQS.SendMessage"):
+                await request.app.state.sqs.send_message(QueueUrl=queue_url, MessageBody=body,
+                                                         MessageAttributes=tracer.inject({}))
+    finally:
+        # Also exports the faulted span when check_in or SendMessage raised
+        await flush_traces()
+
+    return {
+        "status": "submitted",
+        "order_id": message["order_id"],
+        "correlation_id": message["correlation_id"]
+    }
+
+@app.post("/orders/batch")
+async def submit_batch_orders(orders: List[dict], request: Request, user_id: str = Depends(verify_jwt)):
+    results = [None] * len(orders)
+    messages = []
+    positions = []
+
+    for position, order in enumerate(orders):
+        try:
+            order_obj = Order(**order)
+            order_obj.validate()
+        except (TypeError, ValueError) as e:
+            results[position] = {"status": "failed", "error": str(e)}
+            continue
+        messages.append(build_order_message(order, user_id))
+        positions.append(position)
+
+    if messages:
+        # One trace per order, so each order's path can be followed on its own
+        spans = [tracer.start_trace(TRACE_NAME, order_id=message["order_id"],
+                                    correlation_id=message["correlation_id"]).begin() for message in messages]
+        try:
+            queue_url = await get_param(request, "poc-task-queue-url")
+            bodies = await asyncio.gather(*(check_in(request, message) for message in messages))
+            send_results = await send_batch(request.app.state.sqs, queue_url, list(bodies),
+                                            [with_header({}, span.header()) for span in spans])
+        except Exception as e:
+            send_results = [{"error": str(e)}] * len(messages)
+        for span, sent in zip(spans, send_results):
+            span.finish({"type": "SQSError", "message": sent["error"]} if "error" in sent else None)
+        await flush_traces()
+
+        # Map each SendMessageBatch entry result back to its order
+        for position, message, sent in zip(positions, messages, send_results):
+            results[position] = {
+                "status": "failed" if "error" in sent else "submitted",
+                "order_id": message["order_id"],
+                "correlation_id": message["correlation_id"]
+            }
+            if "error" in sent:
+                results[position]["error"] = f"SQS error: {sent['error']}"
+
+    return {"total": len(orders), "results": results}
+
+@app.get("/orders/{order_id}")
+async def get_order(order_id: str, request: Request, user_id: str = Depends(verify_jwt)):
+    # Same read-through cache as the sync API, with a non-blocking DynamoDB read on a miss
+    order = order_cache.get(order_id)
+    if order is None:
+        try:
+            table_name = await get_param(request, "poc-orders-table-name")
+            response = await request.app.state.dynamodb.get_item(
+                TableName=table_name,
+                Key={"order_id": {"S": order_id}},
+                ProjectionExpression=ORDER_STATUS_PROJECTION,
+                ExpressionAttributeNames=ORDER_STATUS_NAMES
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        if "Item" not in response:
+            raise HTTPException(status_code=404, detail=f"Order {order_id} not found")
+        order = parse_order_item(response["Item"])
+        order_cache.put(order_id, order)
+    return order
+
+@app.get("/dlq/stats")
+async def get_dlq_stats(request: Request, user_id: str = Depends(verify_jwt)):
+    try:
+        table_name = await get_param(request, "poc-dlq-catalog-table-name")
+        requests = counts_requests(table_name)
+        responses = await asyncio.gather(*(request.app.state.dynamodb.query(**kwargs) for kwargs in requests.values()))
+        depth = dlq_depth_cache.get()
+        if depth is None:
+            dlq_url = await get_param(request, "poc-dlq-queue-url")
+            attrs = await request.app.state.sqs.get_queue_attributes(
+                QueueUrl=dlq_url,
+                AttributeNames=['ApproximateNumberOfMessages', 'ApproximateNumberOfMessagesNotVisible']
+            )
+            depth = parse_depth(attrs['Attributes'])
+            dlq_depth_cache.put(depth)
+        return {"queue": "task-dlq", **depth, **parse_counts(dict(zip(requests, responses)))}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/dlq/messages")
+async def get_dlq_messages(request: Request, order_id: Optional[str] = None, correlation_id: Optional[str] = None,
+                           signature: Optional[str] = None, hour: Optional[str] = None,
+                           limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                           user_id: str = Depends(verify_jwt)):
+    try:
+        table_name = await get_param(request, "poc-dlq-catalog-table-name")
+        operation, kwargs = browse_request(table_name, order_id=order_id, correlation_id=correlation_id,
+                                           signature=signature, hour=hour, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        response = await getattr(request.app.state.dynamodb, operation)(**kwargs)
+        return parse_browse_response(response)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/dlq/redrive")
+async def redrive_dlq_messages(request: Request, max_messages: int = 1000, dry_run: bool = False,
+                               rate_limit: Optional[float] = None, receivers: int = 4,
+                               resubmit_unchanged: bool = False, user_id: str = Depends(verify_jwt)):
+    if not 0 < max_messages <= REDRIVE_MAX_MESSAGES:
+        raise HTTPException(status_code=400, detail=f"max_messages must be between 1 and {REDRIVE_MAX_MESSAGES}")
+    if not 0 < receivers <= 16:
+        raise HTTPException(status_code=400, detail="receivers must be between 1 and 16")
+    if rate_limit is not None and rate_limit <= 0:
+        raise HTTPException(status_code=400, detail="rate_limit must be greater than 0")
+    try:
+        dlq_url = await get_param(request, "poc-dlq-queue-url")
+        task_queue_url = await get_param(request, "poc-task-queue-url")
+        # Long-running batch job with its own receiver threads: keep it off the event loop
+        return await asyncio.to_thread(
+            redrive_dlq, dlq_url=dlq_url, task_queue_url=task_queue_url, receivers=receivers,
+            max_messages=max_messages, rate_limit=rate_limit, dry_run=dry_run,
+            resubmit_unchanged=resubmit_unchanged, wait_seconds=1, max_seconds=REDRIVE_MAX_SECONDS
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
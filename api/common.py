@@ -0,0 +1,33 @@
+# shared by api/main.py and api/async_main.py - no AWS clients or calls at import time
+import os
+
+from fastapi import HTTPException, Security
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+
+from api.auth import create_token, verify_token
+
+security = HTTPBearer()
+
+ENDPOINT_URL = os.getenv("AWS_ENDPOINT_URL", "http://localhost:4566")
+REGION = os.getenv("AWS_REGION", "us-east-1")
+
+# POST /dlq/redrive works in bounded runs so one request stays under gateway timeouts
+REDRIVE_MAX_MESSAGES = 10000
+REDRIVE_MAX_SECONDS = 25
+
+# Segment name of the trace each order starts here (continued by task_lambda and notification_lambda)
+TRACE_NAME = "order-api"
+
+def verify_jwt(credentials: HTTPAuthorizationCredentials = Security(security)):
+    token = credentials.credentials
+    result = verify_token(token)
+    if not result["valid"]:
+        raise HTTPException(status_code=401, detail=result.get("error", "Invalid token"))
+    return result["user_id"]
+
+def root():
+    return {"message": "Order Processing API", "docs": "/docs"}
+
+def generate_token(user_id: str = "test-user"):
+    token = create_token(user_id)
+    return {"access_token": token, "token_type": "bearer"}
@@ -1,41 +1,32 @@
 # accessing through the api endpoint (single and bulk inputs)
-from fastapi import FastAPI, HTTPException, Depends, Security
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-import boto3
+from fastapi import FastAPI, HTTPException, Depends
 import json
-import uuid
-import os
-from typing import List
-from api.auth import create_token, verify_token
-from api.models import Order
-from app.parameter_store import get_cached_parameter
+from typing import List, Optional
+from api.common import (ENDPOINT_URL, REDRIVE_MAX_MESSAGES, REDRIVE_MAX_SECONDS, REGION, TRACE_NAME, generate_token,
+                        root, verify_jwt)
+from api.models import Order, build_order_message
+from app.claim_check import check_in
+from app.config import get_aws_client
+from app.database import get_order_status
+from app.dlq_catalog import DEFAULT_PAGE_SIZE, browse as browse_dlq, dlq_depth_cache, get_counts as get_dlq_counts, parse_depth
+from app.notifier import send_batch
+from app.parameter_store import get_cached_parameter, prefetch_parameters
+from app.redrive import redrive_dlq
+from app.tracing import tracer, with_header
 
 app = FastAPI(title="Order Processing API", version="1.0.0")
-security = HTTPBearer()
 
-ENDPOINT_URL = os.getenv("AWS_ENDPOINT_URL", "http://localhost:4566")
-REGION = os.getenv("AWS_REGION", "us-east-1")
+sqs = get_aws_client("sqs", region_name=REGION, endpoint_url=ENDPOINT_URL)
 
-sqs = boto3.client("sqs", endpoint_url=ENDPOINT_URL, region_name=REGION)
+# Queue URLs, the DLQ catalog table and the claim-check bucket loaded in one GetParameters call at startup
+prefetch_parameters(["poc-task-queue-url", "poc-dlq-queue-url", "poc-dlq-catalog-table-name",
+                     "poc-results-bucket-name"])
 
 def get_queue_url_from_params(param_name):
     return get_cached_parameter(param_name)
 
-def verify_jwt(credentials: HTTPAuthorizationCredentials = Security(security)):
-    token = credentials.credentials
-    result = verify_token(token)
-    if not result["valid"]:
-        raise HTTPException(status_code=401, detail=result.get("error", "Invalid token"))
-    return result["user_id"]
-
-@app.get("/")
-def root():
-    return {"message": "Order Processing API", "docs": "/docs"}
-
-@app.post("/token")
-def generate_token(user_id: str = "test-user"):
-    token = create_token(user_id)
-    return {"access_token": token, "token_type": "bearer"}
+app.get("/")(root)
+app.post("/token")(generate_token)
 
 @app.post("/orders")
 def submit_order(order: dict, user_id: str = Depends(verify_jwt)):
@@ -45,100 +36,124 @@ def submit_order(order: dict, user_id: str = Depends(verify_jwt)):
     except (TypeError, ValueError) as e:
         raise HTTPException(status_code=400, detail=str(e))
     
-    correlation_id = str(uuid.uuid4())
-    order_id = f"ORD-{int(uuid.uuid4().time_low)}"
-    
-    message = {
-        "correlation_id": correlation_id,
-        "order_id": order_id,
-        "items": order["items"],
-        "promo_code": order.get("promo_code"),
-        "user_id": user_id
-    }
+    message = build_order_message(order, user_id)
     
     queue_url = get_queue_url_from_params("poc-task-queue-url")
-    sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps(message))
+    with tracer.start_trace(TRACE_NAME, order_id=message["order_id"], correlation_id=message["correlation_id"]):
+        # Large orders go to S3; the message carries a claim check (app/claim_check.py)
+        body = check_in(json.dumps(message), message)
+        with tracer.span("SQS.SendMessage"):
+            sqs.send_message(QueueUrl=queue_url, MessageBody=body, MessageAttributes=tracer.inject({}))
+    tracer.flush()
     
     return {
         "status": "submitted",
-        "order_id": order_id,
-        "correlation_id": correlation_id
+        "order_id": message["order_id"],
+        "correlation_id": message["correlation_id"]
     }
 
 @app.post("/orders/batch")
 def submit_batch_orders(orders: List[dict], user_id: str = Depends(verify_jwt)):
-    results = []
+    results = [None] * len(orders)
+    messages = []
+    positions = []
     
-    for order in orders:
+    for position, order in enumerate(orders):
         try:
             order_obj = Order(**order)
             order_obj.validate()
-            
-            correlation_id = str(uuid.uuid4())
-            order_id = f"ORD-{int(uuid.uuid4().time_low)}"
-            
-            message = {
-                "correlation_id": correlation_id,
-                "order_id": order_id,
-                "items": order["items"],
-                "promo_code": order.get("promo_code"),
-                "user_id": user_id
-            }
-            
-            queue_url = get_queue_url_from_params("poc-task-queue-url")
-            sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps(message))
-            
-            results.append({
-                "status": "submitted",
-                "order_id": order_id,
-                "correlation_id": correlation_id
-            })
-            
         except (TypeError, ValueError) as e:
-            results.append({"status": "failed", "error": str(e)})
+            results[position] = {"status": "failed", "error": str(e)}
+            continue
+        
+        messages.append(build_order_message(order, user_id))
+        positions.append(position)
+    
+    if messages:
+        # One trace per order, so each order's path can be followed on its own
+        spans = [tracer.start_trace(TRACE_NAME, order_id=message["order_id"],
+                                    correlation_id=message["correlation_id"]).begin() for message in messages]
+        try:
+            queue_url = get_queue_url_from_params("poc-task-queue-url")
+            attributes = [with_header({}, span.header()) for span in spans]
+            send_results = send_batch(queue_url, messages, attributes=attributes)
         except Exception as e:
-            results.append({"status": "failed", "error": f"SQS error: {str(e)}"})
+            send_results = [{"error": str(e)}] * len(messages)
+        for span, sent in zip(spans, send_results):
+            span.finish({"type": "SQSError", "message": sent["error"]} if "error" in sent else None)
+        tracer.flush()
+        
+        # Map each SendMessageBatch entry result back to its order
+        for position, message, sent in zip(positions, messages, send_results):
+            results[position] = {
+                "status": "failed" if "error" in sent else "submitted",
+                "order_id": message["order_id"],
+                "correlation_id": message["correlation_id"]
+            }
+            if "error" in sent:
+                results[position]["error"] = f"SQS error: {sent['error']}"
     
     return {"total": len(orders), "results": results}
 
+@app.get("/orders/{order_id}")
+def get_order(order_id: str, user_id: str = Depends(verify_jwt)):
+    try:
+        order = get_order_status(order_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if order is None:
+        raise HTTPException(status_code=404, detail=f"Order {order_id} not found")
+    return order
+
 @app.get("/dlq/stats")
 def get_dlq_stats(user_id: str = Depends(verify_jwt)):
     try:
-        dlq_url = get_queue_url_from_params("poc-dlq-queue-url")
-        attrs = sqs.get_queue_attributes(
-            QueueUrl=dlq_url,
-            AttributeNames=['ApproximateNumberOfMessages', 'ApproximateNumberOfMessagesNotVisible']
-        )
-        return {
-            "queue": "task-dlq",
-            "messages_available": int(attrs['Attributes'].get('ApproximateNumberOfMessages', 0)),
-            "messages_in_flight": int(attrs['Attributes'].get('ApproximateNumberOfMessagesNotVisible', 0))
-        }
+        depth = dlq_depth_cache.get()
+        if depth is None:
+            dlq_url = get_queue_url_from_params("poc-dlq-queue-url")
+            attrs = sqs.get_queue_attributes(
+                QueueUrl=dlq_url,
+                AttributeNames=['ApproximateNumberOfMessages', 'ApproximateNumberOfMessagesNotVisible']
+            )
+            depth = parse_depth(attrs['Attributes'])
+            dlq_depth_cache.put(depth)
+        return {"queue": "task-dlq", **depth, **get_dlq_counts()}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/dlq/messages")
-def get_dlq_messages(user_id: str = Depends(verify_jwt)):
+def get_dlq_messages(order_id: Optional[str] = None, correlation_id: Optional[str] = None,
+                     signature: Optional[str] = None, hour: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                     cursor: Optional[str] = None, user_id: str = Depends(verify_jwt)):
+    # Reads the DLQ catalog, never the queue: browsing does not hide messages from dlq_processor_lambda
+    try:
+        return browse_dlq(order_id=order_id, correlation_id=correlation_id, signature=signature, hour=hour,
+                          limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/dlq/redrive")
+def redrive_dlq_messages(max_messages: int = 1000, dry_run: bool = False, rate_limit: Optional[float] = None,
+                         receivers: int = 4, resubmit_unchanged: bool = False, user_id: str = Depends(verify_jwt)):
+    if not 0 < max_messages <= REDRIVE_MAX_MESSAGES:
+        raise HTTPException(status_code=400, detail=f"max_messages must be between 1 and {REDRIVE_MAX_MESSAGES}")
+    if not 0 < receivers <= 16:
+        raise HTTPException(status_code=400, detail="receivers must be between 1 and 16")
+    if rate_limit is not None and rate_limit <= 0:
+        raise HTTPException(status_code=400, detail="rate_limit must be greater than 0")
     try:
-        dlq_url = get_queue_url_from_params("poc-dlq-queue-url")
-        response = sqs.receive_message(
-            QueueUrl=dlq_url,
-            MaxNumberOfMessages=10,
-            VisibilityTimeout=30,
-            WaitTimeSeconds=1
+        return redrive_dlq(
+            dlq_url=get_queue_url_from_params("poc-dlq-queue-url"),
+            task_queue_url=get_queue_url_from_params("poc-task-queue-url"),
+            receivers=receivers,
+            max_messages=max_messages,
+            rate_limit=rate_limit,
+            dry_run=dry_run,
+            resubmit_unchanged=resubmit_unchanged,
+            wait_seconds=1,
+            max_seconds=REDRIVE_MAX_SECONDS
         )
-        
-        messages = []
-        for msg in response.get('Messages', []):
-            body = json.loads(msg['Body'])
-            messages.append({
-                "message_id": msg['MessageId'],
-                "order_id": body.get('order_id'),
-                "correlation_id": body.get('correlation_id'),
-                "receipt_handle": msg['ReceiptHandle'],
-                "body": body
-            })
-        
-        return {"count": len(messages), "messages": messages}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,4 +1,5 @@
 # used the dataclass here , Pydantic was creating some errors while running in the localstack.
+import uuid
 from dataclasses import dataclass
 from typing import List, Optional
 
@@ -26,3 +27,13 @@ class Order:
         for item_data in self.items:
             item = Item(**item_data)
             item.validate()
+
+def build_order_message(order, user_id, order_id=None):
+    """Task-queue message for a validated order"""
+    return {
+        "correlation_id": str(uuid.uuid4()),
+        "order_id": order_id or f"ORD-{int(uuid.uuid4().time_low)}",
+        "items": order["items"],
+        "promo_code": order.get("promo_code"),
+        "user_id": user_id
+    }
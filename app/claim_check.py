@@ -0,0 +1,257 @@
+# claim_check.py
+"""
+Claim-check for oversized SQS bodies: a message body larger than
+CLAIM_CHECK_THRESHOLD_BYTES is compressed (CLAIM_CHECK_CODEC, gzip by
+default) and stored in the results bucket under claim-check/, and the message
+carries a pointer instead:
+
+    {"order_id": "ORD-1", "correlation_id": "...",
+     "claim_check": {"bucket": "results-bucket", "key": "claim-check/<uuid>.json.gz",
+                     "sha256": "<hex of the stored bytes>", "size": 412931, "encoding": "gzip"}}
+
+Producers (send_notification, send_batch, POST /orders, POST /orders/batch):
+
+    body = check_in(json.dumps(message), message)
+
+Consumers (task_lambda, dlq_processor_lambda, the DLQ redrive; notification_lambda only resolves):
+
+    envelope = json.loads(record["body"])
+    try:
+        body = resolve(envelope)                   # the original message
+    except PayloadNotFound:
+        if not already_processed(envelope):
+            raise
+        ...                                        # a redelivery of a processed record: done
+    release(bodies_of_records_that_succeeded)      # once per batch
+
+resolve() verifies the checksum before decoding, so a damaged or replaced
+object fails the record instead of being processed. A Lambda handler releases
+before the event source mapping deletes its messages, so a failed delete
+redelivers a record whose object is gone: resolve() raises PayloadNotFound,
+and the record counts as done if its order is already COMPLETED or RECOVERED
+in DynamoDB. task_worker deletes first and releases only what was deleted.
+notification_lambda never releases: an order is COMPLETED before it is
+notified, so its status cannot tell whether a notification was delivered, and
+its payloads are left to the lifecycle rule. Fetched payloads are kept
+in payload_cache, so a retried record, or one moving on to the DLQ, is fetched
+from S3 only once per warm container. release() deletes the objects in
+batches of up to 1000 keys with DeleteObjects. Records that end in the DLQ or
+in manual review keep their object too. The S3 lifecycle rule on claim-check/
+that notebook/poc.ipynb creates with the bucket (expire after 14 days, the
+SQS maximum retention) removes all of these.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+from app.config import get_aws_client
+from app.database import get_order
+from app.metrics import metrics
+from app.parameter_store import get_cached_parameter
+from app.storage import JSON_CONTENT_TYPE, decompress, get_codec
+from app.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+POINTER_FIELD = "claim_check"
+KEY_PREFIX = "claim-check/"
+
+# Kept next to the pointer so logs, the DLQ catalog and tracing still identify the order
+ENVELOPE_FIELDS = ("order_id", "correlation_id")
+
+DEFAULT_THRESHOLD_BYTES = 64 * 1024
+
+# DeleteObjects limit
+MAX_DELETE_KEYS = 1000
+
+# Order statuses after which a consumer is done with the order's payload
+PROCESSED_STATUSES = ("COMPLETED", "RECOVERED")
+
+
+class PayloadNotFound(LookupError):
+    """The checked-in object does not exist (released after processing, or expired)"""
+
+
+def threshold_bytes():
+    return int(os.environ.get("CLAIM_CHECK_THRESHOLD_BYTES", str(DEFAULT_THRESHOLD_BYTES)))
+
+
+def build_claim_check(body, message, bucket, threshold=None, codec=None):
+    """
+    (body to send, put_object kwargs or None). Bodies at or under the threshold
+    are returned unchanged; larger ones are replaced by a pointer envelope and
+    the kwargs store the compressed payload. No I/O, so the async API can do
+    the put with its own client.
+    """
+    raw = body.encode("utf-8")
+    if len(raw) <= (threshold if threshold is not None else threshold_bytes()):
+        return body, None
+    codec = codec or get_codec(os.environ.get("CLAIM_CHECK_CODEC", "gzip"))
+    data = codec.compress(raw)
+    suffix = f".{codec.content_encoding}" if codec.content_encoding else ""
+    pointer = {
+        "bucket": bucket,
+        "key": f"{KEY_PREFIX}{uuid.uuid4().hex}.json{suffix}",
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "size": len(raw),
+        "encoding": codec.content_encoding,
+    }
+    request = {"Bucket": bucket, "Key": pointer["key"], "Body": data, "ContentType": JSON_CONTENT_TYPE}
+    if codec.content_encoding:
+        request["ContentEncoding"] = codec.content_encoding
+    envelope = {name: message[name] for name in ENVELOPE_FIELDS if isinstance(message, dict) and name in message}
+    envelope[POINTER_FIELD] = pointer
+    return json.dumps(envelope), request
+
+
+def check_in(body, message, bucket=None, threshold=None):
+    """body, or the pointer envelope once the payload is stored in S3 (bucket: poc-results-bucket-name)"""
+    if len(body) <= (threshold if threshold is not None else threshold_bytes()) // 4:
+        # Cheap exit for the common case: a str of this length cannot exceed the threshold in UTF-8
+        return body
+    body, request = build_claim_check(body, message, bucket or get_cached_parameter("poc-results-bucket-name"),
+                                      threshold)
+    if request is not None:
+        s3 = get_aws_client("s3")
+        with metrics.timer("S3.PutObject"), tracer.span("S3.PutObject"):
+            s3.put_object(**request)
+        logger.info(f"   📦 Payload checked in to s3://{request['Bucket']}/{request['Key']} "
+                    f"({len(request['Body'])} bytes stored)")
+    return body
+
+
+def pointer_of(body):
+    """Claim-check pointer of a parsed message body, or None"""
+    return body.get(POINTER_FIELD) if isinstance(body, dict) else None
+
+
+class PayloadCache:
+    """
+    Bounded LRU of checked-out payloads (decoded JSON bytes) by S3 key,
+    limited by total payload size. Bytes rather than dicts, so a consumer that
+    mutates its copy (fix_order_data) cannot change what the next one gets.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes or int(os.environ.get("CLAIM_CHECK_CACHE_BYTES", str(16 * 1024 * 1024)))
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            raw = self._entries.get(key)
+            if raw is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return raw
+
+    def put(self, key, raw):
+        if len(raw) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            self._bytes += len(raw) - (len(previous) if previous is not None else 0)
+            self._entries[key] = raw
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.stats["evictions"] += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            raw = self._entries.pop(key, None)
+            if raw is not None:
+                self._bytes -= len(raw)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+payload_cache = PayloadCache()
+
+
+def fetch_payload(pointer):
+    """Decoded JSON bytes of a checked-in payload, from the cache or S3. Raises ValueError on a checksum mismatch."""
+    raw = payload_cache.get(pointer["key"])
+    if raw is not None:
+        return raw
+    s3 = get_aws_client("s3")
+    try:
+        with metrics.timer("S3.GetObject"), tracer.span("S3.GetObject"):
+            data = s3.get_object(Bucket=pointer["bucket"], Key=pointer["key"])["Body"].read()
+    except Exception as e:
+        if getattr(e, "response", {}).get("Error", {}).get("Code") != "NoSuchKey":
+            raise
+        raise PayloadNotFound(f"Claim-check payload s3://{pointer['bucket']}/{pointer['key']} not found") from e
+    if hashlib.sha256(data).hexdigest() != pointer["sha256"]:
+        raise ValueError(f"Claim-check checksum mismatch for s3://{pointer['bucket']}/{pointer['key']}")
+    raw = decompress(data, pointer.get("encoding"))
+    payload_cache.put(pointer["key"], raw)
+    return raw
+
+
+def resolve(body):
+    """The original message for a parsed body: fetched from S3 for a pointer envelope, else body itself"""
+    pointer = pointer_of(body)
+    if pointer is None:
+        return body
+    return json.loads(fetch_payload(pointer))
+
+
+def already_processed(body):
+    """True if the order of a parsed body is COMPLETED or RECOVERED in DynamoDB (read past the order cache)"""
+    order_id = body.get("order_id") if isinstance(body, dict) else None
+    if not order_id:
+        return False
+    order = get_order(order_id)
+    return order is not None and order.get("status") in PROCESSED_STATUSES
+
+
+def release(bodies):
+    """
+    Deletes the checked-in payloads of the given message bodies (str or parsed)
+    once they no longer need to be read. Failures are logged, not raised: the
+    lifecycle rule on claim-check/ removes what is left. Returns the keys deleted.
+    """
+    keys_by_bucket = {}
+    for body in bodies:
+        if isinstance(body, str):
+            if f'"{POINTER_FIELD}"' not in body:
+                continue
+            try:
+                body = json.loads(body)
+            except ValueError:
+                continue
+        pointer = pointer_of(body)
+        if pointer is not None:
+            keys_by_bucket.setdefault(pointer["bucket"], []).append(pointer["key"])
+
+    deleted = []
+    for bucket, keys in keys_by_bucket.items():
+        for key in keys:
+            payload_cache.invalidate(key)
+        try:
+            s3 = get_aws_client("s3")
+            for start in range(0, len(keys), MAX_DELETE_KEYS):
+                chunk = keys[start:start + MAX_DELETE_KEYS]
+                with metrics.timer("S3.DeleteObjects"), tracer.span("S3.DeleteObjects"):
+                    response = s3.delete_objects(Bucket=bucket, Delete={
+                        "Objects": [{"Key": key} for key in chunk], "Quiet": True})
+                errors = {error["Key"] for error in response.get("Errors", [])}
+                deleted += [key for key in chunk if key not in errors]
+                if errors:
+                    logger.warning(f"   ⚠️ {len(errors)} claim-check objects not deleted from {bucket}")
+        except Exception as e:
+            logger.warning(f"   ⚠️ Claim-check cleanup failed for {len(keys)} objects in {bucket}: {str(e)}")
+    return deleted
@@ -0,0 +1,141 @@
+# app/cold_start.py
+"""
+Cold-start helpers for the Lambda handlers:
+
+- ImportProfiler records how long every module takes to import during init
+  (enable with IMPORT_PROFILE=true) and logs it as one JSON report.
+- lazy_import() defers loading rarely used modules until first attribute
+  access (enable with LAZY_IMPORTS=true).
+"""
+import importlib
+import importlib.util
+import json
+import os
+import sys
+import time
+
+
+def _env_flag(name):
+    return os.environ.get(name, "false").lower() in ("1", "true", "yes")
+
+class _TimedLoader:
+    """Wraps a module loader so exec_module is timed; everything else is forwarded"""
+
+    def __init__(self, loader, profiler):
+        self._loader = loader
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._enter(module.__name__)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit(module.__name__)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+class ImportProfiler:
+    """
+    Meta path hook that records self and cumulative import time per module.
+    Only modules imported while the profiler is running are recorded.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self._stack = []
+        self._started = None
+        self._elapsed_ms = 0.0
+        self._finding = False
+
+    def start(self):
+        self._started = time.perf_counter()
+        sys.meta_path.insert(0, self)
+        return self
+
+    def stop(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+            self._elapsed_ms = (time.perf_counter() - self._started) * 1000
+        return self
+
+    def find_spec(self, fullname, path, target=None):
+        if self._finding:
+            return None
+        self._finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                        spec.loader = _TimedLoader(spec.loader, self)
+                    return spec
+            return None
+        finally:
+            self._finding = False
+
+    def _enter(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def _exit(self, name):
+        _, started, child_ms = self._stack.pop()
+        cumulative_ms = (time.perf_counter() - started) * 1000
+        if self._stack:
+            self._stack[-1][2] += cumulative_ms
+        self.timings[name] = {
+            "self_ms": round(cumulative_ms - child_ms, 3),
+            "cumulative_ms": round(cumulative_ms, 3)
+        }
+
+    def report(self, top=20):
+        modules = sorted(self.timings.items(), key=lambda entry: entry[1]["self_ms"], reverse=True)
+        return {
+            "metric": "import_profile",
+            "init_ms": round(self._elapsed_ms, 3),
+            "modules_imported": len(self.timings),
+            "top_modules": [{"module": name, **timing} for name, timing in modules[:top]]
+        }
+
+    def log_report(self, top=20):
+        # Imported here so app.metrics is not loaded ahead of the profiler
+        from app.metrics import metric_logger
+        metric_logger.info(json.dumps(self.report(top)))
+
+_profiler = None
+
+def start_import_profiler(force=False):
+    """
+    Starts the process-wide import profiler when IMPORT_PROFILE is set (or force=True).
+    Returns the running profiler, or None when profiling is off.
+    """
+    global _profiler
+    if _profiler is None and (force or _env_flag("IMPORT_PROFILE")):
+        _profiler = ImportProfiler().start()
+    return _profiler
+
+def lazy_import(name):
+    """
+    Returns the module, executing it on first attribute access when LAZY_IMPORTS is set.
+    Falls back to a normal import when lazy mode is off or the module is already loaded.
+    """
+    if name in sys.modules or not _env_flag("LAZY_IMPORTS"):
+        return importlib.import_module(name)
+
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        return importlib.import_module(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
@@ -2,20 +2,105 @@
 
 import boto3
 import os
+import threading
+import time
+from botocore.config import Config
+
+# One client per (service, region, endpoint) for the life of the Lambda
+# container / FastAPI process, so every code path shares the same HTTP pools.
+_clients = {}
+_clients_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "construction_ms": 0.0}
 
-def get_aws_client(service_name):
-    """
-    Returns a boto3 client for the service, handling LocalStack endpoint automatically.
-    """
-    region = os.environ.get("AWS_REGION", "us-east-1")
-    endpoint_url = os.environ.get("AWS_ENDPOINT_URL")
+
+def _resolve_region_and_endpoint(region_name=None, endpoint_url=None):
+    region = region_name or os.environ.get("AWS_REGION", "us-east-1")
+    endpoint_url = endpoint_url or os.environ.get("AWS_ENDPOINT_URL")
 
     # Use localhost default if endpoint not set and not running in Lambda
     if not endpoint_url and not os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
         endpoint_url = "http://localhost:4566"
 
-    kwargs = {"region_name": region}
-    if endpoint_url:
-        kwargs["endpoint_url"] = endpoint_url
+    return region, endpoint_url
+
+
+def get_client_options():
+    """
+    Returns the botocore Config options shared by all pooled clients (sync and async).
+    Pool size, keep-alive and timeouts can be tuned through environment variables.
+    """
+    return {
+        "max_pool_connections": int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", "50")),
+        "tcp_keepalive": os.environ.get("AWS_TCP_KEEPALIVE", "true").lower() == "true",
+        "connect_timeout": float(os.environ.get("AWS_CONNECT_TIMEOUT", "5")),
+        "read_timeout": float(os.environ.get("AWS_READ_TIMEOUT", "30")),
+        "retries": {
+            "max_attempts": int(os.environ.get("AWS_MAX_ATTEMPTS", "3")),
+            "mode": "standard"
+        }
+    }
+
+
+def get_client_config():
+    """Returns the botocore Config shared by all pooled clients"""
+    return Config(**get_client_options())
+
+
+def get_aws_client(service_name, region_name=None, endpoint_url=None):
+    """
+    Returns a boto3 client for the service, handling LocalStack endpoint automatically.
+    Clients are memoized per (service, region, endpoint) and are safe to share across threads.
+    """
+    region, endpoint_url = _resolve_region_and_endpoint(region_name, endpoint_url)
+    key = (service_name, region, endpoint_url)
+
+    client = _clients.get(key)
+    if client is not None:
+        with _clients_lock:
+            _stats["hits"] += 1
+        return client
+
+    with _clients_lock:
+        # Another thread may have built it while we waited for the lock
+        client = _clients.get(key)
+        if client is not None:
+            _stats["hits"] += 1
+            return client
+
+        kwargs = {"region_name": region, "config": get_client_config()}
+        if endpoint_url:
+            kwargs["endpoint_url"] = endpoint_url
+
+        start = time.perf_counter()
+        client = boto3.client(service_name, **kwargs)
+        _stats["construction_ms"] += (time.perf_counter() - start) * 1000
+        _stats["misses"] += 1
+        _clients[key] = client
+        return client
+
+
+def register_client(service_name, client, region_name=None, endpoint_url=None):
+    """
+    Installs a pre-built client in the registry (e.g. a local stand-in for scripts and benchmarks).
+    """
+    region, endpoint_url = _resolve_region_and_endpoint(region_name, endpoint_url)
+    with _clients_lock:
+        _clients[(service_name, region, endpoint_url)] = client
+
+
+def get_client_stats():
+    """Returns hit/miss counters and total client construction time"""
+    with _clients_lock:
+        return {
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "construction_ms": round(_stats["construction_ms"], 3),
+            "clients": len(_clients)
+        }
+
 
-    return boto3.client(service_name, **kwargs)
+def reset_clients():
+    """Drops all pooled clients and counters (used by scripts and benchmarks)"""
+    with _clients_lock:
+        _clients.clear()
+        _stats.update({"hits": 0, "misses": 0, "construction_ms": 0.0})
@@ -1,40 +1,261 @@
 import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 from app.config import get_aws_client
+from app.metrics import metrics
+from app.money import Money
 from app.parameter_store import get_cached_parameter
+from app.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# BatchWriteItem accepts at most 25 requests per call
+MAX_BATCH_WRITE_ITEMS = 25
+
+# Status lookups skip the large items_json attribute
+ORDER_STATUS_PROJECTION = "order_id, #status, #timestamp, subtotal, discount_amount, final_total, promo_code, recovered_from_dlq"
+ORDER_STATUS_NAMES = {"#status": "status", "#timestamp": "timestamp"}
+
+def build_order_item(order_id, status, subtotal, discount_amount, final_total, items, promo_code="", recovered=False):
+    """DynamoDB item for an order. Amounts are stored as exact two-decimal N values."""
+    return {
+        "order_id": {"S": order_id},
+        "status": {"S": status},
+        "timestamp": {"S": datetime.utcnow().isoformat()},
+        "subtotal": {"N": str(Money.of(subtotal))},
+        "discount_amount": {"N": str(Money.of(discount_amount))},
+        "final_total": {"N": str(Money.of(final_total))},
+        "promo_code": {"S": promo_code},
+        "items_json": {"S": json.dumps(items)},
+        "recovered_from_dlq": {"BOOL": recovered}
+    }
 
 def save_order(order_id, status, subtotal, discount_amount, final_total, items, promo_code="", recovered=False):
     """Save order to DynamoDB"""
     dynamodb = get_aws_client("dynamodb")
     table_name = get_cached_parameter("poc-orders-table-name")
-    
-    dynamodb.put_item(
-        TableName=table_name,
-        Item={
-            "order_id": {"S": order_id},
-            "status": {"S": status},
-            "timestamp": {"S": datetime.utcnow().isoformat()},
-            "subtotal": {"N": str(subtotal)},
-            "discount_amount": {"N": str(discount_amount)},
-            "final_total": {"N": str(final_total)},
-            "promo_code": {"S": promo_code},
-            "items_json": {"S": json.dumps(items)},
-            "recovered_from_dlq": {"BOOL": recovered}
-        }
-    )
+
+    item = build_order_item(order_id, status, subtotal, discount_amount, final_total, items, promo_code, recovered)
+    with metrics.timer("DynamoDB.PutItem"), tracer.span("DynamoDB.PutItem"):
+        dynamodb.put_item(TableName=table_name, Item=item)
+    order_cache.invalidate(order_id)
 
 def update_order_status(order_id, status, recovered=False):
     """Update order status in DynamoDB"""
     dynamodb = get_aws_client("dynamodb")
     table_name = get_cached_parameter("poc-orders-table-name")
-    
-    dynamodb.update_item(
-        TableName=table_name,
-        Key={"order_id": {"S": order_id}},
-        UpdateExpression="SET #status = :status, recovered_from_dlq = :recovered",
-        ExpressionAttributeNames={"#status": "status"},
-        ExpressionAttributeValues={
-            ":status": {"S": status},
-            ":recovered": {"BOOL": recovered}
-        }
-    )
+
+    with metrics.timer("DynamoDB.UpdateItem"), tracer.span("DynamoDB.UpdateItem"):
+        dynamodb.update_item(
+            TableName=table_name,
+            Key={"order_id": {"S": order_id}},
+            UpdateExpression="SET #status = :status, recovered_from_dlq = :recovered",
+            ExpressionAttributeNames={"#status": "status"},
+            ExpressionAttributeValues={
+                ":status": {"S": status},
+                ":recovered": {"BOOL": recovered}
+            }
+        )
+    order_cache.invalidate(order_id)
+
+def parse_order_item(item):
+    """Converts a DynamoDB order item into a plain dict"""
+    order = {}
+    for name, value in item.items():
+        if "S" in value:
+            order[name] = value["S"]
+        elif "N" in value:
+            order[name] = float(value["N"])
+        elif "BOOL" in value:
+            order[name] = value["BOOL"]
+    return order
+
+class OrderCache:
+    """
+    Bounded LRU cache with a TTL for order status lookups.
+    Writers in this process invalidate entries; the TTL bounds staleness for
+    writes made by other processes (the lambdas).
+    """
+
+    def __init__(self, max_size=None, ttl=None):
+        self.max_size = max_size or int(os.environ.get("ORDER_CACHE_SIZE", "10000"))
+        self.ttl = ttl if ttl is not None else float(os.environ.get("ORDER_CACHE_TTL_SECONDS", "5"))
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, order_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(order_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(order_id)
+                self.stats["hits"] += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[order_id]
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, order_id, order):
+        with self._lock:
+            self._entries[order_id] = (order, time.monotonic() + self.ttl)
+            self._entries.move_to_end(order_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def invalidate(self, order_id):
+        with self._lock:
+            if self._entries.pop(order_id, None) is not None:
+                self.stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def hit_ratio(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+order_cache = OrderCache()
+
+def get_order(order_id):
+    """Reads an order's status fields (without items_json) from DynamoDB. Returns None if missing."""
+    dynamodb = get_aws_client("dynamodb")
+    table_name = get_cached_parameter("poc-orders-table-name")
+
+    with metrics.timer("DynamoDB.GetItem"), tracer.span("DynamoDB.GetItem"):
+        response = dynamodb.get_item(
+            TableName=table_name,
+            Key={"order_id": {"S": order_id}},
+            ProjectionExpression=ORDER_STATUS_PROJECTION,
+            ExpressionAttributeNames=ORDER_STATUS_NAMES
+        )
+    item = response.get("Item")
+    return parse_order_item(item) if item else None
+
+def get_order_status(order_id):
+    """Read-through cached version of get_order"""
+    order = order_cache.get(order_id)
+    if order is None:
+        order = get_order(order_id)
+        if order is not None:
+            order_cache.put(order_id, order)
+    return order
+
+class OrderWriter:
+    """
+    Buffers order writes for a Lambda batch and flushes them with BatchWriteItem.
+    A status update on an order that is already buffered is folded into its put,
+    and repeated puts for the same key keep only the latest item.
+
+    Use as a context manager so the buffer is flushed when the handler finishes:
+
+        with OrderWriter() as writer:
+            writer.save_order(...)
+    """
+
+    def __init__(self, table_name=None, max_attempts=5, base_delay=0.05):
+        self.table_name = table_name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.failed_order_ids = []
+        self.stats = {"items": 0, "round_trips": 0, "retries": 0, "collapsed": 0}
+        self._puts = {}
+        self._updates = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
+
+    def save_order(self, order_id, status, subtotal, discount_amount, final_total, items, promo_code="", recovered=False):
+        item = build_order_item(order_id, status, subtotal, discount_amount, final_total, items, promo_code, recovered)
+        with self._lock:
+            if order_id in self._puts or order_id in self._updates:
+                self.stats["collapsed"] += 1
+            # A full put supersedes any pending status update for the same key
+            self._updates.pop(order_id, None)
+            self._puts[order_id] = item
+
+    def update_order_status(self, order_id, status, recovered=False):
+        with self._lock:
+            item = self._puts.get(order_id)
+            if item is not None:
+                item["status"] = {"S": status}
+                item["recovered_from_dlq"] = {"BOOL": recovered}
+                self.stats["collapsed"] += 1
+            else:
+                self._updates[order_id] = (status, recovered)
+
+    def flush(self):
+        """
+        Writes everything buffered so far. Order IDs that still could not be
+        written after all retries are appended to failed_order_ids.
+        """
+        with self._lock:
+            puts, self._puts = list(self._puts.values()), {}
+            updates, self._updates = self._updates, {}
+
+        if not puts and not updates:
+            return self.stats
+
+        dynamodb = get_aws_client("dynamodb")
+        table_name = self.table_name or get_cached_parameter("poc-orders-table-name")
+
+        for start in range(0, len(puts), MAX_BATCH_WRITE_ITEMS):
+            chunk = puts[start:start + MAX_BATCH_WRITE_ITEMS]
+            self._write_chunk(dynamodb, table_name, [{"PutRequest": {"Item": item}} for item in chunk])
+
+        # BatchWriteItem cannot update, so status-only changes stay as UpdateItem calls
+        for order_id, (status, recovered) in updates.items():
+            try:
+                update_order_status(order_id, status, recovered)
+                self.stats["items"] += 1
+            except Exception as e:
+                logger.error(f"   ❌ Status update failed for {order_id}: {str(e)}")
+                self.failed_order_ids.append(order_id)
+            self.stats["round_trips"] += 1
+
+        # Drop cached status lookups for everything just written
+        for order_id in [item["order_id"]["S"] for item in puts] + list(updates):
+            order_cache.invalidate(order_id)
+
+        logger.info(f"   📊 DynamoDB: {self.stats['items']} items in {self.stats['round_trips']} round-trips")
+        return self.stats
+
+    def _write_chunk(self, dynamodb, table_name, requests):
+        """Writes one BatchWriteItem chunk, retrying UnprocessedItems with exponential backoff"""
+        pending = requests
+        for attempt in range(self.max_attempts):
+            if attempt:
+                self.stats["retries"] += 1
+                delay = self.base_delay * (2 ** (attempt - 1))
+                time.sleep(delay + random.uniform(0, delay))
+
+            self.stats["round_trips"] += 1
+            try:
+                with metrics.timer("DynamoDB.BatchWriteItem"), tracer.span("DynamoDB.BatchWriteItem"):
+                    response = dynamodb.batch_write_item(RequestItems={table_name: pending})
+            except Exception as e:
+                logger.error(f"   ❌ BatchWriteItem failed: {str(e)}")
+                continue
+
+            unprocessed = response.get("UnprocessedItems", {}).get(table_name, [])
+            self.stats["items"] += len(pending) - len(unprocessed)
+            if not unprocessed:
+                return
+            pending = unprocessed
+
+        for request in pending:
+            self.failed_order_ids.append(request["PutRequest"]["Item"]["order_id"]["S"])
+        logger.error(f"   ❌ {len(pending)} items still unprocessed after {self.max_attempts} attempts")
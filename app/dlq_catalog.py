@@ -0,0 +1,406 @@
+# dlq_catalog.py
+"""
+Queryable index of dead-lettered messages, so triage reads DynamoDB instead of
+receiving from dlq-queue (a receive hides messages from dlq_processor_lambda
+and returns at most 10).
+
+dlq_processor_lambda adds every record it is handed, with the outcome of its
+recovery attempt, to the table named by poc-dlq-catalog-table-name
+(partition key message_id). Entries are indexed for browsing newest first:
+
+    order_id-index         order_id        / dead_lettered_at
+    correlation_id-index   correlation_id  / dead_lettered_at
+    signature-index        signature       / dead_lettered_at
+    hour-index             hour            / dead_lettered_at
+
+Counts per signature and per hour are precomputed: one counter item per key
+(message_id "count#signature#..." / "count#hour#..."), bumped with ADD once per
+invocation. Only counter items carry counter_kind, so the sparse counter-index
+returns them without touching the entries.
+
+A message is counted when its entry is created. ApproximateReceiveCount cannot
+tell: a message moved to the DLQ keeps the receive count (and first-receive
+timestamp) it had on task-queue.
+"""
+
+import base64
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from app.config import get_aws_client
+from app.metrics import metrics
+from app.parameter_store import get_cached_parameter
+from app.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# IndexName -> (partition key, sort key)
+CATALOG_INDEXES = {
+    "order_id-index": ("order_id", "dead_lettered_at"),
+    "correlation_id-index": ("correlation_id", "dead_lettered_at"),
+    "signature-index": ("signature", "dead_lettered_at"),
+    "hour-index": ("hour", "dead_lettered_at"),
+    "counter-index": ("counter_kind", "counter_key"),
+}
+
+# Filters that select an index, in order of selectivity
+KEY_FILTERS = ("order_id", "correlation_id", "signature", "hour")
+
+# Set by the write that creates an entry and kept by later ones, so a retried
+# record stays under the hour and signature it was counted in
+FIRST_WRITE_FIELDS = ("dead_lettered_at", "hour", "signature")
+
+# Bodies are kept for triage but capped well below the 400 KB item limit
+MAX_BODY_BYTES = 32 * 1024
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# GET /dlq/stats returns this many most recent hours
+STATS_HOURS = 48
+
+
+def diagnose(body):
+    """
+    Normalized failure codes for a DLQ message body: the same checks task_lambda
+    applies, with item names, amounts and ids left out so messages failing the
+    same way share one signature.
+    """
+    if not isinstance(body, dict):
+        return ["unreadable_body"]
+    items = body.get("items")
+    if not items:
+        return ["no_items"]
+    if not isinstance(items, list):
+        return ["malformed_items"]
+    codes = set()
+    for item in items:
+        if not isinstance(item, dict) or "name" not in item:
+            codes.add("malformed_item")
+            continue
+        price, quantity = item.get("price", 0), item.get("quantity", 0)
+        if not isinstance(price, (int, float)) or not isinstance(quantity, (int, float)):
+            codes.add("non_numeric_amount")
+            continue
+        if price < 0:
+            codes.add("negative_price")
+        if quantity <= 0 or quantity % 1:
+            codes.add("invalid_quantity")
+    # Nothing wrong with the body: the order failed on something transient (S3, DynamoDB, SQS)
+    return sorted(codes) or ["no_validation_error"]
+
+
+def error_signature(body):
+    return "+".join(diagnose(body))
+
+
+def dead_lettered_at(moment=None):
+    """
+    ISO-8601 UTC (ms) of moment, default now. SQS keeps no DLQ arrival time (the
+    first-receive timestamp is from task-queue), so an entry is stamped when the
+    catalog first sees the message and keeps that stamp.
+    """
+    moment = moment or datetime.now(timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{moment.microsecond // 1000:03d}Z"
+
+
+def build_catalog_item(record, status, fixes=(), body=None, at=None, error=None):
+    """
+    Catalog entry for one DLQ record. Index keys are only set when present,
+    since DynamoDB rejects empty strings in key attributes. body is the parsed
+    order when the record only carries a claim check. The stored body is then
+    the pointer, whose payload stays in S3 unless the order was recovered.
+    at (datetime) overrides the dead_lettered_at stamp. error is why a FAILED
+    attempt failed; it is cleared (NULL) by an entry without one.
+    """
+    raw = record.get("body") or ""
+    if body is None:
+        try:
+            body = json.loads(raw)
+        except (TypeError, ValueError):
+            body = None
+    at = dead_lettered_at(at)
+    item = {
+        "message_id": {"S": record["messageId"]},
+        "signature": {"S": error_signature(body)},
+        "dead_lettered_at": {"S": at},
+        "hour": {"S": at[:13]},
+        "status": {"S": status},
+        "receive_count": {"N": record.get("attributes", {}).get("ApproximateReceiveCount", "1")},
+        "fixes": {"S": json.dumps(list(fixes))},
+        "error": {"S": error} if error else {"NULL": True},
+        "body": {"S": raw[:MAX_BODY_BYTES]},
+        "body_truncated": {"BOOL": len(raw) > MAX_BODY_BYTES},
+    }
+    if isinstance(body, dict):
+        for name in ("order_id", "correlation_id"):
+            if isinstance(body.get(name), str) and body[name]:
+                item[name] = {"S": body[name]}
+    return item
+
+
+def parse_catalog_item(item):
+    """Catalog entry as returned by the API"""
+    entry = {
+        "message_id": item["message_id"]["S"],
+        "order_id": item.get("order_id", {}).get("S"),
+        "correlation_id": item.get("correlation_id", {}).get("S"),
+        "signature": item["signature"]["S"],
+        "dead_lettered_at": item["dead_lettered_at"]["S"],
+        "status": item["status"]["S"],
+        "receive_count": int(item["receive_count"]["N"]),
+        "fixes": json.loads(item["fixes"]["S"]),
+        "error": item.get("error", {}).get("S"),
+        "body_truncated": item["body_truncated"]["BOOL"],
+    }
+    try:
+        entry["body"] = json.loads(item["body"]["S"])
+    except ValueError:
+        entry["body"] = item["body"]["S"]
+    return entry
+
+
+def entry_update(table_name, item):
+    """
+    UpdateItem kwargs that create or refresh a catalog entry. FIRST_WRITE_FIELDS
+    are only set if absent; UPDATED_OLD tells whether the entry already existed.
+    """
+    names, values, assignments = {}, {}, []
+    for index, (name, value) in enumerate(item.items()):
+        if name == "message_id":
+            continue
+        names[f"#a{index}"], values[f":v{index}"] = name, value
+        if name in FIRST_WRITE_FIELDS:
+            assignments.append(f"#a{index} = if_not_exists(#a{index}, :v{index})")
+        else:
+            assignments.append(f"#a{index} = :v{index}")
+    return {
+        "TableName": table_name,
+        "Key": {"message_id": item["message_id"]},
+        "UpdateExpression": "SET " + ", ".join(assignments),
+        "ExpressionAttributeNames": names,
+        "ExpressionAttributeValues": values,
+        "ReturnValues": "UPDATED_OLD",
+    }
+
+
+class DLQCatalog:
+    """
+    Collects catalog entries for one invocation. flush() writes each with
+    UpdateItem and then bumps each signature/hour counter once.
+
+    Entries are keyed by message_id, so a retried record updates its entry
+    with the latest outcome. Counters only count entries the flush created, so
+    a message received again (a FAILED retry, a duplicate delivery) is not
+    counted twice, whatever its ApproximateReceiveCount.
+    """
+
+    def __init__(self, table_name=None):
+        self.table_name = table_name
+        self.entries = {}
+        self.stats = {"items": 0, "created": 0, "counter_updates": 0}
+
+    def add(self, record, status, fixes=(), body=None, at=None, error=None):
+        self.entries[record["messageId"]] = build_catalog_item(record, status, fixes, body, at, error)
+
+    def flush(self):
+        entries = list(self.entries.values())
+        self.entries.clear()
+        if not entries:
+            return self.stats
+
+        try:
+            dynamodb = get_aws_client("dynamodb")
+            table_name = self.table_name or get_cached_parameter("poc-dlq-catalog-table-name")
+        except Exception as e:
+            logger.error(f"   ❌ DLQ catalog unavailable, {len(entries)} entries not indexed: {str(e)}")
+            return self.stats
+
+        counts = Counter()
+        for item in entries:
+            try:
+                with metrics.timer("DynamoDB.UpdateItem"), tracer.span("DynamoDB.UpdateItem"):
+                    response = dynamodb.update_item(**entry_update(table_name, item))
+            except Exception as e:
+                # The catalog is an index: losing an entry must not fail the recovery itself
+                logger.error(f"   ❌ DLQ catalog entry {item['message_id']['S']} not written: {str(e)}")
+                continue
+            self.stats["items"] += 1
+            if "dead_lettered_at" not in response.get("Attributes", {}):
+                self.stats["created"] += 1
+                counts[("signature", item["signature"]["S"])] += 1
+                counts[("hour", item["hour"]["S"])] += 1
+
+        for (kind, key), count in counts.items():
+            try:
+                with metrics.timer("DynamoDB.UpdateItem"), tracer.span("DynamoDB.UpdateItem"):
+                    dynamodb.update_item(
+                        TableName=table_name,
+                        Key={"message_id": {"S": f"count#{kind}#{key}"}},
+                        UpdateExpression="SET counter_kind = :kind, counter_key = :key ADD #count :count",
+                        ExpressionAttributeNames={"#count": "count"},
+                        ExpressionAttributeValues={
+                            ":kind": {"S": kind},
+                            ":key": {"S": key},
+                            ":count": {"N": str(count)}
+                        }
+                    )
+                self.stats["counter_updates"] += 1
+            except Exception as e:
+                logger.error(f"   ❌ DLQ catalog counter {kind}={key} not updated: {str(e)}")
+
+        logger.info(f"   📚 DLQ catalog: {self.stats['items']} entries ({self.stats['created']} new), "
+                    f"{self.stats['counter_updates']} counters")
+        return self.stats
+
+
+def encode_cursor(last_evaluated_key):
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key).encode()).decode()
+
+
+def decode_cursor(cursor, index_name=None):
+    """
+    ExclusiveStartKey from a next_cursor. It must hold exactly the key
+    attributes of the table (message_id) plus those of index_name, as string
+    attribute values, or DynamoDB rejects the request. Raises ValueError.
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    expected = {"message_id", *CATALOG_INDEXES.get(index_name, ())}
+    if not isinstance(key, dict) or set(key) != expected:
+        raise ValueError("Invalid cursor")
+    for value in key.values():
+        if not isinstance(value, dict) or list(value) != ["S"] or not isinstance(value["S"], str) or not value["S"]:
+            raise ValueError("Invalid cursor")
+    return key
+
+
+def browse_request(table_name, order_id=None, correlation_id=None, signature=None, hour=None,
+                   limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """
+    (operation, kwargs) for one page of catalog entries. One of order_id,
+    correlation_id or signature picks its index; hour (YYYY-MM-DDTHH) narrows
+    it with begins_with on dead_lettered_at, or picks hour-index on its own.
+    Filtered pages are newest first. With no filter the table is scanned in key
+    order; counter items are dropped from the page, so it can hold fewer than
+    limit entries - keep following next_cursor, which is only valid for the same
+    filters. Raises ValueError on invalid arguments or cursor.
+    """
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    filters = {name: value for name, value in zip(KEY_FILTERS, (order_id, correlation_id, signature, hour)) if value}
+    if len(set(filters) - {"hour"}) > 1:
+        raise ValueError("Filter by at most one of order_id, correlation_id or signature")
+
+    kwargs = {"TableName": table_name, "Limit": limit}
+    if not filters:
+        if cursor:
+            kwargs["ExclusiveStartKey"] = decode_cursor(cursor)
+        kwargs["FilterExpression"] = "attribute_exists(dead_lettered_at)"
+        return "scan", kwargs
+
+    key = next(name for name in KEY_FILTERS if name in filters)
+    if cursor:
+        kwargs["ExclusiveStartKey"] = decode_cursor(cursor, f"{key}-index")
+    condition = "#key = :key"
+    names = {"#key": key}
+    values = {":key": {"S": filters[key]}}
+    if key != "hour" and "hour" in filters:
+        condition += " AND begins_with(#at, :hour)"
+        names["#at"] = "dead_lettered_at"
+        values[":hour"] = {"S": filters["hour"]}
+    kwargs.update(
+        IndexName=f"{key}-index",
+        KeyConditionExpression=condition,
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values,
+        ScanIndexForward=False
+    )
+    return "query", kwargs
+
+
+def parse_browse_response(response):
+    # Counter items never match a filtered query; an unfiltered Scan page may contain them
+    messages = [parse_catalog_item(item) for item in response.get("Items", []) if "dead_lettered_at" in item]
+    last_key = response.get("LastEvaluatedKey")
+    return {
+        "count": len(messages),
+        "messages": messages,
+        "next_cursor": encode_cursor(last_key) if last_key else None
+    }
+
+
+def counts_requests(table_name):
+    """Query kwargs for the signature counters and the most recent hour counters"""
+    def counters(kind, **extra):
+        return {
+            "TableName": table_name,
+            "IndexName": "counter-index",
+            "KeyConditionExpression": "counter_kind = :kind",
+            "ExpressionAttributeValues": {":kind": {"S": kind}},
+            **extra
+        }
+    return {
+        "signature": counters("signature"),
+        "hour": counters("hour", ScanIndexForward=False, Limit=STATS_HOURS)
+    }
+
+
+def parse_counts(responses):
+    by_signature = {item["counter_key"]["S"]: int(item["count"]["N"]) for item in responses["signature"].get("Items", [])}
+    by_hour = {item["counter_key"]["S"]: int(item["count"]["N"]) for item in responses["hour"].get("Items", [])}
+    return {
+        "total_indexed": sum(by_signature.values()),
+        "by_signature": dict(sorted(by_signature.items(), key=lambda entry: -entry[1])),
+        "by_hour": dict(sorted(by_hour.items(), reverse=True))
+    }
+
+
+def browse(**filters):
+    """One page of catalog entries (see browse_request for the filters)"""
+    dynamodb = get_aws_client("dynamodb")
+    operation, kwargs = browse_request(get_cached_parameter("poc-dlq-catalog-table-name"), **filters)
+    return parse_browse_response(getattr(dynamodb, operation)(**kwargs))
+
+
+def get_counts():
+    """Precomputed counts per signature and per hour"""
+    dynamodb = get_aws_client("dynamodb")
+    requests = counts_requests(get_cached_parameter("poc-dlq-catalog-table-name"))
+    # Signatures are few; one page holds them all
+    return parse_counts({kind: dynamodb.query(**kwargs) for kind, kwargs in requests.items()})
+
+
+class DepthCache:
+    """Last DLQ depth read, reused for ttl seconds so /dlq/stats does not call GetQueueAttributes per request"""
+
+    def __init__(self, ttl=30.0):
+        self.ttl = ttl
+        self._value = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            return self._value if time.monotonic() < self._expires else None
+
+    def put(self, value):
+        with self._lock:
+            self._value = value
+            self._expires = time.monotonic() + self.ttl
+
+
+def parse_depth(attributes):
+    return {
+        "messages_available": int(attributes.get("ApproximateNumberOfMessages", 0)),
+        "messages_in_flight": int(attributes.get("ApproximateNumberOfMessagesNotVisible", 0))
+    }
+
+
+dlq_depth_cache = DepthCache()
@@ -0,0 +1,234 @@
+# event_log.py
+"""
+Structured per-record logging for the handlers: one JSON event per record
+stage instead of a dozen formatted lines.
+
+    with event_log.record(message_id=record["messageId"]) as scope:
+        scope.bind(order_id=order_id, correlation_id=correlation_id)
+        event_log.info("calculated", subtotal=subtotal)
+
+Events are cheap until they are written:
+- Level gating is one integer compare; a disabled event costs nothing else.
+- Fields are kept as-is and only serialized when the event is actually
+  written, so nothing is formatted for dropped events. Guard fields that are
+  expensive to compute with event_log.enabled(level).
+- Inside a record, events are buffered and the record is kept or dropped as a
+  whole when it ends. Head sampling keeps LOG_SAMPLE_RATE of the records,
+  decided from the correlation_id so an order is kept or dropped consistently
+  in every function. Tail sampling always keeps records that failed, logged
+  a warning or an error, or took longer than LOG_TAIL_SLOW_MS.
+
+Every event carries the record's context (function, message_id, order_id,
+correlation_id) and the reason it was kept. Events outside a record (the
+invocation start, the batch summary) are written directly.
+
+The level and sample rate are read from Parameter Store (poc-log-level,
+poc-log-sample-rate) through the parameter cache at most every
+LOG_CONFIG_REFRESH_SECONDS, so both change without a redeploy; LOG_LEVEL and
+LOG_SAMPLE_RATE are the fallbacks. A level change also applies to the
+handler loggers passed to set_function(), so the handlers' remaining plain log
+lines follow it; app/ modules and the JSON metric lines (app.metrics) keep
+their own level.
+
+LOG_SINK picks where events go, like METRICS_SINK: stdout, memory or off.
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+import zlib
+
+from app.metrics import get_sink
+from app.parameter_store import get_cached_parameter
+
+logger = logging.getLogger(__name__)
+
+LEVEL_PARAMETER = "poc-log-level"
+SAMPLE_RATE_PARAMETER = "poc-log-sample-rate"
+
+LEVEL_NAMES = {logging.DEBUG: "DEBUG", logging.INFO: "INFO", logging.WARNING: "WARNING", logging.ERROR: "ERROR"}
+
+# Record scope of the current thread / task
+_current = contextvars.ContextVar("event_log_record", default=None)
+
+
+def parse_level(value):
+    level = logging.getLevelName(str(value).strip().upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown log level: {value}")
+    return level
+
+
+def head_sampled(key, rate):
+    """Same answer for the same key in every process, so an order is sampled end to end"""
+    if rate >= 1:
+        return True
+    if rate <= 0:
+        return False
+    return zlib.crc32(str(key).encode()) % 10000 < rate * 10000
+
+
+class RecordScope:
+    """Buffered events and context of one record"""
+
+    __slots__ = ("context", "events", "max_level", "started")
+
+    def __init__(self, context):
+        self.context = context
+        self.events = []
+        self.max_level = logging.NOTSET
+        self.started = time.perf_counter()
+
+    def bind(self, **fields):
+        """Adds context fields (e.g. order_id once the body is parsed) to every event of the record"""
+        self.context.update(fields)
+
+
+class EventLog:
+    def __init__(self, sink=None, function_name="unknown"):
+        self.sink = sink if sink is not None else get_sink(os.environ.get("LOG_SINK"))
+        self.function_name = os.environ.get("AWS_LAMBDA_FUNCTION_NAME", function_name)
+        self.level = parse_level(os.environ.get("LOG_LEVEL", "INFO"))
+        self.sample_rate = float(os.environ.get("LOG_SAMPLE_RATE", "1.0"))
+        self.slow_ms = float(os.environ.get("LOG_TAIL_SLOW_MS", "1000"))
+        self.refresh_seconds = float(os.environ.get("LOG_CONFIG_REFRESH_SECONDS", "60"))
+        self.loggers = []
+        self._checked = None
+        self._lock = threading.Lock()
+        self.stats = {"records": 0, "kept": 0, "written": 0, "dropped": 0}
+
+    def set_function(self, function_name, logger=None):
+        """
+        function field of every event; the Lambda runtime's AWS_LAMBDA_FUNCTION_NAME
+        wins when set. logger (the handler's own) follows level changes.
+        """
+        self.function_name = os.environ.get("AWS_LAMBDA_FUNCTION_NAME", function_name)
+        if logger is not None and logger not in self.loggers:
+            logger.setLevel(self.level)
+            self.loggers.append(logger)
+
+    def refresh_config(self, force=False):
+        """
+        Re-reads the level and sample rate from Parameter Store when the last
+        check is older than refresh_seconds. Call once per invocation; a missing
+        parameter keeps the current value.
+        """
+        now = time.monotonic()
+        if not force and self._checked is not None and now - self._checked < self.refresh_seconds:
+            return
+        self._checked = now
+        try:
+            level = parse_level(get_cached_parameter(LEVEL_PARAMETER))
+            if level != self.level:
+                logger.warning(f"   📝 Log level changed: {logging.getLevelName(self.level)} -> {logging.getLevelName(level)}")
+                self.level = level
+                for handler_logger in self.loggers:
+                    handler_logger.setLevel(level)
+        except Exception as e:
+            logger.debug(f"   Log level parameter unavailable: {str(e)}")
+        try:
+            self.sample_rate = min(1.0, max(0.0, float(get_cached_parameter(SAMPLE_RATE_PARAMETER))))
+        except Exception as e:
+            logger.debug(f"   Log sample rate parameter unavailable: {str(e)}")
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def record(self, **context):
+        return _RecordBlock(self, context)
+
+    def current(self):
+        """RecordScope of the record being processed on this thread, or None"""
+        return _current.get()
+
+    def log(self, level, stage, **fields):
+        if level < self.level:
+            return
+        scope = _current.get()
+        if scope is None:
+            self._write(level, stage, fields, {"function": self.function_name}, None)
+            return
+        if level > scope.max_level:
+            scope.max_level = level
+        scope.events.append((time.time(), level, stage, fields))
+
+    def debug(self, stage, **fields):
+        self.log(logging.DEBUG, stage, **fields)
+
+    def info(self, stage, **fields):
+        self.log(logging.INFO, stage, **fields)
+
+    def warning(self, stage, **fields):
+        self.log(logging.WARNING, stage, **fields)
+
+    def error(self, stage, **fields):
+        self.log(logging.ERROR, stage, **fields)
+
+    def _finish(self, scope, failed):
+        """Writes or drops the record's buffered events"""
+        duration_ms = (time.perf_counter() - scope.started) * 1000
+        if failed or scope.max_level >= logging.ERROR:
+            reason = "error"
+        elif scope.max_level >= logging.WARNING:
+            reason = "warning"
+        elif duration_ms >= self.slow_ms:
+            reason = "slow"
+        elif head_sampled(self._sample_key(scope.context), self.sample_rate):
+            reason = "head"
+        else:
+            reason = None
+
+        with self._lock:
+            self.stats["records"] += 1
+            if reason is None:
+                self.stats["dropped"] += len(scope.events)
+                return
+            self.stats["kept"] += 1
+        context = {"function": self.function_name, **scope.context}
+        for timestamp, level, stage, fields in scope.events:
+            self._write(level, stage, fields, context, reason, timestamp)
+
+    @staticmethod
+    def _sample_key(context):
+        correlation_id = context.get("correlation_id")
+        return correlation_id if correlation_id not in (None, "N/A") else context.get("message_id")
+
+    def _write(self, level, stage, fields, context, reason, timestamp=None):
+        event = {
+            "timestamp": int((timestamp or time.time()) * 1000),
+            "level": LEVEL_NAMES.get(level) or logging.getLevelName(level),
+            "stage": stage,
+            **context,
+        }
+        if reason:
+            event["sampled"] = reason
+        event.update(fields)
+        self.sink.write(event)
+        with self._lock:
+            self.stats["written"] += 1
+
+
+class _RecordBlock:
+    """Context manager from EventLog.record(); an exception escaping it marks the record failed"""
+
+    __slots__ = ("_log", "_context", "_scope", "_token")
+
+    def __init__(self, log, context):
+        self._log = log
+        self._context = context
+
+    def __enter__(self):
+        self._scope = RecordScope(self._context)
+        self._token = _current.set(self._scope)
+        return self._scope
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        self._log._finish(self._scope, exc_type is not None)
+        return False
+
+
+# Process-wide event log: one Lambda process serves one invocation at a time
+event_log = EventLog()
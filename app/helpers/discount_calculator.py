@@ -1,38 +1,24 @@
 """
 Discount calculator - nested inside app/helpers/
 """
-import logging
+from app.event_log import event_log
+from app.money import TAX_RATE_BPS, Money
+from app.promotions import get_promo_catalog
 
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-
-logger.info("📦 MODULE LOADED: app/helpers/discount_calculator.py")
+# Bulk tiers come from the promo catalog (app/promotions.py); the tax rate is TAX_RATE_BPS (app/money.py)
 
 def calculate_bulk_discount(subtotal):
     """Apply bulk discount based on order size"""
-    logger.info(f"   🔹 Accessing: calculate_bulk_discount() from app/helpers/")
-    logger.info(f"   🔹 Input: subtotal=${subtotal:.2f}")
-    
-    if subtotal > 1000:
-        discount = subtotal * 0.15  # 15% off
-        logger.info(f"   🔹 Applied: 15% bulk discount")
-        return discount
-    elif subtotal > 500:
-        discount = subtotal * 0.10  # 10% off
-        logger.info(f"   🔹 Applied: 10% bulk discount")
-        return discount
-    elif subtotal > 100:
-        discount = subtotal * 0.05  # 5% off
-        logger.info(f"   🔹 Applied: 5% bulk discount")
-        return discount
-    
-    logger.info(f"   🔹 Applied: No bulk discount (subtotal too low)")
-    return 0
+    subtotal = Money.of(subtotal)
+    basis_points = get_promo_catalog().bulk_discount_basis_points(subtotal.cents)
+    discount = subtotal.apply_rate(basis_points) if basis_points else Money(0)
+    # Part of the record's events (app/event_log.py) when called from a handler
+    event_log.debug("bulk_discount", subtotal=subtotal, basis_points=basis_points, discount=discount)
+    return discount
 
 def calculate_tax(amount):
     """Calculate tax"""
-    logger.info(f"   🔹 Accessing: calculate_tax() from app/helpers/")
-    logger.info(f"   🔹 Input: amount=${amount:.2f}")
-    tax = amount * 0.08  # 8% tax
-    logger.info(f"   🔹 Calculated: 8% tax = ${tax:.2f}")
+    amount = Money.of(amount)
+    tax = amount.apply_rate(TAX_RATE_BPS)
+    event_log.debug("tax", amount=amount, rate_bps=TAX_RATE_BPS, tax=tax)
     return tax
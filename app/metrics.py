@@ -0,0 +1,176 @@
+# metrics.py
+"""
+Business and latency metrics for the handlers, aggregated in memory and
+written as one CloudWatch Embedded Metric Format (EMF) line per invocation.
+CloudWatch extracts the metrics from that line under METRICS_NAMESPACE, with
+a FunctionName dimension; no PutMetricData calls are made.
+
+    metrics.count("OrdersProcessed")
+    with metrics.timer("Step.calculate_order_total"):
+        subtotal = calculate_order_total(items)
+    metrics.flush()  # end of the invocation
+
+Values are kept as-is until flush(), which reports count/sum/min/max exactly
+plus up to MAX_VALUES of the values (a random sample past that): EMF takes at
+most 100 values per metric. A Lambda batch is at most 10,000 records, so an
+invocation's values stay small.
+
+METRICS_SINK picks where lines go: stdout (default; Lambda ships stdout to
+CloudWatch Logs, and EMF lines must not carry the logging prefix), memory
+(kept in metrics.sink.lines, for tests and benchmarks) or off.
+"""
+
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from time import perf_counter
+
+from app.money import Money
+
+# Plain JSON metric lines (queue_latency, ssm_prefetch, parameter_cache,
+# import_profile) go through this logger. It is pinned to INFO so that
+# poc-log-level (app/event_log.py) cannot silence them.
+metric_logger = logging.getLogger("app.metrics")
+metric_logger.setLevel(logging.INFO)
+
+# EMF limit on values per metric in one line
+MAX_VALUES = 100
+
+DEFAULT_NAMESPACE = "OrderProcessing"
+
+
+def _json_default(value):
+    # Money as a JSON number (like app.money.json_default); anything else as its str()
+    return float(value) if isinstance(value, Money) else str(value)
+
+
+class StdoutSink:
+    def write(self, line):
+        sys.stdout.write(json.dumps(line, separators=(",", ":"), default=_json_default) + "\n")
+
+
+class MemorySink:
+    def __init__(self):
+        self.lines = []
+
+    def write(self, line):
+        self.lines.append(line)
+
+
+class NullSink:
+    def write(self, line):
+        pass
+
+
+SINKS = {"stdout": StdoutSink, "memory": MemorySink, "off": NullSink}
+
+
+def get_sink(name=None):
+    name = (name or os.environ.get("METRICS_SINK", "stdout")).lower()
+    if name not in SINKS:
+        raise ValueError(f"Unknown METRICS_SINK: {name} (expected one of {', '.join(SINKS)})")
+    return SINKS[name]()
+
+
+class _Timer:
+    """Context manager from Metrics.timer(); records elapsed whole microseconds on exit, errors included"""
+
+    __slots__ = ("_metrics", "_name", "_start")
+
+    def __init__(self, metrics, name):
+        self._metrics = metrics
+        self._name = name
+
+    def __enter__(self):
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        # Through record() so the value lands in the list current at exit, not one a flush already took
+        self._metrics.record(self._name, int((perf_counter() - self._start) * 1000000))
+        return False
+
+
+def _stats(values):
+    return {"count": len(values), "sum": sum(values), "min": min(values), "max": max(values)}
+
+
+class Metrics:
+    """
+    Registry for one process. Recording is an append to a plain list under a
+    lock, so threads can record while another one flushes; grouping,
+    aggregation and sampling all happen in flush(), which emits one EMF line
+    and starts over.
+    """
+
+    def __init__(self, namespace=None, sink=None, function_name="unknown"):
+        self.namespace = namespace or os.environ.get("METRICS_NAMESPACE", DEFAULT_NAMESPACE)
+        self.sink = sink if sink is not None else get_sink()
+        self.function_name = os.environ.get("AWS_LAMBDA_FUNCTION_NAME", function_name)
+        self._counters = {}
+        self._samples = []
+        self._units = {}
+        self._lock = threading.Lock()
+
+    def set_function(self, function_name):
+        """FunctionName dimension; the Lambda runtime's AWS_LAMBDA_FUNCTION_NAME wins when set"""
+        self.function_name = os.environ.get("AWS_LAMBDA_FUNCTION_NAME", function_name)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def record(self, name, value, unit="Microseconds"):
+        if name not in self._units:
+            self._units[name] = unit
+        with self._lock:
+            self._samples.append((name, value))
+
+    def timer(self, name):
+        return _Timer(self, name)
+
+    def flush(self):
+        """Writes everything recorded since the last flush as one EMF line; returns it (None if empty)"""
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            samples, self._samples = self._samples, []
+        if not counters and not samples:
+            return None
+
+        distributions = {}
+        for name, value in samples:
+            values = distributions.get(name)
+            if values is None:
+                distributions[name] = [value]
+            else:
+                values.append(value)
+        line = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": self.namespace,
+                    "Dimensions": [["FunctionName"]],
+                    "Metrics": [{"Name": name, "Unit": "Count"} for name in counters]
+                               + [{"Name": name, "Unit": self._units.get(name, "Microseconds")}
+                                  for name in distributions]
+                }]
+            },
+            "FunctionName": self.function_name,
+            **counters,
+            **{name: values if len(values) <= MAX_VALUES else random.sample(values, MAX_VALUES)
+               for name, values in distributions.items()},
+            # Exact aggregates for Logs Insights, since the values above may be a sample
+            "MetricStats": {name: _stats(values) for name, values in distributions.items()}
+        }
+        self.sink.write(line)
+        return line
+
+
+# Process-wide registry. A Lambda process serves one invocation at a time, but
+# task_worker's receiver threads share it and each flushes after its own batch,
+# so a line holds whatever any thread recorded since the previous flush.
+metrics = Metrics()
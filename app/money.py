@@ -0,0 +1,165 @@
+# app/money.py
+"""
+Fixed-point money in integer cents.
+
+Prices arrive as JSON floats; they are converted to cents once, and every
+sum, discount and tax after that is integer arithmetic, rounded half-even
+to the cent exactly where a rate is applied. The same numbers then come
+out of S3, DynamoDB and SQS with no float drift between them.
+
+Hot loops work on plain ints (to_cents / apply_rate); Money wraps a cent
+amount at the API boundary and knows how to serialize itself:
+
+- str(Money)     -> "12.34"   (DynamoDB N attributes)
+- json_default   -> 12.34     (JSON number whose repr is the exact amount)
+
+Money compares with Money, int and Decimal by exact value. Floats are not
+comparable: convert them with Money.of() first, so a binary float never
+decides whether two amounts are equal (and equal values hash alike).
+"""
+from decimal import ROUND_HALF_EVEN, Decimal
+from functools import total_ordering
+
+CENTS_PER_UNIT = 100
+BASIS_POINTS = 10000  # rates are integer basis points: 1000 = 10%
+TAX_RATE_BPS = 800  # fixed 8% tax on the final total
+
+# Below this, value * 100 is exact enough to read the cents off directly
+_FAST_PATH_LIMIT = 1e13
+_FAST_PATH_TOLERANCE = 0.01
+_CENT = Decimal("0.01")
+
+def to_cents(value):
+    """
+    Converts an amount (float, int, str, Decimal or Money) to integer cents,
+    rounding half-even. Equivalent to Decimal(repr(value)).quantize(0.01).
+    """
+    if isinstance(value, Money):
+        return value.cents
+    if isinstance(value, int):
+        return value * CENTS_PER_UNIT
+    if isinstance(value, float):
+        # Fast path: a float with at most two decimals lands within a few ulps of an integer
+        scaled = value * CENTS_PER_UNIT
+        cents = round(scaled)
+        if abs(scaled - cents) < _FAST_PATH_TOLERANCE and abs(scaled) < _FAST_PATH_LIMIT:
+            return cents
+        value = repr(value)
+    return int(Decimal(value).quantize(_CENT, rounding=ROUND_HALF_EVEN).scaleb(2))
+
+def to_quantity(value):
+    """Item quantity as an int; 2.0 is accepted, 1.5 (or inf / nan) raises ValueError instead of truncating"""
+    whole = value.is_integer() if isinstance(value, float) else int(value) == value
+    if not whole:
+        raise ValueError(f"Quantity must be a whole number, got {value!r}")
+    return int(value)
+
+def div_round(numerator, denominator):
+    """Integer division rounded half-even (denominator > 0)"""
+    quotient, remainder = divmod(numerator, denominator)
+    twice = remainder * 2
+    if twice > denominator or (twice == denominator and quotient & 1):
+        quotient += 1
+    return quotient
+
+def apply_rate(cents, basis_points):
+    """cents * rate, rounded half-even to the cent"""
+    return div_round(cents * basis_points, BASIS_POINTS)
+
+def to_basis_points(rate):
+    """0.15 -> 1500"""
+    return int(Decimal(repr(rate)).scaleb(4).to_integral_value(rounding=ROUND_HALF_EVEN))
+
+@total_ordering
+class Money:
+    """An amount in integer cents. Immutable; compares and hashes by value."""
+    __slots__ = ("cents",)
+
+    def __init__(self, cents=0):
+        whole = int(cents)
+        if whole != cents:
+            raise ValueError(f"Money takes whole cents, got {cents!r}; use Money.of() for amounts")
+        object.__setattr__(self, "cents", whole)
+
+    @classmethod
+    def of(cls, value):
+        """Money from any amount accepted by to_cents (Money is returned as-is)"""
+        return value if isinstance(value, cls) else cls(to_cents(value))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Money is immutable")
+
+    def __add__(self, other):
+        return Money(self.cents + Money.of(other).cents)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return Money(self.cents - Money.of(other).cents)
+
+    def __rsub__(self, other):
+        return Money(Money.of(other).cents - self.cents)
+
+    def __mul__(self, quantity):
+        if not isinstance(quantity, int):
+            raise TypeError("Money can only be multiplied by an integer quantity; use apply_rate for rates")
+        return Money(self.cents * quantity)
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return Money(-self.cents)
+
+    def __abs__(self):
+        return Money(abs(self.cents))
+
+    def __bool__(self):
+        return self.cents != 0
+
+    def __eq__(self, other):
+        if isinstance(other, Money):
+            return self.cents == other.cents
+        if isinstance(other, (int, Decimal)):
+            return self.to_decimal() == other
+        return NotImplemented
+
+    def __lt__(self, other):
+        if isinstance(other, Money):
+            return self.cents < other.cents
+        if isinstance(other, (int, Decimal)):
+            return self.to_decimal() < other
+        return NotImplemented
+
+    def __hash__(self):
+        # Equal to the hash of the equal int / Decimal, like __eq__
+        return hash(self.to_decimal())
+
+    def apply_rate(self, basis_points):
+        return Money(apply_rate(self.cents, basis_points))
+
+    def to_decimal(self):
+        return Decimal(self.cents).scaleb(-2)
+
+    def __float__(self):
+        # Correctly rounded division, so repr() gives back the exact two-decimal amount
+        return self.cents / CENTS_PER_UNIT
+
+    def __str__(self):
+        sign = "-" if self.cents < 0 else ""
+        units, cents = divmod(abs(self.cents), CENTS_PER_UNIT)
+        return f"{sign}{units}.{cents:02d}"
+
+    def __repr__(self):
+        return f"Money('{self}')"
+
+    def __format__(self, spec):
+        return format(self.to_decimal(), spec) if spec else str(self)
+
+    def __reduce__(self):
+        return (Money, (self.cents,))
+
+def json_default(value):
+    """json.dumps default= hook: Money becomes a JSON number (e.g. 12.34)"""
+    if isinstance(value, Money):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -1,28 +1,130 @@
 # app/notifier.py
 import json
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from app.claim_check import check_in
 from app.config import get_aws_client
+from app.metrics import metrics
+from app.money import json_default
+from app.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
+# SendMessageBatch limits
+MAX_BATCH_ENTRIES = 10
+MAX_BATCH_BYTES = 256 * 1024
+
 def send_notification(queue_url, message):
     """
-    Sends message to SQS queue.
+    Sends message to SQS queue. An oversized body goes to S3 and the message carries a claim check.
     """
     try:
         sqs = get_aws_client("sqs")
-        sqs.send_message(
-            QueueUrl=queue_url,
-            MessageBody=json.dumps(message)
-        )
-        logger.info(f"   ✅ Notification sent to queue")
+        body = check_in(json.dumps(message, default=json_default), message)
+        with metrics.timer("SQS.SendMessage"), tracer.span("SQS.SendMessage"):
+            # Trace context for the consumer; the SendMessage span becomes its parent
+            sqs.send_message(QueueUrl=queue_url, MessageBody=body, MessageAttributes=tracer.inject({}))
+        logger.info("   ✅ Notification sent to queue")
         
     except Exception as e:
         logger.error(f"   ❌ Notification failed: {str(e)}")
         raise
 
+def attributes_size(message_attributes):
+    """Bytes SQS counts for MessageAttributes toward the message size: each name, data type and value"""
+    size = 0
+    for name, attribute in (message_attributes or {}).items():
+        size += len(name.encode("utf-8")) + len(attribute.get("DataType", "").encode("utf-8"))
+        if "StringValue" in attribute:
+            size += len(attribute["StringValue"].encode("utf-8"))
+        if "BinaryValue" in attribute:
+            size += len(attribute["BinaryValue"])
+    return size
 
+def chunk_entries(bodies, attributes=None):
+    """
+    Packs (index, body) pairs into SendMessageBatch chunks of at most
+    10 entries and 256 KB of payload, counting each message's attributes[index]
+    like SQS does. Oversized messages come back in `too_large`.
+    """
+    chunks, too_large = [], []
+    current, current_bytes = [], 0
+    
+    for index, body in enumerate(bodies):
+        size = len(body.encode("utf-8")) + (attributes_size(attributes[index]) if attributes else 0)
+        if size > MAX_BATCH_BYTES:
+            too_large.append(index)
+            continue
+        if len(current) == MAX_BATCH_ENTRIES or current_bytes + size > MAX_BATCH_BYTES:
+            chunks.append(current)
+            current, current_bytes = [], 0
+        current.append((index, body))
+        current_bytes += size
+    
+    if current:
+        chunks.append(current)
+    return chunks, too_large
 
+def batch_entries(chunk, attributes=None):
+    """SendMessageBatch entries for a chunk; attributes[index] are the MessageAttributes of message index"""
+    entries = []
+    for index, body in chunk:
+        entry = {"Id": str(index), "MessageBody": body}
+        if attributes and attributes[index]:
+            entry["MessageAttributes"] = attributes[index]
+        entries.append(entry)
+    return entries
 
+def _send_chunk(sqs, queue_url, chunk, attributes=None):
+    """Sends one chunk and returns {index: result} for every entry in it"""
+    try:
+        with metrics.timer("SQS.SendMessageBatch"), tracer.span("SQS.SendMessageBatch"):
+            response = sqs.send_message_batch(QueueUrl=queue_url, Entries=batch_entries(chunk, attributes))
+    except Exception as e:
+        return {index: {"error": str(e)} for index, _ in chunk}
+    return chunk_results(response)
 
+def chunk_results(response):
+    """Maps a SendMessageBatch response to {index: result}"""
+    results = {}
+    for entry in response.get("Successful", []):
+        results[int(entry["Id"])] = {"MessageId": entry["MessageId"]}
+    for entry in response.get("Failed", []):
+        results[int(entry["Id"])] = {"error": f"{entry.get('Code')}: {entry.get('Message', '')}".strip()}
+    return results
 
+def merge_results(count, too_large, all_chunk_results):
+    """Flattens per-chunk results into one result per message, in input order"""
+    results = [None] * count
+    for index in too_large:
+        results[index] = {"error": f"Message exceeds {MAX_BATCH_BYTES} bytes"}
+    for chunk_result in all_chunk_results:
+        for index, result in chunk_result.items():
+            results[index] = result
+    
+    # Entries missing from both Successful and Failed are treated as failed
+    return [result or {"error": "No result returned for entry"} for result in results]
+
+def send_batch(queue_url, messages, max_workers=None, attributes=None):
+    """
+    Sends many messages to SQS with SendMessageBatch, running the chunks in parallel.
+    attributes: optional MessageAttributes per message (e.g. each order's trace context).
+    Oversized bodies are checked in to S3 first (app/claim_check.py).
+    Returns one result per message, in input order: {"MessageId": ...} or {"error": ...}.
+    """
+    bodies = [check_in(json.dumps(message, default=json_default), message) for message in messages]
+    chunks, too_large = chunk_entries(bodies, attributes)
+    all_chunk_results = []
+    
+    if chunks:
+        sqs = get_aws_client("sqs")
+        max_workers = max_workers or int(os.environ.get("SQS_BATCH_SEND_WORKERS", "8"))
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+            all_chunk_results = list(pool.map(lambda chunk: _send_chunk(sqs, queue_url, chunk, attributes), chunks))
+    
+    results = merge_results(len(bodies), too_large, all_chunk_results)
+    
+    failed = sum(1 for result in results if "error" in result)
+    logger.info(f"   ✅ Batch sent: {len(results) - failed}/{len(results)} messages in {len(chunks)} calls")
+    return results
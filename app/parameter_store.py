@@ -1,19 +1,163 @@
-import boto3
+import json
+import logging
 import os
+import threading
+import time
+from app.config import get_aws_client
+from app.metrics import metric_logger
+
+logger = logging.getLogger(__name__)
+
+# Parameters the lambdas and the API read; preloaded with one GetParameters call
+POC_PARAMETERS = [
+    "poc-task-queue-url",
+    "poc-notification-queue-url",
+    "poc-dlq-queue-url",
+    "poc-results-bucket-name",
+    "poc-orders-table-name",
+    "poc-dlq-catalog-table-name",
+    "poc-log-level",
+    "poc-log-sample-rate",
+]
+
+# GetParameters accepts at most 10 names per call
+MAX_GET_PARAMETERS = 10
 
 def get_ssm_client():
-    endpoint_url = os.environ.get('AWS_ENDPOINT_URL')
-    region = os.environ.get('AWS_REGION', 'us-east-1')
-    
-    return boto3.client('ssm', endpoint_url=endpoint_url, region_name=region)
+    return get_aws_client('ssm')
 
 def get_parameter(name):
     ssm = get_ssm_client()
     return ssm.get_parameter(Name=name)['Parameter']['Value']
 
-_cache = {}
+class ParameterCache:
+    """
+    Thread-safe Parameter Store cache with per-entry TTLs.
+
+    Expired entries are served stale while a background thread re-reads them
+    (stale-while-revalidate), so rotated values are picked up without a cold
+    start and without blocking the caller.
+    """
+
+    def __init__(self, ttl=None, stale_while_revalidate=True):
+        self.ttl = ttl if ttl is not None else float(os.environ.get("PARAMETER_CACHE_TTL_SECONDS", "300"))
+        self.stale_while_revalidate = stale_while_revalidate
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0, "misses": 0, "stale_hits": 0,
+            "refreshes": 0, "refresh_errors": 0,
+            "prefetched": 0, "prefetch_calls": 0, "prefetch_ms": 0.0
+        }
+
+    def _store(self, name, value, ttl=None):
+        self._entries[name] = (value, time.monotonic() + (ttl if ttl is not None else self.ttl))
+
+    def prefetch(self, names, ttl=None):
+        """Loads many parameters with GetParameters (10 names per call)"""
+        ssm = get_ssm_client()
+        start = time.perf_counter()
+        found = {}
+        calls = 0
+        for offset in range(0, len(names), MAX_GET_PARAMETERS):
+            response = ssm.get_parameters(Names=names[offset:offset + MAX_GET_PARAMETERS])
+            calls += 1
+            for param in response.get("Parameters", []):
+                found[param["Name"]] = param["Value"]
+            if response.get("InvalidParameters"):
+                logger.warning(f"   ⚠️ Unknown parameters: {', '.join(response['InvalidParameters'])}")
+        return self._record_prefetch(found, calls, start, ttl)
+
+    def prefetch_path(self, path, ttl=None, recursive=True):
+        """Loads every parameter under a hierarchy with GetParametersByPath"""
+        ssm = get_ssm_client()
+        start = time.perf_counter()
+        found = {}
+        calls = 0
+        kwargs = {"Path": path, "Recursive": recursive}
+        while True:
+            response = ssm.get_parameters_by_path(**kwargs)
+            calls += 1
+            for param in response.get("Parameters", []):
+                found[param["Name"]] = param["Value"]
+            if not response.get("NextToken"):
+                break
+            kwargs["NextToken"] = response["NextToken"]
+        return self._record_prefetch(found, calls, start, ttl)
+
+    def _record_prefetch(self, found, calls, start, ttl):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            for name, value in found.items():
+                self._store(name, value, ttl)
+            self._stats["prefetched"] += len(found)
+            self._stats["prefetch_calls"] += calls
+            self._stats["prefetch_ms"] += elapsed_ms
+        return found
+
+    def get(self, name, ttl=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[1] > now:
+                self._stats["hits"] += 1
+                return entry[0]
+            if entry is not None and self.stale_while_revalidate:
+                self._stats["stale_hits"] += 1
+                if name not in self._refreshing:
+                    self._refreshing.add(name)
+                    threading.Thread(target=self._refresh, args=(name, ttl), daemon=True).start()
+                return entry[0]
+            self._stats["misses"] += 1
+
+        value = get_parameter(name)
+        with self._lock:
+            self._store(name, value, ttl)
+        return value
+
+    def _refresh(self, name, ttl):
+        try:
+            value = get_parameter(name)
+            with self._lock:
+                self._store(name, value, ttl)
+                self._stats["refreshes"] += 1
+        except Exception as e:
+            # Keep serving the stale value; the next read retries the refresh
+            logger.warning(f"   ⚠️ Parameter refresh failed for {name}: {str(e)}")
+            with self._lock:
+                self._stats["refresh_errors"] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(name)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["prefetch_ms"] = round(stats["prefetch_ms"], 3)
+        stats["entries"] = len(self._entries)
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+parameter_cache = ParameterCache()
 
 def get_cached_parameter(name):
-    if name not in _cache:
-        _cache[name] = get_parameter(name)
-    return _cache[name]
\ No newline at end of file
+    return parameter_cache.get(name)
+
+def prefetch_parameters(names=None):
+    """
+    Preloads parameters during init (Lambda cold start / API startup).
+    Failures are logged and the cache falls back to lazy per-name reads.
+    """
+    try:
+        found = parameter_cache.prefetch(names or POC_PARAMETERS)
+        metric_logger.info(json.dumps({"metric": "ssm_prefetch", "parameters": len(found), **parameter_cache.stats()}))
+    except Exception as e:
+        logger.warning(f"   ⚠️ Parameter prefetch failed, falling back to lazy reads: {str(e)}")
+
+def log_parameter_metrics():
+    """Emits cache hit/refresh counters as one structured log line"""
+    metric_logger.info(json.dumps({"metric": "parameter_cache", **parameter_cache.stats()}))
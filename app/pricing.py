@@ -0,0 +1,173 @@
+# app/pricing.py
+"""
+Batch pricing for bulk jobs (ingest, DLQ backfills) that price many orders at once.
+
+Orders are held column-wise in an OrderBatch: every item's price (in integer
+cents, see app/money.py) and quantity in two flat arrays, plus offsets
+marking where each order's items start. price_batch() then computes subtotal,
+promo discount, final total, bulk discount and tax for the whole batch with
+vectorized NumPy integer operations.
+
+Promo and bulk rates come from the same compiled promo catalog as the scalar
+path (app/promotions.py). Each distinct promo code is looked up once; its
+validity window, minimum spend and spend tiers are then applied to every
+order with array masks, and bulk tiers are looked up for the whole batch
+with np.searchsorted. Results are identical to the scalar path used by the lambdas
+(calculate_order_total -> apply_discount -> calculate_bulk_discount /
+calculate_tax): both sum exact cents and round each rate half-even to the
+cent with the same integer division.
+
+Without NumPy (e.g. inside the Lambda runtime) the same columns are priced
+with a plain Python loop.
+"""
+import logging
+import time
+
+from app.money import BASIS_POINTS, TAX_RATE_BPS, apply_rate, to_cents, to_quantity
+from app.promotions import get_promo_catalog
+
+try:
+    import numpy as np
+except ImportError:  # optional: only needed for the vectorized path
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Every column holds integer cents
+PRICE_COLUMNS = ("subtotal", "discount_amount", "final_total", "bulk_discount", "tax")
+
+class OrderBatch:
+    """
+    Columnar batch of orders. Items of order i are
+    price_cents[offsets[i]:offsets[i + 1]] and quantities[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, price_cents, quantities, offsets, promo_codes):
+        if len(offsets) != len(promo_codes) + 1:
+            raise ValueError("offsets must have one more entry than promo_codes")
+        if len(price_cents) != len(quantities) or offsets[-1] != len(price_cents):
+            raise ValueError("price_cents/quantities must both hold offsets[-1] items")
+        self.price_cents = price_cents
+        self.quantities = quantities
+        self.offsets = offsets
+        self.promo_codes = promo_codes
+
+    @classmethod
+    def from_orders(cls, orders):
+        """
+        Flattens order dicts ({"items": [...], "promo_code": ...}) into columns.
+        Non-integral quantities raise ValueError, like calculate_order_total.
+        """
+        price_cents, quantities, offsets, promo_codes = [], [], [0], []
+        for order in orders:
+            for item in order["items"]:
+                price_cents.append(to_cents(item.get("price", 0)))
+                quantities.append(to_quantity(item.get("quantity", 1)))
+            offsets.append(len(price_cents))
+            promo_codes.append(order.get("promo_code"))
+        if np is not None:
+            return cls(np.asarray(price_cents, dtype=np.int64), np.asarray(quantities, dtype=np.int64),
+                       np.asarray(offsets, dtype=np.int64), promo_codes)
+        return cls(price_cents, quantities, offsets, promo_codes)
+
+    def __len__(self):
+        return len(self.promo_codes)
+
+def price_batch(batch, vectorized=True, now=None):
+    """
+    Prices every order in the batch. Returns {column: cents} for PRICE_COLUMNS,
+    as int64 NumPy arrays on the vectorized path and lists of ints otherwise.
+    Promo validity is evaluated once, at `now` (default: current time).
+    """
+    catalog = get_promo_catalog()
+    now = time.time() if now is None else now
+    if vectorized and np is not None:
+        return _price_numpy(batch, catalog, now)
+    return _price_python(batch, catalog, now)
+
+def _apply_rates(cents, basis_points):
+    """Vectorized app.money.apply_rate: cents * bps / 10000, rounded half-even"""
+    quotient, remainder = np.divmod(cents * basis_points, BASIS_POINTS)
+    twice = remainder * 2
+    return quotient + ((twice > BASIS_POINTS) | ((twice == BASIS_POINTS) & (quotient % 2 == 1)))
+
+def _promo_rates(promo_codes, subtotal, catalog, now):
+    """
+    Vectorized PromoCatalog.discount_basis_points: each distinct code is looked
+    up once, then validity window, minimum spend and spend tiers are applied
+    to every order with array masks.
+    """
+    # Distinct code -> index in first-seen order (what np.unique(..., return_inverse=True)
+    # gives, without sorting the strings, which costs more than the lookups it saves)
+    distinct = {}
+    code_index = np.fromiter((distinct.setdefault(code, len(distinct)) for code in promo_codes),
+                             dtype=np.int64, count=len(promo_codes))
+    promos = [catalog.lookup(code) for code in distinct]
+
+    basis_points = np.array([promo.basis_points if promo else 0 for promo in promos], dtype=np.int64)
+    active = np.array([promo is not None
+                       and (promo.valid_from is None or now >= promo.valid_from)
+                       and (promo.valid_until is None or now < promo.valid_until)
+                       for promo in promos], dtype=bool)
+    min_spend = np.array([promo.min_spend_cents if promo else 0 for promo in promos], dtype=np.int64)
+
+    rates = basis_points[code_index]
+    # Spend tiers differ per code: search each tiered code's orders in its own thresholds
+    tiered = [index for index, promo in enumerate(promos) if promo is not None and promo.tier_thresholds]
+    if tiered:
+        by_code = np.argsort(code_index, kind="stable")
+        bounds = np.searchsorted(code_index[by_code], np.arange(len(promos) + 1))
+        for index in tiered:
+            orders = by_code[bounds[index]:bounds[index + 1]]
+            promo = promos[index]
+            tier = np.searchsorted(np.array(promo.tier_thresholds, dtype=np.int64), subtotal[orders], side="left")
+            rates[orders] = np.array((promo.basis_points,) + promo.tier_rates, dtype=np.int64)[tier]
+
+    eligible = active[code_index] & (subtotal >= min_spend[code_index])
+    return np.where(eligible, rates, 0)
+
+def _price_numpy(batch, catalog, now):
+    price_cents = np.asarray(batch.price_cents, dtype=np.int64)
+    quantities = np.asarray(batch.quantities, dtype=np.int64)
+    offsets = np.asarray(batch.offsets, dtype=np.int64)
+
+    # Integer sums are exact, so a running total per order gives the same subtotal as sum()
+    running = np.concatenate(([0], np.cumsum(price_cents * quantities)))
+    subtotal = running[offsets[1:]] - running[offsets[:-1]]
+
+    discount = _apply_rates(subtotal, _promo_rates(batch.promo_codes, subtotal, catalog, now))
+    final_total = subtotal - discount
+
+    # Vectorized bisect: index of the highest bulk threshold each subtotal exceeds
+    bulk_rates = np.array((0,) + catalog.bulk_rates, dtype=np.int64)
+    tier_rates = bulk_rates[np.searchsorted(np.array(catalog.bulk_thresholds, dtype=np.int64), subtotal, side="left")]
+
+    return {
+        "subtotal": subtotal,
+        "discount_amount": discount,
+        "final_total": final_total,
+        "bulk_discount": _apply_rates(subtotal, tier_rates),
+        "tax": _apply_rates(final_total, TAX_RATE_BPS),
+    }
+
+def _as_list(values):
+    # NumPy scalars are slow in a Python loop, so work on plain ints here
+    return values.tolist() if hasattr(values, "tolist") else list(values)
+
+def _price_python(batch, catalog, now):
+    price_cents, quantities, offsets = _as_list(batch.price_cents), _as_list(batch.quantities), _as_list(batch.offsets)
+    columns = {name: [] for name in PRICE_COLUMNS}
+
+    for index, promo_code in enumerate(batch.promo_codes):
+        start, end = offsets[index], offsets[index + 1]
+        subtotal = sum(price * quantity for price, quantity in zip(price_cents[start:end], quantities[start:end]))
+        discount = apply_rate(subtotal, catalog.discount_basis_points(promo_code, subtotal, now))
+        final_total = subtotal - discount
+        bulk_rate = catalog.bulk_discount_basis_points(subtotal)
+
+        columns["subtotal"].append(subtotal)
+        columns["discount_amount"].append(discount)
+        columns["final_total"].append(final_total)
+        columns["bulk_discount"].append(apply_rate(subtotal, bulk_rate))
+        columns["tax"].append(apply_rate(final_total, TAX_RATE_BPS))
+    return columns
@@ -1,6 +1,8 @@
 # app/processors.py
 import time
 import logging
+from app.money import Money, to_cents, to_quantity
+from app.promotions import get_promo_catalog
 
 logger = logging.getLogger(__name__)
 
@@ -16,17 +18,17 @@ def validate_order(items):
     return True
 
 def calculate_order_total(items):
-    """Calculate total from items list"""
-    total = sum(item.get('price', 0) * item.get('quantity', 1) for item in items)
-    return round(total, 2)
+    """Calculate total from items list (exact, in integer cents); non-integral quantities raise ValueError"""
+    total = sum(to_cents(item.get('price', 0)) * to_quantity(item.get('quantity', 1)) for item in items)
+    return Money(total)
 
-def apply_discount(subtotal, promo_code):
-    """Apply discount based on promo code"""
-    discounts = {"SAVE10": 0.10, "SAVE20": 0.20, "SAVE30": 0.30, "FREESHIP": 0.05}
-    discount_rate = discounts.get(promo_code, 0)
-    discount_amount = subtotal * discount_rate
+def apply_discount(subtotal, promo_code, now=None):
+    """Apply discount based on promo code (see app/promotions.py); rounded half-even to the cent"""
+    subtotal = Money.of(subtotal)
+    basis_points = get_promo_catalog().discount_basis_points(promo_code, subtotal.cents, now)
+    discount_amount = subtotal.apply_rate(basis_points)
     final_total = subtotal - discount_amount
-    return round(final_total, 2), round(discount_amount, 2)
+    return final_total, discount_amount
 
 def build_invoice(order_id, items, subtotal, discount_amount, final_total, promo_code):
     """Create invoice object"""
@@ -41,3 +43,28 @@ def build_invoice(order_id, items, subtotal, discount_amount, final_total, promo
         "status": "completed",
         "timestamp": time.time()
     }
+
+def fix_order_data(body):
+    """Attempt to fix common order issues"""
+    fixed = False
+    issues = []
+    
+    # Fix negative prices
+    if "items" in body:
+        for item in body["items"]:
+            if item.get("price", 0) < 0:
+                item["price"] = abs(item["price"])
+                fixed = True
+                issues.append(f"Fixed negative price for {item['name']}")
+            
+            if item.get("quantity", 0) <= 0:
+                item["quantity"] = 1
+                fixed = True
+                issues.append(f"Fixed invalid quantity for {item['name']}")
+    
+    # Check if items exist
+    if not body.get("items") or len(body["items"]) == 0:
+        issues.append("Cannot fix: No items in order")
+        return None, issues
+    
+    return body if fixed else None, issues
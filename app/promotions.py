@@ -0,0 +1,335 @@
+# app/promotions.py
+"""
+Promo code catalog.
+
+Promo rules (discount, validity window, minimum spend, spend tiers) and the
+bulk-discount tiers are data, loaded from one of:
+
+- builtin   the codes that used to be hard-coded (default; no AWS resources)
+- dynamodb  one item per code in the table named by poc-promo-table-name,
+            plus a "__catalog__" item whose `version` is bumped on every edit
+- s3        a JSON snapshot (optionally gzip-encoded, see app/storage.py) at
+            the s3://bucket/key named by poc-promo-snapshot-uri
+
+Set the source with PROMO_CATALOG_SOURCE. The records are compiled into a
+PromoCatalog: a dict for O(1) code lookup and sorted threshold tuples that
+are searched with bisect. Every PROMO_CATALOG_REFRESH_SECONDS a background
+thread compares the source's version (the __catalog__ item or the S3 ETag)
+and only rebuilds and swaps the catalog when it changed. A warm Lambda picks
+up new codes without a cold start, and callers never block on the reload's
+lock. They do share the GIL with the rebuild, though: decoding a large S3
+snapshot is one json.loads call that holds it, so a get() that lands during
+a reload can stall for that long (about 250 ms at 100k codes; see
+benchmarks/promo_catalog.py).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+
+from app.config import get_aws_client
+from app.database import MAX_BATCH_WRITE_ITEMS
+from app.parameter_store import get_cached_parameter
+from app.storage import decode_s3_object, save_to_s3
+
+logger = logging.getLogger(__name__)
+
+# Built-in catalog: promo code -> discount in basis points
+PROMO_DISCOUNT_BPS = {"SAVE10": 1000, "SAVE20": 2000, "SAVE30": 3000, "FREESHIP": 500}
+
+# (subtotal threshold in cents, basis points) bulk tiers used when the source defines none
+BULK_DISCOUNT_TIERS = ((10000, 500), (50000, 1000), (100000, 1500))
+
+CATALOG_META_CODE = "__catalog__"
+_NO_TIERS = ()
+
+def _timestamp(value):
+    """Epoch seconds from a number or an ISO-8601 string; None means unbounded"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+def _compile_tiers(tiers):
+    """[(threshold_cents, basis_points), ...] -> (sorted thresholds, matching basis points)"""
+    if not tiers:
+        return _NO_TIERS, _NO_TIERS
+    ordered = sorted((int(threshold), int(basis_points)) for threshold, basis_points in tiers)
+    return tuple(threshold for threshold, _ in ordered), tuple(basis_points for _, basis_points in ordered)
+
+def _tier_rate(thresholds, rates, subtotal_cents, default=0):
+    # Highest tier whose threshold the subtotal exceeds (strictly, like the old if/elif chain)
+    index = bisect_left(thresholds, subtotal_cents)
+    return rates[index - 1] if index else default
+
+class Promo:
+    """One compiled promo rule"""
+    __slots__ = ("basis_points", "valid_from", "valid_until", "min_spend_cents", "tier_thresholds", "tier_rates")
+
+    def __init__(self, basis_points, valid_from=None, valid_until=None, min_spend_cents=0, tiers=None):
+        self.basis_points = int(basis_points)
+        self.valid_from = _timestamp(valid_from)
+        self.valid_until = _timestamp(valid_until)
+        self.min_spend_cents = int(min_spend_cents or 0)
+        self.tier_thresholds, self.tier_rates = _compile_tiers(tiers)
+
+    def basis_points_for(self, subtotal_cents, now):
+        if self.valid_from is not None and now < self.valid_from:
+            return 0
+        if self.valid_until is not None and now >= self.valid_until:
+            return 0
+        if subtotal_cents < self.min_spend_cents:
+            return 0
+        if self.tier_thresholds:
+            return _tier_rate(self.tier_thresholds, self.tier_rates, subtotal_cents, self.basis_points)
+        return self.basis_points
+
+class PromoCatalog:
+    """Immutable, compiled view of one catalog version"""
+
+    def __init__(self, records, version=None, bulk_tiers=None):
+        self.version = version
+        self._promos = {
+            record["code"]: Promo(record.get("basis_points", 0), record.get("valid_from"), record.get("valid_until"),
+                                  record.get("min_spend_cents", 0), record.get("tiers"))
+            for record in records
+        }
+        self.bulk_thresholds, self.bulk_rates = _compile_tiers(BULK_DISCOUNT_TIERS if bulk_tiers is None else bulk_tiers)
+
+    def __len__(self):
+        return len(self._promos)
+
+    def __contains__(self, code):
+        return code in self._promos
+
+    def lookup(self, code):
+        return self._promos.get(code)
+
+    def discount_basis_points(self, code, subtotal_cents, now=None):
+        """Discount for code at this subtotal; 0 for unknown, expired or below-minimum codes"""
+        promo = self._promos.get(code)
+        if promo is None:
+            return 0
+        return promo.basis_points_for(subtotal_cents, time.time() if now is None else now)
+
+    def bulk_discount_basis_points(self, subtotal_cents):
+        return _tier_rate(self.bulk_thresholds, self.bulk_rates, subtotal_cents)
+
+def builtin_records():
+    return [{"code": code, "basis_points": basis_points} for code, basis_points in PROMO_DISCOUNT_BPS.items()]
+
+def build_snapshot(records, version, bulk_tiers=None):
+    """S3 snapshot document in the format S3SnapshotSource reads"""
+    return {
+        "version": version,
+        "bulk_tiers": [list(tier) for tier in (BULK_DISCOUNT_TIERS if bulk_tiers is None else bulk_tiers)],
+        "promos": records,
+    }
+
+def _to_dynamodb_item(record):
+    item = {"code": {"S": record["code"]}, "basis_points": {"N": str(int(record.get("basis_points", 0)))}}
+    for name in ("valid_from", "valid_until"):
+        if record.get(name) not in (None, ""):
+            item[name] = {"N": repr(_timestamp(record[name]))}
+    if record.get("min_spend_cents"):
+        item["min_spend_cents"] = {"N": str(int(record["min_spend_cents"]))}
+    if record.get("tiers"):
+        item["tiers"] = {"S": json.dumps(record["tiers"])}
+    return item
+
+def publish_to_dynamodb(records, version, table_name=None, bulk_tiers=None):
+    """
+    Writes promo items with BatchWriteItem, then bumps the __catalog__ version
+    last so running stores only reload once every item is in place.
+    """
+    dynamodb = get_aws_client("dynamodb")
+    table_name = table_name or get_cached_parameter("poc-promo-table-name")
+    requests = [{"PutRequest": {"Item": _to_dynamodb_item(record)}} for record in records]
+    for start in range(0, len(requests), MAX_BATCH_WRITE_ITEMS):
+        pending, delay = requests[start:start + MAX_BATCH_WRITE_ITEMS], 0.05
+        while pending:
+            response = dynamodb.batch_write_item(RequestItems={table_name: pending})
+            pending = response.get("UnprocessedItems", {}).get(table_name, [])
+            if pending:
+                time.sleep(delay)
+                delay = min(delay * 2, 2.0)
+    dynamodb.put_item(TableName=table_name, Item={
+        "code": {"S": CATALOG_META_CODE},
+        "version": {"N": str(version)},
+        "bulk_tiers": {"S": json.dumps([list(tier) for tier in (BULK_DISCOUNT_TIERS if bulk_tiers is None else bulk_tiers)])},
+    })
+
+def publish_snapshot(records, version, uri=None, bulk_tiers=None, codec="gzip"):
+    """Uploads a catalog snapshot for S3SnapshotSource (gzip by default: 100k codes is a few MB of JSON)"""
+    uri = uri or get_cached_parameter("poc-promo-snapshot-uri")
+    bucket, _, key = uri[len("s3://"):].partition("/")
+    save_to_s3(bucket, key, build_snapshot(records, version, bulk_tiers), codec=codec)
+
+class BuiltinSource:
+    name = "builtin"
+
+    def current_version(self):
+        return "builtin"
+
+    def load(self):
+        return PromoCatalog(builtin_records(), version="builtin")
+
+class DynamoDBSource:
+    """Promo items keyed by `code`; tiers are stored as a JSON string attribute"""
+    name = "dynamodb"
+
+    def __init__(self, table_name=None):
+        self.table_name = table_name
+
+    def _table(self):
+        return self.table_name or get_cached_parameter("poc-promo-table-name")
+
+    def current_version(self):
+        response = get_aws_client("dynamodb").get_item(
+            TableName=self._table(),
+            Key={"code": {"S": CATALOG_META_CODE}},
+            ProjectionExpression="#version",
+            ExpressionAttributeNames={"#version": "version"}
+        )
+        item = response.get("Item", {})
+        return item.get("version", {}).get("N") or item.get("version", {}).get("S")
+
+    def load(self):
+        dynamodb = get_aws_client("dynamodb")
+        records, version, bulk_tiers = [], None, None
+        kwargs = {"TableName": self._table()}
+        while True:
+            response = dynamodb.scan(**kwargs)
+            for item in response.get("Items", []):
+                code = item["code"]["S"]
+                if code == CATALOG_META_CODE:
+                    version = item.get("version", {}).get("N") or item.get("version", {}).get("S")
+                    if "bulk_tiers" in item:
+                        bulk_tiers = json.loads(item["bulk_tiers"]["S"])
+                    continue
+                records.append({
+                    "code": code,
+                    "basis_points": int(item["basis_points"]["N"]),
+                    "valid_from": float(item["valid_from"]["N"]) if "valid_from" in item else None,
+                    "valid_until": float(item["valid_until"]["N"]) if "valid_until" in item else None,
+                    "min_spend_cents": int(item["min_spend_cents"]["N"]) if "min_spend_cents" in item else 0,
+                    "tiers": json.loads(item["tiers"]["S"]) if "tiers" in item else None,
+                })
+            if "LastEvaluatedKey" not in response:
+                break
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        return PromoCatalog(records, version=version, bulk_tiers=bulk_tiers)
+
+class S3SnapshotSource:
+    """A build_snapshot() document; the object's ETag is the version"""
+    name = "s3"
+
+    def __init__(self, uri=None):
+        self.uri = uri
+
+    def _location(self):
+        uri = self.uri or get_cached_parameter("poc-promo-snapshot-uri")
+        bucket, _, key = uri[len("s3://"):].partition("/")
+        return bucket, key
+
+    def current_version(self):
+        bucket, key = self._location()
+        return get_aws_client("s3").head_object(Bucket=bucket, Key=key)["ETag"]
+
+    def load(self):
+        bucket, key = self._location()
+        response = get_aws_client("s3").get_object(Bucket=bucket, Key=key)
+        snapshot = decode_s3_object(response)
+        return PromoCatalog(snapshot["promos"], version=response["ETag"], bulk_tiers=snapshot.get("bulk_tiers"))
+
+PROMO_SOURCES = {
+    "builtin": BuiltinSource,
+    "dynamodb": DynamoDBSource,
+    "s3": S3SnapshotSource,
+}
+
+class PromoCatalogStore:
+    """
+    Holds the current PromoCatalog and hot-reloads it when the source's
+    version changes. The first get() loads synchronously; after that, version
+    checks run in a background thread and the catalog reference is swapped
+    atomically, so readers always see one complete version.
+    """
+
+    def __init__(self, source=None, refresh_seconds=None):
+        if source is None or isinstance(source, str):
+            name = (source or os.environ.get("PROMO_CATALOG_SOURCE", "builtin")).lower()
+            if name not in PROMO_SOURCES:
+                raise ValueError(f"Unknown promo catalog source: {name}")
+            source = PROMO_SOURCES[name]()
+        self.source = source
+        self.refresh_seconds = (refresh_seconds if refresh_seconds is not None
+                                else float(os.environ.get("PROMO_CATALOG_REFRESH_SECONDS", "60")))
+        self._catalog = None
+        self._checked_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._stats = {"loads": 0, "version_checks": 0, "reloads": 0, "errors": 0, "load_ms": 0.0}
+
+    def get(self):
+        catalog = self._catalog
+        if catalog is None:
+            with self._lock:
+                if self._catalog is None:
+                    self._load()
+                return self._catalog
+        if time.monotonic() - self._checked_at >= self.refresh_seconds:
+            with self._lock:
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._refresh, daemon=True).start()
+        return catalog
+
+    def _load(self):
+        start = time.perf_counter()
+        catalog = self.source.load()
+        self._stats["loads"] += 1
+        self._stats["load_ms"] += (time.perf_counter() - start) * 1000
+        self._catalog = catalog
+        self._checked_at = time.monotonic()
+        logger.info(f"   🏷️ Promo catalog v{catalog.version}: {len(catalog)} codes from {self.source.name}")
+
+    def reload(self, force=False):
+        """Synchronous version check; rebuilds when the version changed (or force). Returns True if swapped."""
+        self._stats["version_checks"] += 1
+        current = self._catalog
+        if not force and current is not None and self.source.current_version() == current.version:
+            self._checked_at = time.monotonic()
+            return False
+        self._load()
+        self._stats["reloads"] += 1
+        return True
+
+    def _refresh(self):
+        try:
+            self.reload()
+        except Exception as e:
+            # Keep serving the current version; the next interval retries
+            logger.warning(f"   ⚠️ Promo catalog refresh failed: {str(e)}")
+            self._stats["errors"] += 1
+            self._checked_at = time.monotonic()
+        finally:
+            self._refreshing = False
+
+    def stats(self):
+        catalog = self._catalog
+        return {
+            **self._stats,
+            "load_ms": round(self._stats["load_ms"], 3),
+            "version": catalog.version if catalog else None,
+            "codes": len(catalog) if catalog else 0,
+        }
+
+promo_catalog = PromoCatalogStore()
+
+def get_promo_catalog():
+    return promo_catalog.get()
@@ -0,0 +1,207 @@
+# queue_metrics.py
+"""
+Queue latency per SQS record, from the system attributes Lambda (and
+task_worker.py) already deliver in record["attributes"]:
+
+    queue_age_ms            SentTimestamp -> processing started (includes earlier attempts)
+    first_receive_delay_ms  SentTimestamp -> ApproximateFirstReceiveTimestamp (pure queue wait)
+    processing_ms           handler time for the record
+    retries                 ApproximateReceiveCount - 1
+
+Each handler keeps one QueueLatencyRecorder. Records are added to in-memory
+histograms and flush() writes them once per invocation as a single JSON line:
+
+    {"metric": "queue_latency", "function": "task_lambda", "queues": {"task-queue": {...}}}
+
+Histograms carry their buckets, so lines from any number of invocations and
+functions merge into one view per queue (queue_latency_report.py).
+"""
+
+import json
+import math
+import os
+import threading
+import time
+
+from app.metrics import metric_logger
+
+METRIC_NAME = "queue_latency"
+TIMINGS = ("queue_age_ms", "first_receive_delay_ms", "processing_ms")
+COUNTERS = ("records", "retried", "retries", "failed")
+
+# 8 buckets per power of two: a percentile is off by at most ~9%
+SUB_BUCKETS = 8
+MIN_VALUE = 0.01
+
+
+class Histogram:
+    """Log-bucketed histogram; bucket i holds values up to 2 ** (i / SUB_BUCKETS)"""
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, value):
+        index = math.ceil(math.log2(max(value, MIN_VALUE)) * SUB_BUCKETS)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def percentile(self, point):
+        """Upper bound of the bucket holding the nearest-rank percentile (never above max)"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * point / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return round(min(2 ** (index / SUB_BUCKETS), self.max), 2)
+
+    def summary(self, points=(50, 95, 99)):
+        return {**{f"p{point}": self.percentile(point) for point in points}, "max": round(self.max, 2),
+                "count": self.count}
+
+    def to_dict(self):
+        return {"buckets": {str(index): count for index, count in self.buckets.items()},
+                "count": self.count, "max": round(self.max, 3)}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.buckets = {int(index): count for index, count in data["buckets"].items()}
+        histogram.count = data["count"]
+        histogram.max = data["max"]
+        return histogram
+
+
+class QueueStats:
+    """Counters and histograms for one queue"""
+
+    def __init__(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.timings = {name: Histogram() for name in TIMINGS}
+
+    def merge(self, other):
+        for name in COUNTERS:
+            self.counters[name] += other.counters[name]
+        for name in TIMINGS:
+            self.timings[name].merge(other.timings[name])
+
+    def to_dict(self):
+        return {**self.counters, **{name: {**histogram.summary(), **histogram.to_dict()}
+                                    for name, histogram in self.timings.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        for name in COUNTERS:
+            stats.counters[name] = data.get(name, 0)
+        for name in TIMINGS:
+            if name in data:
+                stats.timings[name] = Histogram.from_dict(data[name])
+        return stats
+
+
+def queue_name(record):
+    """Queue the record came from: last part of eventSourceARN"""
+    return record.get("eventSourceARN", "unknown").rsplit(":", 1)[-1]
+
+
+class QueueLatencyRecorder:
+    """
+    Per-process recorder for one handler. observe() is thread-safe, so records
+    processed on a pool (TASK_LAMBDA_WORKERS, task_worker.py) can share it.
+    flush() emits and resets the invocation's stats and keeps a running total
+    for the life of the process.
+    """
+
+    def __init__(self, function_name):
+        self.function_name = os.environ.get("AWS_LAMBDA_FUNCTION_NAME", function_name)
+        self.current = {}
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def observe(self, record, processing_seconds, failed=False, started=None):
+        """started: epoch seconds when processing began (default: now - processing_seconds)"""
+        attributes = record.get("attributes", {})
+        started_ms = (started if started is not None else time.time() - processing_seconds) * 1000
+        sent = attributes.get("SentTimestamp")
+        first_receive = attributes.get("ApproximateFirstReceiveTimestamp")
+        receive_count = int(attributes.get("ApproximateReceiveCount", "1"))
+
+        with self._lock:
+            stats = self.current.get(queue_name(record))
+            if stats is None:
+                stats = self.current[queue_name(record)] = QueueStats()
+            stats.counters["records"] += 1
+            stats.counters["retried"] += receive_count > 1
+            stats.counters["retries"] += max(0, receive_count - 1)
+            stats.counters["failed"] += bool(failed)
+            stats.timings["processing_ms"].add(processing_seconds * 1000)
+            if sent:
+                stats.timings["queue_age_ms"].add(max(0.0, started_ms - int(sent)))
+                if first_receive:
+                    stats.timings["first_receive_delay_ms"].add(max(0, int(first_receive) - int(sent)))
+
+    def flush(self):
+        """Logs this invocation's stats as one JSON line and returns them; nothing is logged without records"""
+        with self._lock:
+            current, self.current = self.current, {}
+            for name, stats in current.items():
+                self.totals.setdefault(name, QueueStats()).merge(stats)
+        if not current:
+            return None
+        line = {"metric": METRIC_NAME, "function": self.function_name,
+                "queues": {name: stats.to_dict() for name, stats in current.items()}}
+        metric_logger.info(json.dumps(line))
+        return line
+
+    def report(self):
+        """Percentile view of everything flushed by this process"""
+        with self._lock:
+            return queue_age_view(self.totals)
+
+
+def parse_metric_lines(lines):
+    """
+    Merges queue_latency lines (e.g. exported CloudWatch Logs) into QueueStats per
+    queue. Text around the JSON objects, such as the Lambda log prefix, is ignored.
+    """
+    decoder = json.JSONDecoder()
+    marker = '{"metric": "' + METRIC_NAME + '"'
+    merged = {}
+    for line in lines:
+        # `aws logs ... --output text` puts several events on one line
+        start = line.find(marker)
+        while start >= 0:
+            try:
+                data, end = decoder.raw_decode(line, start)
+            except ValueError:
+                break
+            for name, stats in data.get("queues", {}).items():
+                merged.setdefault(name, QueueStats()).merge(QueueStats.from_dict(stats))
+            start = line.find(marker, end)
+    return merged
+
+
+def queue_age_view(stats_by_queue):
+    """Per queue: records, retry rate and p50/p95/p99 of queue age, first-receive delay and processing time"""
+    view = {}
+    for name in sorted(stats_by_queue):
+        stats = stats_by_queue[name]
+        records = stats.counters["records"]
+        view[name] = {
+            "records": records,
+            "retry_rate": round(stats.counters["retried"] / records, 4) if records else 0.0,
+            "failed": stats.counters["failed"],
+            **{timing: stats.timings[timing].summary() for timing in TIMINGS},
+        }
+    return view
@@ -0,0 +1,250 @@
+# redrive.py
+"""
+Bulk DLQ redrive: drain dlq-queue, repair orders with fix_order_data and
+resubmit them to task-queue, so task_lambda does the reprocessing.
+
+Used by redrive_dlq.py (CLI) and POST /dlq/redrive.
+"""
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.claim_check import release, resolve
+from app.config import get_aws_client
+from app.notifier import MAX_BATCH_ENTRIES, send_batch
+from app.parameter_store import get_cached_parameter
+from app.processors import fix_order_data
+
+logger = logging.getLogger(__name__)
+
+# Received messages stay hidden for the rest of the run so receivers do not see them twice;
+# whatever is left in the DLQ is made visible again when the run ends
+REDRIVE_VISIBILITY_TIMEOUT = 300
+
+
+class RateLimiter:
+    """Token bucket shared by the receivers: at most rate messages/sec, bursts of one batch"""
+
+    def __init__(self, rate, burst=MAX_BATCH_ENTRIES):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, count):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= count:
+                    self.tokens -= count
+                    return
+                wait = (count - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def repair_batch(messages, resubmit_unchanged=False):
+    """
+    Applies fix_order_data to a received batch. Returns (repaired, left) where
+    repaired is [(message, fixed body)] to resubmit and left is [(message, reason)].
+    Claim-checked bodies are repaired from their payload in S3.
+    """
+    repaired, left = [], []
+    for message in messages:
+        try:
+            body = json.loads(message["Body"])
+        except (TypeError, ValueError) as e:
+            left.append((message, f"Unreadable body: {str(e)}"))
+            continue
+        try:
+            body = resolve(body)
+        except Exception as e:
+            left.append((message, f"Claim-check payload unavailable: {str(e)}"))
+            continue
+        if not isinstance(body, dict):
+            left.append((message, "Body is not a JSON object"))
+            continue
+        try:
+            fixed_body, issues = fix_order_data(body)
+        except (TypeError, KeyError, AttributeError) as e:
+            left.append((message, f"Cannot fix: {str(e)}"))
+            continue
+        if fixed_body is None and resubmit_unchanged and body.get("items"):
+            fixed_body = body
+        if fixed_body is None:
+            left.append((message, "; ".join(issues) or "Nothing to fix"))
+            continue
+        fixed_body["redriven_from_dlq"] = True
+        fixed_body["dlq_fixes"] = issues
+        repaired.append((message, fixed_body))
+    return repaired, left
+
+
+class DLQRedrive:
+    """
+    One redrive run. Receivers long-poll the DLQ in parallel; each received
+    batch is repaired, sent to task-queue with SendMessageBatch and, for the
+    entries that were accepted, deleted with DeleteMessageBatch. The run ends
+    when a receive comes back empty or max_messages have been received.
+    """
+
+    def __init__(self, dlq_url=None, task_queue_url=None, receivers=4, max_messages=None, rate_limit=None,
+                 dry_run=False, resubmit_unchanged=False, wait_seconds=2, max_seconds=None):
+        self.dlq_url = dlq_url or get_cached_parameter("poc-dlq-queue-url")
+        self.task_queue_url = task_queue_url or get_cached_parameter("poc-task-queue-url")
+        self.receivers = receivers
+        self.max_messages = max_messages
+        if rate_limit is not None and rate_limit <= 0:
+            raise ValueError("rate_limit must be positive (None for no limit)")
+        self.limiter = RateLimiter(rate_limit) if rate_limit is not None else None
+        self.dry_run = dry_run
+        self.resubmit_unchanged = resubmit_unchanged
+        self.wait_seconds = wait_seconds
+        self.max_seconds = max_seconds
+        self.sqs = get_aws_client("sqs")
+        self.stats = {"received": 0, "repaired": 0, "resubmitted": 0, "deleted": 0, "left_in_dlq": 0,
+                      "send_failures": 0, "delete_failures": 0}
+        self.reasons = {}
+        self.errors = []  # receiver errors; a failing receiver stops the run, the report still comes back
+        self._hidden = []  # receipt handles of messages left in the DLQ, released at the end
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.receivers) as pool:
+                for future in [pool.submit(self._receive_loop, start) for _ in range(self.receivers)]:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.error(f"❌ DLQ redrive receiver failed: {str(e)}")
+                        self.errors.append(str(e))
+        finally:
+            # Whatever happened, messages received and left in the DLQ are not kept hidden
+            self._release(self._hidden)
+        elapsed = time.perf_counter() - start
+        logger.info(f"🔁 DLQ redrive: {self.stats} in {elapsed:.2f}s")
+        return {
+            **self.stats,
+            "errors": self.errors,
+            "dry_run": self.dry_run,
+            "seconds": round(elapsed, 3),
+            "messages_per_sec": round(self.stats["received"] / elapsed, 1) if elapsed else 0.0,
+            "left_reasons": dict(sorted(self.reasons.items(), key=lambda item: -item[1])[:10]),
+        }
+
+    def _claim(self):
+        """How many more messages this receiver may take (0 = stop)"""
+        with self._lock:
+            if self._stop.is_set():
+                return 0
+            if self.max_messages is None:
+                return MAX_BATCH_ENTRIES
+            return max(0, min(MAX_BATCH_ENTRIES, self.max_messages - self.stats["received"]))
+
+    def _receive_loop(self, start):
+        try:
+            self._receive_batches(start)
+        except Exception:
+            # Stop the other receivers too: the run ends with what it has done so far
+            self._stop.set()
+            raise
+
+    def _receive_batches(self, start):
+        while True:
+            if self.max_seconds and time.perf_counter() - start > self.max_seconds:
+                self._stop.set()
+            count = self._claim()
+            if not count:
+                return
+            messages = self.sqs.receive_message(
+                QueueUrl=self.dlq_url,
+                MaxNumberOfMessages=count,
+                WaitTimeSeconds=self.wait_seconds,
+                VisibilityTimeout=REDRIVE_VISIBILITY_TIMEOUT,
+                MessageAttributeNames=["All"]
+            ).get("Messages", [])
+            if not messages:
+                self._stop.set()
+                return
+            with self._lock:
+                over = max(0, self.stats["received"] + len(messages) - self.max_messages) if self.max_messages else 0
+                self.stats["received"] += len(messages) - over
+            if over:
+                # Another receiver filled the quota meanwhile; hand these back untouched
+                self._release([message["ReceiptHandle"] for message in messages[-over:]])
+                messages = messages[:-over]
+            try:
+                self._redrive_batch(messages)
+            except Exception:
+                # Made visible again with the rest at the end; a handle already deleted is just not released
+                with self._lock:
+                    self._hidden.extend(message["ReceiptHandle"] for message in messages)
+                raise
+
+    def _redrive_batch(self, messages):
+        repaired, left = repair_batch(messages, self.resubmit_unchanged)
+        sent, undeleted = [], []
+
+        if repaired and not self.dry_run:
+            if self.limiter:
+                self.limiter.acquire(len(repaired))
+            # Message attributes (the order's trace context) go along with the repaired body
+            results = send_batch(self.task_queue_url, [body for _, body in repaired], max_workers=1,
+                                 attributes=[message.get("MessageAttributes") for message, _ in repaired])
+            sent = [message for (message, _), result in zip(repaired, results) if "error" not in result]
+            undeleted = self._delete(sent)
+
+        deleted = {message["MessageId"] for message in sent} - {message["MessageId"] for message in undeleted}
+        # The resubmitted body is checked in again if still oversized; the originals' payloads are done with
+        release(message["Body"] for message in sent if message["MessageId"] in deleted)
+        with self._lock:
+            self.stats["repaired"] += len(repaired)
+            self.stats["resubmitted"] += len(sent)
+            self.stats["deleted"] += len(deleted)
+            self.stats["send_failures"] += 0 if self.dry_run else len(repaired) - len(sent)
+            self.stats["delete_failures"] += len(undeleted)
+            self.stats["left_in_dlq"] += len(messages) - len(deleted)
+            self._hidden.extend(message["ReceiptHandle"] for message in messages if message["MessageId"] not in deleted)
+            for _, reason in left:
+                self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+    def _delete(self, messages):
+        """Deletes resubmitted originals; returns the ones that could not be deleted"""
+        if not messages:
+            return []
+        try:
+            response = self.sqs.delete_message_batch(
+                QueueUrl=self.dlq_url,
+                Entries=[{"Id": str(index), "ReceiptHandle": message["ReceiptHandle"]}
+                         for index, message in enumerate(messages)]
+            )
+        except Exception as e:
+            logger.error(f"❌ DeleteMessageBatch failed: {str(e)}")
+            return messages
+        # An undeleted original is redriven again by a later run; task_lambda writes are
+        # keyed by order_id, so the duplicate is harmless
+        return [messages[int(entry["Id"])] for entry in response.get("Failed", [])]
+
+    def _release(self, handles):
+        for offset in range(0, len(handles), MAX_BATCH_ENTRIES):
+            chunk = handles[offset:offset + MAX_BATCH_ENTRIES]
+            try:
+                self.sqs.change_message_visibility_batch(
+                    QueueUrl=self.dlq_url,
+                    Entries=[{"Id": str(index), "ReceiptHandle": handle, "VisibilityTimeout": 0}
+                             for index, handle in enumerate(chunk)]
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Could not release DLQ messages: {str(e)}")
+
+
+def redrive_dlq(**options):
+    """Runs one DLQRedrive with the given options and returns its report"""
+    return DLQRedrive(**options).run()
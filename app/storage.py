@@ -1,23 +1,141 @@
 # app/storage.py
+import gzip
+import io
 import json
 import logging
+import os
 from app.config import get_aws_client
+from app.metrics import metrics
+from app.money import json_default
+from app.tracing import tracer
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for INVOICE_CODEC=zstd
+    zstandard = None
 
 logger = logging.getLogger(__name__)
 
-def save_to_s3(bucket_name, file_key, data):
+JSON_CONTENT_TYPE = "application/json"
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+def _dumps(data):
+    # Compact separators: pretty-printing roughly doubled invoice size for large orders
+    return json.dumps(data, separators=(",", ":"), default=json_default).encode("utf-8")
+
+class InvoiceCodec:
     """
-    Saves dictionary data as JSON file in S3.
+    How an invoice is serialized into an S3 object body.
+    content_encoding is stored as the object's ContentEncoding so readers
+    know how to decode it; None means plain JSON.
+    """
+    name = "json"
+    content_encoding = None
+
+    def encode(self, data):
+        return self.compress(_dumps(data))
+
+    def compress(self, raw):
+        """Encodes already-serialized JSON bytes"""
+        return raw
+
+    @staticmethod
+    def open_stream(body):
+        """Wraps a streaming body so it yields the decoded JSON bytes"""
+        return body
+
+class GzipCodec(InvoiceCodec):
+    name = "gzip"
+    content_encoding = "gzip"
+
+    def __init__(self, level=GZIP_LEVEL):
+        self.level = level
+
+    def compress(self, raw):
+        # mtime=0 keeps the output deterministic for identical invoices
+        return gzip.compress(raw, compresslevel=self.level, mtime=0)
+
+    @staticmethod
+    def open_stream(body):
+        return gzip.GzipFile(fileobj=body, mode="rb")
+
+class ZstdCodec(InvoiceCodec):
+    name = "zstd"
+    content_encoding = "zstd"
+
+    def __init__(self, level=ZSTD_LEVEL):
+        if zstandard is None:
+            raise ValueError("INVOICE_CODEC=zstd requires the 'zstandard' package")
+        self.level = level
+
+    def compress(self, raw):
+        return zstandard.ZstdCompressor(level=self.level).compress(raw)
+
+    @staticmethod
+    def open_stream(body):
+        if zstandard is None:
+            raise ValueError("Object is zstd-encoded but the 'zstandard' package is not installed")
+        return zstandard.ZstdDecompressor().stream_reader(body)
+
+INVOICE_CODECS = {
+    "json": InvoiceCodec,
+    "gzip": GzipCodec,
+    "zstd": ZstdCodec,
+}
+
+def get_codec(name=None):
+    """Returns the codec for name, defaulting to the INVOICE_CODEC env var (json)"""
+    name = (name or os.environ.get("INVOICE_CODEC", "json")).lower()
+    if name not in INVOICE_CODECS:
+        raise ValueError(f"Unknown invoice codec: {name} (expected one of {', '.join(INVOICE_CODECS)})")
+    return INVOICE_CODECS[name]()
+
+def _codec_for_encoding(content_encoding):
+    for codec_class in INVOICE_CODECS.values():
+        if codec_class.content_encoding == content_encoding:
+            return codec_class
+    raise ValueError(f"Unsupported ContentEncoding: {content_encoding}")
+
+def save_to_s3(bucket_name, file_key, data, codec=None):
+    """
+    Saves dictionary data as JSON file in S3, compressed if the codec says so.
     """
     try:
+        codec = codec if isinstance(codec, InvoiceCodec) else get_codec(codec)
+        body = codec.encode(data)
+        extra = {"ContentEncoding": codec.content_encoding} if codec.content_encoding else {}
+
         s3 = get_aws_client("s3")
-        s3.put_object(
-            Bucket=bucket_name,
-            Key=file_key,
-            Body=json.dumps(data, indent=2)
-        )
-        logger.info(f"   ✅ Saved to s3://{bucket_name}/{file_key}")
-        
+        with metrics.timer("S3.PutObject"), tracer.span("S3.PutObject"):
+            s3.put_object(
+                Bucket=bucket_name,
+                Key=file_key,
+                Body=body,
+                ContentType=JSON_CONTENT_TYPE,
+                **extra
+            )
+        logger.info(f"   ✅ Saved to s3://{bucket_name}/{file_key} ({len(body)} bytes, {codec.name})")
+
     except Exception as e:
         logger.error(f"   ❌ S3 save failed: {str(e)}")
         raise
+
+def decode_s3_object(response):
+    """
+    Decodes a get_object response written by save_to_s3, whatever its codec.
+    The body is decompressed as a stream rather than read into memory first.
+    """
+    content_encoding = response.get("ContentEncoding")
+    codec_class = _codec_for_encoding(content_encoding) if content_encoding else InvoiceCodec
+    return json.load(codec_class.open_stream(response["Body"]))
+
+def decompress(data, content_encoding=None):
+    """JSON bytes of an object body written with content_encoding (None = plain JSON)"""
+    codec_class = _codec_for_encoding(content_encoding) if content_encoding else InvoiceCodec
+    return codec_class.open_stream(io.BytesIO(data)).read()
+
+def load_from_s3(bucket_name, file_key, s3=None):
+    """Reads a JSON object saved by save_to_s3"""
+    s3 = s3 or get_aws_client("s3")
+    return decode_s3_object(s3.get_object(Bucket=bucket_name, Key=file_key))
@@ -0,0 +1,452 @@
+# tracing.py
+"""
+Lightweight distributed tracing across the API, task_lambda, the DLQ and
+notification_lambda, exported as AWS X-Ray segment documents.
+
+Trace context travels with each SQS message in an X-Ray style message
+attribute, so one order's trace covers every hop:
+
+    X-Amzn-Trace-Id: Root=1-6710c3a2-9f1c2b3d4e5f60718293a4b5;Parent=53995c3f42cd8ad8;Sampled=1
+
+    with tracer.start_trace("task_lambda", trace_header(record), LAMBDA_ORIGIN):
+        with tracer.span("Step.calculate_order_total"):
+            ...
+        with tracer.span("SQS.SendMessage"):
+            sqs.send_message(..., MessageAttributes=tracer.inject())
+    tracer.flush()  # end of the invocation
+
+Code that processes batches concurrently in one process (task_worker's
+receiver threads) collects each batch's root spans in its own SpanBatch, so
+a flush exports only that batch:
+
+    spans = SpanBatch()
+    with tracer.start_trace("task_lambda", trace_header(record), LAMBDA_ORIGIN, batch=spans):
+        ...
+    tracer.flush(spans)
+
+start_trace() continues the trace in the header (same trace id, the sender's
+span as parent, the sender's sampling decision) or starts a new one, sampled
+with probability TRACE_SAMPLE_RATE. span() opens a child of the current span;
+outside a sampled trace it returns a shared no-op, so instrumented code costs
+next to nothing when a trace is not recorded.
+
+TRACE_EXPORTER picks where finished spans go at flush():
+    off     (default) nothing is recorded, but trace context is still propagated
+    file    one X-Ray segment document per line, appended to TRACE_FILE
+    daemon  UDP to the X-Ray daemon protocol at AWS_XRAY_DAEMON_ADDRESS
+            (trace_collector.py listen is a local stand-in)
+    memory  kept in tracer.exporter.documents, for tests and benchmarks
+
+trace_view() turns one trace's documents back into a timeline and the hops
+between services (time waiting in the queue, time in the consumer), which is
+what trace_collector.py show prints to find an order's slow hop.
+"""
+
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+
+TRACE_HEADER = "X-Amzn-Trace-Id"
+DAEMON_HEADER = '{"format": "json", "version": 1}\n'
+DEFAULT_DAEMON_ADDRESS = "127.0.0.1:2000"
+
+LAMBDA_ORIGIN = "AWS::Lambda::Function"
+
+# Span names "<service>.<Operation>" with these prefixes are AWS calls
+AWS_SERVICES = frozenset({"S3", "SQS", "DynamoDB", "SSM"})
+
+logger = logging.getLogger(__name__)
+
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+# Span open on the current thread / task
+_current = contextvars.ContextVar("trace_span", default=None)
+
+
+def new_trace_id():
+    return f"1-{int(time.time()):08x}-{random.getrandbits(96):024x}"
+
+
+def new_span_id():
+    return f"{random.getrandbits(64):016x}"
+
+
+def format_header(trace_id, parent_id, sampled):
+    return f"Root={trace_id};Parent={parent_id};Sampled={1 if sampled else 0}"
+
+
+def parse_header(header):
+    """(trace_id, parent_id, sampled) from an X-Amzn-Trace-Id value; sampled is None when undecided"""
+    if not header:
+        return None, None, None
+    fields = dict(part.split("=", 1) for part in header.replace(" ", "").split(";") if "=" in part)
+    sampled = fields.get("Sampled")
+    return fields.get("Root"), fields.get("Parent"), {"1": True, "0": False}.get(sampled)
+
+
+def trace_header(message):
+    """Trace header of a Lambda SQS record (messageAttributes) or a ReceiveMessage message (MessageAttributes)"""
+    attributes = message.get("messageAttributes") or message.get("MessageAttributes") or {}
+    attribute = attributes.get(TRACE_HEADER)
+    if not attribute:
+        return None
+    return attribute.get("stringValue") or attribute.get("StringValue")
+
+
+def with_header(message_attributes, header):
+    """SQS MessageAttributes with the trace header added (a new dict; None stays None without a header)"""
+    if header is None:
+        return message_attributes
+    return {**(message_attributes or {}), TRACE_HEADER: {"DataType": "String", "StringValue": header}}
+
+
+class FileExporter:
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("TRACE_FILE", "traces.jsonl")
+        self._lock = threading.Lock()
+
+    def export(self, documents):
+        lines = "".join(_encode(document) + "\n" for document in documents)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+class DaemonExporter:
+    """X-Ray daemon UDP protocol: a JSON header line, then one segment document per datagram"""
+
+    def __init__(self, address=None):
+        host, port = (address or os.environ.get("AWS_XRAY_DAEMON_ADDRESS", DEFAULT_DAEMON_ADDRESS)).rsplit(":", 1)
+        self.address = (host, int(port))
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def export(self, documents):
+        for document in documents:
+            payload = DAEMON_HEADER + _encode(document)
+            try:
+                self._socket.sendto(payload.encode("utf-8"), self.address)
+            except OSError:
+                # Tracing never fails the handler; a missing collector just loses spans
+                pass
+
+
+class MemoryExporter:
+    def __init__(self):
+        self.documents = []
+
+    def export(self, documents):
+        self.documents.extend(documents)
+
+
+EXPORTERS = {"file": FileExporter, "daemon": DaemonExporter, "memory": MemoryExporter, "off": None}
+
+
+def get_exporter(name=None):
+    name = (name or os.environ.get("TRACE_EXPORTER", "off")).lower()
+    if name not in EXPORTERS:
+        raise ValueError(f"Unknown TRACE_EXPORTER: {name} (expected one of {', '.join(EXPORTERS)})")
+    return EXPORTERS[name]() if EXPORTERS[name] else None
+
+
+class SpanBatch:
+    """Root spans finished since the last flush, for one batch or (the tracer's own) the whole process"""
+
+    def __init__(self):
+        self._spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self._spans.append(span)
+
+    def take(self):
+        with self._lock:
+            spans, self._spans = self._spans, []
+        return spans
+
+
+class Span:
+    """
+    One segment (trace root in this process) or subsegment. A span that is
+    not recorded (not sampled, or no exporter) still carries context for inject().
+    Finished subsegments are kept on their parent and exported embedded in the
+    segment's document, as the X-Ray SDKs do: one document per record.
+    """
+
+    __slots__ = ("tracer", "batch", "trace_id", "id", "parent_id", "parent", "name", "sampled", "recorded", "origin",
+                 "start", "end", "annotations", "error", "subsegments", "_token")
+
+    def __init__(self, tracer, trace_id, parent_id, name, sampled=True, recorded=True, origin=None, parent=None,
+                 batch=None):
+        self.tracer = tracer
+        self.batch = batch
+        self.trace_id = trace_id
+        self.id = new_span_id()
+        self.parent_id = parent_id
+        self.parent = parent
+        self.name = name
+        self.sampled = sampled
+        self.recorded = recorded
+        self.origin = origin
+        self.annotations = {}
+        self.error = None
+        self.subsegments = []
+        self.end = None
+
+    def annotate(self, **annotations):
+        """Indexed key/values (order_id, correlation_id): X-Ray filter expressions and trace_collector.py use them"""
+        self.annotations.update(annotations)
+
+    def header(self):
+        return format_header(self.trace_id, self.id, self.sampled)
+
+    def begin(self):
+        self.start = time.time()
+        return self
+
+    def finish(self, error=None):
+        """Ends the span; error is {"type": ..., "message": ...}. begin()/finish() leave the current span alone."""
+        self.end = time.time()
+        if error:
+            self.error = error
+        if not self.recorded:
+            return
+        if self.parent is None:
+            (self.batch or self.tracer._finished).add(self)
+        else:
+            self.parent.subsegments.append(self)
+
+    def __enter__(self):
+        self.start = time.time()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        self.finish({"type": exc_type.__name__, "message": str(exc)} if exc_type is not None else None)
+        return False
+
+    def to_document(self):
+        """Segment document; subsegments embedded in it carry only their own fields"""
+        document = {"name": self.name, "id": self.id, "start_time": self.start, "end_time": self.end}
+        if self.parent is None:
+            document["trace_id"] = self.trace_id
+            if self.parent_id:
+                document["parent_id"] = self.parent_id
+            if self.origin:
+                document["origin"] = self.origin
+        service, _, operation = self.name.partition(".")
+        if service in AWS_SERVICES:
+            # S3.PutObject -> name "S3", aws.operation "PutObject", as the X-Ray SDK records AWS calls
+            document.update(name=service, namespace="aws", aws={"operation": operation})
+        if self.annotations:
+            document["annotations"] = self.annotations
+        if self.error:
+            document["fault"] = True
+            document["cause"] = {"exceptions": [{"id": new_span_id(), **self.error}]}
+        if self.subsegments:
+            document["subsegments"] = [subsegment.to_document() for subsegment in self.subsegments]
+        return document
+
+
+class _NoopSpan:
+    """Returned by span() outside a recorded trace"""
+
+    def annotate(self, **annotations):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    def __init__(self, exporter=None, sample_rate=None):
+        self.exporter = exporter if exporter is not None else get_exporter()
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.environ.get("TRACE_SAMPLE_RATE", "1.0"))
+        self._finished = SpanBatch()
+
+    def start_trace(self, name, header=None, origin=None, batch=None, **annotations):
+        """
+        Root span (segment) of this service's part of a trace, continuing the one
+        in header if given. name is the service (task_lambda, order-api, ...);
+        origin its X-Ray type, e.g. AWS::Lambda::Function. batch: the SpanBatch
+        it is kept in once finished (default: the tracer's own).
+        """
+        trace_id, parent_id, sampled = parse_header(header)
+        if trace_id is None:
+            trace_id, parent_id = new_trace_id(), None
+        if sampled is None:
+            sampled = random.random() < self.sample_rate
+        span = Span(self, trace_id, parent_id, name, sampled=sampled, recorded=sampled and self.exporter is not None,
+                    origin=origin, batch=batch)
+        span.annotations.update(annotations)
+        return span
+
+    def span(self, name):
+        """
+        Child of the current span, or a no-op when the current trace is not
+        recorded. Name AWS calls "<service>.<Operation>", like the metrics timers.
+        """
+        parent = _current.get()
+        if parent is None or not parent.recorded:
+            return NOOP_SPAN
+        return Span(self, parent.trace_id, parent.id, name, True, True, None, parent)
+
+    def current(self):
+        return _current.get()
+
+    @contextlib.contextmanager
+    def resume(self, span):
+        """
+        Makes a finished span current again for work deferred to the end of the
+        batch (e.g. notifications sent after the DynamoDB flush); its end time
+        moves to cover it. The span must not have been flushed yet: keep it in a
+        SpanBatch flushed only after the deferred work when other threads flush.
+        """
+        token = _current.set(span)
+        try:
+            yield span
+        finally:
+            _current.reset(token)
+            span.end = time.time()
+
+    def annotate(self, **annotations):
+        """Annotates the current span (typically the record's root span)"""
+        span = _current.get()
+        if span is not None:
+            span.annotate(**annotations)
+
+    def inject(self, message_attributes=None):
+        """message_attributes plus the current trace context, for SendMessage / SendMessageBatch entries"""
+        span = _current.get()
+        return with_header(message_attributes, span.header() if span is not None else None)
+
+    def flush(self, batch=None):
+        """Exports the spans finished in batch (default: the tracer's own) since its last flush; returns how many"""
+        finished = (batch or self._finished).take()
+        if finished and self.exporter is not None:
+            try:
+                self.exporter.export([span.to_document() for span in finished])
+            except Exception as e:
+                # Tracing never fails the handler
+                logger.warning(f"   ⚠️ Trace export failed ({len(finished)} spans): {str(e)}")
+        return len(finished)
+
+
+def flatten_documents(documents):
+    """
+    Segment documents with their embedded subsegments pulled out as separate
+    documents (with trace_id, parent_id and type "subsegment"), as X-Ray stores them
+    """
+    flat = []
+    pending = list(documents)
+    while pending:
+        document = dict(pending.pop())
+        for subsegment in document.pop("subsegments", ()):
+            pending.append({**subsegment, "trace_id": document["trace_id"], "parent_id": document["id"],
+                            "type": "subsegment"})
+        flat.append(document)
+    return flat
+
+
+def load_documents(lines):
+    """
+    Flattened segment documents from exported lines; daemon header lines and
+    anything that is not a segment are skipped
+    """
+    documents = []
+    for line in lines:
+        line = line.strip()
+        if not line.startswith("{"):
+            continue
+        try:
+            document = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(document, dict) and "trace_id" in document:
+            documents.append(document)
+    return flatten_documents(documents)
+
+
+def find_trace_ids(documents, **annotations):
+    """Ids of the traces with a segment annotated with all the given values, e.g. correlation_id=..."""
+    return sorted({document["trace_id"] for document in documents
+                   if all(document.get("annotations", {}).get(key) == value for key, value in annotations.items())})
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def trace_view(documents, trace_id):
+    """
+    Timeline of one trace plus its hops: a hop is a segment continued from a
+    span of another segment (the SQS send), queue_ms is the gap between that
+    send ending and the consumer starting, processing_ms the consumer's time.
+    documents are flattened, as load_documents() returns them.
+    """
+    spans = sorted((document for document in documents if document["trace_id"] == trace_id),
+                   key=lambda document: document["start_time"])
+    if not spans:
+        return None
+    by_id = {span["id"]: span for span in spans}
+
+    def segment_of(span):
+        # Subsegments point at their parent span; the first non-subsegment up the chain is the segment
+        while span.get("type") == "subsegment" and span.get("parent_id") in by_id:
+            span = by_id[span["parent_id"]]
+        return span
+
+    started = spans[0]["start_time"]
+    timeline, subsegments, hops = [], [], []
+    for span in spans:
+        segment = segment_of(span)
+        operation = span.get("aws", {}).get("operation")
+        entry = {
+            "offset_ms": _ms(span["start_time"] - started),
+            "duration_ms": _ms(span["end_time"] - span["start_time"]),
+            "segment": segment["name"],
+            "name": f"{span['name']}.{operation}" if operation else span["name"],
+            "fault": bool(span.get("fault")),
+        }
+        timeline.append(entry)
+        if span.get("type") == "subsegment":
+            subsegments.append(entry)
+            continue
+        sender = by_id.get(span.get("parent_id"))
+        if sender is not None:
+            hops.append({
+                "from": segment_of(sender)["name"],
+                "to": span["name"],
+                "queue_ms": _ms(span["start_time"] - sender["end_time"]),
+                "processing_ms": _ms(span["end_time"] - span["start_time"]),
+                "fault": bool(span.get("fault")),
+            })
+
+    return {
+        "trace_id": trace_id,
+        "annotations": {key: value for span in spans for key, value in span.get("annotations", {}).items()},
+        "duration_ms": _ms(max(span["end_time"] for span in spans) - started),
+        "segments": [span["name"] for span in spans if span.get("type") != "subsegment"],
+        "faults": [entry["name"] for entry in timeline if entry["fault"]],
+        "timeline": timeline,
+        "hops": hops,
+        "slowest_hop": max(hops, key=lambda hop: hop["queue_ms"] + hop["processing_ms"], default=None),
+        "slowest_span": max(subsegments, key=lambda entry: entry["duration_ms"], default=None),
+    }
+
+
+# Process-wide tracer. task_worker's receiver threads share it, each flushing its
+# own batch's SpanBatch; the Lambdas use the tracer's own, one invocation at a time.
+tracer = Tracer()
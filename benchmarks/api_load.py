@@ -0,0 +1,82 @@
+"""
+Load test: sync api.main vs async api.async_main for POST /orders.
+
+Both apps run in-process behind httpx's ASGI transport; SQS is the in-memory
+stand-in with --latency-ms per call (a blocking sleep for the sync app, an
+awaited sleep for the async one). Reports p50/p99 latency and requests/sec at
+each concurrency level. Requires httpx.
+
+Usage: python -m benchmarks.api_load [--clients 50 100 250 500] [--requests-per-client 4]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+
+import httpx
+
+from benchmarks.local_aws import AsyncClient, LocalAWS, make_order
+
+
+async def drive(app, clients, requests_per_client, headers):
+    order = {"items": make_order(0)["items"], "promo_code": "SAVE10"}
+    latencies = []
+    errors = 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        async def one_client():
+            nonlocal errors
+            for _ in range(requests_per_client):
+                start = time.perf_counter()
+                response = await client.post("/orders", json=order, headers=headers)
+                latencies.append((time.perf_counter() - start) * 1000)
+                errors += response.status_code != 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one_client() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "clients": clients,
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 2),
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 100, 250, 500])
+    parser.add_argument("--requests-per-client", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    LocalAWS(latency_ms=args.latency_ms).install()
+
+    # Imported after install() so api.main's module-level client is the in-memory one
+    from api import async_main, main as sync_main
+    from api.auth import create_token
+
+    # The async app skips its lifespan: its clients are injected directly
+    async_aws = LocalAWS()
+    async_main.app.state.sqs = AsyncClient(async_aws.sqs, latency_ms=args.latency_ms)
+    async_main.app.state.ssm = AsyncClient(async_aws.ssm, latency_ms=args.latency_ms)
+    async_main.app.state.s3 = AsyncClient(async_aws.s3, latency_ms=args.latency_ms)
+    async_main.app.state.parameters = {}
+
+    headers = {"Authorization": f"Bearer {create_token('bench-user')}"}
+    print(f"🌐 POST /orders, {args.latency_ms}ms per SQS call")
+    for name, app in (("sync", sync_main.app), ("async", async_main.app)):
+        for clients in args.clients:
+            result = asyncio.run(drive(app, clients, args.requests_per_client, headers))
+            print(json.dumps({"api": name, **result}))
+
+
+if __name__ == "__main__":
+    main()
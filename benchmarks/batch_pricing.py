@@ -0,0 +1,92 @@
+"""
+Orders/sec of app.pricing.price_batch (vectorized, and its pure-Python
+fallback) vs the scalar functions the lambdas call per order:
+calculate_order_total -> apply_discount -> calculate_bulk_discount / calculate_tax.
+
+Every run also checks that all five columns hold exactly the same cents as
+the scalar results, including prices with a third decimal that land on a
+half-cent.
+
+Usage: python -m benchmarks.batch_pricing [--orders 1000 100000 1000000]
+"""
+
+import argparse
+import json
+import logging
+import random
+import time
+
+from app import pricing
+from app.helpers.discount_calculator import calculate_bulk_discount, calculate_tax
+from app.processors import apply_discount, calculate_order_total
+from app.promotions import PROMO_DISCOUNT_BPS
+
+PROMO_CODES = list(PROMO_DISCOUNT_BPS) + [None, "EXPIRED"]
+
+
+def make_orders(count, seed=3):
+    rng = random.Random(seed)
+    orders = []
+    for _ in range(count):
+        items = [{"price": round(rng.uniform(0.5, 400), 2) if rng.random() < 0.9 else rng.choice([0.125, 2.675, 1.005]),
+                  "quantity": rng.randint(1, 5)}
+                 for _ in range(rng.randint(1, 12))]
+        orders.append({"items": items, "promo_code": rng.choice(PROMO_CODES)})
+    return orders
+
+
+def price_scalar(orders):
+    columns = {name: [] for name in pricing.PRICE_COLUMNS}
+    for order in orders:
+        subtotal = calculate_order_total(order["items"])
+        final_total, discount_amount = apply_discount(subtotal, order["promo_code"])
+        columns["subtotal"].append(subtotal)
+        columns["discount_amount"].append(discount_amount)
+        columns["final_total"].append(final_total)
+        columns["bulk_discount"].append(calculate_bulk_discount(subtotal))
+        columns["tax"].append(calculate_tax(final_total))
+    return columns
+
+
+def mismatches(expected, actual):
+    return sum(
+        want.cents != int(got)
+        for name in pricing.PRICE_COLUMNS
+        for want, got in zip(expected[name], actual[name])
+    )
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run(count):
+    orders = make_orders(count)
+    expected, scalar_seconds = timed(price_scalar, orders)
+    batch, columnar_seconds = timed(pricing.OrderBatch.from_orders, orders)
+
+    result = {"orders": count, "scalar_orders_per_sec": round(count / scalar_seconds),
+              "from_orders_ms": round(columnar_seconds * 1000, 1)}
+    modes = [("python", False)] + ([("vectorized", True)] if pricing.np is not None else [])
+    for mode, vectorized in modes:
+        priced, seconds = timed(pricing.price_batch, batch, vectorized)
+        result[f"{mode}_orders_per_sec"] = round(count / seconds)
+        result[f"{mode}_mismatches"] = mismatches(expected, priced)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, nargs="+", default=[1000, 100000, 1000000])
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    print(f"🧮 Batch pricing, NumPy {'available' if pricing.np is not None else 'not installed'}")
+    for count in args.orders:
+        print(json.dumps(run(count)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Orders/sec of POST /orders/batch: per-order send_message loop vs the
+SendMessageBatch producer (app.notifier.send_batch).
+
+Usage: python -m benchmarks.batch_producer [--latency-ms 2] [--sizes 10 100 10000]
+"""
+
+import argparse
+import json
+import logging
+import time
+
+from benchmarks.local_aws import LocalAWS, make_order
+
+
+def legacy_submit(sqs, queue_url, orders):
+    """The previous implementation: one send_message round-trip per order"""
+    for order in orders:
+        sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps(order))
+
+
+def run(size, latency_ms):
+    aws = LocalAWS(latency_ms=latency_ms).install()
+    # Imported after install() so the module-level client is the in-memory one
+    from api import main
+
+    orders = [{"items": make_order(index)["items"], "promo_code": "SAVE10"} for index in range(size)]
+    queue_url = aws.ssm.parameters["poc-task-queue-url"]
+
+    start = time.perf_counter()
+    legacy_submit(main.sqs, queue_url, orders)
+    legacy_seconds = time.perf_counter() - start
+
+    aws.calls.clear()
+    start = time.perf_counter()
+    response = main.submit_batch_orders(orders, user_id="bench-user")
+    batched_seconds = time.perf_counter() - start
+
+    submitted = sum(1 for result in response["results"] if result["status"] == "submitted")
+    return {
+        "orders": size,
+        "legacy_orders_per_sec": round(size / legacy_seconds, 1),
+        "batched_orders_per_sec": round(size / batched_seconds, 1),
+        "send_message_batch_calls": aws.calls["sqs.send_message_batch"],
+        "submitted": submitted,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 10000])
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    print(f"📤 {args.latency_ms}ms per SQS call")
+    for size in args.sizes:
+        print(json.dumps(run(size, args.latency_ms)))
+
+
+if __name__ == "__main__":
+    main()
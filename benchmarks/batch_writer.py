@@ -0,0 +1,56 @@
+"""
+DynamoDB round-trips per Lambda batch: per-order put_item (+ update_item on the
+DLQ path) vs app.database.OrderWriter (BatchWriteItem in groups of 25).
+
+--unprocessed-rate makes the stand-in return that fraction of each
+BatchWriteItem as UnprocessedItems to exercise the backoff/retry path.
+
+Usage: python -m benchmarks.batch_writer [--orders 100] [--unprocessed-rate 0.1]
+"""
+
+import argparse
+import json
+import logging
+
+from app import database
+from benchmarks.local_aws import LocalAWS, make_order
+
+
+def write_orders(target, orders, dlq_path):
+    for order in orders:
+        target.save_order(order["order_id"], "RECOVERED" if dlq_path else "COMPLETED", 100.0, 10.0, 90.0,
+                          order["items"], "SAVE10", recovered=dlq_path)
+        if dlq_path:
+            target.update_order_status(order["order_id"], status="RECOVERED", recovered=True)
+
+
+def run(orders, dlq_path, unprocessed_rate):
+    results = {"orders": len(orders), "path": "dlq" if dlq_path else "task"}
+
+    aws = LocalAWS().install()
+    write_orders(database, orders, dlq_path)
+    results["legacy_round_trips"] = aws.calls["dynamodb.put_item"] + aws.calls["dynamodb.update_item"]
+
+    aws = LocalAWS().install()
+    aws.dynamodb.unprocessed_rate = unprocessed_rate
+    with database.OrderWriter(base_delay=0.001) as writer:
+        write_orders(writer, orders, dlq_path)
+    results["writer"] = writer.stats
+    results["stored"] = len(aws.dynamodb.tables.get("orders", {}))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument("--unprocessed-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    orders = [make_order(index) for index in range(args.orders)]
+    for dlq_path in (False, True):
+        print(json.dumps(run(orders, dlq_path, args.unprocessed_rate)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Claim-check for oversized SQS bodies (app/claim_check.py): orders of
+--item-counts items go through POST /orders and POST /orders/batch of
+api/main.py and then task_lambda, notification_lambda and (every
+--bad-every-th order has a negative price) dlq_processor_lambda behind the
+event source mappings. FakeSQS rejects bodies over 256 KB like SQS does.
+
+1. With the default CLAIM_CHECK_THRESHOLD_BYTES. Checks:
+   - no message body on any queue exceeds 256 KB, and every order is accepted
+   - every order ends with an invoice holding all its items
+   - each checked-in payload is read from S3 once: retries and the DLQ hit payload_cache
+   - the payloads of processed orders are deleted; one sent straight to the
+     DLQ with nothing to fix (manual review) keeps its object
+   - a claim-checked order redriven with redrive_dlq is repaired from its
+     payload and processed, and leaves no object behind
+   - when the event source fails to delete processed messages (after their
+     payloads were released), the redelivered records count as done: no
+     failures, no DLQ, one notification per order
+   - an oversized notification whose payload cannot be read is retried, not dropped
+   - a payload changed in S3 after check-in is rejected by its checksum
+2. The same orders with the claim check off (threshold above any order):
+   the largest orders are rejected by SQS, and the bytes sent over SQS for the
+   orders that do go through are higher than with the claim check on.
+
+Usage: python -m benchmarks.claim_check [--item-counts 10,2000,8000] [--orders-per-size 4] [--bad-every 4]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+import httpx
+
+from app import claim_check
+from app.claim_check import KEY_PREFIX, MAX_DELETE_KEYS, check_in, payload_cache, pointer_of, resolve
+from app.redrive import redrive_dlq
+from app.storage import decode_s3_object
+from benchmarks.event_source import MAPPINGS, EventSourceMapping
+from benchmarks.local_aws import MAX_MESSAGE_BYTES, QUEUE_URL_PREFIX, LocalAWS, make_order
+
+BUCKET = "results-bucket"
+
+
+async def submit(app, orders, headers):
+    """Half the orders one by one through POST /orders, the rest through POST /orders/batch; returns the results"""
+    half = len(orders) // 2
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+        for order in orders[:half]:
+            response = await client.post("/orders", json=order, headers=headers)
+            results.append(response.json() if response.status_code == 200 else {"status": "failed"})
+        for offset in range(half, len(orders), 10):
+            response = await client.post("/orders/batch", json=orders[offset:offset + 10], headers=headers)
+            results.extend(response.json()["results"])
+    return results
+
+
+def record_bodies(aws):
+    """Collects the body of every message enqueued on any queue"""
+    bodies = []
+    enqueue = aws.sqs._enqueue
+
+    def recording(queue_url, body, message_attributes=None):
+        bodies.append(body)
+        return enqueue(queue_url, body, message_attributes)
+
+    aws.sqs._enqueue = recording
+    return bodies
+
+
+def drain(aws):
+    aws.sqs.set_queue_attributes(QueueUrl=QUEUE_URL_PREFIX + "task-queue", Attributes={"VisibilityTimeout": "0"})
+    mappings = [EventSourceMapping(aws, queue, function) for queue, function in MAPPINGS]
+    while sum(mapping.poll_once() for mapping in mappings):
+        pass
+
+
+def claim_check_keys(aws):
+    return {key for bucket, key in aws.s3.objects if bucket == BUCKET and key.startswith(KEY_PREFIX)}
+
+
+def checked_in_keys(bodies):
+    return {pointer_of(json.loads(body))["key"] for body in bodies if f'"{claim_check.POINTER_FIELD}"' in body}
+
+
+def invoice_complete(aws, order_id, item_count):
+    if (BUCKET, f"{order_id}.json") not in aws.s3.objects:
+        return False
+    invoice = decode_s3_object(aws.s3.get_object(Bucket=BUCKET, Key=f"{order_id}.json"))
+    return invoice["item_count"] == item_count and len(invoice["items"]) == item_count
+
+
+def run_pipeline(api, item_counts, orders_per_size, bad_every, headers):
+    """Orders through the API and every mapping until the queues are empty"""
+    aws = LocalAWS().install()
+    api.sqs = aws.sqs
+    payload_cache.clear()
+    payload_cache.stats.update(hits=0, misses=0, evictions=0)
+    bodies = record_bodies(aws)
+
+    orders = []
+    for size in item_counts:
+        for _ in range(orders_per_size):
+            order = make_order(len(orders), bad=len(orders) % bad_every == bad_every - 1, item_count=size)
+            orders.append({"items": order["items"], "promo_code": order["promo_code"]})
+    results = asyncio.run(submit(api.app, orders, headers))
+    drain(aws)
+
+    accepted = [(result["order_id"], len(order["items"])) for order, result in zip(orders, results)
+                if result.get("status") == "submitted"]
+    return {
+        "aws": aws,
+        "bodies": bodies,
+        "orders": len(orders),
+        "accepted": accepted,
+        "rejected_item_counts": sorted({len(order["items"]) for order, result in zip(orders, results)
+                                        if result.get("status") != "submitted"}),
+        "invoices_complete": all(invoice_complete(aws, order_id, count) for order_id, count in accepted),
+        "sqs_bytes": sum(len(body.encode("utf-8")) for body in bodies),
+        "largest_body": max((len(body.encode("utf-8")) for body in bodies), default=0),
+    }
+
+
+def manual_review_keeps_object(aws, item_count):
+    """A valid claim-checked order in the DLQ goes to manual review and keeps its payload"""
+    order = make_order(900001, item_count=item_count)
+    body = check_in(json.dumps(order), order)
+    aws.sqs.send_message(QueueUrl=QUEUE_URL_PREFIX + "dlq-queue", MessageBody=body)
+    drain(aws)
+    key = pointer_of(json.loads(body))["key"]
+    return key, (BUCKET, key) in aws.s3.objects
+
+
+def redrive_releases_object(aws, item_count):
+    """A bad claim-checked order redriven to task-queue is repaired from S3, processed and cleaned up"""
+    order = make_order(900002, bad=True, item_count=item_count)
+    body = check_in(json.dumps(order), order)
+    aws.sqs.send_message(QueueUrl=QUEUE_URL_PREFIX + "dlq-queue", MessageBody=body)
+    before = claim_check_keys(aws)
+    report = redrive_dlq(receivers=1, wait_seconds=0)
+    drain(aws)
+    return (report["resubmitted"] == 1 and pointer_of(json.loads(body))["key"] not in claim_check_keys(aws)
+            and claim_check_keys(aws) <= before and invoice_complete(aws, order["order_id"], item_count))
+
+
+def lost_deletes_redeliver(aws, item_count):
+    """
+    A claim-checked order (task_lambda) and a bad one sent to the DLQ (dlq_processor_lambda) whose message
+    deletes fail once: the records come back after their payloads were released and must count as done
+    """
+    good = make_order(900004, item_count=item_count)
+    bad = make_order(900005, bad=True, item_count=item_count)
+    before = claim_check_keys(aws)
+    aws.sqs.send_message(QueueUrl=QUEUE_URL_PREFIX + "task-queue", MessageBody=check_in(json.dumps(good), good))
+    aws.sqs.send_message(QueueUrl=QUEUE_URL_PREFIX + "dlq-queue", MessageBody=check_in(json.dumps(bad), bad))
+    for queue in ("task-queue", "dlq-queue"):
+        aws.sqs.set_queue_attributes(QueueUrl=QUEUE_URL_PREFIX + queue, Attributes={"VisibilityTimeout": "0"})
+    bodies = record_bodies(aws)
+    mappings = [EventSourceMapping(aws, queue, function) for queue, function in MAPPINGS]
+
+    delete = aws.sqs.delete_message_batch
+    aws.sqs.delete_message_batch = lambda QueueUrl, Entries: {"Successful": [], "Failed": [
+        {"Id": entry["Id"], "Code": "InternalError", "SenderFault": False} for entry in Entries]}
+    for mapping in mappings:
+        mapping.poll_once()
+    aws.sqs.delete_message_batch = delete
+    # Bounded: a record that keeps failing would otherwise come back forever with no visibility timeout
+    for _ in range(10):
+        if not sum(mapping.poll_once() for mapping in mappings):
+            break
+
+    task, _, dlq = (mapping.stats for mapping in mappings)
+    notified = sorted(json.loads(body)["order_id"] for body in bodies)
+    return (task["records"] == 2 and dlq["records"] == 2 and task["failed_records"] == dlq["failed_records"] == 0
+            and notified == [good["order_id"], bad["order_id"]] and claim_check_keys(aws) == before
+            and aws.sqs.depth(QUEUE_URL_PREFIX + "dlq-queue") == 0)
+
+
+def unreadable_notification_retried(aws):
+    """A claim-checked notification whose object is gone comes back as a batch item failure and stays queued"""
+    notification = {"order_id": "BENCH-900006", "status": "processed", "final_total": 1.0}
+    body = check_in(json.dumps(notification), notification, threshold=0)
+    del aws.s3.objects[(BUCKET, pointer_of(json.loads(body))["key"])]
+    queue_url = QUEUE_URL_PREFIX + "notification-queue"
+    before = aws.sqs.depth(queue_url)
+    aws.sqs.send_message(QueueUrl=queue_url, MessageBody=body)
+    mapping = EventSourceMapping(aws, "notification-queue", "notification_lambda")
+    mapping.poll_once()
+    return mapping.stats["failed_records"] == 1 and aws.sqs.depth(queue_url) == before + 1
+
+
+def tampered_payload_rejected(aws, item_count):
+    order = make_order(900003, item_count=item_count)
+    body = json.loads(check_in(json.dumps(order), order))
+    data, meta = aws.s3.objects[(BUCKET, body["claim_check"]["key"])]
+    aws.s3.objects[(BUCKET, body["claim_check"]["key"])] = (data[:-8] + bytes(8), meta)
+    payload_cache.clear()
+    try:
+        resolve(body)
+    except ValueError:
+        return True
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--item-counts", default="10,2000,8000", help="comma-separated items per order")
+    parser.add_argument("--orders-per-size", type=int, default=4)
+    parser.add_argument("--bad-every", type=int, default=4, help="every n-th order has a negative price")
+    args = parser.parse_args()
+    item_counts = [int(count) for count in args.item_counts.split(",")]
+
+    logging.disable(logging.CRITICAL)
+    LocalAWS().install()
+    # Imported after install() so api.main's module-level client is the in-memory one
+    from api import main as api
+    from api.auth import create_token
+    headers = {"Authorization": f"Bearer {create_token('bench-user')}"}
+
+    print(f"📦 Claim check: {args.orders_per_size} orders of each of {item_counts} items, "
+          f"threshold {claim_check.threshold_bytes()} bytes")
+    saved = os.environ.get("CLAIM_CHECK_THRESHOLD_BYTES")
+    try:
+        on = run_pipeline(api, item_counts, args.orders_per_size, args.bad_every, headers)
+        aws = on["aws"]
+        keys = checked_in_keys(on["bodies"])
+        checks = {
+            "bodies_under_sqs_limit": on["largest_body"] <= MAX_MESSAGE_BYTES,
+            "every_order_accepted": len(on["accepted"]) == on["orders"],
+            "invoices_complete": on["invoices_complete"],
+            "payload_fetched_once": bool(keys) and payload_cache.stats["misses"] == len(keys),
+            "retries_hit_cache": payload_cache.stats["hits"] > 0,
+            "processed_payloads_deleted": not claim_check_keys(aws),
+        }
+        cache_stats = dict(payload_cache.stats)
+
+        review_key, kept = manual_review_keeps_object(aws, max(item_counts))
+        checks["manual_review_keeps_payload"] = kept and claim_check_keys(aws) == {review_key}
+        checks["redrive_repairs_and_releases"] = redrive_releases_object(aws, max(item_counts))
+        checks["redelivery_after_release_done"] = lost_deletes_redeliver(aws, max(item_counts))
+        checks["unreadable_notification_retried"] = unreadable_notification_retried(aws)
+        checks["tampered_payload_rejected"] = tampered_payload_rejected(aws, max(item_counts))
+        stored = len(aws.s3.objects[(BUCKET, review_key)][0])
+
+        os.environ["CLAIM_CHECK_THRESHOLD_BYTES"] = str(10 ** 9)
+        off = run_pipeline(api, item_counts, args.orders_per_size, args.bad_every, headers)
+    finally:
+        if saved is None:
+            os.environ.pop("CLAIM_CHECK_THRESHOLD_BYTES", None)
+        else:
+            os.environ["CLAIM_CHECK_THRESHOLD_BYTES"] = saved
+
+    for name, run in (("claim_check", on), ("off", off)):
+        print(json.dumps({"run": name, "orders": run["orders"], "accepted": len(run["accepted"]),
+                          "rejected_item_counts": run["rejected_item_counts"], "messages": len(run["bodies"]),
+                          "sqs_bytes": run["sqs_bytes"], "largest_body": run["largest_body"],
+                          "s3_claim_checks": len(checked_in_keys(run["bodies"]))}))
+    print(json.dumps({"payload_cache": cache_stats, "s3_calls": {
+        call: on["aws"].calls[f"s3.{call}"] for call in ("put_object", "get_object", "delete_objects")},
+        "stored_bytes_of_largest_order": stored, "max_keys_per_delete": MAX_DELETE_KEYS}))
+
+    checks["oversized_rejected_without"] = max(item_counts) in off["rejected_item_counts"]
+    checks["fewer_sqs_bytes"] = on["sqs_bytes"] < off["sqs_bytes"]
+    print(json.dumps({"checks": checks}))
+    if not all(checks.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Cold-start init time of each Lambda handler, measured in a fresh interpreter
+per run, with eager imports (default) and with LAZY_IMPORTS=true.
+
+Each child process starts the import profiler, installs the in-memory AWS
+stand-ins (so the SSM prefetch has something to talk to) and imports the
+handler module. Use --profile to print the slowest modules of one run.
+
+Usage: python -m benchmarks.cold_start [--runs 5] [--profile]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.local_aws import LAMBDAS_DIR
+
+ROOT = os.path.dirname(LAMBDAS_DIR)
+HANDLERS = ["task_lambda", "notification_lambda", "dlq_processor_lambda"]
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+from app.cold_start import start_import_profiler
+profiler = start_import_profiler(force=True)
+from benchmarks.local_aws import LocalAWS
+LocalAWS(latency_ms={latency_ms}).install()
+import {handler}
+init_ms = (time.perf_counter() - start) * 1000
+profiler.stop()
+print(json.dumps({{"init_ms": init_ms, "profile": profiler.report(top=10)}}))
+"""
+
+
+def run_once(handler, lazy, latency_ms):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, LAMBDAS_DIR]),
+               LAZY_IMPORTS="true" if lazy else "false", IMPORT_PROFILE="false")
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(handler=handler, latency_ms=latency_ms)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--profile", action="store_true")
+    args = parser.parse_args()
+
+    print(f"🧊 {args.runs} fresh interpreters per handler and mode")
+    for handler in HANDLERS:
+        result = {"handler": handler}
+        for lazy in (False, True):
+            runs = [run_once(handler, lazy, args.latency_ms) for _ in range(args.runs)]
+            result["lazy_init_ms" if lazy else "eager_init_ms"] = round(
+                statistics.median(run["init_ms"] for run in runs), 2)
+        print(json.dumps(result))
+        if args.profile:
+            print(json.dumps(runs[-1]["profile"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Batch wall-clock time of task_lambda at 1/4/8 workers (TASK_LAMBDA_WORKERS).
+
+Each S3/DynamoDB/SQS call against the in-memory stand-ins sleeps for
+--latency-ms to mimic a network round-trip.
+
+Usage: python -m benchmarks.concurrent_records [--batches 10] [--latency-ms 15]
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import time
+
+from benchmarks.local_aws import LocalAWS, load_handler, make_order, sqs_event
+
+BATCH_SIZE = 10
+
+
+def run(workers, batches, latency_ms):
+    aws = LocalAWS(latency_ms=latency_ms).install()
+    task_lambda = load_handler("task_lambda")
+    queue_url = aws.ssm.parameters["poc-task-queue-url"]
+    os.environ["TASK_LAMBDA_WORKERS"] = str(workers)
+
+    # Warm the parameter cache so only the per-record calls are timed
+    task_lambda.lambda_handler({"Records": []}, None)
+
+    timings = []
+    failures = 0
+    for batch in range(batches):
+        for index in range(BATCH_SIZE):
+            order = make_order(batch * BATCH_SIZE + index)
+            aws.sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps(order))
+        messages = aws.sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=BATCH_SIZE)["Messages"]
+
+        start = time.perf_counter()
+        response = task_lambda.lambda_handler(sqs_event(messages), None)
+        timings.append((time.perf_counter() - start) * 1000)
+        failures += len(response["batchItemFailures"])
+
+    return {
+        "workers": workers,
+        "batch_ms_p50": round(statistics.median(timings), 2),
+        "batch_ms_max": round(max(timings), 2),
+        "records_per_sec": round(BATCH_SIZE * batches / (sum(timings) / 1000), 1),
+        "failures": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batches", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=15.0)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    print(f"⏱️ {args.batches} batches x {BATCH_SIZE} records, {args.latency_ms}ms per AWS call")
+    for workers in (1, 4, 8):
+        print(json.dumps(run(workers, args.batches, args.latency_ms)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+DLQ triage cost: the DLQ catalog (app/dlq_catalog.py) vs receiving from the
+queue, as GET /dlq/messages and /dlq/stats used to.
+
+1. Integration: --processed messages go through dlq_processor_lambda behind
+   an event source mapping. Every one must end up in the catalog with its
+   outcome, including the MANUAL_REVIEW ones the lambda deletes from the DLQ.
+   A tenth as many bad orders reach the DLQ from task-queue (arriving with
+   ApproximateReceiveCount > 1), and the FAILED ones are delivered again:
+   each message must still be counted exactly once. A claim-checked order
+   whose RECOVERED write fails keeps its signature on the FAILED entry, with
+   the reason in error rather than fixes.
+2. Triage at --messages DLQ messages. The catalog is filled with DLQCatalog
+   (10 records per invocation, dead-lettered over the last 24 hours), and the
+   same messages sit in dlq-queue. Compared:
+   - receive: counting messages per signature takes a receive per 10 messages
+     and hides every one for VisibilityTimeout=30
+   - catalog: /dlq/stats is two counter-index queries, a page of 50 is one
+     query, and walking one signature follows the cursor. No SQS calls.
+     Malformed cursors, and a scan cursor reused for a signature query, are
+     rejected as invalid arguments (400) rather than sent to DynamoDB.
+
+Usage: python -m benchmarks.dlq_catalog [--messages 100000] [--processed 1000] [--latency-ms 0]
+"""
+
+import argparse
+import json
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from app.claim_check import check_in
+from app.dlq_catalog import DLQCatalog, browse, encode_cursor, error_signature, get_counts, parse_catalog_item
+from benchmarks.event_source import EventSourceMapping
+from benchmarks.local_aws import DEFAULT_PARAMETERS, LocalAWS, make_order
+
+DLQ_URL = DEFAULT_PARAMETERS["poc-dlq-queue-url"]
+TASK_QUEUE_URL = DEFAULT_PARAMETERS["poc-task-queue-url"]
+CATALOG_TABLE = DEFAULT_PARAMETERS["poc-dlq-catalog-table-name"]
+
+
+def dlq_body(index):
+    """Mix of the ways orders fail: mostly negative prices, some unfixable"""
+    kind = index % 20
+    if kind == 0:
+        return "not json {"
+    order = make_order(index, bad=kind < 14)
+    if kind == 14:
+        order["items"] = []
+    elif kind in (15, 16):
+        order["items"][1]["quantity"] = 0
+    return json.dumps(order)
+
+
+def synthetic_record(index, body, now):
+    """SQS record as the DLQ mapping delivers it, and when it was dead-lettered (within the last 24 hours)"""
+    record = {
+        "messageId": f"dlq-{index:07d}",
+        "body": body,
+        "attributes": {
+            "ApproximateReceiveCount": "3",
+            "ApproximateFirstReceiveTimestamp": str(int(now * 1000)),
+        },
+    }
+    return record, datetime.fromtimestamp(now - (index % 86400), timezone.utc)
+
+
+def run_integration(processed):
+    aws = LocalAWS().install()
+    for index in range(processed):
+        aws.sqs.send_message(QueueUrl=DLQ_URL, MessageBody=dlq_body(index))
+    # Bad orders failing twice on task-queue reach the DLQ with their receive count
+    redriven = processed // 10
+    for index in range(redriven):
+        aws.sqs.send_message(QueueUrl=TASK_QUEUE_URL, MessageBody=json.dumps(make_order(processed + index, bad=True)))
+    aws.sqs.set_queue_attributes(QueueUrl=TASK_QUEUE_URL, Attributes={"VisibilityTimeout": "0"})
+    mappings = [EventSourceMapping(aws, "task-queue", "task_lambda"),
+                EventSourceMapping(aws, "dlq-queue", "dlq_processor_lambda")]
+    while sum(mapping.poll_once() for mapping in mappings):
+        pass
+    # FAILED messages stay in the DLQ; make them visible and deliver them again (retries of the same message)
+    for _ in range(2):
+        handles = list(aws.sqs.queues[DLQ_URL]["in_flight"])
+        for offset in range(0, len(handles), 10):
+            aws.sqs.change_message_visibility_batch(QueueUrl=DLQ_URL, Entries=[
+                {"Id": str(i), "ReceiptHandle": handle, "VisibilityTimeout": 0}
+                for i, handle in enumerate(handles[offset:offset + 10])])
+        while mappings[1].poll_once():
+            pass
+
+    entries = list(aws.dynamodb.tables.get(CATALOG_TABLE, {}).values())
+    entries = [item for item in entries if "dead_lettered_at" in item]
+    counts = get_counts()
+    return {
+        "messages": processed + redriven,
+        "redelivered": mappings[1].stats["records"] - processed - redriven,
+        "catalog_entries": len(entries),
+        "by_status": dict(Counter(item["status"]["S"] for item in entries)),
+        "counted": counts["total_indexed"],
+        "left_in_dlq": aws.sqs.depth(DLQ_URL),
+    }
+
+
+def failed_write_entry():
+    """Catalog entry of a claim-checked bad order whose RECOVERED write never lands"""
+    aws = LocalAWS().install()
+    aws.dynamodb.unprocessed_rate = 1.0
+    order = make_order(0, bad=True)
+    aws.sqs.send_message(QueueUrl=DLQ_URL, MessageBody=check_in(json.dumps(order), order, threshold=0))
+    EventSourceMapping(aws, "dlq-queue", "dlq_processor_lambda").poll_once()
+    entries = [parse_catalog_item(item) for item in aws.dynamodb.tables[CATALOG_TABLE].values()
+               if "dead_lettered_at" in item]
+    return {key: entries[0][key] for key in ("status", "signature", "fixes", "error")} if entries else None
+
+
+def run_triage(messages, latency_ms):
+    aws = LocalAWS(latency_ms=latency_ms).install()
+    now = time.time()
+    expected = Counter()
+
+    start = time.perf_counter()
+    for offset in range(0, messages, 10):
+        catalog = DLQCatalog()
+        for index in range(offset, min(offset + 10, messages)):
+            body = dlq_body(index)
+            try:
+                expected[error_signature(json.loads(body))] += 1
+            except ValueError:
+                expected[error_signature(None)] += 1
+            record, at = synthetic_record(index, body, now)
+            catalog.add(record, "MANUAL_REVIEW", at=at)
+            aws.sqs.send_message(QueueUrl=DLQ_URL, MessageBody=body)
+        catalog.flush()
+    index_seconds = time.perf_counter() - start
+    index_calls = aws.calls["dynamodb.batch_write_item"] + aws.calls["dynamodb.update_item"]
+
+    # Catalog: stats, the first page, then every page of the rarest signature
+    # (the in-memory Query scans the whole table, so calls are reported rather than ms)
+    aws.calls.clear()
+    counts = get_counts()
+    stats_calls = sum(aws.calls.values())
+    aws.calls.clear()
+    first_page = browse(limit=50, signature="negative_price")
+    page_calls = sum(aws.calls.values())
+    rarest = min(counts["by_signature"], key=counts["by_signature"].get)
+    walked, pages, cursor = 0, 0, None
+    while True:
+        page = browse(signature=rarest, limit=500, cursor=cursor)
+        walked += page["count"]
+        pages += 1
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    bad_cursors = [
+        "not-a-cursor",
+        encode_cursor(["message_id"]),
+        encode_cursor({"message_id": {"N": "1"}, "signature": {"S": rarest}, "dead_lettered_at": {"S": "x"}}),
+        browse(limit=1)["next_cursor"],
+    ]
+    rejected = 0
+    for bad_cursor in bad_cursors:
+        try:
+            browse(signature=rarest, cursor=bad_cursor)
+        except ValueError:
+            rejected += 1
+    catalog_sqs_calls = sum(count for call, count in aws.calls.items() if call.startswith("sqs."))
+    visible_after_catalog = int(aws.sqs.get_queue_attributes(QueueUrl=DLQ_URL)["Attributes"]["ApproximateNumberOfMessages"])
+
+    # Receive: what counting per signature costs through the queue
+    aws.calls.clear()
+    seen = Counter()
+    while True:
+        received = aws.sqs.receive_message(QueueUrl=DLQ_URL, MaxNumberOfMessages=10, VisibilityTimeout=30).get("Messages", [])
+        if not received:
+            break
+        for message in received:
+            try:
+                seen[error_signature(json.loads(message["Body"]))] += 1
+            except ValueError:
+                seen[error_signature(None)] += 1
+    hidden = int(aws.sqs.get_queue_attributes(QueueUrl=DLQ_URL)["Attributes"]["ApproximateNumberOfMessagesNotVisible"])
+
+    return {
+        "messages": messages,
+        "index": {"seconds": round(index_seconds, 3), "dynamodb_calls": index_calls,
+                  "calls_per_message": round(index_calls / messages, 3)},
+        "catalog": {
+            "stats_calls": stats_calls,
+            "first_page_calls": page_calls,
+            "first_page_count": first_page["count"],
+            "walk_signature": rarest,
+            "walk_messages": walked,
+            "walk_pages": pages,
+            "bad_cursors_rejected": rejected == len(bad_cursors),
+            "sqs_calls": catalog_sqs_calls,
+            "hidden_messages": messages - visible_after_catalog,
+            "counts_match": dict(expected) == counts["by_signature"],
+            "hours": len(counts["by_hour"]),
+        },
+        "receive": {
+            "receive_calls": aws.calls["sqs.receive_message"],
+            "hidden_messages": hidden,
+            "counts_match": seen == expected,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100000, help="DLQ size for the triage comparison")
+    parser.add_argument("--processed", type=int, default=1000, help="messages run through dlq_processor_lambda")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="per AWS call")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    print(f"📚 DLQ catalog: {args.processed} messages through dlq_processor_lambda, triage at {args.messages}")
+    integration = run_integration(args.processed)
+    print(json.dumps({"integration": integration}))
+    failed_write = failed_write_entry()
+    print(json.dumps({"failed_write_entry": failed_write}))
+    triage = run_triage(args.messages, args.latency_ms)
+    print(json.dumps({"triage": triage}))
+
+    checks = {
+        "every_processed_message_indexed": integration["catalog_entries"] == integration["messages"],
+        "counters_match_entries": integration["counted"] == integration["messages"] and integration["redelivered"] > 0,
+        "failed_entry_keeps_signature": failed_write is not None and failed_write["status"] == "FAILED"
+        and failed_write["signature"] == "negative_price" and failed_write["error"] == "DynamoDB write failed",
+        "triage_counts_match": triage["catalog"]["counts_match"],
+        "browsing_makes_no_sqs_calls": triage["catalog"]["sqs_calls"] == 0,
+        "browsing_hides_nothing": triage["catalog"]["hidden_messages"] == 0,
+        "bad_cursors_rejected": triage["catalog"]["bad_cursors_rejected"],
+    }
+    print(json.dumps({"checks": checks}))
+    if not all(checks.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Bulk DLQ redrive (app.redrive) against the in-memory SQS: messages/sec at
+1/4/8 parallel receivers, compared with draining the same DLQ through
+dlq_processor_lambda (repair + inline reprocessing, one record at a time).
+
+The DLQ holds orders with a negative price (80%), a zero quantity (10%) and
+no items (10%, cannot be repaired). A dry run first checks that nothing is
+sent or deleted. Each redrive run then checks that every repairable order
+reached task-queue exactly once and that only the unrepairable ones are
+left in the DLQ. A last dry run has ReceiveMessage start throttling midway:
+the run must report the error and leave every message visible in the DLQ.
+
+Usage: python -m benchmarks.dlq_redrive [--messages 5000] [--receivers 1 4 8] [--latency-ms 5]
+"""
+
+import argparse
+import json
+import logging
+import time
+
+from app.redrive import redrive_dlq
+from benchmarks.event_source import EventSourceMapping
+from benchmarks.local_aws import DEFAULT_PARAMETERS, ClientError, LocalAWS, make_order
+
+DLQ_URL = DEFAULT_PARAMETERS["poc-dlq-queue-url"]
+TASK_QUEUE_URL = DEFAULT_PARAMETERS["poc-task-queue-url"]
+
+
+def seed(messages, latency_ms):
+    aws = LocalAWS(latency_ms=latency_ms).install()
+    repairable = 0
+    for index in range(messages):
+        order = make_order(index, bad=True)
+        if index % 10 == 8:
+            order["items"][0]["price"] = abs(order["items"][0]["price"])
+            order["items"][0]["quantity"] = 0
+        elif index % 10 == 9:
+            order["items"] = []
+        repairable += index % 10 != 9
+        aws.sqs._enqueue(DLQ_URL, json.dumps(order))
+    return aws, repairable
+
+
+def run_redrive(messages, receivers, latency_ms, dry_run=False):
+    aws, repairable = seed(messages, latency_ms)
+    report = redrive_dlq(receivers=receivers, dry_run=dry_run, wait_seconds=0)
+    order_ids = [json.loads(message["body"])["order_id"] for message in aws.sqs.queues[TASK_QUEUE_URL]["messages"]]
+    expected_task, expected_dlq = (0, messages) if dry_run else (repairable, messages - repairable)
+    checks_ok = (len(order_ids) == len(set(order_ids)) == expected_task
+                 and aws.sqs.depth(DLQ_URL) == expected_dlq)
+    return {
+        "path": "redrive_dry_run" if dry_run else "redrive",
+        "receivers": receivers,
+        **{key: report[key] for key in ("received", "resubmitted", "deleted", "left_in_dlq", "seconds",
+                                        "messages_per_sec")},
+        "send_calls": aws.calls["sqs.send_message_batch"],
+        "delete_calls": aws.calls["sqs.delete_message_batch"],
+        "checks_ok": checks_ok,
+    }
+
+
+def run_receive_failure(messages, receivers, latency_ms, failing_after=5):
+    aws, _ = seed(messages, latency_ms)
+    receive = aws.sqs.receive_message
+
+    def throttled(**kwargs):
+        if aws.calls["sqs.receive_message"] >= failing_after:
+            raise ClientError("ThrottlingException", "Rate exceeded")
+        return receive(**kwargs)
+
+    aws.sqs.receive_message = throttled
+    report = redrive_dlq(receivers=receivers, dry_run=True, wait_seconds=0)
+    attributes = aws.sqs.get_queue_attributes(QueueUrl=DLQ_URL)["Attributes"]
+    return {
+        "path": "redrive_receive_failure",
+        "receivers": receivers,
+        "received": report["received"],
+        "errors": len(report["errors"]),
+        "visible_after": int(attributes["ApproximateNumberOfMessages"]),
+        "checks_ok": (bool(report["errors"]) and report["received"] > 0
+                      and int(attributes["ApproximateNumberOfMessages"]) == messages
+                      and attributes["ApproximateNumberOfMessagesNotVisible"] == "0"),
+    }
+
+
+def run_lambda(messages, latency_ms):
+    aws, _ = seed(messages, latency_ms)
+    mapping = EventSourceMapping(aws, "dlq-queue", "dlq_processor_lambda")
+    start = time.perf_counter()
+    while mapping.poll_once():
+        pass
+    elapsed = time.perf_counter() - start
+    return {"path": "dlq_processor_lambda", "received": mapping.stats["records"], "seconds": round(elapsed, 3),
+            "messages_per_sec": round(mapping.stats["records"] / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--receivers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    print(f"🔁 DLQ redrive of {args.messages} messages, {args.latency_ms}ms per AWS call")
+    results = [run_redrive(args.messages, max(args.receivers), args.latency_ms, dry_run=True)]
+    results += [run_redrive(args.messages, receivers, args.latency_ms) for receivers in args.receivers]
+    results.append(run_receive_failure(args.messages, max(args.receivers), args.latency_ms))
+    results.append(run_lambda(args.messages, args.latency_ms))
+    for result in results:
+        print(json.dumps(result))
+    if not all(result.get("checks_ok", True) for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
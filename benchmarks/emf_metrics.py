@@ -0,0 +1,167 @@
+"""
+Per-invocation metrics (app/metrics.py): correctness of the EMF lines and
+the cost of the metrics calls per record.
+
+1. --orders orders (--bad-ratio of them invalid) go through task_lambda
+   behind the task-queue event source mapping, with a MemorySink. Checks:
+   - one EMF line per invocation
+   - OrdersProcessed / OrdersFailed add up to what the mapping deleted and retried
+   - every step from calculate_order_total to send_notification is timed, and
+     so are the S3/DynamoDB/SQS calls
+   - every line is valid EMF: each declared metric is present, with at most
+     100 values
+2. Threads time steps while others flush, like task_worker's receivers
+   sharing the registry: every timed value must show up in some line.
+3. The metrics calls a record makes (6 step timers, S3 + SQS timers, a tenth
+   of the BatchWriteItem timer, counters and flush) are repeated --records
+   times. The µs per record must stay under --budget-us.
+
+Usage: python -m benchmarks.emf_metrics [--orders 2000] [--records 100000] [--budget-us 25]
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from app.metrics import MAX_VALUES, MemorySink, Metrics, StdoutSink, metrics
+from benchmarks.event_source import EventSourceMapping
+from benchmarks.local_aws import QUEUE_URL_PREFIX, LocalAWS, make_order
+
+STEPS = ("calculate_order_total", "apply_discount", "build_invoice", "save_to_s3", "save_order", "send_notification")
+AWS_CALLS = ("S3.PutObject", "DynamoDB.BatchWriteItem", "SQS.SendMessage")
+
+
+def emf_errors(line):
+    """Reasons the line is not valid EMF (empty list if it is)"""
+    errors = []
+    directives = line.get("_aws", {}).get("CloudWatchMetrics", [])
+    if not isinstance(line.get("_aws", {}).get("Timestamp"), int) or not directives:
+        return ["missing _aws.Timestamp or CloudWatchMetrics"]
+    for directive in directives:
+        for dimension_set in directive["Dimensions"]:
+            errors += [f"dimension {name} missing" for name in dimension_set if not isinstance(line.get(name), str)]
+        for metric in directive["Metrics"]:
+            value = line.get(metric["Name"])
+            if isinstance(value, list):
+                if not value or len(value) > MAX_VALUES:
+                    errors.append(f"{metric['Name']}: {len(value)} values")
+            elif not isinstance(value, (int, float)):
+                errors.append(f"{metric['Name']} missing")
+    return errors
+
+
+def run_handler(orders, bad_ratio):
+    aws = LocalAWS().install()
+    sink = metrics.sink = MemorySink()
+    rng = random.Random(3)
+    for index in range(orders):
+        aws.sqs.send_message(QueueUrl=QUEUE_URL_PREFIX + "task-queue",
+                             MessageBody=json.dumps(make_order(index, bad=rng.random() < bad_ratio)))
+    aws.sqs.set_queue_attributes(QueueUrl=QUEUE_URL_PREFIX + "task-queue", Attributes={"VisibilityTimeout": "0"})
+    mapping = EventSourceMapping(aws, "task-queue", "task_lambda")
+    while mapping.poll_once():
+        pass
+
+    lines = sink.lines
+    totals = {name: sum(line.get(name, 0) for line in lines) for name in ("OrdersProcessed", "OrdersFailed")}
+    timed = {name for line in lines for name in line.get("MetricStats", {})}
+    invalid = [error for line in lines for error in emf_errors(line)]
+    return {
+        "invocations": mapping.stats["invocations"],
+        "emf_lines": len(lines),
+        **totals,
+        "deleted": mapping.stats["deleted"],
+        "failed_records": mapping.stats["failed_records"],
+        "timed": sorted(timed),
+        "invalid": invalid[:5],
+        "sample_line_bytes": len(json.dumps(lines[0])) if lines else 0,
+    }
+
+
+def concurrent_flushes(threads=8, timings=20000):
+    """Timings recorded by several threads, each flushing every 10; returns (timed, counted in MetricStats)"""
+    registry = Metrics(sink=MemorySink(), function_name="bench")
+
+    def work():
+        for index in range(timings):
+            with registry.timer("Step.calculate_order_total"):
+                pass
+            if index % 10 == 9:
+                registry.flush()
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    registry.flush()
+    counted = sum(line["MetricStats"]["Step.calculate_order_total"]["count"] for line in registry.sink.lines)
+    return threads * timings, counted
+
+
+def per_record_cost(records):
+    """
+    µs per record for the metrics calls alone, flushing every 10 records like a Lambda batch.
+    Flushes serialize to /dev/null through StdoutSink, as they would in Lambda.
+    """
+    registry = Metrics(sink=StdoutSink(), function_name="bench")
+    step_names = [f"Step.{step}" for step in STEPS]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        for index in range(records):
+            for name in step_names:
+                with registry.timer(name):
+                    pass
+            with registry.timer("S3.PutObject"):
+                pass
+            with registry.timer("SQS.SendMessage"):
+                pass
+            if index % 10 == 9:
+                with registry.timer("DynamoDB.BatchWriteItem"):
+                    pass
+                registry.count("OrdersProcessed", 10)
+                registry.count("OrdersFailed", 0)
+                registry.flush()
+        elapsed = time.perf_counter() - start
+    return elapsed / records * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--bad-ratio", type=float, default=0.05)
+    parser.add_argument("--records", type=int, default=100000, help="records for the overhead measurement")
+    parser.add_argument("--budget-us", type=float, default=25.0, help="max metrics overhead per record")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    print(f"📏 EMF metrics: {args.orders} orders through task_lambda, overhead over {args.records} records")
+    handler = run_handler(args.orders, args.bad_ratio)
+    print(json.dumps({"handler": handler}))
+    timed, counted = concurrent_flushes()
+    print(json.dumps({"concurrent": {"timed": timed, "counted": counted}}))
+    overhead = round(per_record_cost(args.records), 2)
+    print(json.dumps({"overhead_us_per_record": overhead, "budget_us": args.budget_us}))
+
+    checks = {
+        "one_line_per_invocation": handler["emf_lines"] == handler["invocations"],
+        "processed_matches_deleted": handler["OrdersProcessed"] == handler["deleted"],
+        "failed_matches_retried": handler["OrdersFailed"] == handler["failed_records"],
+        "steps_timed": all(f"Step.{step}" in handler["timed"] for step in STEPS),
+        "aws_calls_timed": all(name in handler["timed"] for name in AWS_CALLS),
+        "valid_emf": not handler["invalid"],
+        "no_values_lost_to_concurrent_flush": counted == timed,
+        "within_budget": overhead <= args.budget_us,
+    }
+    print(json.dumps({"checks": checks}))
+    if not all(checks.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
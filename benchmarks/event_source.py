@@ -0,0 +1,257 @@
+"""
+In-process stand-in for the SQS -> Lambda event source mappings, so the real
+handlers can run (and be profiled) against the in-memory AWS without
+LocalStack or Docker.
+
+Each mapping polls its queue the way the managed poller does:
+- A batch holds up to --batch-size records, collected for at most
+  --batching-window seconds after the first one arrives.
+- The handler module is imported from lambdas/ and invoked directly with an
+  SQS event and a LambdaContext whose get_remaining_time_in_millis() counts
+  down from the function timeout (30s, as in deploy_lambdas.py).
+- Records not listed in batchItemFailures are deleted with
+  DeleteMessageBatch. If the handler raises or overruns its timeout, the
+  whole batch is left on the queue.
+- Records left on the queue come back once the queue's VisibilityTimeout
+  expires. The task-queue RedrivePolicy (maxReceiveCount=2) then moves them
+  to dlq-queue, where dlq_processor_lambda picks them up.
+
+run_until_idle() drives every mapping from the calling thread until nothing
+is visible or in flight, which is deterministic and profiles cleanly.
+start()/stop() run each mapping on its own poller threads instead.
+
+Usage: python -m benchmarks.event_source [--orders 1000] [--bad-ratio 0.05] [--batch-size 10] [--batching-window 0] [--profile]
+"""
+
+import argparse
+import cProfile
+import io
+import json
+import logging
+import pstats
+import random
+import threading
+import time
+import uuid
+
+from benchmarks.local_aws import ACCOUNT, QUEUE_URL_PREFIX, REGION, LocalAWS, load_handler, make_order, sqs_event
+
+FUNCTION_TIMEOUT_SECONDS = 30
+MAX_RECEIVE_BATCH = 10
+
+# (queue, function) pairs linked by add_trigger in poc.ipynb
+MAPPINGS = (
+    ("task-queue", "task_lambda"),
+    ("notification-queue", "notification_lambda"),
+    ("dlq-queue", "dlq_processor_lambda"),
+)
+
+
+class LambdaContext:
+    """The attributes and methods of the Lambda context object the handlers may use"""
+
+    def __init__(self, function_name, timeout_seconds=FUNCTION_TIMEOUT_SECONDS, memory_limit_in_mb=128):
+        self.function_name = function_name
+        self.function_version = "$LATEST"
+        self.invoked_function_arn = f"arn:aws:lambda:{REGION}:{ACCOUNT}:function:{function_name}"
+        self.memory_limit_in_mb = memory_limit_in_mb
+        self.aws_request_id = str(uuid.uuid4())
+        self.log_group_name = f"/aws/lambda/{function_name}"
+        self.log_stream_name = time.strftime("%Y/%m/%d/[$LATEST]") + uuid.uuid4().hex
+        self._deadline = time.monotonic() + timeout_seconds
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+
+class EventSourceMapping:
+    """One queue -> function mapping. handler defaults to the module's lambda_handler."""
+
+    def __init__(self, aws, queue_name, function_name, handler=None, batch_size=10, batching_window=0.0,
+                 timeout_seconds=FUNCTION_TIMEOUT_SECONDS, report_batch_item_failures=True):
+        self.aws = aws
+        self.queue_name = queue_name
+        self.queue_url = QUEUE_URL_PREFIX + queue_name
+        self.function_name = function_name
+        self.handler = handler or load_handler(function_name).lambda_handler
+        self.batch_size = batch_size
+        self.batching_window = batching_window
+        self.timeout_seconds = timeout_seconds
+        self.report_batch_item_failures = report_batch_item_failures
+        self.stats = {"invocations": 0, "records": 0, "deleted": 0, "failed_records": 0,
+                      "errors": 0, "timeouts": 0, "max_batch": 0, "handler_seconds": 0.0}
+        self._lock = threading.Lock()
+
+    def collect(self):
+        """Receives up to batch_size messages, waiting at most batching_window for the batch to fill"""
+        messages = []
+        deadline = None
+        while len(messages) < self.batch_size:
+            received = self.aws.sqs.receive_message(
+                QueueUrl=self.queue_url, MaxNumberOfMessages=min(MAX_RECEIVE_BATCH, self.batch_size - len(messages))
+            ).get("Messages", [])
+            messages.extend(received)
+            if not messages:
+                break
+            # The window opens with the first record, so an empty queue costs one receive
+            deadline = deadline or time.monotonic() + self.batching_window
+            if time.monotonic() >= deadline:
+                break
+            if not received:
+                time.sleep(min(0.01, max(0.0, deadline - time.monotonic())))
+        return messages
+
+    def poll_once(self):
+        """Collects and delivers one batch; returns the number of records invoked"""
+        messages = self.collect()
+        if not messages:
+            return 0
+
+        context = LambdaContext(self.function_name, self.timeout_seconds)
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            response = self.handler(sqs_event(messages, self.queue_name), context) or {}
+        except Exception:
+            outcome, response = "errors", {}
+        elapsed = time.perf_counter() - start
+        if elapsed > self.timeout_seconds:
+            # The real function would have been killed: nothing it returned counts
+            outcome = "timeouts"
+
+        failed_ids = set()
+        if outcome != "ok":
+            failed_ids = {message["MessageId"] for message in messages}
+        elif self.report_batch_item_failures:
+            failed_ids = {failure["itemIdentifier"] for failure in response.get("batchItemFailures", [])}
+
+        succeeded = [message for message in messages if message["MessageId"] not in failed_ids]
+        for offset in range(0, len(succeeded), MAX_RECEIVE_BATCH):
+            chunk = succeeded[offset:offset + MAX_RECEIVE_BATCH]
+            self.aws.sqs.delete_message_batch(
+                QueueUrl=self.queue_url,
+                Entries=[{"Id": str(index), "ReceiptHandle": message["ReceiptHandle"]} for index, message in enumerate(chunk)]
+            )
+
+        with self._lock:
+            self.stats["invocations"] += 1
+            self.stats["records"] += len(messages)
+            self.stats["deleted"] += len(succeeded)
+            self.stats["failed_records"] += len(failed_ids)
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(messages))
+            self.stats["handler_seconds"] += elapsed
+            if outcome != "ok":
+                self.stats[outcome] += 1
+        return len(messages)
+
+    def run(self, stop):
+        while not stop.is_set():
+            if not self.poll_once():
+                stop.wait(0.005)
+
+
+class EventSourceSimulator:
+    """
+    The three mappings from poc.ipynb over one LocalAWS. visibility_timeout,
+    when given, is written to every queue's VisibilityTimeout attribute.
+    """
+
+    def __init__(self, aws, batch_size=10, batching_window=0.0, timeout_seconds=FUNCTION_TIMEOUT_SECONDS,
+                 visibility_timeout=None, concurrency=1, mappings=MAPPINGS, handlers=None):
+        self.aws = aws
+        self.concurrency = concurrency
+        handlers = handlers or {}
+        self.mappings = [
+            EventSourceMapping(aws, queue_name, function_name, handler=handlers.get(function_name),
+                               batch_size=batch_size, batching_window=batching_window,
+                               timeout_seconds=timeout_seconds)
+            for queue_name, function_name in mappings
+        ]
+        if visibility_timeout is not None:
+            for mapping in self.mappings:
+                aws.sqs.set_queue_attributes(QueueUrl=mapping.queue_url,
+                                             Attributes={"VisibilityTimeout": str(visibility_timeout)})
+        self._stop = threading.Event()
+        self._threads = []
+
+    def run_until_idle(self, max_seconds=300.0):
+        """Delivers batches until every mapped queue is empty and nothing is in flight"""
+        deadline = time.monotonic() + max_seconds
+        while time.monotonic() < deadline:
+            if any([mapping.poll_once() for mapping in self.mappings]):
+                continue
+            next_visible = self._next_visible()
+            if next_visible is None:
+                return True
+            time.sleep(min(max(0.0, next_visible - time.time()), 0.05))
+        return False
+
+    def _next_visible(self):
+        """Earliest time an in-flight message on a mapped queue becomes visible again"""
+        with self.aws.sqs._lock:
+            times = [message["visible_at"] for mapping in self.mappings
+                     for message in self.aws.sqs.queues[mapping.queue_url]["in_flight"].values()]
+            pending = any(self.aws.sqs.queues[mapping.queue_url]["messages"] for mapping in self.mappings)
+        if pending:
+            return time.time()
+        return min(times) if times else None
+
+    def start(self):
+        self._stop.clear()
+        self._threads = [threading.Thread(target=mapping.run, args=(self._stop,), daemon=True)
+                         for mapping in self.mappings for _ in range(self.concurrency)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def stats(self):
+        return {mapping.function_name: {**mapping.stats, "handler_seconds": round(mapping.stats["handler_seconds"], 3)}
+                for mapping in self.mappings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--bad-ratio", type=float, default=0.05, help="orders that fail and end in the DLQ")
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--batching-window", type=float, default=0.0, help="seconds")
+    parser.add_argument("--visibility-timeout", type=float, default=0.2, help="seconds (the notebook uses 30)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="per AWS call")
+    parser.add_argument("--profile", action="store_true", help="cProfile the run, top 25 by cumulative time")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    aws = LocalAWS(latency_ms=args.latency_ms).install()
+    rng = random.Random(31)
+    for index in range(args.orders):
+        aws.sqs.send_message(QueueUrl=QUEUE_URL_PREFIX + "task-queue",
+                             MessageBody=json.dumps(make_order(index, bad=rng.random() < args.bad_ratio)))
+
+    simulator = EventSourceSimulator(aws, batch_size=args.batch_size, batching_window=args.batching_window,
+                                     visibility_timeout=args.visibility_timeout)
+    print(f"⚡ {args.orders} orders through task/notification/dlq mappings, batch size {args.batch_size}")
+    profiler = cProfile.Profile() if args.profile else None
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    drained = simulator.run_until_idle()
+    if profiler:
+        profiler.disable()
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({"drained": drained, "seconds": round(elapsed, 3),
+                      "orders_per_sec": round(args.orders / elapsed, 1), **simulator.stats()}))
+    if profiler:
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(25)
+        print(output.getvalue())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Bulk ingestion (ingest_orders.py) against the in-memory SQS: orders/sec and
+peak Python memory for two file sizes, then an interrupted run that is
+resumed from its checkpoint.
+
+Input files are gzip JSONL with 2% invalid lines. For the memory runs the
+queue drops message bodies on arrival, so tracemalloc only sees the
+ingestor; a flat peak across file sizes is the constant-memory check. The
+resume run interrupts after half the file, resumes, and checks that every
+valid line reached the queue exactly once.
+
+Usage: python -m benchmarks.ingest [--lines 20000 200000] [--latency-ms 5] [--max-in-flight 16]
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import tempfile
+import tracemalloc
+from collections import deque
+
+import ingest_orders
+from benchmarks.local_aws import DEFAULT_PARAMETERS, LocalAWS, make_order
+
+QUEUE_URL = DEFAULT_PARAMETERS["poc-task-queue-url"]
+
+
+def write_input(path, lines, invalid_every=50):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for index in range(lines):
+            order = make_order(index, item_count=1 + index % 4)
+            del order["order_id"], order["correlation_id"]
+            if index % invalid_every == invalid_every - 1:
+                order["items"][0]["quantity"] = 0
+            f.write(json.dumps(order) + "\n")
+    return os.path.getsize(path)
+
+
+def run_once(path, latency_ms, max_in_flight, discard=True):
+    aws = LocalAWS(latency_ms=latency_ms).install()
+    if discard:
+        aws.sqs.queues[QUEUE_URL]["messages"] = deque(maxlen=0)
+    ingestor = ingest_orders.OrderIngestor(QUEUE_URL, max_in_flight=max_in_flight, progress=None)
+    tracemalloc.start()
+    result = ingestor.run(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return aws, {**result, "peak_kb": round(peak / 1024)}
+
+
+class _InterruptAt(ingest_orders.OrderIngestor):
+    """Simulates Ctrl-C on the reader thread at a given line"""
+
+    def __init__(self, *args, stop_line, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stop_line = stop_line
+
+    def _encode_line(self, raw, line_number, source):
+        if line_number == self.stop_line:
+            raise KeyboardInterrupt
+        return super()._encode_line(raw, line_number, source)
+
+
+def resume(path, lines, latency_ms, max_in_flight):
+    aws = LocalAWS(latency_ms=latency_ms).install()
+    checkpoint = f"{path}.checkpoint"
+    first = _InterruptAt(QUEUE_URL, max_in_flight=max_in_flight, checkpoint_path=checkpoint,
+                         progress=None, stop_line=lines // 2).run(path)
+    second = ingest_orders.OrderIngestor(QUEUE_URL, max_in_flight=max_in_flight, checkpoint_path=checkpoint,
+                                         progress=None).run(path)
+    order_ids = [json.loads(message["body"])["order_id"] for message in aws.sqs.queues[QUEUE_URL]["messages"]]
+    return {
+        "interrupted_at_checkpoint_line": first["checkpoint_line"],
+        "resumed_from_line": second["resumed_from_line"],
+        "messages": len(order_ids),
+        "unique_order_ids": len(set(order_ids)),
+        "expected": lines - lines // 50,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[20000, 200000])
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="per SendMessageBatch call")
+    parser.add_argument("--max-in-flight", type=int, default=16)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    print(f"📥 JSONL ingestion, {args.max_in_flight} batches in flight, {args.latency_ms}ms per call")
+    with tempfile.TemporaryDirectory() as directory:
+        for lines in args.lines:
+            path = os.path.join(directory, f"orders-{lines}.jsonl.gz")
+            size = write_input(path, lines)
+            aws, result = run_once(path, args.latency_ms, args.max_in_flight)
+            print(json.dumps({"lines": lines, "gzip_bytes": size, "send_calls": aws.calls["sqs.send_message_batch"],
+                              **{key: result[key] for key in ("sent", "rejected", "failed", "seconds",
+                                                              "orders_per_sec", "peak_kb")}}))
+
+        path = os.path.join(directory, "orders-resume.jsonl.gz")
+        lines = min(args.lines)
+        write_input(path, lines)
+        result = resume(path, lines, args.latency_ms, args.max_in_flight)
+        print(json.dumps(result))
+    if result["messages"] != result["expected"] or result["unique_order_ids"] != result["expected"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Invoice size and encode/put/read cost per app.storage codec, against the
+previous pretty-printed JSON (indent=2), for orders with 1 to 5,000 items.
+
+put_ms is save_to_s3 against the in-memory S3 (serialize + put) plus the time
+the body would take on the wire at --mbps; read_ms is get_object + decode.
+zstd is skipped when the optional 'zstandard' package is not installed.
+
+Usage: python -m benchmarks.invoice_codec [--items 1 10 100 1000 5000] [--mbps 100]
+"""
+
+import argparse
+import json
+import logging
+import time
+
+from app import storage
+from app.money import json_default
+from app.processors import apply_discount, build_invoice, calculate_order_total
+from benchmarks.local_aws import LocalAWS, make_order
+
+BUCKET = "results-bucket"
+
+
+class LegacyCodec(storage.InvoiceCodec):
+    """The format save_to_s3 wrote before codecs existed"""
+    name = "legacy-indent2"
+
+    def encode(self, data):
+        return json.dumps(data, indent=2, default=json_default).encode("utf-8")
+
+
+def codecs():
+    available = [LegacyCodec()]
+    for name in storage.INVOICE_CODECS:
+        try:
+            available.append(storage.get_codec(name))
+        except ValueError:
+            continue
+    return available
+
+
+def make_invoice(item_count):
+    order = make_order(0, item_count=item_count)
+    subtotal = calculate_order_total(order["items"])
+    final_total, discount_amount = apply_discount(subtotal, "SAVE10")
+    invoice = build_invoice(order["order_id"], order["items"], subtotal, discount_amount, final_total, "SAVE10")
+    invoice.update(correlation_id=order["correlation_id"], bulk_discount=0.0, tax=0.0)
+    return invoice
+
+
+def measure(codec, invoice, repeats, mbps):
+    aws = LocalAWS().install()
+    key = f"{invoice['order_id']}.json"
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        body = codec.encode(invoice)
+    serialize_ms = (time.perf_counter() - start) * 1000 / repeats
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        storage.save_to_s3(BUCKET, key, invoice, codec=codec)
+    put_ms = (time.perf_counter() - start) * 1000 / repeats
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        decoded = storage.load_from_s3(BUCKET, key)
+    read_ms = (time.perf_counter() - start) * 1000 / repeats
+    assert decoded == json.loads(json.dumps(invoice, default=json_default)), f"{codec.name} did not round-trip"
+
+    stored, meta = aws.s3.objects[(BUCKET, key)]
+    transfer_ms = len(stored) * 8 / (mbps * 1_000_000) * 1000
+    return {
+        "codec": codec.name,
+        "content_encoding": meta.get("ContentEncoding"),
+        "bytes": len(body),
+        "serialize_ms": round(serialize_ms, 3),
+        "put_ms": round(put_ms + transfer_ms, 3),
+        "read_ms": round(read_ms + transfer_ms, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[1, 10, 100, 1000, 5000])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--mbps", type=float, default=100.0)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    print(f"🧾 Invoice codecs: {', '.join(codec.name for codec in codecs())} ({args.mbps} Mbps wire)")
+    for item_count in args.items:
+        invoice = make_invoice(item_count)
+        for codec in codecs():
+            print(json.dumps({"items": item_count, **measure(codec, invoice, args.repeats, args.mbps)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,620 @@
+"""
+In-memory stand-ins for S3, SQS, DynamoDB and SSM used by the benchmark scripts.
+
+Only the calls made by app/, api/ and lambdas/ are implemented. Every call is
+counted in LocalAWS.calls and can be slowed down with a fixed latency to mimic
+network round-trips.
+"""
+
+import asyncio
+import importlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+
+from app import config, parameter_store
+from app.event_log import event_log
+from app.metrics import NullSink, metrics
+from app.database import MAX_BATCH_WRITE_ITEMS
+from app.dlq_catalog import CATALOG_INDEXES
+
+REGION = "us-east-1"
+ACCOUNT = "000000000000"
+QUEUE_URL_PREFIX = f"http://localhost:4566/{ACCOUNT}/"
+
+# SQS limit on one message body, and on the bodies of one SendMessageBatch
+MAX_MESSAGE_BYTES = 256 * 1024
+
+LAMBDAS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambdas")
+
+DEFAULT_PARAMETERS = {
+    "poc-task-queue-url": QUEUE_URL_PREFIX + "task-queue",
+    "poc-notification-queue-url": QUEUE_URL_PREFIX + "notification-queue",
+    "poc-dlq-queue-url": QUEUE_URL_PREFIX + "dlq-queue",
+    "poc-results-bucket-name": "results-bucket",
+    "poc-orders-table-name": "orders",
+    "poc-dlq-catalog-table-name": "dlq-catalog",
+    "poc-log-level": "INFO",
+    "poc-log-sample-rate": "1.0",
+    "poc-promo-table-name": "promos",
+    "poc-promo-snapshot-uri": "s3://results-bucket/promo-catalog/catalog.json",
+}
+
+
+class ClientError(Exception):
+    def __init__(self, code, message=""):
+        super().__init__(f"{code}: {message}")
+        self.response = {"Error": {"Code": code, "Message": message}}
+
+
+class _Service:
+    name = ""
+
+    def __init__(self, aws):
+        self._aws = aws
+        self._lock = threading.Lock()
+
+    def _call(self, operation, writes=0):
+        self._aws.calls[f"{self.name}.{operation}"] += 1
+        self._aws.writes += writes
+        if self._aws.latency:
+            time.sleep(self._aws.latency)
+
+
+class _Body:
+    def __init__(self, data):
+        self._data = data
+        self._pos = 0
+
+    def read(self, amt=None):
+        if amt is None:
+            chunk, self._pos = self._data[self._pos:], len(self._data)
+        else:
+            chunk = self._data[self._pos:self._pos + amt]
+            self._pos += len(chunk)
+        return chunk
+
+    def close(self):
+        pass
+
+
+class FakeS3(_Service):
+    name = "s3"
+
+    def __init__(self, aws):
+        super().__init__(aws)
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self._call("put_object", writes=1)
+        if isinstance(Body, str):
+            Body = Body.encode("utf-8")
+        etag = f'"{uuid.uuid4().hex}"'
+        with self._lock:
+            self.objects[(Bucket, Key)] = (bytes(Body), dict(kwargs, ETag=etag))
+        return {"ETag": etag}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self._call("head_object")
+        with self._lock:
+            if (Bucket, Key) not in self.objects:
+                raise ClientError("404", Key)
+            data, meta = self.objects[(Bucket, Key)]
+        return self._headers(data, meta)
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self._call("get_object")
+        with self._lock:
+            if (Bucket, Key) not in self.objects:
+                raise ClientError("NoSuchKey", Key)
+            data, meta = self.objects[(Bucket, Key)]
+        return dict(self._headers(data, meta), Body=_Body(data))
+
+    @staticmethod
+    def _headers(data, meta):
+        response = {"ContentLength": len(data)}
+        for field in ("ContentType", "ContentEncoding", "Metadata", "ETag"):
+            if field in meta:
+                response[field] = meta[field]
+        return response
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        self._call("delete_object")
+        with self._lock:
+            self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def delete_objects(self, Bucket, Delete, **kwargs):
+        self._call("delete_objects", writes=len(Delete["Objects"]))
+        if len(Delete["Objects"]) > 1000:
+            raise ClientError("MalformedXML", "More than 1000 keys")
+        with self._lock:
+            for entry in Delete["Objects"]:
+                self.objects.pop((Bucket, entry["Key"]), None)
+        deleted = [] if Delete.get("Quiet") else [{"Key": entry["Key"]} for entry in Delete["Objects"]]
+        return {"Deleted": deleted, "Errors": []}
+
+
+class FakeSQS(_Service):
+    name = "sqs"
+
+    def __init__(self, aws):
+        super().__init__(aws)
+        self.queues = {}
+
+    def create_queue(self, QueueName, Attributes=None):
+        url = QUEUE_URL_PREFIX + QueueName
+        with self._lock:
+            # next_visible: earliest visible_at in in_flight, so receives skip the expiry scan until then
+            self.queues.setdefault(url, {"messages": deque(), "in_flight": {}, "attributes": dict(Attributes or {}),
+                                         "next_visible": float("inf")})
+        return {"QueueUrl": url}
+
+    def get_queue_url(self, QueueName):
+        self._call("get_queue_url")
+        url = QUEUE_URL_PREFIX + QueueName
+        if url not in self.queues:
+            raise ClientError("AWS.SimpleQueueService.NonExistentQueue", QueueName)
+        return {"QueueUrl": url}
+
+    def set_queue_attributes(self, QueueUrl, Attributes):
+        self._call("set_queue_attributes")
+        with self._lock:
+            self._queue(QueueUrl)["attributes"].update(Attributes)
+        return {}
+
+    def get_queue_attributes(self, QueueUrl, AttributeNames=None):
+        self._call("get_queue_attributes")
+        with self._lock:
+            queue = self._queue(QueueUrl)
+            self._release_expired(queue)
+            attributes = dict(queue["attributes"])
+            attributes["ApproximateNumberOfMessages"] = str(len(queue["messages"]))
+            attributes["ApproximateNumberOfMessagesNotVisible"] = str(len(queue["in_flight"]))
+            attributes["QueueArn"] = f"arn:aws:sqs:{REGION}:{ACCOUNT}:{QueueUrl.rsplit('/', 1)[-1]}"
+        return {"Attributes": attributes}
+
+    @staticmethod
+    def _size(body, message_attributes):
+        """Message size as SQS counts it: the body plus each attribute's name, data type and value"""
+        size = len(body.encode("utf-8"))
+        for name, attribute in (message_attributes or {}).items():
+            size += len(name.encode("utf-8")) + len(attribute["DataType"].encode("utf-8"))
+            size += len(attribute.get("StringValue", "").encode("utf-8")) + len(attribute.get("BinaryValue", b""))
+        return size
+
+    def send_message(self, QueueUrl, MessageBody, MessageAttributes=None, **kwargs):
+        self._call("send_message", writes=1)
+        if self._size(MessageBody, MessageAttributes) > MAX_MESSAGE_BYTES:
+            raise ClientError("InvalidParameterValue", "Message must be shorter than 262144 bytes")
+        message_id = self._enqueue(QueueUrl, MessageBody, MessageAttributes)
+        return {"MessageId": message_id}
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self._call("send_message_batch", writes=len(Entries))
+        if len(Entries) > 10:
+            raise ClientError("AWS.SimpleQueueService.TooManyEntriesInBatchRequest")
+        size = sum(self._size(entry["MessageBody"], entry.get("MessageAttributes")) for entry in Entries)
+        if size > MAX_MESSAGE_BYTES:
+            raise ClientError("AWS.SimpleQueueService.BatchRequestTooLong")
+        successful = []
+        for entry in Entries:
+            message_id = self._enqueue(QueueUrl, entry["MessageBody"], entry.get("MessageAttributes"))
+            successful.append({"Id": entry["Id"], "MessageId": message_id})
+        return {"Successful": successful, "Failed": []}
+
+    def receive_message(self, QueueUrl, MaxNumberOfMessages=1, VisibilityTimeout=None,
+                        WaitTimeSeconds=0, **kwargs):
+        self._call("receive_message")
+        # Long polling: an empty queue holds the call open for up to WaitTimeSeconds
+        deadline = time.monotonic() + WaitTimeSeconds
+        while True:
+            received = self._receive(QueueUrl, MaxNumberOfMessages, VisibilityTimeout)
+            if received or time.monotonic() >= deadline:
+                return {"Messages": received} if received else {}
+            time.sleep(min(0.005, max(0.0, deadline - time.monotonic())))
+
+    def _receive(self, QueueUrl, MaxNumberOfMessages, VisibilityTimeout):
+        received = []
+        with self._lock:
+            queue = self._queue(QueueUrl)
+            self._release_expired(queue)
+            if VisibilityTimeout is None:
+                VisibilityTimeout = float(queue["attributes"].get("VisibilityTimeout", 30))
+            now = time.time()
+            while queue["messages"] and len(received) < MaxNumberOfMessages:
+                message = queue["messages"].popleft()
+                if self._redrive(queue, message):
+                    continue
+                message["receive_count"] += 1
+                message.setdefault("first_receive", now)
+                message["receipt_handle"] = uuid.uuid4().hex
+                message["visible_at"] = now + VisibilityTimeout
+                queue["next_visible"] = min(queue["next_visible"], message["visible_at"])
+                queue["in_flight"][message["receipt_handle"]] = message
+                received.append(self._to_wire(message))
+        return received
+
+    def delete_message(self, QueueUrl, ReceiptHandle):
+        self._call("delete_message")
+        with self._lock:
+            self._queue(QueueUrl)["in_flight"].pop(ReceiptHandle, None)
+        return {}
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        self._call("delete_message_batch")
+        with self._lock:
+            in_flight = self._queue(QueueUrl)["in_flight"]
+            for entry in Entries:
+                in_flight.pop(entry["ReceiptHandle"], None)
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries], "Failed": []}
+
+    def change_message_visibility(self, QueueUrl, ReceiptHandle, VisibilityTimeout):
+        self._call("change_message_visibility")
+        with self._lock:
+            queue = self._queue(QueueUrl)
+            message = queue["in_flight"].get(ReceiptHandle)
+            if message is None:
+                raise ClientError("ReceiptHandleIsInvalid", ReceiptHandle)
+            message["visible_at"] = time.time() + VisibilityTimeout
+            queue["next_visible"] = min(queue["next_visible"], message["visible_at"])
+        return {}
+
+    def change_message_visibility_batch(self, QueueUrl, Entries):
+        self._call("change_message_visibility_batch")
+        successful, failed = [], []
+        with self._lock:
+            queue = self._queue(QueueUrl)
+            for entry in Entries:
+                message = queue["in_flight"].get(entry["ReceiptHandle"])
+                if message is None:
+                    failed.append({"Id": entry["Id"], "Code": "ReceiptHandleIsInvalid", "SenderFault": True})
+                    continue
+                message["visible_at"] = time.time() + entry["VisibilityTimeout"]
+                queue["next_visible"] = min(queue["next_visible"], message["visible_at"])
+                successful.append({"Id": entry["Id"]})
+        return {"Successful": successful, "Failed": failed}
+
+    def depth(self, queue_url):
+        with self._lock:
+            queue = self._queue(queue_url)
+            return len(queue["messages"]) + len(queue["in_flight"])
+
+    def _queue(self, queue_url):
+        if queue_url not in self.queues:
+            raise ClientError("AWS.SimpleQueueService.NonExistentQueue", queue_url)
+        return self.queues[queue_url]
+
+    def _enqueue(self, queue_url, body, message_attributes=None):
+        message = {
+            "message_id": str(uuid.uuid4()),
+            "body": body,
+            "message_attributes": message_attributes or {},
+            "sent": time.time(),
+            "receive_count": 0,
+        }
+        with self._lock:
+            self._queue(queue_url)["messages"].append(message)
+        return message["message_id"]
+
+    def _release_expired(self, queue):
+        now = time.time()
+        if now < queue["next_visible"]:
+            return
+        for handle, message in list(queue["in_flight"].items()):
+            if message["visible_at"] <= now:
+                del queue["in_flight"][handle]
+                queue["messages"].append(message)
+        queue["next_visible"] = min((message["visible_at"] for message in queue["in_flight"].values()),
+                                    default=float("inf"))
+
+    def _redrive(self, queue, message):
+        """Moves a message to the DLQ once it exceeds maxReceiveCount"""
+        policy = queue["attributes"].get("RedrivePolicy")
+        if not policy:
+            return False
+        policy = json.loads(policy)
+        if message["receive_count"] < int(policy["maxReceiveCount"]):
+            return False
+        dlq_url = QUEUE_URL_PREFIX + policy["deadLetterTargetArn"].rsplit(":", 1)[-1]
+        # Like SQS, the move keeps the receive count and first-receive timestamp from the source queue
+        self.queues[dlq_url]["messages"].append(message)
+        return True
+
+    @staticmethod
+    def _to_wire(message):
+        wire = {
+            "MessageId": message["message_id"],
+            "ReceiptHandle": message["receipt_handle"],
+            "Body": message["body"],
+            "Attributes": {
+                "SentTimestamp": str(int(message["sent"] * 1000)),
+                "ApproximateReceiveCount": str(message["receive_count"]),
+                "ApproximateFirstReceiveTimestamp": str(int(message["first_receive"] * 1000)),
+            },
+        }
+        if message["message_attributes"]:
+            wire["MessageAttributes"] = message["message_attributes"]
+        return wire
+
+
+class FakeDynamoDB(_Service):
+    name = "dynamodb"
+
+    def __init__(self, aws):
+        super().__init__(aws)
+        self.tables = {}
+        self.unprocessed_rate = 0.0
+        # Partition key per table; anything not listed is keyed by order_id
+        self.key_names = {"promos": "code", "dlq-catalog": "message_id"}
+        # Global secondary indexes: IndexName -> (partition key, sort key)
+        self.indexes = dict(CATALOG_INDEXES)
+        self.scan_page_size = 1000
+
+    def _key(self, table_name, item):
+        return item[self.key_names.get(table_name, "order_id")]["S"]
+
+    def put_item(self, TableName, Item, **kwargs):
+        self._call("put_item", writes=1)
+        with self._lock:
+            self.tables.setdefault(TableName, {})[self._key(TableName, Item)] = dict(Item)
+        return {}
+
+    def update_item(self, TableName, Key, UpdateExpression, ExpressionAttributeValues,
+                    ExpressionAttributeNames=None, **kwargs):
+        self._call("update_item", writes=1)
+        names = ExpressionAttributeNames or {}
+        # "SET a = :x, b = if_not_exists(b, :y) ADD c :n" - either clause may be missing
+        clauses = dict(re.findall(r"(SET|ADD)\s+(.*?)(?=\s+(?:SET|ADD)\s|$)", UpdateExpression.strip()))
+        old = {}
+        with self._lock:
+            item = self.tables.setdefault(TableName, {}).setdefault(self._key(TableName, Key), dict(Key))
+            # Commas inside if_not_exists(...) do not separate assignments
+            for assignment in filter(None, re.split(r",(?![^()]*\))", clauses.get("SET", ""))):
+                attribute, value = (part.strip() for part in assignment.split("=", 1))
+                attribute = names.get(attribute, attribute)
+                if attribute in item:
+                    old[attribute] = item[attribute]
+                keep = re.fullmatch(r"if_not_exists\(\s*\S+?\s*,\s*(\S+?)\s*\)", value)
+                if keep is None:
+                    item[attribute] = ExpressionAttributeValues[value]
+                elif attribute not in item:
+                    item[attribute] = ExpressionAttributeValues[keep.group(1)]
+            for addition in filter(None, clauses.get("ADD", "").split(",")):
+                attribute, placeholder = addition.split()
+                attribute = names.get(attribute, attribute)
+                if attribute in item:
+                    old[attribute] = item[attribute]
+                total = float(item.get(attribute, {"N": "0"})["N"]) + float(ExpressionAttributeValues[placeholder]["N"])
+                item[attribute] = {"N": str(int(total)) if total.is_integer() else str(total)}
+        return {"Attributes": old} if kwargs.get("ReturnValues") == "UPDATED_OLD" and old else {}
+
+    def get_item(self, TableName, Key, ProjectionExpression=None, ExpressionAttributeNames=None, **kwargs):
+        self._call("get_item")
+        with self._lock:
+            item = self.tables.get(TableName, {}).get(self._key(TableName, Key))
+        if item is None:
+            return {}
+        if ProjectionExpression:
+            names = ExpressionAttributeNames or {}
+            wanted = [names.get(field.strip(), field.strip()) for field in ProjectionExpression.split(",")]
+            item = {field: item[field] for field in wanted if field in item}
+        return {"Item": dict(item)}
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        unprocessed = {}
+        written = 0
+        with self._lock:
+            for table_name, requests in RequestItems.items():
+                if len(requests) > MAX_BATCH_WRITE_ITEMS:
+                    raise ClientError("ValidationException", "Too many items in BatchWriteItem")
+                table = self.tables.setdefault(table_name, {})
+                for request in requests:
+                    # Simulated throttling: a fraction of requests come back unprocessed
+                    if self.unprocessed_rate and random.random() < self.unprocessed_rate:
+                        unprocessed.setdefault(table_name, []).append(request)
+                        continue
+                    if "PutRequest" in request:
+                        item = request["PutRequest"]["Item"]
+                        table[self._key(table_name, item)] = dict(item)
+                    else:
+                        table.pop(self._key(table_name, request["DeleteRequest"]["Key"]), None)
+                    written += 1
+        self._call("batch_write_item", writes=written)
+        return {"UnprocessedItems": unprocessed}
+
+    def scan(self, TableName, ExclusiveStartKey=None, Limit=None, **kwargs):
+        self._call("scan")
+        with self._lock:
+            keys = sorted(self.tables.get(TableName, {}))
+            start = 0
+            if ExclusiveStartKey:
+                start = keys.index(self._key(TableName, ExclusiveStartKey)) + 1
+            page = keys[start:start + (Limit or self.scan_page_size)]
+            items = [dict(self.tables[TableName][key]) for key in page]
+        response = {"Items": items, "Count": len(items)}
+        if start + len(page) < len(keys):
+            key_name = self.key_names.get(TableName, "order_id")
+            response["LastEvaluatedKey"] = {key_name: {"S": page[-1]}}
+        return response
+
+
+    def query(self, TableName, KeyConditionExpression, ExpressionAttributeValues, IndexName=None,
+              ExpressionAttributeNames=None, ScanIndexForward=True, Limit=None, ExclusiveStartKey=None, **kwargs):
+        """Equality on the partition key, optionally begins_with on the sort key"""
+        self._call("query")
+        names = ExpressionAttributeNames or {}
+        key_name = self.key_names.get(TableName, "order_id")
+        sort_key = self.indexes[IndexName][1] if IndexName else None
+        conditions = []
+        for condition in KeyConditionExpression.split(" AND "):
+            match = re.fullmatch(r"\s*begins_with\((\S+),\s*(\S+)\)\s*", condition)
+            if match:
+                conditions.append((names.get(match[1], match[1]), "begins_with", ExpressionAttributeValues[match[2]]))
+            else:
+                attribute, placeholder = (part.strip() for part in condition.split("="))
+                conditions.append((names.get(attribute, attribute), "=", ExpressionAttributeValues[placeholder]))
+
+        def matches(item):
+            for attribute, operator, value in conditions:
+                if attribute not in item:
+                    return False
+                if operator == "=" and item[attribute] != value:
+                    return False
+                if operator == "begins_with" and not item[attribute]["S"].startswith(value["S"]):
+                    return False
+            return True
+
+        with self._lock:
+            found = [dict(item) for item in self.tables.get(TableName, {}).values() if matches(item)]
+        found.sort(key=lambda item: (item[sort_key]["S"] if sort_key else "", item[key_name]["S"]),
+                   reverse=not ScanIndexForward)
+        start = 0
+        if ExclusiveStartKey:
+            start = next(index for index, item in enumerate(found)
+                         if item[key_name] == ExclusiveStartKey[key_name]) + 1
+        page = found[start:start + (Limit or self.scan_page_size)]
+        response = {"Items": page, "Count": len(page)}
+        if start + len(page) < len(found):
+            last = page[-1]
+            response["LastEvaluatedKey"] = {name: last[name] for name in {key_name, *self.indexes.get(IndexName, ())}}
+        return response
+
+
+class FakeSSM(_Service):
+    name = "ssm"
+
+    def __init__(self, aws):
+        super().__init__(aws)
+        self.parameters = dict(DEFAULT_PARAMETERS)
+
+    def get_parameter(self, Name, **kwargs):
+        self._call("get_parameter")
+        if Name not in self.parameters:
+            raise ClientError("ParameterNotFound", Name)
+        return {"Parameter": {"Name": Name, "Value": self.parameters[Name], "Type": "String"}}
+
+    def get_parameters(self, Names, **kwargs):
+        self._call("get_parameters")
+        found = [{"Name": name, "Value": self.parameters[name], "Type": "String"}
+                 for name in Names if name in self.parameters]
+        return {"Parameters": found, "InvalidParameters": [name for name in Names if name not in self.parameters]}
+
+    def get_parameters_by_path(self, Path, Recursive=False, **kwargs):
+        self._call("get_parameters_by_path")
+        prefix = Path.rstrip("/") + "/"
+        found = [{"Name": name, "Value": value, "Type": "String"}
+                 for name, value in self.parameters.items() if name.startswith(prefix)]
+        return {"Parameters": found}
+
+    def put_parameter(self, Name, Value, **kwargs):
+        self._call("put_parameter")
+        self.parameters[Name] = Value
+        return {"Version": 1}
+
+
+class AsyncClient:
+    """
+    aiobotocore-style wrapper: every method becomes a coroutine that awaits
+    the simulated latency instead of blocking a thread.
+    """
+
+    def __init__(self, service, latency_ms=0.0):
+        self._service = service
+        self._latency = latency_ms / 1000.0
+
+    def __getattr__(self, name):
+        method = getattr(self._service, name)
+
+        async def call(**kwargs):
+            if self._latency:
+                await asyncio.sleep(self._latency)
+            return method(**kwargs)
+
+        return call
+
+
+class LocalAWS:
+    """
+    Bundle of in-memory services wired into app.config's client registry.
+    """
+
+    def __init__(self, latency_ms=0.0):
+        self.latency = latency_ms / 1000.0
+        self.calls = Counter()
+        self.writes = 0
+        self.s3 = FakeS3(self)
+        self.sqs = FakeSQS(self)
+        self.dynamodb = FakeDynamoDB(self)
+        self.ssm = FakeSSM(self)
+
+        for name in ("task-queue", "notification-queue", "dlq-queue"):
+            self.sqs.create_queue(QueueName=name)
+        self.sqs.queues[DEFAULT_PARAMETERS["poc-task-queue-url"]]["attributes"]["RedrivePolicy"] = json.dumps({
+            "deadLetterTargetArn": f"arn:aws:sqs:{REGION}:{ACCOUNT}:dlq-queue",
+            "maxReceiveCount": "2",
+        })
+
+    def install(self):
+        """Routes every get_aws_client() call to the in-memory services"""
+        config.reset_clients()
+        parameter_store.parameter_cache.clear()
+        # EMF lines would interleave with benchmark output; benchmarks.emf_metrics swaps in a MemorySink
+        metrics.sink = NullSink()
+        # Same for the handlers' JSON log events
+        event_log.sink = NullSink()
+        for service in (self.s3, self.sqs, self.dynamodb, self.ssm):
+            config.register_client(service.name, service)
+        # Log level / sample rate from the fake Parameter Store
+        event_log.refresh_config(force=True)
+        return self
+
+    def downstream_writes(self):
+        """S3 objects + DynamoDB items + SQS messages written by the order pipeline"""
+        return self.writes
+
+
+def load_handler(module_name):
+    """Imports a handler module from lambdas/ the way the Lambda zip exposes it"""
+    if LAMBDAS_DIR not in sys.path:
+        sys.path.insert(0, LAMBDAS_DIR)
+    return importlib.import_module(module_name)
+
+
+def sqs_event(messages, queue_name="task-queue"):
+    """Builds a Lambda SQS event from received messages"""
+    return {
+        "Records": [
+            {
+                "messageId": message["MessageId"],
+                "receiptHandle": message["ReceiptHandle"],
+                "body": message["Body"],
+                "attributes": message.get("Attributes", {}),
+                "messageAttributes": message.get("MessageAttributes", {}),
+                "eventSource": "aws:sqs",
+                "eventSourceARN": f"arn:aws:sqs:{REGION}:{ACCOUNT}:{queue_name}",
+                "awsRegion": REGION,
+            }
+            for message in messages
+        ]
+    }
+
+
+def make_order(index, bad=False, item_count=2):
+    """Order body in the shape produced by api/main.submit_order"""
+    items = [{"name": f"Item-{n}", "price": 19.99 + n, "quantity": 1 + n % 3} for n in range(item_count)]
+    if bad:
+        items[0]["price"] = -items[0]["price"]
+    return {
+        "order_id": f"BENCH-{index:06d}",
+        "correlation_id": str(uuid.uuid4()),
+        "items": items,
+        "promo_code": "SAVE10" if index % 2 else None,
+        "user_id": "bench-user",
+    }
@@ -0,0 +1,140 @@
+"""
+Integer-cents money (app.money): property checks against a Decimal reference,
+then orders/sec of the pricing hot path with floats (the old round(x, 2)
+code), Decimal, and integer cents.
+
+Properties checked on seeded random inputs:
+- to_cents(x) equals Decimal(repr(x)) quantized half-even to the cent
+- apply_rate(c, bps) equals c * bps / 10000 in Decimal, rounded half-even
+- calculate_order_total / apply_discount match the Decimal pipeline, and
+  final_total + discount_amount == subtotal exactly
+- str() and float() of Money round-trip to the same cents
+- Money equal to an int / Decimal hashes like it; floats never compare equal
+
+Usage: python -m benchmarks.money [--cases 100000] [--orders 100000]
+"""
+
+import argparse
+import json
+import logging
+import random
+import time
+from decimal import ROUND_HALF_EVEN, Decimal
+
+from app.money import Money, apply_rate, to_cents
+from app.processors import apply_discount, calculate_order_total
+from app.promotions import PROMO_DISCOUNT_BPS
+
+CENT = Decimal("0.01")
+PROMO_CODES = list(PROMO_DISCOUNT_BPS) + [None]
+
+
+def decimal_cents(value):
+    return int(Decimal(repr(value)).quantize(CENT, rounding=ROUND_HALF_EVEN).scaleb(2))
+
+
+def decimal_rate(cents, basis_points):
+    return int((Decimal(cents) * basis_points / 10000).quantize(Decimal(1), rounding=ROUND_HALF_EVEN))
+
+
+def random_price(rng):
+    kind = rng.random()
+    if kind < 0.6:
+        return round(rng.uniform(0, 2000), 2)
+    if kind < 0.8:
+        return round(rng.uniform(0, 50), rng.randint(3, 5))
+    if kind < 0.9:
+        return rng.randint(0, 99) + rng.choice([0.005, 0.015, 0.125, 0.995])
+    return rng.uniform(-1e6, 1e6)
+
+
+def random_items(rng):
+    return [{"price": round(rng.uniform(0.01, 500), 2), "quantity": rng.randint(1, 9)}
+            for _ in range(rng.randint(1, 15))]
+
+
+def check_properties(cases, seed=5):
+    rng = random.Random(seed)
+    failures = {"to_cents": 0, "apply_rate": 0, "order_pipeline": 0, "conservation": 0, "round_trip": 0,
+                "hash_eq": 0}
+
+    for _ in range(cases):
+        price = random_price(rng)
+        failures["to_cents"] += to_cents(price) != decimal_cents(price)
+
+        cents, basis_points = rng.randint(-10 ** 9, 10 ** 9), rng.randint(0, 10000)
+        failures["apply_rate"] += apply_rate(cents, basis_points) != decimal_rate(cents, basis_points)
+
+        items, promo_code = random_items(rng), rng.choice(PROMO_CODES)
+        subtotal = calculate_order_total(items)
+        final_total, discount_amount = apply_discount(subtotal, promo_code)
+        reference = sum(Decimal(repr(item["price"])) * item["quantity"] for item in items)
+        reference_discount = decimal_rate(int(reference.scaleb(2)), PROMO_DISCOUNT_BPS.get(promo_code, 0))
+        failures["order_pipeline"] += (subtotal.to_decimal() != reference
+                                       or discount_amount.cents != reference_discount)
+        failures["conservation"] += (final_total + discount_amount) != subtotal
+
+        money = Money(cents)
+        failures["round_trip"] += Money.of(str(money)) != money or to_cents(float(money)) != cents
+        decimal = money.to_decimal()
+        failures["hash_eq"] += (money != decimal or hash(money) != hash(decimal) or len({money, decimal}) != 1
+                                or money == float(money))
+
+    return {"cases": cases, "failures": failures}
+
+
+def price_floats(orders):
+    for items, promo_code in orders:
+        subtotal = round(sum(item["price"] * item["quantity"] for item in items), 2)
+        discount = subtotal * PROMO_DISCOUNT_BPS.get(promo_code, 0) / 10000
+        round(subtotal - discount, 2), round(discount, 2)
+
+
+def price_decimal(orders):
+    for items, promo_code in orders:
+        subtotal = sum(Decimal(repr(item["price"])) * item["quantity"] for item in items)
+        discount = (subtotal * PROMO_DISCOUNT_BPS.get(promo_code, 0) / 10000).quantize(CENT, rounding=ROUND_HALF_EVEN)
+        subtotal - discount, discount
+
+
+def price_cents(orders):
+    for items, promo_code in orders:
+        subtotal = sum(to_cents(item["price"]) * item["quantity"] for item in items)
+        discount = apply_rate(subtotal, PROMO_DISCOUNT_BPS.get(promo_code, 0))
+        subtotal - discount, discount
+
+
+def price_money(orders):
+    for items, promo_code in orders:
+        apply_discount(calculate_order_total(items), promo_code)
+
+
+def benchmark(count, seed=9):
+    rng = random.Random(seed)
+    orders = [(random_items(rng), rng.choice(PROMO_CODES)) for _ in range(count)]
+    result = {"orders": count}
+    for name, price in (("float", price_floats), ("decimal", price_decimal),
+                        ("int_cents", price_cents), ("money", price_money)):
+        start = time.perf_counter()
+        price(orders)
+        result[f"{name}_orders_per_sec"] = round(count / (time.perf_counter() - start))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=100000)
+    parser.add_argument("--orders", type=int, default=100000)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    print("💰 Integer-cents money vs Decimal reference")
+    properties = check_properties(args.cases)
+    print(json.dumps(properties))
+    print(json.dumps(benchmark(args.orders)))
+    if any(properties["failures"].values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
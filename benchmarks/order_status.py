@@ -0,0 +1,85 @@
+"""
+GET /orders/{id} read path under a Zipfian key distribution: uncached
+get_item per lookup vs app.database.get_order_status (LRU/TTL read-through
+cache) at several cache sizes.
+
+A few hot orders get most of the lookups, like customers refreshing a status
+page, so a small cache absorbs most of the DynamoDB reads. Concurrent writes
+are simulated by --write-every, which updates a random order through
+update_order_status and so invalidates its cache entry.
+
+Usage: python -m benchmarks.order_status [--orders 10000] [--lookups 50000] [--zipf-s 1.1] [--latency-ms 2]
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import random
+import time
+
+from app import database
+from benchmarks.local_aws import LocalAWS, make_order
+
+
+def zipf_keys(order_ids, lookups, s, seed=7):
+    """Draws lookups order IDs where rank r is requested with weight 1 / r**s"""
+    rng = random.Random(seed)
+    cum_weights = list(itertools.accumulate(1.0 / rank ** s for rank in range(1, len(order_ids) + 1)))
+    return rng.choices(order_ids, cum_weights=cum_weights, k=lookups)
+
+
+def seed_orders(count):
+    with database.OrderWriter() as writer:
+        for index in range(count):
+            order = make_order(index)
+            writer.save_order(order["order_id"], "COMPLETED", 100.0, 10.0, 90.0, order["items"], "SAVE10")
+    return [make_order(index)["order_id"] for index in range(count)]
+
+
+def run(keys, order_ids, latency_ms, cache_size, write_every):
+    aws = LocalAWS().install()
+    seed_orders(len(order_ids))
+    aws.latency = latency_ms / 1000.0
+    aws.calls.clear()
+    database.order_cache = database.OrderCache(max_size=cache_size or 1, ttl=60)
+    lookup = database.get_order_status if cache_size else database.get_order
+
+    rng = random.Random(11)
+    start = time.perf_counter()
+    for count, order_id in enumerate(keys, 1):
+        lookup(order_id)
+        if write_every and count % write_every == 0:
+            database.update_order_status(rng.choice(order_ids), "SHIPPED")
+    seconds = time.perf_counter() - start
+
+    return {
+        "cache_size": cache_size,
+        "lookups_per_sec": round(len(keys) / seconds),
+        "get_item_calls": aws.calls["dynamodb.get_item"],
+        "hit_ratio": round(database.order_cache.hit_ratio(), 4) if cache_size else 0.0,
+        **({"cache": database.order_cache.stats} if cache_size else {}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--lookups", type=int, default=50000)
+    parser.add_argument("--zipf-s", type=float, default=1.1)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--write-every", type=int, default=100)
+    parser.add_argument("--cache-sizes", type=int, nargs="+", default=[0, 100, 1000, 10000])
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    order_ids = [make_order(index)["order_id"] for index in range(args.orders)]
+    keys = zipf_keys(order_ids, args.lookups, args.zipf_s)
+    print(f"📦 {args.lookups} lookups over {args.orders} orders (zipf s={args.zipf_s}), "
+          f"{args.latency_ms}ms per get_item")
+    for cache_size in args.cache_sizes:
+        print(json.dumps(run(keys, order_ids, args.latency_ms, cache_size, args.write_every)))
+
+
+if __name__ == "__main__":
+    main()
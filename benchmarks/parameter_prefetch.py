@@ -0,0 +1,64 @@
+"""
+Parameter Store cost of a cold start: lazy per-name get_parameter vs one
+GetParameters prefetch, plus a stale-while-revalidate check after a rotation.
+
+Usage: python -m benchmarks.parameter_prefetch [--latency-ms 25]
+"""
+
+import argparse
+import json
+import logging
+import time
+
+from app.parameter_store import POC_PARAMETERS, ParameterCache
+from benchmarks.local_aws import LocalAWS
+
+
+def cold_start(latency_ms, prefetch):
+    aws = LocalAWS(latency_ms=latency_ms).install()
+    cache = ParameterCache()
+    start = time.perf_counter()
+    if prefetch:
+        cache.prefetch(POC_PARAMETERS)
+    for name in POC_PARAMETERS:
+        cache.get(name)
+    return {
+        "mode": "prefetch" if prefetch else "lazy",
+        "ssm_ms": round((time.perf_counter() - start) * 1000, 2),
+        "ssm_calls": aws.calls["ssm.get_parameter"] + aws.calls["ssm.get_parameters"],
+    }
+
+
+def rotation(latency_ms):
+    aws = LocalAWS(latency_ms=latency_ms).install()
+    cache = ParameterCache(ttl=0.05)
+    cache.prefetch(POC_PARAMETERS)
+    aws.ssm.parameters["poc-results-bucket-name"] = "results-bucket-v2"
+    time.sleep(0.06)
+
+    start = time.perf_counter()
+    stale = cache.get("poc-results-bucket-name")
+    stale_ms = (time.perf_counter() - start) * 1000
+    time.sleep(latency_ms / 1000 * 3)
+    return {
+        "stale_read": stale,
+        "stale_read_ms": round(stale_ms, 3),
+        "after_refresh": cache.get("poc-results-bucket-name"),
+        **cache.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=25.0)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    print(f"🔑 {len(POC_PARAMETERS)} parameters, {args.latency_ms}ms per SSM call")
+    for prefetch in (False, True):
+        print(json.dumps(cold_start(args.latency_ms, prefetch)))
+    print(json.dumps(rotation(args.latency_ms)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Partial batch failure harness for task_lambda.
+
+Feeds mixed good/bad batches of 10 through the in-memory task-queue (with the
+maxReceiveCount=2 redrive policy) and counts the downstream writes (S3 puts,
+DynamoDB writes, SQS sends) made while draining it:
+
+  whole-batch  - any failure returns every message of the batch to the queue
+                 (event source mapping without ReportBatchItemFailures)
+  partial      - only the message IDs in batchItemFailures are retried
+
+A last batch of good orders, each sent twice (a resubmitted order arrives
+under a new messageId), runs with every BatchWriteItem item coming back
+unprocessed: all records must be retried and no customer notified, since the
+notification waits for the DynamoDB write.
+
+Usage: python -m benchmarks.partial_batch_failures [--batches 20] [--bad-per-batch 1]
+"""
+
+import argparse
+import json
+import logging
+
+from benchmarks.local_aws import LocalAWS, load_handler, make_order, sqs_event
+
+BATCH_SIZE = 10
+
+
+def run(mode, batches, bad_per_batch):
+    aws = LocalAWS().install()
+    task_lambda = load_handler("task_lambda")
+    queue_url = aws.ssm.parameters["poc-task-queue-url"]
+
+    good_orders = 0
+    for index in range(batches * BATCH_SIZE):
+        bad = index % BATCH_SIZE < bad_per_batch
+        good_orders += not bad
+        aws.sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps(make_order(index, bad=bad)))
+    aws.calls.clear()
+    aws.writes = 0
+
+    invocations = 0
+    while True:
+        # VisibilityTimeout=0 makes retried messages visible again immediately
+        messages = aws.sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=BATCH_SIZE,
+                                           VisibilityTimeout=0).get("Messages", [])
+        if not messages:
+            break
+        invocations += 1
+        response = task_lambda.lambda_handler(sqs_event(messages), None)
+        failed_ids = {failure["itemIdentifier"] for failure in response.get("batchItemFailures", [])}
+
+        if mode == "whole-batch" and failed_ids:
+            continue
+        for message in messages:
+            if message["MessageId"] not in failed_ids:
+                aws.sqs.delete_message(QueueUrl=queue_url, ReceiptHandle=message["ReceiptHandle"])
+
+    writes = aws.downstream_writes()
+    return {
+        "mode": mode,
+        "invocations": invocations,
+        "downstream_writes": writes,
+        "redundant_writes": writes - good_orders * 3,
+        "dlq_messages": aws.sqs.depth(aws.ssm.parameters["poc-dlq-queue-url"]),
+    }
+
+
+def run_write_failure():
+    aws = LocalAWS().install()
+    aws.dynamodb.unprocessed_rate = 1.0
+    task_lambda = load_handler("task_lambda")
+    queue_url = aws.ssm.parameters["poc-task-queue-url"]
+    for index in range(BATCH_SIZE):
+        aws.sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps(make_order(index // 2)))
+    messages = aws.sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=BATCH_SIZE).get("Messages", [])
+    response = task_lambda.lambda_handler(sqs_event(messages), None)
+    return {
+        "mode": "dynamodb-write-failure",
+        "records": len(messages),
+        "retried": len(response["batchItemFailures"]),
+        "notifications_sent": aws.sqs.depth(aws.ssm.parameters["poc-notification-queue-url"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--bad-per-batch", type=int, default=1)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    print(f"📦 {args.batches} batches x {BATCH_SIZE} messages, {args.bad_per_batch} bad per batch")
+    for mode in ("whole-batch", "partial"):
+        print(json.dumps(run(mode, args.batches, args.bad_per_batch)))
+    print(json.dumps(run_write_failure()))
+
+
+if __name__ == "__main__":
+    main()
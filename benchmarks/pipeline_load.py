@@ -0,0 +1,226 @@
+"""
+End-to-end load test of the order pipeline against the in-memory AWS:
+
+  producer -> task-queue -> task_lambda -> S3 / DynamoDB -> notification-queue -> notification_lambda
+                       \\-> dlq-queue (after maxReceiveCount=2)
+
+A producer thread submits orders at a fixed arrival rate, using the same
+build_order_message + SendMessage as POST /orders. Pollers from
+benchmarks.event_source stand in for the event source mappings: each one
+receives up to 10 messages, invokes the real handler and deletes whatever
+did not come back in batchItemFailures.
+
+Every order is followed by correlation_id through these stages:
+
+  submitted -> task_received -> invoice_saved -> order_saved -> notification_queued -> notified
+  submitted -> dead_lettered (bad orders)
+
+The report is one JSON object per arrival rate. It has sustained orders/sec,
+p50/p95/p99 end-to-end latency (submitted -> notified), the DLQ rate, and
+p50/p95/p99 of each hop between consecutive stages. --output also writes the
+reports to a file.
+
+Usage: python -m benchmarks.pipeline_load [--rates 50 200 500] [--seconds 10] [--bad-ratio 0.02] [--output report.json]
+"""
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+
+from api.models import build_order_message
+from benchmarks.event_source import EventSourceMapping
+from benchmarks.local_aws import DEFAULT_PARAMETERS, LocalAWS, load_handler, make_order
+
+TASK_QUEUE_URL = DEFAULT_PARAMETERS["poc-task-queue-url"]
+NOTIFICATION_QUEUE_URL = DEFAULT_PARAMETERS["poc-notification-queue-url"]
+STAGES = ("submitted", "task_received", "invoice_saved", "order_saved", "notification_queued", "notified")
+
+
+def percentiles(values, points=(50, 95, 99)):
+    """Nearest-rank percentiles in milliseconds; empty input gives None"""
+    if not values:
+        return {f"p{point}_ms": None for point in points}
+    ordered = sorted(values)
+    return {f"p{point}_ms": round(ordered[max(0, -(-len(ordered) * point // 100) - 1)] * 1000, 2) for point in points}
+
+
+class StageClock:
+    """
+    First time each correlation_id reaches each stage. The wrappers below feed
+    it from the fake AWS calls, so the handlers themselves are not modified.
+    """
+
+    def __init__(self):
+        self.times = {}
+        self.correlation_ids = {}  # order_id -> correlation_id
+        self._lock = threading.Lock()
+
+    def mark(self, correlation_id, stage, at=None):
+        at = time.perf_counter() if at is None else at
+        with self._lock:
+            self.times.setdefault(correlation_id, {}).setdefault(stage, at)
+
+    def mark_order(self, order_id, stage):
+        correlation_id = self.correlation_ids.get(order_id)
+        if correlation_id:
+            self.mark(correlation_id, stage)
+
+    def instrument(self, aws):
+        put_object = aws.s3.put_object
+        batch_write_item = aws.dynamodb.batch_write_item
+        send_message = aws.sqs.send_message
+        redrive = aws.sqs._redrive
+
+        def traced_put_object(Bucket, Key, Body, **kwargs):
+            response = put_object(Bucket=Bucket, Key=Key, Body=Body, **kwargs)
+            self.mark_order(Key.rsplit("/", 1)[-1][:-len(".json")], "invoice_saved")
+            return response
+
+        def traced_batch_write_item(RequestItems, **kwargs):
+            response = batch_write_item(RequestItems=RequestItems, **kwargs)
+            unprocessed = {id(request) for requests in response.get("UnprocessedItems", {}).values()
+                           for request in requests}
+            for requests in RequestItems.values():
+                for request in requests:
+                    if "PutRequest" in request and id(request) not in unprocessed:
+                        self.mark_order(request["PutRequest"]["Item"]["order_id"]["S"], "order_saved")
+            return response
+
+        def traced_send_message(QueueUrl, MessageBody, **kwargs):
+            response = send_message(QueueUrl=QueueUrl, MessageBody=MessageBody, **kwargs)
+            if QueueUrl == NOTIFICATION_QUEUE_URL:
+                self.mark(json.loads(MessageBody)["correlation_id"], "notification_queued")
+            return response
+
+        def traced_redrive(queue, message):
+            moved = redrive(queue, message)
+            if moved:
+                self.mark(json.loads(message["body"])["correlation_id"], "dead_lettered")
+            return moved
+
+        aws.s3.put_object = traced_put_object
+        aws.dynamodb.batch_write_item = traced_batch_write_item
+        aws.sqs.send_message = traced_send_message
+        aws.sqs._redrive = traced_redrive
+
+    def report(self):
+        with self._lock:
+            times = {correlation_id: dict(stages) for correlation_id, stages in self.times.items()}
+        submitted = [stages for stages in times.values() if "submitted" in stages]
+        completed = [stages for stages in submitted if "notified" in stages]
+        dead_lettered = sum("dead_lettered" in stages for stages in submitted)
+
+        window = 0.0
+        if completed:
+            window = max(stages["notified"] for stages in completed) - min(stages["submitted"] for stages in submitted)
+        hops = {}
+        for earlier, later in zip(STAGES, STAGES[1:]):
+            hops[f"{earlier}->{later}"] = percentiles([stages[later] - stages[earlier] for stages in completed
+                                                       if earlier in stages and later in stages])
+        return {
+            "orders_submitted": len(submitted),
+            "orders_completed": len(completed),
+            "dead_lettered": dead_lettered,
+            "dlq_rate": round(dead_lettered / len(submitted), 4) if submitted else 0.0,
+            "lost": len(submitted) - len(completed) - dead_lettered,
+            "sustained_orders_per_sec": round(len(completed) / window, 1) if window else 0.0,
+            "end_to_end": percentiles([stages["notified"] - stages["submitted"] for stages in completed]),
+            "stages": hops,
+        }
+
+
+def produce(aws, clock, rate, seconds, bad_ratio, seed=23):
+    """Open-loop arrivals: the schedule does not slow down when the pipeline falls behind"""
+    rng = random.Random(seed)
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    for index in range(int(rate * seconds)):
+        delay = start + index * interval - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        order = make_order(index, bad=rng.random() < bad_ratio)
+        message = build_order_message(order, "load-test")
+        clock.correlation_ids[message["order_id"]] = message["correlation_id"]
+        clock.mark(message["correlation_id"], "submitted")
+        aws.sqs.send_message(QueueUrl=TASK_QUEUE_URL, MessageBody=json.dumps(message))
+
+
+def traced_handler(handler, clock, stage):
+    """Marks every record of the event before (task_received) or after (notified) the real handler"""
+    def invoke(event, context):
+        correlation_ids = [json.loads(record["body"])["correlation_id"] for record in event["Records"]]
+        if stage == "task_received":
+            for correlation_id in correlation_ids:
+                clock.mark(correlation_id, stage)
+        response = handler(event, context)
+        if stage == "notified":
+            for correlation_id in correlation_ids:
+                clock.mark(correlation_id, stage)
+        return response
+    return invoke
+
+
+def run(rate, seconds, bad_ratio, latency_ms, task_pollers, visibility_timeout, drain_seconds):
+    aws = LocalAWS(latency_ms=latency_ms).install()
+    clock = StageClock()
+    clock.instrument(aws)
+    task_mapping = EventSourceMapping(aws, "task-queue", "task_lambda", handler=traced_handler(
+        load_handler("task_lambda").lambda_handler, clock, "task_received"))
+    notification_mapping = EventSourceMapping(aws, "notification-queue", "notification_lambda", handler=traced_handler(
+        load_handler("notification_lambda").lambda_handler, clock, "notified"))
+    for mapping in (task_mapping, notification_mapping):
+        aws.sqs.set_queue_attributes(QueueUrl=mapping.queue_url,
+                                     Attributes={"VisibilityTimeout": str(visibility_timeout)})
+
+    stop = threading.Event()
+    pollers = [threading.Thread(target=task_mapping.run, args=(stop,)) for _ in range(task_pollers)]
+    pollers.append(threading.Thread(target=notification_mapping.run, args=(stop,)))
+    for thread in pollers:
+        thread.start()
+
+    produce(aws, clock, rate, seconds, bad_ratio)
+    deadline = time.perf_counter() + drain_seconds
+    while time.perf_counter() < deadline:
+        report = clock.report()
+        if report["lost"] == 0:
+            break
+        time.sleep(0.05)
+    stop.set()
+    for thread in pollers:
+        thread.join()
+
+    return {"arrival_rate": rate, "seconds": seconds, "bad_ratio": bad_ratio, "latency_ms": latency_ms,
+            "task_pollers": task_pollers, **clock.report()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rates", type=float, nargs="+", default=[50, 200, 500], help="orders/sec offered")
+    parser.add_argument("--seconds", type=float, default=10.0, help="arrival period per rate")
+    parser.add_argument("--bad-ratio", type=float, default=0.02, help="share of orders that fail into the DLQ")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="per AWS call")
+    parser.add_argument("--task-pollers", type=int, default=5, help="concurrent task_lambda invocations")
+    parser.add_argument("--visibility-timeout", type=float, default=1.0, help="seconds before a failed message retries")
+    parser.add_argument("--drain-seconds", type=float, default=30.0)
+    parser.add_argument("--output", help="also write the reports to this JSON file")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    print(f"🚚 Pipeline load test: {args.seconds}s per rate, {args.task_pollers} task pollers, "
+          f"{args.latency_ms}ms per AWS call")
+    reports = []
+    for rate in args.rates:
+        report = run(rate, args.seconds, args.bad_ratio, args.latency_ms, args.task_pollers,
+                     args.visibility_timeout, args.drain_seconds)
+        reports.append(report)
+        print(json.dumps(report))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Promo catalog (app.promotions) at 100k codes: compiled size in memory,
+lookup latency, load time from DynamoDB and from a gzip S3 snapshot, and a
+hot reload while reader threads keep pricing.
+
+Codes mix plain discounts, validity windows, minimum spends and spend tiers.
+Lookups are 90% known codes and 10% unknown ones. During the hot reload,
+readers never wait on the store's lock, but they do share the GIL with the
+thread that decodes and compiles the new snapshot: json.loads of the whole
+snapshot is one call that holds it. The report gives reader get() latency
+percentiles between publishing v2 and the new code becoming visible.
+
+Usage: python -m benchmarks.promo_catalog [--codes 100000] [--lookups 1000000]
+"""
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+import tracemalloc
+
+from app import promotions
+from benchmarks.local_aws import LocalAWS
+
+NOW = time.time()
+
+
+def make_records(count, seed=13):
+    rng = random.Random(seed)
+    records = []
+    for index in range(count):
+        record = {"code": f"PROMO{index:06d}", "basis_points": rng.choice([500, 1000, 1500, 2000, 2500])}
+        kind = rng.random()
+        if kind < 0.3:
+            record["valid_from"] = NOW - rng.randint(0, 30) * 86400
+            record["valid_until"] = NOW + rng.randint(-5, 30) * 86400
+        elif kind < 0.5:
+            record["min_spend_cents"] = rng.choice([2500, 5000, 10000])
+        elif kind < 0.6:
+            record["tiers"] = [[5000, record["basis_points"] + 500], [20000, record["basis_points"] + 1000]]
+        records.append(record)
+    return records
+
+
+def compiled_size(records):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    catalog = promotions.PromoCatalog(records, version="1")
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return catalog, after - before
+
+
+def lookup_latency(catalog, codes, lookups, seed=17):
+    rng = random.Random(seed)
+    keys = [rng.choice(codes) if rng.random() < 0.9 else f"NOPE{rng.randint(0, 10 ** 6)}" for _ in range(lookups)]
+    subtotals = [rng.randint(100, 100000) for _ in range(lookups)]
+    discount_basis_points = catalog.discount_basis_points
+    start = time.perf_counter()
+    for code, subtotal in zip(keys, subtotals):
+        discount_basis_points(code, subtotal, NOW)
+    promo_ns = (time.perf_counter() - start) * 1e9 / lookups
+
+    bulk_discount_basis_points = catalog.bulk_discount_basis_points
+    start = time.perf_counter()
+    for subtotal in subtotals:
+        bulk_discount_basis_points(subtotal)
+    bulk_ns = (time.perf_counter() - start) * 1e9 / lookups
+    return {"promo_lookup_ns": round(promo_ns, 1), "bulk_tier_ns": round(bulk_ns, 1)}
+
+
+def load_times(records):
+    aws = LocalAWS().install()
+    results = {}
+
+    promotions.publish_snapshot(records, version=1)
+    store = promotions.PromoCatalogStore(source="s3", refresh_seconds=3600)
+    start = time.perf_counter()
+    store.get()
+    results["s3_load_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    results["s3_snapshot_bytes"] = len(aws.s3.objects[("results-bucket", "promo-catalog/catalog.json")][0])
+    start = time.perf_counter()
+    store.reload()
+    results["s3_version_check_ms"] = round((time.perf_counter() - start) * 1000, 3)
+
+    promotions.publish_to_dynamodb(records, version=1)
+    store = promotions.PromoCatalogStore(source="dynamodb", refresh_seconds=3600)
+    start = time.perf_counter()
+    store.get()
+    results["dynamodb_load_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    results["dynamodb_scan_pages"] = aws.calls["dynamodb.scan"]
+    start = time.perf_counter()
+    store.reload()
+    results["dynamodb_version_check_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return results
+
+
+def percentile_ms(ordered, point):
+    return round(ordered[max(0, -(-len(ordered) * point // 100) - 1)] * 1000, 3) if ordered else None
+
+
+def hot_reload(records, readers=4):
+    """Publishes v2 with an extra code while readers call get(); reports get() latency during the reload"""
+    LocalAWS().install()
+    promotions.publish_snapshot(records, version=1)
+    store = promotions.PromoCatalogStore(source="s3", refresh_seconds=0.05)
+    store.get()
+
+    stop, reloading = threading.Event(), threading.Event()
+    latencies = [[] for _ in range(readers)]
+    versions_seen = [set() for _ in range(readers)]
+
+    def read(slot):
+        while not stop.is_set():
+            start = time.perf_counter()
+            catalog = store.get()
+            catalog.discount_basis_points("PROMO000001", 10000, NOW)
+            if reloading.is_set():
+                latencies[slot].append(time.perf_counter() - start)
+            versions_seen[slot].add(catalog.version)
+
+    threads = [threading.Thread(target=read, args=(slot,)) for slot in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    promotions.publish_snapshot(records + [{"code": "FLASHSALE", "basis_points": 4000}], version=2)
+    published = time.perf_counter()
+    reloading.set()
+    while "FLASHSALE" not in store.get() and time.perf_counter() - published < 30:
+        time.sleep(0.01)
+    visible_after = time.perf_counter() - published
+    reloading.clear()
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    during = sorted(latency for slot in latencies for latency in slot)
+    return {
+        "new_code_visible_after_ms": round(visible_after * 1000, 1),
+        "reader_gets_during_reload": len(during),
+        "reader_get_p50_ms": percentile_ms(during, 50),
+        "reader_get_p99_ms": percentile_ms(during, 99),
+        "reader_get_max_ms": percentile_ms(during, 100),
+        "versions_seen_by_readers": max(len(seen) for seen in versions_seen),
+        **store.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--codes", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=1000000)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    records = make_records(args.codes)
+    catalog, size = compiled_size(records)
+    print(f"🏷️ {args.codes} promo codes")
+    print(json.dumps({"compiled_bytes": size, "bytes_per_code": round(size / args.codes, 1),
+                      **lookup_latency(catalog, [record["code"] for record in records], args.lookups)}))
+    print(json.dumps(load_times(records)))
+    print(json.dumps(hot_reload(records)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Queue latency instrumentation (app/queue_metrics.py) end to end: orders
+arrive on task-queue at --rate for --seconds, bad ones are retried and
+dead-lettered, and the three handlers run behind event source mappings on
+poller threads (benchmarks.event_source).
+
+The queue_latency lines the handlers log are captured and merged with
+parse_metric_lines, exactly as queue_latency_report.py does with CloudWatch
+Logs. The printed view shows, per queue, how much of the p99 is spent waiting
+(queue_age_ms, first_receive_delay_ms) vs processing (processing_ms). The
+checks compare the merged counts with what the mappings delivered.
+
+observe() is also timed on its own, as µs per record.
+
+Usage: python -m benchmarks.queue_latency [--rate 200] [--seconds 5] [--bad-ratio 0.05] [--pollers 2]
+"""
+
+import argparse
+import json
+import logging
+import random
+import time
+
+from app.metrics import metric_logger
+from app.queue_metrics import METRIC_NAME, QueueLatencyRecorder, parse_metric_lines, queue_age_view
+from benchmarks.event_source import EventSourceSimulator
+from benchmarks.local_aws import QUEUE_URL_PREFIX, LocalAWS, make_order, sqs_event
+
+
+class LineCollector(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(record.getMessage())
+
+
+def observe_cost(records=100000):
+    """µs per observe() call, flushing every 10 records like a Lambda batch"""
+    recorder = QueueLatencyRecorder("bench")
+    now = int(time.time() * 1000)
+    event = sqs_event([{"MessageId": str(index), "ReceiptHandle": "", "Body": "{}", "Attributes": {
+        "SentTimestamp": str(now - index % 5000), "ApproximateFirstReceiveTimestamp": str(now - index % 3000),
+        "ApproximateReceiveCount": str(1 + index % 3)}} for index in range(records)])
+    metric_logger.disabled = True
+    start = time.perf_counter()
+    for index, record in enumerate(event["Records"]):
+        recorder.observe(record, 0.004)
+        if index % 10 == 9:
+            recorder.flush()
+    elapsed = time.perf_counter() - start
+    metric_logger.disabled = False
+    return round(elapsed / records * 1e6, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=200.0, help="orders/sec offered")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--bad-ratio", type=float, default=0.05)
+    parser.add_argument("--pollers", type=int, default=2, help="concurrent invocations per mapping")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="per AWS call")
+    parser.add_argument("--visibility-timeout", type=float, default=0.5, help="seconds before a failed record retries")
+    args = parser.parse_args()
+
+    aws = LocalAWS(latency_ms=args.latency_ms).install()
+    simulator = EventSourceSimulator(aws, visibility_timeout=args.visibility_timeout, concurrency=args.pollers)
+
+    # Handlers log at INFO through the root logger; keep only the metrics lines
+    logging.getLogger().setLevel(logging.WARNING)
+    collector = LineCollector()
+    metric_logger.addHandler(collector)
+    metric_logger.propagate = False
+
+    print(f"⏱️ Queue latency: {args.rate} orders/s for {args.seconds}s, {args.pollers} pollers per queue, "
+          f"{args.latency_ms}ms per AWS call")
+    simulator.start()
+    rng = random.Random(7)
+    interval = 1.0 / args.rate
+    start = time.perf_counter()
+    for index in range(int(args.rate * args.seconds)):
+        delay = start + index * interval - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        aws.sqs.send_message(QueueUrl=QUEUE_URL_PREFIX + "task-queue",
+                             MessageBody=json.dumps(make_order(index, bad=rng.random() < args.bad_ratio)))
+    deadline = time.perf_counter() + 60
+    while time.perf_counter() < deadline and any(aws.sqs.depth(mapping.queue_url) for mapping in simulator.mappings):
+        time.sleep(0.05)
+    simulator.stop()
+
+    # app.metrics also carries the parameter_cache / import_profile lines
+    lines = [line for line in collector.lines if f'"metric": "{METRIC_NAME}"' in line]
+    view = queue_age_view(parse_metric_lines(lines))
+    print(json.dumps({"metric_lines": len(lines), "queues": view}, indent=2))
+
+    delivered = {mapping.queue_name: mapping.stats for mapping in simulator.mappings}
+    checks = {
+        f"{name}_records_match": view.get(name, {}).get("records", 0) == stats["records"]
+        for name, stats in delivered.items()
+    }
+    # Concurrent pollers share a module's recorder (one Lambda process runs one invocation at a time),
+    # so a flush can carry a neighbour's records and leave it nothing to log
+    checks["at_most_one_line_per_invocation"] = 0 < len(lines) <= sum(
+        stats["invocations"] for stats in delivered.values())
+    checks["task_queue_retries_seen"] = view.get("task-queue", {}).get("retry_rate", 0) > 0 or not args.bad_ratio
+    cost = observe_cost()
+    print(json.dumps({"observe_us_per_record": cost, "checks": checks}))
+    if not all(checks.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
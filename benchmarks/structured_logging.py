@@ -0,0 +1,235 @@
+"""
+Per-order logging cost: the multi-line f-string logger.info calls task_lambda
+and app/helpers/discount_calculator.py made per order (before) vs the JSON
+stage events of app/event_log.py (after).
+
+1. The log calls of one order are repeated --orders times with the same
+   values, written to /dev/null: before through a root handler with the
+   Lambda log format, after through event_log's StdoutSink. Reported as µs and
+   bytes per order, for the before lines at INFO and WARNING (the f-strings
+   are still built) and for the events at INFO with sample rates 1.0 / 0.1 and
+   at WARNING.
+2. task_lambda runs behind the task-queue event source mapping with the log
+   parameters in the fake Parameter Store. Checks:
+   - at poc-log-sample-rate 0 only failed records are logged, with all their stages
+   - at 0.25 the kept records are exactly the head-sampled correlation ids
+   - a kept order has one event per stage; every event carries correlation_id and order_id
+   - poc-log-level WARNING takes effect on refresh without a redeploy
+
+Usage: python -m benchmarks.structured_logging [--orders 20000] [--handler-orders 1000]
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import random
+import time
+import uuid
+
+from app.event_log import event_log, head_sampled
+from app.metrics import MemorySink, StdoutSink
+from app.money import Money
+from benchmarks.event_source import EventSourceMapping
+from benchmarks.local_aws import QUEUE_URL_PREFIX, LocalAWS, make_order
+
+# Lambda's Python runtime format
+LAMBDA_LOG_FORMAT = "[%(levelname)s]\t%(asctime)s.%(msecs)03dZ\t%(aws_request_id)s\t%(message)s"
+
+STAGES = ("received", "priced", "invoiced", "stored", "order_queued", "completed")
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.aws_request_id = "8f5e3c1a-0b6d-4a57-9d7e-2c1f0e9b4a63"
+        return True
+
+
+class ByteCounter:
+    """File-like /dev/null that counts what would have reached CloudWatch Logs"""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, text):
+        self.bytes += len(text.encode("utf-8"))
+
+    def flush(self):
+        pass
+
+
+ORDER = {
+    "order_id": "BENCH-000001", "correlation_id": "c0ffee00-1234-4bcd-8e9f-0123456789ab",
+    "items": [{"name": "Item-0", "price": 19.99, "quantity": 2}, {"name": "Item-1", "price": 5.5, "quantity": 1}],
+    "promo_code": "SAVE10", "subtotal": Money.of("45.48"), "discount": Money.of("4.55"),
+    "final_total": Money.of("40.93"), "bulk_discount": Money(0), "tax": Money.of("3.27"), "bucket": "results-bucket",
+}
+
+
+def legacy_order_logs(logger, order):
+    """The log calls one successful order made before app/event_log.py, in order"""
+    order_id, correlation_id, items, promo_code = (order["order_id"], order["correlation_id"], order["items"],
+                                                   order["promo_code"])
+    subtotal, discount_amount, final_total = order["subtotal"], order["discount"], order["final_total"]
+    bulk_discount, tax = order["bulk_discount"], order["tax"]
+    logger.info(f"\n📦 ORDER: {order_id} | Correlation: {correlation_id}")
+    logger.info(f"   Items: {len(items)} | Promo: {promo_code or 'None'}")
+    logger.info(f"\n→ Step 1: calculate_order_total()")
+    logger.info(f"   Subtotal: ${subtotal}")
+    logger.info(f"\n→ Step 2: apply_discount()")
+    logger.info(f"   Discount: ${discount_amount} | Final: ${final_total}")
+    logger.info(f"\n➡️ Step 2.5: TESTING NESTED MODULE ACCESS")
+    logger.info(f"   📂 Calling: app/helpers/discount_calculator.py")
+    logger.info(f"   📂 Module path: app.helpers.discount_calculator")
+    # discount_calculator.calculate_bulk_discount / calculate_tax
+    logger.info(f"   🔹 Accessing: calculate_bulk_discount() from app/helpers/")
+    logger.info(f"   🔹 Input: subtotal=${subtotal:.2f}")
+    logger.info(f"   🔹 Applied: No bulk discount (subtotal too low)")
+    logger.info(f"   🔹 Accessing: calculate_tax() from app/helpers/")
+    logger.info(f"   🔹 Input: amount=${final_total:.2f}")
+    logger.info(f"   🔹 Calculated: 8% tax = ${tax:.2f}")
+    logger.info(f"   ✅ NESTED MODULE ACCESS SUCCESSFUL!")
+    logger.info(f"   📊 Results: Bulk Discount=${bulk_discount:.2f}, Tax=${tax:.2f}")
+    logger.info(f"\n→ Step 3: build_invoice()")
+    logger.info(f"   ✅ Invoice created")
+    logger.info(f"\n→ Step 4: save_to_s3()")
+    logger.info(f"\n→ Step 5: save_order() to DynamoDB (batched)")
+    logger.info(f"   ✅ Order queued for DynamoDB")
+    logger.info(f"\n→ Step 6: send_notification()")
+    logger.info(f"\n✅ ORDER {order_id} COMPLETED")
+    logger.info("="*70 + "\n")
+
+
+def event_order_logs(order, message_id, correlation_id):
+    """The event_log calls one successful order makes in task_lambda and discount_calculator"""
+    key = f"{order['order_id']}.json"
+    with event_log.record(message_id=message_id) as scope:
+        scope.bind(order_id=order["order_id"], correlation_id=correlation_id)
+        event_log.info("received", items=len(order["items"]), promo_code=order["promo_code"] or None)
+        event_log.info("priced", subtotal=order["subtotal"], discount=order["discount"],
+                       final_total=order["final_total"])
+        event_log.debug("bulk_discount", subtotal=order["subtotal"], basis_points=0, discount=order["bulk_discount"])
+        event_log.debug("tax", amount=order["final_total"], rate_bps=800, tax=order["tax"])
+        event_log.info("invoiced", bulk_discount=order["bulk_discount"], tax=order["tax"])
+        event_log.info("stored", invoice_location=f"s3://{order['bucket']}/{key}")
+        event_log.info("order_queued", status="COMPLETED")
+        event_log.info("completed")
+
+
+def legacy_cost(orders, level):
+    out = ByteCounter()
+    handler = logging.StreamHandler(out)
+    handler.setFormatter(logging.Formatter(LAMBDA_LOG_FORMAT, "%Y-%m-%dT%H:%M:%S"))
+    handler.addFilter(RequestIdFilter())
+    logger = logging.getLogger("benchmarks.legacy_task_lambda")
+    logger.handlers, logger.propagate = [handler], False
+    logger.setLevel(level)
+    start = time.perf_counter()
+    for _ in range(orders):
+        legacy_order_logs(logger, ORDER)
+    elapsed = time.perf_counter() - start
+    return {"us_per_order": round(elapsed / orders * 1e6, 2), "bytes_per_order": round(out.bytes / orders, 1)}
+
+
+def event_cost(orders, level, sample_rate):
+    out = ByteCounter()
+    # Head sampling is by correlation_id, so every order needs its own
+    correlation_ids = [str(uuid.UUID(int=random.Random(index).getrandbits(128))) for index in range(orders)]
+    saved = event_log.sink, event_log.level, event_log.sample_rate
+    event_log.sink, event_log.level, event_log.sample_rate = StdoutSink(), level, sample_rate
+    try:
+        with contextlib.redirect_stdout(out):
+            start = time.perf_counter()
+            for index in range(orders):
+                event_order_logs(ORDER, f"message-{index}", correlation_ids[index])
+            elapsed = time.perf_counter() - start
+    finally:
+        event_log.sink, event_log.level, event_log.sample_rate = saved
+    return {"us_per_order": round(elapsed / orders * 1e6, 2), "bytes_per_order": round(out.bytes / orders, 1)}
+
+
+def run_handler(orders, bad_ratio, sample_rate, level="INFO"):
+    """task_lambda behind the event source mapping; returns the events and the correlation ids sent / bad"""
+    aws = LocalAWS()
+    aws.ssm.parameters["poc-log-sample-rate"] = str(sample_rate)
+    aws.ssm.parameters["poc-log-level"] = level
+    aws.install()
+    sink = event_log.sink = MemorySink()
+    rng = random.Random(11)
+    sent, bad = set(), set()
+    for index in range(orders):
+        order = make_order(index, bad=rng.random() < bad_ratio)
+        sent.add(order["correlation_id"])
+        if any(item["price"] < 0 or item["quantity"] <= 0 for item in order["items"]):
+            bad.add(order["correlation_id"])
+        aws.sqs.send_message(QueueUrl=QUEUE_URL_PREFIX + "task-queue", MessageBody=json.dumps(order))
+    aws.sqs.set_queue_attributes(QueueUrl=QUEUE_URL_PREFIX + "task-queue", Attributes={"VisibilityTimeout": "0"})
+    mapping = EventSourceMapping(aws, "task-queue", "task_lambda")
+    while mapping.poll_once():
+        pass
+    return [event for event in sink.lines if "message_id" in event], sent, bad
+
+
+def handler_checks(orders, bad_ratio):
+    checks = {}
+    events, _, bad = run_handler(orders, bad_ratio, 0.0)
+    logged = {event["correlation_id"] for event in events}
+    failed_chains = {}
+    for event in events:
+        failed_chains.setdefault((event["message_id"], event["correlation_id"]), []).append(event["stage"])
+    checks["sample_0_only_failures"] = logged == bad and all(event["sampled"] == "error" for event in events)
+    checks["failures_keep_all_stages"] = all(stages[:1] == ["received"] and stages[-1] == "failed"
+                                             for stages in failed_chains.values())
+
+    events, sent, bad = run_handler(orders, bad_ratio, 0.25)
+    head = {event["correlation_id"] for event in events if event["sampled"] == "head"}
+    checks["head_sample_deterministic"] = head == {key for key in sent - bad if head_sampled(key, 0.25)}
+    chains = {}
+    for event in events:
+        if event["sampled"] == "head":
+            chains.setdefault(event["message_id"], []).append(event["stage"])
+    checks["one_event_per_stage"] = all(tuple(stages) == STAGES for stages in chains.values())
+    checks["context_on_every_event"] = all(event.get("correlation_id") and event.get("order_id") for event in events)
+    head_share = round(len(head) / max(1, orders - len(bad)), 3)
+
+    events, _, _ = run_handler(orders // 10 or 1, bad_ratio, 1.0, level="WARNING")
+    checks["runtime_level_from_parameter_store"] = (
+        event_log.level == logging.WARNING and all(event["level"] != "INFO" for event in events))
+    event_log.level = logging.INFO
+    for handler_logger in event_log.loggers:
+        handler_logger.setLevel(logging.INFO)
+    return checks, head_share
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=20000, help="orders for the per-order cost")
+    parser.add_argument("--handler-orders", type=int, default=1000, help="orders through task_lambda")
+    parser.add_argument("--bad-ratio", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(f"📝 Structured logging: {args.orders} orders of log calls, {args.handler_orders} orders through task_lambda")
+    cost = {
+        "before_info": legacy_cost(args.orders, logging.INFO),
+        "before_warning": legacy_cost(args.orders, logging.WARNING),
+        "after_info_sample_1.0": event_cost(args.orders, logging.INFO, 1.0),
+        "after_info_sample_0.1": event_cost(args.orders, logging.INFO, 0.1),
+        "after_warning": event_cost(args.orders, logging.WARNING, 1.0),
+    }
+    for name, result in cost.items():
+        print(json.dumps({"config": name, **result}))
+
+    logging.disable(logging.CRITICAL)
+    checks, head_share = handler_checks(args.handler_orders, args.bad_ratio)
+    logging.disable(logging.NOTSET)
+    print(json.dumps({"head_sampled_share_at_0.25": head_share}))
+    checks["faster_at_info"] = cost["after_info_sample_1.0"]["us_per_order"] < cost["before_info"]["us_per_order"]
+    checks["fewer_bytes_at_info"] = (cost["after_info_sample_1.0"]["bytes_per_order"]
+                                     < cost["before_info"]["bytes_per_order"])
+    print(json.dumps({"checks": checks}))
+    if not all(checks.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Throughput per vCPU: the long-polling worker (task_worker.py) vs the Lambda
+path (event source mapping + task_lambda), on the same backlog in the
+in-memory AWS with --latency-ms per call.
+
+Both sides run the same task_lambda.process_batch. The worker is one process
+with --threads record threads. The Lambda side runs --concurrency parallel
+invocations, processing records sequentially as deployed
+(TASK_LAMBDA_WORKERS=1).
+
+- orders_per_cpu_second is orders / process CPU time. Each run is alone in
+  this process, so this is throughput per fully used vCPU.
+- billed_seconds is what each path pays for: the summed handler wall time
+  for Lambda (mostly spent waiting on AWS calls), and the container's wall
+  time for the worker.
+
+Usage: python -m benchmarks.task_worker [--orders 2000] [--threads 10 40] [--concurrency 10 40] [--latency-ms 10]
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+
+import task_worker
+from benchmarks.event_source import EventSourceMapping
+from benchmarks.local_aws import DEFAULT_PARAMETERS, LocalAWS, make_order
+
+TASK_QUEUE_URL = DEFAULT_PARAMETERS["poc-task-queue-url"]
+
+
+def seed(orders, latency_ms):
+    aws = LocalAWS(latency_ms=latency_ms).install()
+    for index in range(orders):
+        aws.sqs._enqueue(TASK_QUEUE_URL, json.dumps(make_order(index)))
+    return aws
+
+
+def drain(aws, stop, threads_running):
+    """Sets stop once task-queue is empty and nothing is in flight"""
+    while aws.sqs.depth(TASK_QUEUE_URL):
+        time.sleep(0.01)
+    stop.set()
+    for thread in threads_running:
+        thread.join()
+
+
+def measure(label, orders, run):
+    wall, cpu = time.perf_counter(), time.process_time()
+    details = run()
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return {
+        "path": label,
+        "orders": orders,
+        "seconds": round(wall, 3),
+        "orders_per_sec": round(orders / wall, 1),
+        "cpu_seconds": round(cpu, 3),
+        "orders_per_cpu_second": round(orders / cpu, 1),
+        **details,
+    }
+
+
+def run_worker(orders, threads, latency_ms):
+    aws = seed(orders, latency_ms)
+    worker = task_worker.TaskWorker(threads=threads, wait_seconds=0.5)
+
+    def run():
+        start = time.perf_counter()
+        stop = threading.Event()
+        result = {}
+        thread = threading.Thread(target=lambda: result.update(worker.run(stop)))
+        thread.start()
+        drain(aws, stop, [thread])
+        return {"threads": threads, "billed_seconds": round(time.perf_counter() - start, 2),
+                "receive_calls": aws.calls["sqs.receive_message"],
+                "delete_batch_calls": aws.calls["sqs.delete_message_batch"], "succeeded": result["succeeded"]}
+
+    return measure("worker", orders, run)
+
+
+def run_lambda(orders, concurrency, latency_ms):
+    aws = seed(orders, latency_ms)
+    mapping = EventSourceMapping(aws, "task-queue", "task_lambda")
+
+    def run():
+        stop = threading.Event()
+        pollers = [threading.Thread(target=mapping.run, args=(stop,)) for _ in range(concurrency)]
+        for thread in pollers:
+            thread.start()
+        drain(aws, stop, pollers)
+        return {"concurrency": concurrency, "invocations": mapping.stats["invocations"],
+                "billed_seconds": round(mapping.stats["handler_seconds"], 2),
+                "succeeded": mapping.stats["deleted"]}
+
+    return measure("lambda", orders, run)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[10, 40])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 40])
+    parser.add_argument("--latency-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    print(f"🏭 {args.orders} orders, {args.latency_ms}ms per AWS call: long-polling worker vs Lambda path")
+    for threads in args.threads:
+        print(json.dumps(run_worker(args.orders, threads, args.latency_ms)))
+    for concurrency in args.concurrency:
+        print(json.dumps(run_lambda(args.orders, concurrency, args.latency_ms)))
+
+
+if __name__ == "__main__":
+    main()
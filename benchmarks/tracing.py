@@ -0,0 +1,254 @@
+"""
+Distributed tracing (app/tracing.py): orders go through POST /orders and
+POST /orders/batch of api/main.py and then task_lambda, notification_lambda
+and (for invalid orders) dlq_processor_lambda behind the event source
+mappings, with a MemoryExporter collecting the segment documents.
+
+1. At TRACE_SAMPLE_RATE 1.0, per order (found by its correlation_id, as
+   trace_collector.py show does). Checks:
+   - one trace per order, and every order is found
+   - a valid order's trace links order-api -> task_lambda -> notification_lambda
+   - an invalid order's trace has the failed task_lambda attempts (faults) and
+     the dlq_processor_lambda segment that recovered it
+   - every task_lambda step and its S3 / SQS calls have a span
+   - queue_ms is never negative (child segments start after the send)
+2. At --sample-rate, the share of traces recorded is close to the rate, and
+   consumers follow the API's decision: no lambda segment for an unsampled order.
+3. task_worker with several receiver threads, each flushing its own batch:
+   every record's task_lambda segment is exported once, with the
+   Step.send_notification span sent after the batch's DynamoDB flush.
+4. A daemon exporter sends to a UDP socket read back like trace_collector.py listen.
+5. The tracing calls a record makes (root span from the header, 6 step spans,
+   S3 + SQS spans, inject, flush every 10) are repeated --records times with
+   tracing off, and on (FileExporter to /dev/null) with every record sampled
+   and with --sample-rate of them sampled, best of 3 runs each. The µs per
+   record at --sample-rate must stay under --budget-us.
+
+Usage: python -m benchmarks.tracing [--orders 200] [--bad-ratio 0.1] [--sample-rate 0.1] [--records 50000]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+
+import httpx
+
+import task_worker
+from app.tracing import (DaemonExporter, FileExporter, MemoryExporter, Tracer, find_trace_ids, flatten_documents,
+                         format_header, load_documents, new_span_id, new_trace_id, trace_view, tracer, with_header)
+from benchmarks.event_source import MAPPINGS, EventSourceMapping
+from benchmarks.local_aws import QUEUE_URL_PREFIX, LocalAWS, make_order
+
+STEPS = ("calculate_order_total", "apply_discount", "build_invoice", "save_to_s3", "save_order", "send_notification")
+AWS_CALLS = ("S3.PutObject", "SQS.SendMessage")
+
+
+async def submit(app, orders, headers):
+    """Half the orders one by one through POST /orders, the rest through POST /orders/batch; returns correlation ids"""
+    half = len(orders) // 2
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        responses = [(await client.post("/orders", json=order, headers=headers)).json() for order in orders[:half]]
+        for offset in range(half, len(orders), 10):
+            response = await client.post("/orders/batch", json=orders[offset:offset + 10], headers=headers)
+            responses.extend(response.json()["results"])
+    return [response["correlation_id"] for response in responses]
+
+
+def run_pipeline(api, orders, bad_ratio, sample_rate, headers):
+    """Orders through the API and every mapping until the queues are empty; returns the flattened documents and ids"""
+    aws = LocalAWS().install()
+    api.sqs = aws.sqs
+    exporter = tracer.exporter = MemoryExporter()
+    tracer.sample_rate = sample_rate
+
+    rng = random.Random(5)
+    bodies, bad = [], []
+    for index in range(orders):
+        order = make_order(index, bad=rng.random() < bad_ratio)
+        bodies.append({"items": order["items"], "promo_code": order["promo_code"]})
+        bad.append(order["items"][0]["price"] < 0)
+    correlation_ids = asyncio.run(submit(api.app, bodies, headers))
+
+    aws.sqs.set_queue_attributes(QueueUrl=QUEUE_URL_PREFIX + "task-queue", Attributes={"VisibilityTimeout": "0"})
+    mappings = [EventSourceMapping(aws, queue, function) for queue, function in MAPPINGS]
+    while sum(mapping.poll_once() for mapping in mappings):
+        pass
+    return flatten_documents(exporter.documents), correlation_ids, bad
+
+
+def full_trace_checks(documents, correlation_ids, bad):
+    checks = {"one_trace_per_order": True, "valid_orders_linked": True, "invalid_orders_via_dlq": True,
+              "steps_and_aws_calls_spanned": True, "queue_ms_non_negative": True}
+    slowest = None
+    for correlation_id, invalid in zip(correlation_ids, bad):
+        trace_ids = find_trace_ids(documents, correlation_id=correlation_id)
+        if len(trace_ids) != 1:
+            checks["one_trace_per_order"] = False
+            continue
+        view = trace_view(documents, trace_ids[0])
+        if invalid:
+            checks["invalid_orders_via_dlq"] &= (
+                view["segments"].count("task_lambda") >= 1 and "dlq_processor_lambda" in view["segments"]
+                and "task_lambda" in view["faults"])
+        else:
+            checks["valid_orders_linked"] &= (
+                view["segments"] == ["order-api", "task_lambda", "notification_lambda"]
+                and [(hop["from"], hop["to"]) for hop in view["hops"]]
+                == [("order-api", "task_lambda"), ("task_lambda", "notification_lambda")])
+            names = {entry["name"] for entry in view["timeline"] if entry["segment"] == "task_lambda"}
+            checks["steps_and_aws_calls_spanned"] &= all(f"Step.{step}" in names for step in STEPS) and all(
+                name in names for name in AWS_CALLS)
+        checks["queue_ms_non_negative"] &= all(hop["queue_ms"] >= 0 for hop in view["hops"])
+        if slowest is None or view["duration_ms"] > slowest["duration_ms"]:
+            slowest = view
+    return checks, slowest
+
+
+def sampling_checks(documents, correlation_ids, sample_rate):
+    api_traces = {document["trace_id"] for document in documents if document["name"] == "order-api"}
+    lambda_traces = {document["trace_id"] for document in documents
+                     if document["name"].endswith("_lambda") and document.get("type") != "subsegment"}
+    share = len(api_traces) / len(correlation_ids)
+    # Within 4 standard deviations of the binomial share
+    tolerance = 4 * (sample_rate * (1 - sample_rate) / len(correlation_ids)) ** 0.5
+    return {
+        "sample_share_close_to_rate": abs(share - sample_rate) <= max(tolerance, 0.01),
+        "unsampled_not_recorded_downstream": lambda_traces <= api_traces,
+    }, round(share, 4)
+
+
+def worker_notification_spans(orders, receivers=4, latency_ms=2):
+    """(task_lambda segments, segments with a Step.send_notification span) for orders through task_worker"""
+    aws = LocalAWS(latency_ms=latency_ms).install()
+    for index in range(orders):
+        header = format_header(new_trace_id(), new_span_id(), True)
+        aws.sqs._enqueue(QUEUE_URL_PREFIX + "task-queue", json.dumps(make_order(index)), with_header({}, header))
+    exporter = tracer.exporter = MemoryExporter()
+    worker = task_worker.TaskWorker(threads=8, receivers=receivers, wait_seconds=0.1)
+    stop = threading.Event()
+    thread = threading.Thread(target=worker.run, args=(stop,))
+    thread.start()
+    while aws.sqs.depth(QUEUE_URL_PREFIX + "task-queue"):
+        time.sleep(0.01)
+    stop.set()
+    thread.join()
+    segments = [document for document in exporter.documents if document["name"] == "task_lambda"]
+    notified = sum(any(subsegment["name"] == "Step.send_notification" for subsegment in document.get("subsegments", ()))
+                   for document in segments)
+    return len(segments), notified
+
+
+def daemon_roundtrip():
+    """Documents sent by DaemonExporter come back intact from the UDP socket"""
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(2)
+    local = Tracer(exporter=DaemonExporter(f"127.0.0.1:{receiver.getsockname()[1]}"), sample_rate=1.0)
+    with local.start_trace("order-api", correlation_id="daemon-check"):
+        with local.span("SQS.SendMessage"):
+            pass
+    sent = local.flush()
+    documents = []
+    try:
+        while len(documents) < sent:
+            documents += load_documents(receiver.recv(65535).decode().splitlines())
+    except socket.timeout:
+        pass
+    finally:
+        receiver.close()
+    # One segment document with its SQS subsegment embedded
+    return sent == 1 and len(documents) == 2 and len(find_trace_ids(documents, correlation_id="daemon-check")) == 1
+
+
+def per_record_cost(records, exporter, sample_rate=1.0):
+    """
+    µs per record for the tracing calls of one task_lambda record, flushing every
+    10 records like a batch. sample_rate of the incoming headers is the API's decision.
+    """
+    local = Tracer(exporter=exporter)
+    rng = random.Random(7)
+    headers = [format_header(new_trace_id(), new_span_id(), rng.random() < sample_rate) for _ in range(1000)]
+    step_names = [f"Step.{step}" for step in STEPS]
+    start = time.perf_counter()
+    for index in range(records):
+        with local.start_trace("task_lambda", headers[index % 1000]) as span:
+            span.annotate(order_id="BENCH-000001", correlation_id="c0ffee00-1234-4bcd-8e9f-0123456789ab")
+            for name in step_names:
+                with local.span(name):
+                    pass
+            with local.span("S3.PutObject"):
+                pass
+            with local.span("SQS.SendMessage"):
+                with_header({}, local.inject({}))
+        if index % 10 == 9:
+            local.flush()
+    return (time.perf_counter() - start) / records * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--bad-ratio", type=float, default=0.1)
+    parser.add_argument("--sample-rate", type=float, default=0.1)
+    parser.add_argument("--sample-orders", type=int, default=2000, help="orders for the sampling check")
+    parser.add_argument("--records", type=int, default=50000, help="records for the overhead measurement")
+    parser.add_argument("--budget-us", type=float, default=30.0,
+                        help="max tracing overhead per record at --sample-rate")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    LocalAWS().install()
+    # Imported after install() so api.main's module-level client is the in-memory one
+    from api import main as api
+    from api.auth import create_token
+    headers = {"Authorization": f"Bearer {create_token('bench-user')}"}
+
+    print(f"🧵 Tracing: {args.orders} orders through the API and lambdas, {args.sample_orders} at "
+          f"sample rate {args.sample_rate}, overhead over {args.records} records")
+    saved = tracer.exporter, tracer.sample_rate
+    try:
+        documents, correlation_ids, bad = run_pipeline(api, args.orders, args.bad_ratio, 1.0, headers)
+        checks, slowest = full_trace_checks(documents, correlation_ids, bad)
+        print(json.dumps({"documents": len(documents), "orders": len(correlation_ids), "invalid": sum(bad)}))
+        if slowest:
+            print(json.dumps({"slowest_trace": {key: slowest[key] for key in
+                                                ("trace_id", "annotations", "duration_ms", "segments", "hops",
+                                                 "slowest_hop", "slowest_span")}}))
+
+        documents, correlation_ids, _ = run_pipeline(api, args.sample_orders, args.bad_ratio, args.sample_rate,
+                                                     headers)
+        sampled, share = sampling_checks(documents, correlation_ids, args.sample_rate)
+        checks.update(sampled)
+        print(json.dumps({"sample_rate": args.sample_rate, "recorded_share": share}))
+
+        segments, notified = worker_notification_spans(args.orders)
+        print(json.dumps({"task_worker": {"orders": args.orders, "segments": segments,
+                                          "notification_spans": notified}}))
+        checks["worker_batches_keep_notification_spans"] = segments == notified == args.orders
+    finally:
+        tracer.exporter, tracer.sample_rate = saved
+
+    checks["daemon_roundtrip"] = daemon_roundtrip()
+
+    # Best of 3 runs per configuration, so a noisy neighbour does not fail the budget
+    cost = {"off": min(per_record_cost(args.records, None) for _ in range(3)),
+            "sample_1.0": min(per_record_cost(args.records, FileExporter(os.devnull)) for _ in range(3)),
+            f"sample_{args.sample_rate}": min(per_record_cost(args.records, FileExporter(os.devnull), args.sample_rate)
+                                              for _ in range(3))}
+    cost = {name: round(value, 2) for name, value in cost.items()}
+    print(json.dumps({"overhead_us_per_record": cost, "budget_us": args.budget_us}))
+    checks["within_budget"] = cost[f"sample_{args.sample_rate}"] <= args.budget_us
+
+    print(json.dumps({"checks": checks}))
+    if not all(checks.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+Streams a JSONL file of orders (one {"items": [...], "promo_code": ...} object
+per line, optionally gzip-compressed) into task-queue.
+
+- Lines are read lazily and validated with the api/models rules; invalid
+  lines go to the rejects file instead of the queue.
+- Valid orders are packed into SendMessageBatch calls (10 entries / 256 KB)
+  and sent from a thread pool. At most --max-in-flight batches are
+  outstanding; when that many are in flight, the reader blocks. Memory stays
+  bounded by max-in-flight x 256 KB whatever the file size.
+- Entries that SQS rejects are retried with backoff. Entries that still fail
+  after --max-attempts go to the rejects file.
+- Progress is checkpointed (line number and byte offset of the last line up
+  to which every batch has finished). An interrupted run resumes from there
+  on the next invocation. Orders without an order_id get one derived from
+  the file name and line number, so lines re-sent after a crash overwrite
+  the same invoice/DynamoDB item instead of creating duplicates.
+
+Usage: python ingest_orders.py orders.jsonl.gz [--max-in-flight 16] [--rejects rejects.jsonl] [--restart]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api.models import Order, build_order_message
+from app.config import get_aws_client
+from app.notifier import MAX_BATCH_BYTES, MAX_BATCH_ENTRIES, chunk_results
+from app.parameter_store import get_cached_parameter
+
+GZIP_MAGIC = b"\x1f\x8b"
+# A long run of invalid lines still closes a (message-less) batch so the checkpoint moves
+MAX_LINES_PER_BATCH = 1000
+
+
+def open_input(path):
+    """Binary line stream over path; gzip is detected from the magic bytes, not the extension"""
+    with open(path, "rb") as probe:
+        magic = probe.read(2)
+    return gzip.open(path, "rb") if magic == GZIP_MAGIC else open(path, "rb")
+
+
+def parse_order(line):
+    """Parses and validates one JSONL line. Raises ValueError with the reason if it is not a valid order."""
+    try:
+        data = json.loads(line)
+        if not isinstance(data, dict):
+            raise ValueError("line is not a JSON object")
+        Order(items=data.get("items"), promo_code=data.get("promo_code")).validate()
+    except (TypeError, AttributeError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid order: {str(e)}") from e
+    return data
+
+
+def derived_order_id(source, line_number):
+    digest = hashlib.sha1(f"{source}:{line_number}".encode("utf-8")).hexdigest()[:16]
+    return f"ING-{digest}"
+
+
+def input_fingerprint(path):
+    return {"input": os.path.abspath(path), "size": os.path.getsize(path)}
+
+
+def load_checkpoint(path, fingerprint):
+    """Returns the saved progress for this input, or None to start from the beginning"""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        state = json.load(f)
+    if {key: state.get(key) for key in fingerprint} != fingerprint:
+        raise SystemExit(f"❌ Checkpoint {path} belongs to a different input; use --restart to ignore it")
+    return state
+
+
+def save_checkpoint(path, state):
+    """Atomic write: a crash mid-write leaves the previous checkpoint intact"""
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(state, f)
+    os.replace(temporary, path)
+
+
+class _Batch:
+    __slots__ = ("first_line", "last_line", "end_offset", "entries", "bytes")
+
+    def __init__(self, first_line):
+        self.first_line = first_line
+        self.last_line = first_line - 1
+        self.end_offset = 0
+        self.entries = []  # (line number, body)
+        self.bytes = 0
+
+
+class OrderIngestor:
+    """Streams one input file into an SQS queue. See the module docstring."""
+
+    def __init__(self, queue_url, max_in_flight=16, user_id="bulk-ingest", max_attempts=3,
+                 checkpoint_path=None, rejects_path=None, progress=sys.stderr, progress_interval=1.0):
+        self.queue_url = queue_url
+        self.max_in_flight = max_in_flight
+        self.user_id = user_id
+        self.max_attempts = max_attempts
+        self.checkpoint_path = checkpoint_path
+        self.rejects_path = rejects_path
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.stats = {"lines": 0, "sent": 0, "rejected": 0, "failed": 0, "batches": 0, "retries": 0}
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._completed = {}
+        self._watermark = (0, 0)
+        self._rejects = None
+
+    def run(self, path):
+        fingerprint = input_fingerprint(path)
+        state = load_checkpoint(self.checkpoint_path, fingerprint)
+        start_line, start_offset = (state["line"], state["offset"]) if state else (0, 0)
+        self._watermark = (start_line, start_offset)
+        source = os.path.basename(path)
+        sqs = get_aws_client("sqs")
+
+        self._rejects = open(self.rejects_path, "a", encoding="utf-8") if self.rejects_path else None
+        started = time.monotonic()
+        next_report = started + self.progress_interval
+        interrupted = False
+
+        pool = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        try:
+            with open_input(path) as stream:
+                stream.seek(start_offset)
+                offset, line_number = start_offset, start_line
+                batch = _Batch(line_number + 1)
+                try:
+                    for raw in stream:
+                        line_number += 1
+                        self.stats["lines"] += 1
+                        body = self._encode_line(raw, line_number, source)
+                        if body is not None:
+                            size = len(body.encode("utf-8"))
+                            if batch.bytes + size > MAX_BATCH_BYTES:
+                                self._submit(pool, sqs, batch)
+                                batch = _Batch(line_number)
+                            batch.entries.append((line_number, body))
+                            batch.bytes += size
+                        offset += len(raw)
+                        batch.last_line, batch.end_offset = line_number, offset
+
+                        if len(batch.entries) == MAX_BATCH_ENTRIES or batch.last_line - batch.first_line >= MAX_LINES_PER_BATCH:
+                            self._submit(pool, sqs, batch)
+                            batch = _Batch(line_number + 1)
+
+                        now = time.monotonic()
+                        if now >= next_report:
+                            self._report(started, now)
+                            self._save(fingerprint)
+                            next_report = now + self.progress_interval
+                except KeyboardInterrupt:
+                    interrupted = True
+                if not interrupted and batch.last_line >= batch.first_line:
+                    self._submit(pool, sqs, batch)
+        finally:
+            pool.shutdown(wait=True)
+            self._save(fingerprint, complete=not interrupted)
+            if self._rejects:
+                self._rejects.close()
+
+        elapsed = time.monotonic() - started
+        self._report(started, time.monotonic(), final=True)
+        return {
+            **self.stats,
+            "resumed_from_line": start_line,
+            "checkpoint_line": self._watermark[0],
+            "interrupted": interrupted,
+            "seconds": round(elapsed, 3),
+            "orders_per_sec": round(self.stats["sent"] / elapsed) if elapsed else 0,
+        }
+
+    def _encode_line(self, raw, line_number, source):
+        """Message body for one line, or None if the line is blank or rejected"""
+        if not raw.strip():
+            return None
+        try:
+            order = parse_order(raw)
+            body = json.dumps(build_order_message(
+                order, order.get("user_id") or self.user_id,
+                order_id=order.get("order_id") or derived_order_id(source, line_number)
+            ))
+            if len(body.encode("utf-8")) > MAX_BATCH_BYTES:
+                raise ValueError(f"Message exceeds {MAX_BATCH_BYTES} bytes")
+        except ValueError as e:
+            self._reject(line_number, str(e), raw)
+            self.stats["rejected"] += 1
+            return None
+        return body
+
+    def _submit(self, pool, sqs, batch):
+        # Backpressure: blocks the reader while max_in_flight batches are outstanding
+        self._slots.acquire()
+        self.stats["batches"] += 1
+        pool.submit(self._send, sqs, batch)
+
+    def _send(self, sqs, batch):
+        try:
+            pending = dict(batch.entries)
+            errors = {}
+            for attempt in range(self.max_attempts):
+                if not pending:
+                    break
+                if attempt:
+                    with self._lock:
+                        self.stats["retries"] += 1
+                    time.sleep(0.1 * (2 ** (attempt - 1)))
+                try:
+                    response = sqs.send_message_batch(
+                        QueueUrl=self.queue_url,
+                        Entries=[{"Id": str(line_number), "MessageBody": body} for line_number, body in pending.items()]
+                    )
+                    results = chunk_results(response)
+                except Exception as e:
+                    results = {line_number: {"error": str(e)} for line_number in pending}
+                for line_number, result in results.items():
+                    if "error" in result:
+                        errors[line_number] = result["error"]
+                    else:
+                        pending.pop(line_number, None)
+                        errors.pop(line_number, None)
+
+            with self._lock:
+                self.stats["sent"] += len(batch.entries) - len(pending)
+                self.stats["failed"] += len(pending)
+            for line_number, body in pending.items():
+                self._reject(line_number, errors.get(line_number, "No result returned for entry"), body)
+        finally:
+            self._complete(batch)
+            self._slots.release()
+
+    def _complete(self, batch):
+        """Advances the checkpoint watermark over every contiguous finished batch"""
+        with self._lock:
+            self._completed[batch.first_line] = (batch.last_line, batch.end_offset)
+            line, offset = self._watermark
+            while line + 1 in self._completed:
+                line, offset = self._completed.pop(line + 1)
+            self._watermark = (line, offset)
+
+    def _reject(self, line_number, error, raw):
+        if self._rejects is None:
+            return
+        text = raw.decode("utf-8", errors="replace").rstrip("\n") if isinstance(raw, bytes) else raw
+        with self._lock:
+            self._rejects.write(json.dumps({"line": line_number, "error": error, "order": text}) + "\n")
+
+    def _save(self, fingerprint, complete=False):
+        if not self.checkpoint_path:
+            return
+        with self._lock:
+            line, offset = self._watermark
+        save_checkpoint(self.checkpoint_path, {**fingerprint, "line": line, "offset": offset,
+                                               "complete": complete, "updated_at": time.time()})
+
+    def _report(self, started, now, final=False):
+        if self.progress is None:
+            return
+        elapsed = max(now - started, 1e-9)
+        with self._lock:
+            stats = dict(self.stats)
+            checkpoint_line = self._watermark[0]
+        self.progress.write(
+            f"\r📤 lines {stats['lines']:,} | sent {stats['sent']:,} | rejected {stats['rejected']:,} | "
+            f"failed {stats['failed']:,} | {stats['sent'] / elapsed:,.0f} orders/s | checkpoint line {checkpoint_line:,}"
+            + ("\n" if final else "")
+        )
+        self.progress.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file, plain or gzip")
+    parser.add_argument("--queue-url", help="defaults to the poc-task-queue-url parameter")
+    parser.add_argument("--max-in-flight", type=int, default=16, help="concurrent SendMessageBatch calls")
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--user-id", default="bulk-ingest", help="user_id for lines that do not carry one")
+    parser.add_argument("--checkpoint", help="defaults to <input>.checkpoint")
+    parser.add_argument("--rejects", help="defaults to <input>.rejects.jsonl")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    checkpoint = args.checkpoint or f"{args.input}.checkpoint"
+    if args.restart and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    ingestor = OrderIngestor(
+        queue_url=args.queue_url or get_cached_parameter("poc-task-queue-url"),
+        max_in_flight=args.max_in_flight,
+        user_id=args.user_id,
+        max_attempts=args.max_attempts,
+        checkpoint_path=checkpoint,
+        rejects_path=args.rejects or f"{args.input}.rejects.jsonl",
+    )
+    result = ingestor.run(args.input)
+    print(json.dumps(result))
+    if result["interrupted"]:
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
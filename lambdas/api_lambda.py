@@ -7,6 +7,7 @@ import json
 import os
 import uuid
 from app.config import get_aws_client
+from app.database import get_order_status as read_order_status
 
 TASK_QUEUE_URL = os.environ.get("TASK_QUEUE_URL")
 
@@ -63,11 +64,23 @@ def get_order_status(event, context):
     """
     order_id = event["pathParameters"]["order_id"]
     
-    # TODO: Query DynamoDB for order status
+    try:
+        # Read-through cache in front of the orders table (kept warm across invocations)
+        order = read_order_status(order_id)
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"error": str(e)})
+        }
+    
+    if order is None:
+        return {
+            "statusCode": 404,
+            "body": json.dumps({"error": f"Order {order_id} not found"})
+        }
+    
     return {
         "statusCode": 200,
-        "body": json.dumps({
-            "order_id": order_id,
-            "status": "processing"
-        })
+        "headers": {"Content-Type": "application/json"},
+        "body": json.dumps(order)
     }
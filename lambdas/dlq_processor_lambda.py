@@ -1,47 +1,52 @@
+from app.cold_start import start_import_profiler
+
+# IMPORT_PROFILE=true records per-module import cost during init
+import_profiler = start_import_profiler()
+
+import copy
 import json
 import logging
 import os
+import time
+from collections import defaultdict
 
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+# Configure logging: app/ modules log at INFO through the root logger; the
+# handler's own logger follows poc-log-level (app/event_log.py)
+logging.getLogger().setLevel(logging.INFO)
+logger = logging.getLogger("dlq_processor_lambda")
 
-from app.processors import calculate_order_total, apply_discount, build_invoice
+from app.processors import calculate_order_total, apply_discount, build_invoice, fix_order_data
 from app.storage import save_to_s3
 from app.notifier import send_notification
-from app.parameter_store import get_cached_parameter
-from app.database import save_order, update_order_status
-from app.database import update_order_status
-
-def fix_order_data(body):
-    """Attempt to fix common order issues"""
-    fixed = False
-    issues = []
-    
-    # Fix negative prices
-    if "items" in body:
-        for item in body["items"]:
-            if item.get("price", 0) < 0:
-                item["price"] = abs(item["price"])
-                fixed = True
-                issues.append(f"Fixed negative price for {item['name']}")
-            
-            if item.get("quantity", 0) <= 0:
-                item["quantity"] = 1
-                fixed = True
-                issues.append(f"Fixed invalid quantity for {item['name']}")
-    
-    # Check if items exist
-    if not body.get("items") or len(body["items"]) == 0:
-        issues.append("Cannot fix: No items in order")
-        return None, issues
-    
-    return body if fixed else None, issues
+from app.claim_check import PayloadNotFound, already_processed, pointer_of, release, resolve
+from app.parameter_store import get_cached_parameter, prefetch_parameters, log_parameter_metrics
+from app.database import OrderWriter
+from app.dlq_catalog import DLQCatalog
+from app.event_log import event_log
+from app.metrics import metrics
+from app.queue_metrics import QueueLatencyRecorder
+from app.tracing import LAMBDA_ORIGIN, trace_header, tracer
+
+# One GetParameters call during init instead of one get_parameter per name
+prefetch_parameters()
+
+if import_profiler:
+    import_profiler.stop()
+    import_profiler.log_report()
+
+# Queue age / retries / processing time per record, one metrics line per invocation
+queue_latency = QueueLatencyRecorder("dlq_processor_lambda")
+
+# Counters and step/AWS-call timers, one EMF line per invocation
+metrics.set_function("dlq_processor_lambda")
+
+# One JSON event per record stage, sampled per record (app/event_log.py)
+event_log.set_function("dlq_processor_lambda", logger=logger)
 
 def lambda_handler(event, context):
-    logger.info("\n" + "="*70)
-    logger.info("🔄 DLQ PROCESSOR LAMBDA INVOKED")
-    logger.info("="*70)
-    
+    # Level and sample rate can be changed in Parameter Store without a redeploy
+    event_log.refresh_config()
+
     # Get values from Parameter Store
     BUCKET = get_cached_parameter("poc-results-bucket-name")
     NOTIFICATION_QUEUE_URL = get_cached_parameter("poc-notification-queue-url")
@@ -51,115 +56,167 @@ def lambda_handler(event, context):
     processed_count = 0
     recovered_count = 0
     failed_count = 0
+    batch_item_failures = []
+    # order_id -> messageIds of the records recovering it: one batch can carry an order more than once
+    recovered_messages = defaultdict(list)
+    # Fixes and unfixed body of each recovered record, so a FAILED entry written later keeps its signature
+    recovered_entries = {}
+    # By messageId, like everything retried through batchItemFailures
+    notifications = {}
+    
+    # save_order + update_order_status on the same order collapse into one batched put
+    writer = OrderWriter()
+    # Every record is indexed for GET /dlq/messages, whatever the outcome
+    catalog = DLQCatalog()
+    records_by_id = {}
     
-    logger.info(f"\n📊 DLQ BATCH INFO:")
-    logger.info(f"   Total messages received: {total_messages}")
-    logger.info("="*70)
+    event_log.info("invoked", records=total_messages)
     
     for record in event.get("Records", []):
         order_id = "Unknown"
-        correlation_id = "N/A"
+        message_id = record["messageId"]
+        records_by_id[message_id] = record
+        started, clock = time.time(), time.perf_counter()
+        failed = False
+        # Unfixed copy of a claim-checked order, for the catalog signature (fix_order_data edits body in place)
+        original = None
         
+        span = tracer.start_trace("dlq_processor_lambda", trace_header(record), LAMBDA_ORIGIN)
+        with span, event_log.record(message_id=message_id) as scope:
+            try:
+                envelope = json.loads(record["body"])
+                try:
+                    body = resolve(envelope)
+                except PayloadNotFound:
+                    # Released after a successful attempt whose message delete failed: recovered already
+                    if not already_processed(envelope):
+                        raise
+                    scope.bind(order_id=envelope.get("order_id"), correlation_id=envelope.get("correlation_id"))
+                    event_log.info("already_processed")
+                    processed_count += 1
+                    recovered_count += 1
+                    continue
+                if pointer_of(envelope):
+                    original = copy.deepcopy(body)
+                order_id = body.get("order_id", "Unknown")
+                correlation_id = body.get("correlation_id", "N/A")
+                scope.bind(order_id=order_id, correlation_id=correlation_id)
+                span.annotate(order_id=order_id, correlation_id=correlation_id)
+
+                # Attempt to fix the order
+                fixed_body, issues = fix_order_data(body)
+                event_log.info("received", receive_count=record.get("attributes", {}).get("ApproximateReceiveCount"),
+                               issues=issues)
+
+                if fixed_body is None:
+                    # Not an error (the record is indexed for review), but always kept by tail sampling
+                    event_log.warning("manual_review", reason="cannot auto-fix")
+                    catalog.add(record, "MANUAL_REVIEW", issues, original)
+                    continue
+
+                items = fixed_body.get("items", [])
+                promo_code = fixed_body.get("promo_code", "")
+
+                with metrics.timer("Step.calculate_order_total"), tracer.span("Step.calculate_order_total"):
+                    subtotal = calculate_order_total(items)
+                with metrics.timer("Step.apply_discount"), tracer.span("Step.apply_discount"):
+                    final_total, discount_amount = apply_discount(subtotal, promo_code)
+                event_log.info("priced", subtotal=subtotal, discount=discount_amount, final_total=final_total)
+
+                with metrics.timer("Step.build_invoice"), tracer.span("Step.build_invoice"):
+                    invoice = build_invoice(order_id, items, subtotal, discount_amount, final_total, promo_code)
+                invoice["correlation_id"] = correlation_id
+                invoice["recovered_from_dlq"] = True
+                invoice["dlq_fixes"] = issues
+
+                key = f"{order_id}.json"
+                with metrics.timer("Step.save_to_s3"), tracer.span("Step.save_to_s3"):
+                    save_to_s3(BUCKET, key, invoice)
+                event_log.info("stored", invoice_location=f"s3://{BUCKET}/{key}")
+
+                # Saved with RECOVERED status
+                with metrics.timer("Step.save_order"), tracer.span("Step.save_order"):
+                    writer.save_order(
+                        order_id=order_id,
+                        status="RECOVERED",
+                        subtotal=subtotal,
+                        discount_amount=discount_amount,
+                        final_total=final_total,
+                        items=items,
+                        promo_code=promo_code,
+                        recovered=True
+                    )
+
+                # Sent after writer.flush(), once the RECOVERED status has landed
+                notifications[message_id] = (span, {
+                    "order_id": order_id,
+                    "correlation_id": correlation_id,
+                    "status": "recovered_from_dlq",
+                    "final_total": final_total,
+                    "invoice_location": f"s3://{BUCKET}/{key}",
+                    "fixes_applied": issues
+                })
+
+                writer.update_order_status(order_id, status="RECOVERED", recovered=True)
+                event_log.info("recovered", status="RECOVERED")
+                processed_count += 1
+                recovered_count += 1
+                recovered_messages[order_id].append(message_id)
+                recovered_entries[message_id] = (issues, original)
+                catalog.add(record, "RECOVERED", issues, original)
+
+            except Exception as e:
+                event_log.error("failed", error=str(e))
+                span.error = {"type": type(e).__name__, "message": str(e)}
+                processed_count += 1
+                failed_count += 1
+                batch_item_failures.append({"itemIdentifier": record["messageId"]})
+                catalog.add(record, "FAILED", body=original, error=str(e))
+                failed = True
+            finally:
+                queue_latency.observe(record, time.perf_counter() - clock, failed, started)
+
+    writer.flush()
+    for order_id in writer.failed_order_ids:
+        for message_id in recovered_messages.get(order_id, ()):
+            recovered_count -= 1
+            failed_count += 1
+            batch_item_failures.append({"itemIdentifier": message_id})
+            catalog.add(records_by_id[message_id], "FAILED", *recovered_entries[message_id],
+                        error="DynamoDB write failed")
+            notifications.pop(message_id, None)
+    for message_id, (span, notification) in notifications.items():
         try:
-            body = json.loads(record["body"])
-            order_id = body.get("order_id", "Unknown")
-            correlation_id = body.get("correlation_id", "N/A")
-            
-            logger.info(f"\n⚠️ PROCESSING FAILED ORDER: {order_id} | Correlation: {correlation_id}")
-            
-            # Attempt to fix the order
-            fixed_body, issues = fix_order_data(body)
-            
-            if issues:
-                logger.info(f"   Issues found: {', '.join(issues)}")
-            
-            if fixed_body is None:
-                logger.error(f"   ❌ Cannot auto-fix order {order_id} - requires manual intervention")
-                logger.info("="*70 + "\n")
-                continue
-            
-            # If fixed, reprocess the order
-            logger.info(f"   ✅ Order fixed, reprocessing...")
-            
-            items = fixed_body.get("items", [])
-            promo_code = fixed_body.get("promo_code", "")
-            
-            # Calculate
-            logger.info(f"\n→ Step 1: calculate_order_total()")
-            subtotal = calculate_order_total(items)
-            logger.info(f"   Subtotal: ${subtotal}")
-            
-            logger.info(f"\n→ Step 2: apply_discount()")
-            final_total, discount_amount = apply_discount(subtotal, promo_code)
-            logger.info(f"   Discount: ${discount_amount} | Final: ${final_total}")
-            
-            # Build invoice
-            logger.info(f"\n→ Step 3: build_invoice()")
-            invoice = build_invoice(order_id, items, subtotal, discount_amount, final_total, promo_code)
-            invoice["correlation_id"] = correlation_id
-            invoice["recovered_from_dlq"] = True
-            invoice["dlq_fixes"] = issues
-            logger.info(f"   ✅ Invoice created")
-
-            # Save to S3
-            logger.info(f"\n→ Step 4: save_to_s3()")
-            key = f"{order_id}.json"
-            save_to_s3(BUCKET, key, invoice)
-
-            # Save to DynamoDB with RECOVERED status
-            logger.info(f"\n→ Step 5: save_order() to DynamoDB")
-            save_order(
-                order_id=order_id,
-                status="RECOVERED",
-                subtotal=subtotal,
-                discount_amount=discount_amount,
-                final_total=final_total,
-                items=items,
-                promo_code=promo_code,
-                recovered=True
-            )
-            logger.info(f"   ✅ Order saved to DynamoDB with RECOVERED status")
-
-            # Send notification
-            logger.info(f"\n→ Step 6: send_notification()")
-            send_notification(NOTIFICATION_QUEUE_URL, {
-                "order_id": order_id,
-                "correlation_id": correlation_id,
-                "status": "recovered_from_dlq",
-                "final_total": final_total,
-                "invoice_location": f"s3://{BUCKET}/{key}",
-                "fixes_applied": issues
-            })
-            
-            # Update DynamoDB status
-            logger.info(f"\n→ Step 6: update_order_status() in DynamoDB")
-            update_order_status(order_id, status="RECOVERED", recovered=True)
-            logger.info(f"   ✅ Order status updated to RECOVERED")
-            
-            logger.info(f"\n✅ ORDER {order_id} RECOVERED AND COMPLETED")
-            logger.info("="*70 + "\n")
-            processed_count += 1
-            recovered_count += 1
-            
+            with tracer.resume(span), metrics.timer("Step.send_notification"), tracer.span("Step.send_notification"):
+                send_notification(NOTIFICATION_QUEUE_URL, notification)
         except Exception as e:
-            logger.error(f"\n❌ ERROR processing DLQ message for {order_id}: {str(e)}")
-            logger.info("="*70 + "\n")
-            processed_count += 1
+            # Retried like a failed write: the RECOVERED item and the invoice are keyed by order_id
+            logger.error(f"❌ [{notification['order_id']}] Notification failed, retrying the record: {str(e)}")
+            recovered_count -= 1
             failed_count += 1
+            batch_item_failures.append({"itemIdentifier": message_id})
+            catalog.add(records_by_id[message_id], "FAILED", *recovered_entries[message_id],
+                        error=f"Notification failed: {str(e)}")
+    catalog.flush()
+    # Claim-checked payloads are kept for manual review and retries, deleted once recovered
+    failed_ids = {failure["itemIdentifier"] for failure in batch_item_failures}
+    release([records_by_id[message_id]["body"] for message_id in recovered_entries
+             if message_id not in failed_ids])
+    metrics.count("OrdersRecovered", recovered_count)
+    metrics.count("OrdersFailed", failed_count)
+    metrics.count("OrdersManualReview", total_messages - recovered_count - failed_count)
+    queue_latency.flush()
+    metrics.flush()
+    tracer.flush()
 
-    # Final DLQ Summary
-    logger.info("\n" + "="*70)
-    logger.info("📈 DLQ PROCESSING SUMMARY")
-    logger.info("="*70)
-    logger.info(f"   Total messages in batch: {total_messages}")
-    logger.info(f"   ✅ Successfully recovered: {recovered_count}")
-    logger.info(f"   ❌ Failed to recover: {failed_count}")
-    logger.info(f"   📊 Success rate: {(recovered_count/total_messages*100):.1f}%" if total_messages > 0 else "   📊 Success rate: N/A")
-    logger.info("="*70 + "\n")
+    event_log.info("summary", records=total_messages, recovered=recovered_count, failed=failed_count,
+                   success_rate=round(recovered_count / total_messages, 3) if total_messages else None)
+    log_parameter_metrics()
 
     return {
         "status": "dlq_processed",
         "total_messages": total_messages,
         "recovered": recovered_count,
-        "failed": failed_count
+        "failed": failed_count,
+        "batchItemFailures": batch_item_failures
     }
@@ -1,33 +1,77 @@
 # notification_lambda.py
+from app.cold_start import start_import_profiler, lazy_import
+
+# IMPORT_PROFILE=true records per-module import cost during init
+import_profiler = start_import_profiler()
+
 import json
 import logging
+import time
+
+from app.metrics import metrics
+from app.queue_metrics import QueueLatencyRecorder
+from app.tracing import LAMBDA_ORIGIN, trace_header, tracer
+
+# Only needed for oversized notifications; deferred until first use when LAZY_IMPORTS=true
+claim_check = lazy_import("app.claim_check")
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+if import_profiler:
+    import_profiler.stop()
+    import_profiler.log_report()
+
+# Queue age / retries / processing time per record, one metrics line per invocation
+queue_latency = QueueLatencyRecorder("notification_lambda")
+
+# Counters, one EMF line per invocation
+metrics.set_function("notification_lambda")
+
 def lambda_handler(event, context):
     logger.info("\n" + "="*70)
     logger.info("🔔 NOTIFICATION LAMBDA INVOKED")
     logger.info("="*70)
 
+    batch_item_failures = []
     for record in event["Records"]:
-        try:
-            body = json.loads(record["body"])
-            order_id = body.get("order_id", "Unknown")
-            correlation_id = body.get("correlation_id", "N/A")
-            status = body.get("status", "Unknown")
-            final_total = body.get("final_total", 0)
-            
-            logger.info(f"\n📧 NOTIFICATION RECEIVED:")
-            logger.info(f"   Order: {order_id} | Correlation: {correlation_id}")
-            logger.info(f"   Status: {status}")
-            logger.info(f"   Total: ${final_total}")
-            logger.info(f"\n✅ Notification processed")
-            logger.info("="*70 + "\n")
-            
-        except Exception as e:
-            logger.error(f"❌ Error: {str(e)}")
-            logger.info("="*70 + "\n")
-
-    return {"status": "notified"}
+        started, clock = time.time(), time.perf_counter()
+        failed = False
+        with tracer.start_trace("notification_lambda", trace_header(record), LAMBDA_ORIGIN) as span:
+            try:
+                body = json.loads(record["body"])
+                if "claim_check" in body:
+                    # Payload was too large for SQS: fetched from S3. It is not released here: nothing records
+                    # that a notification was delivered, so a redelivered one still needs it. The claim-check/
+                    # lifecycle rule (created with the bucket in notebook/poc.ipynb) expires it
+                    body = claim_check.resolve(body)
+                order_id = body.get("order_id", "Unknown")
+                correlation_id = body.get("correlation_id", "N/A")
+                status = body.get("status", "Unknown")
+                final_total = body.get("final_total", 0)
+                span.annotate(order_id=order_id, correlation_id=correlation_id)
+
+                logger.info(f"\n📧 NOTIFICATION RECEIVED:")
+                logger.info(f"   Order: {order_id} | Correlation: {correlation_id}")
+                logger.info(f"   Status: {status}")
+                logger.info(f"   Total: ${final_total}")
+                logger.info(f"\n✅ Notification processed")
+                logger.info("="*70 + "\n")
+
+            except Exception as e:
+                failed = True
+                # Retried: S3 / checksum errors on the payload must not drop the notification
+                batch_item_failures.append({"itemIdentifier": record["messageId"]})
+                span.error = {"type": type(e).__name__, "message": str(e)}
+                logger.error(f"❌ Error: {str(e)}")
+                logger.info("="*70 + "\n")
+            finally:
+                queue_latency.observe(record, time.perf_counter() - clock, failed, started)
+
+    metrics.count("NotificationsProcessed", len(event["Records"]) - len(batch_item_failures))
+    metrics.count("NotificationsFailed", len(batch_item_failures))
+    queue_latency.flush()
+    metrics.flush()
+    tracer.flush()
+    return {"status": "notified", "batchItemFailures": batch_item_failures}
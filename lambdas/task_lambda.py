@@ -1,11 +1,20 @@
 # task_lambda.py
+from app.cold_start import start_import_profiler
+
+# IMPORT_PROFILE=true records per-module import cost during init
+import_profiler = start_import_profiler()
+
 import json
 import os
 import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
-# Configure logging
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+# Configure logging: app/ modules log at INFO through the root logger; the
+# handler's own logger follows poc-log-level (app/event_log.py)
+logging.getLogger().setLevel(logging.INFO)
+logger = logging.getLogger("task_lambda")
 
 logger.info("📦 IMPORTING MODULES...")
 
@@ -17,108 +26,253 @@ from app.storage import save_to_s3
 
 from app.notifier import send_notification
 
+from app.claim_check import PayloadNotFound, already_processed, release, resolve
+
 from app.helpers.discount_calculator import calculate_bulk_discount, calculate_tax
 
-from app.parameter_store import get_cached_parameter
+from app.parameter_store import get_cached_parameter, prefetch_parameters, log_parameter_metrics
 
-from app.database import save_order
+# One GetParameters call during init instead of one get_parameter per name
+prefetch_parameters()
 
+from app.database import OrderWriter
+from app.event_log import event_log
+from app.metrics import metrics
+from app.queue_metrics import QueueLatencyRecorder
+from app.tracing import LAMBDA_ORIGIN, SpanBatch, trace_header, tracer
 
-def lambda_handler(event, context):
-    logger.info("\n" + "="*70)
-    logger.info("🚀 TASK LAMBDA INVOKED")
-    logger.info("="*70)
+# Queue age / retries / processing time per record, one metrics line per invocation
+queue_latency = QueueLatencyRecorder("task_lambda")
+
+# Counters and step/AWS-call timers, one EMF line per invocation
+metrics.set_function("task_lambda")
+
+# One JSON event per record stage, sampled per record (app/event_log.py)
+event_log.set_function("task_lambda", logger=logger)
+
+if import_profiler:
+    import_profiler.stop()
+    import_profiler.log_report()
+
+
+class RecordContextFilter(logging.Filter):
+    """
+    Tags plain log lines (including the ones from app/ modules) with the record
+    being processed, so interleaved output from concurrent workers stays attributable.
+    """
+
+    def filter(self, record):
+        scope = event_log.current()
+        if scope:
+            order_id = scope.context.get("order_id") or scope.context.get("message_id")
+            record.order_id = order_id
+            record.correlation_id = scope.context.get("correlation_id", "N/A")
+            if not getattr(record, "record_tagged", False):
+                record.msg = f"[{order_id}] {str(record.msg).lstrip()}"
+                record.record_tagged = True
+        return True
+
+
+def install_record_filter():
+    for handler in logging.getLogger().handlers:
+        if not any(isinstance(f, RecordContextFilter) for f in handler.filters):
+            handler.addFilter(RecordContextFilter())
+
+
+def get_worker_count():
+    """Records processed in parallel per invocation (TASK_LAMBDA_WORKERS, default 1 = sequential)"""
+    return max(1, int(os.environ.get("TASK_LAMBDA_WORKERS", "1")))
+
+
+def process_record(record, bucket, writer):
+    """
+    Processes one SQS record and returns (order_id, notification). Raises on failure.
+    The notification is sent by process_batch once the order's DynamoDB write has landed;
+    it is None for a redelivered record that was already processed.
+    """
+    # Large orders arrive as a claim check: the payload is fetched from S3 (cached per container)
+    envelope = json.loads(record["body"])
+    try:
+        body = resolve(envelope)
+    except PayloadNotFound:
+        # Released after a successful attempt whose message delete failed: nothing left to do
+        if not already_processed(envelope):
+            raise
+        event_log.current().bind(order_id=envelope.get("order_id"), correlation_id=envelope.get("correlation_id"))
+        event_log.info("already_processed")
+        return envelope.get("order_id"), None
+    order_id = body.get("order_id")
+    correlation_id = body.get("correlation_id", "N/A")
+    event_log.current().bind(order_id=order_id, correlation_id=correlation_id)
+    tracer.annotate(order_id=order_id, correlation_id=correlation_id)
+    items = body.get("items", [])
+    promo_code = body.get("promo_code", "")
+    event_log.info("received", items=len(items), promo_code=promo_code or None)
+
+    # Validate items (reject negative values - DLQ will fix them)
+    for item in items:
+        if item.get("price", 0) < 0 or item.get("quantity", 0) <= 0:
+            raise ValueError(f"Invalid item: {item['name']} has negative price or invalid quantity")
+
+    with metrics.timer("Step.calculate_order_total"), tracer.span("Step.calculate_order_total"):
+        subtotal = calculate_order_total(items)
+    with metrics.timer("Step.apply_discount"), tracer.span("Step.apply_discount"):
+        final_total, discount_amount = apply_discount(subtotal, promo_code)
+    event_log.info("priced", subtotal=subtotal, discount=discount_amount, final_total=final_total)
+
+    # Nested-module demo step: app/helpers/discount_calculator.py
+    bulk_discount = calculate_bulk_discount(subtotal)
+    tax = calculate_tax(final_total)
+
+    with metrics.timer("Step.build_invoice"), tracer.span("Step.build_invoice"):
+        invoice = build_invoice(order_id, items, subtotal, discount_amount, final_total, promo_code)
+    invoice["correlation_id"] = correlation_id
+    invoice["bulk_discount"] = bulk_discount
+    invoice["tax"] = tax
+    event_log.info("invoiced", bulk_discount=bulk_discount, tax=tax)
+
+    key = f"{order_id}.json"
+    with metrics.timer("Step.save_to_s3"), tracer.span("Step.save_to_s3"):
+        save_to_s3(bucket, key, invoice)
+    event_log.info("stored", invoice_location=f"s3://{bucket}/{key}")
+
+    # Buffered: the BatchWriteItem itself is timed as DynamoDB.BatchWriteItem
+    with metrics.timer("Step.save_order"), tracer.span("Step.save_order"):
+        writer.save_order(
+            order_id=order_id,
+            status="COMPLETED",
+            subtotal=subtotal,
+            discount_amount=discount_amount,
+            final_total=final_total,
+            items=items,
+            promo_code=promo_code,
+            recovered=False
+        )
+    event_log.info("order_queued", status="COMPLETED")
+
+    event_log.info("completed")
+    return order_id, {
+        "order_id": order_id,
+        "correlation_id": correlation_id,
+        "status": "processed",
+        "final_total": final_total,
+        "invoice_location": f"s3://{bucket}/{key}"
+    }
+
+
+def handle_record(record, bucket, writer, spans=None):
+    """
+    Runs process_record without raising. Returns (order_id, batch item failure
+    or None, notification or None, the record's trace span). spans: the
+    SpanBatch the record's trace is flushed with.
+    """
+    started, clock = time.time(), time.perf_counter()
+    failed = False
+    message_id = record.get("messageId", "Unknown")
+    span = tracer.start_trace("task_lambda", trace_header(record), LAMBDA_ORIGIN, batch=spans)
+    with span, event_log.record(message_id=message_id) as scope:
+        try:
+            order_id, notification = process_record(record, bucket, writer)
+            return order_id, None, notification, span
+        except Exception as e:
+            failed = True
+            span.error = {"type": type(e).__name__, "message": str(e)}
+            # Keeps every event of the record, whatever the sample rate
+            event_log.error("failed", error=str(e), action="retry_or_dlq")
+            order_id = scope.context.get("order_id") or scope.context["message_id"]
+            return order_id, {"itemIdentifier": record["messageId"]}, None, span
+        finally:
+            queue_latency.observe(record, time.perf_counter() - clock, failed, started)
+
+
+def notify(notification_queue_url, record, notification, span):
+    """Sends a processed order's notification in its record's trace; returns a batch item failure or None"""
+    try:
+        with tracer.resume(span), metrics.timer("Step.send_notification"), tracer.span("Step.send_notification"):
+            send_notification(notification_queue_url, notification)
+        return None
+    except Exception as e:
+        # The order is retried; its DynamoDB write and invoice are keyed by order_id, so redoing them is harmless
+        logger.error(f"❌ [{notification['order_id']}] Notification failed, retrying the record: {str(e)}")
+        return {"itemIdentifier": record["messageId"]}
+
+
+def process_batch(records, bucket, notification_queue_url, pool=None, release_payloads=True):
+    """
+    Processes a batch of SQS records and returns the batchItemFailures list.
+    Shared by lambda_handler and the long-polling worker (task_worker.py);
+    with a pool, records run concurrently on its threads. A caller that deletes
+    the messages itself passes release_payloads=False and releases the
+    claim-checked payloads of the ones it deleted.
+    """
+    # Level and sample rate can be changed in Parameter Store without a redeploy
+    event_log.refresh_config()
+
+    # Flushed only after the notifications resume the record spans; task_worker runs batches on several threads
+    spans = SpanBatch()
+
+    # DynamoDB writes are buffered and flushed with BatchWriteItem when the block exits
+    with OrderWriter() as writer:
+        if pool is not None:
+            install_record_filter()
+            # Overlap the blocking S3/DynamoDB/SQS calls of different records
+            results = list(pool.map(lambda record: handle_record(record, bucket, writer, spans), records))
+        else:
+            results = [handle_record(record, bucket, writer, spans) for record in records]
     
+    # Only failed message IDs go back to the queue (ReportBatchItemFailures)
+    batch_item_failures = [failure for _, failure, _, _ in results if failure]
+    
+    # Orders whose DynamoDB write never landed are retried too, with every message
+    # of the batch that carried the order (a resent order arrives under a new messageId)
+    message_ids = defaultdict(list)
+    for record, (order_id, failure, _, _) in zip(records, results):
+        if not failure:
+            message_ids[order_id].append(record["messageId"])
+    for order_id in writer.failed_order_ids:
+        batch_item_failures += [{"itemIdentifier": message_id} for message_id in message_ids.get(order_id, ())]
+
+    # Customers are only notified once their order is in DynamoDB, so a retried write
+    # does not notify them twice
+    unwritten = set(writer.failed_order_ids)
+    pending = [(record, notification, span) for record, (order_id, failure, notification, span) in zip(records, results)
+               if notification is not None and order_id not in unwritten]
+    send = pool.map if pool is not None else map
+    batch_item_failures += [failure for failure in send(lambda args: notify(notification_queue_url, *args), pending)
+                            if failure]
+
+    # Claim-checked payloads of the orders that made it are no longer needed;
+    # retried ones keep theirs for the next attempt or the DLQ
+    if release_payloads:
+        failed_ids = {failure["itemIdentifier"] for failure in batch_item_failures}
+        release([record["body"] for record in records if record["messageId"] not in failed_ids])
+    metrics.count("OrdersProcessed", len(records) - len(batch_item_failures))
+    metrics.count("OrdersFailed", len(batch_item_failures))
+    queue_latency.flush()
+    metrics.flush()
+    tracer.flush(spans)
+    return batch_item_failures
+
+
+def lambda_handler(event, context):
+    event_log.info("invoked", records=len(event.get("Records", [])))
+
     # Get values from Parameter Store
     BUCKET = get_cached_parameter("poc-results-bucket-name")
     NOTIFICATION_QUEUE_URL = get_cached_parameter("poc-notification-queue-url")
     
-    for record in event.get("Records", []):
-        order_id = "Unknown"
-        correlation_id = "N/A"
-        try:
-            body = json.loads(record["body"])
-            order_id = body.get("order_id")
-            correlation_id = body.get("correlation_id", "N/A")
-            items = body.get("items", [])
-            promo_code = body.get("promo_code", "")
-            
-            logger.info(f"\n📦 ORDER: {order_id} | Correlation: {correlation_id}")
-            logger.info(f"   Items: {len(items)} | Promo: {promo_code or 'None'}")
-            
-            # Validate items (reject negative values - DLQ will fix them)
-            for item in items:
-                if item.get("price", 0) < 0 or item.get("quantity", 0) <= 0:
-                    raise ValueError(f"Invalid item: {item['name']} has negative price or invalid quantity")
-            
-            # Calculate
-            logger.info(f"\n→ Step 1: calculate_order_total()")
-            subtotal = calculate_order_total(items)
-            logger.info(f"   Subtotal: ${subtotal}")
-            
-            logger.info(f"\n→ Step 2: apply_discount()")
-            final_total, discount_amount = apply_discount(subtotal, promo_code)
-            logger.info(f"   Discount: ${discount_amount} | Final: ${final_total}")
-            
-            # TEST: Use nested folder function
-            logger.info(f"\n➡️ Step 2.5: TESTING NESTED MODULE ACCESS")
-            logger.info(f"   📂 Calling: app/helpers/discount_calculator.py")
-            logger.info(f"   📂 Module path: app.helpers.discount_calculator")
-            
-            bulk_discount = calculate_bulk_discount(subtotal)
-            tax = calculate_tax(final_total)
-            
-            logger.info(f"   ✅ NESTED MODULE ACCESS SUCCESSFUL!")
-            logger.info(f"   📊 Results: Bulk Discount=${bulk_discount:.2f}, Tax=${tax:.2f}")
-            
-            # Build invoice
-            logger.info(f"\n→ Step 3: build_invoice()")
-            invoice = build_invoice(order_id, items, subtotal, discount_amount, final_total, promo_code)
-            invoice["correlation_id"] = correlation_id
-            invoice["bulk_discount"] = bulk_discount
-            invoice["tax"] = tax
-            logger.info(f"   ✅ Invoice created")
-
-            # Save to S3
-            logger.info(f"\n→ Step 4: save_to_s3()")
-            key = f"{order_id}.json"
-            save_to_s3(BUCKET, key, invoice)
-
-            # Save to DynamoDB
-            logger.info(f"\n→ Step 5: save_order() to DynamoDB")
-            save_order(
-                order_id=order_id,
-                status="COMPLETED",
-                subtotal=subtotal,
-                discount_amount=discount_amount,
-                final_total=final_total,
-                items=items,
-                promo_code=promo_code,
-                recovered=False
-            )
-            logger.info(f"   ✅ Order saved to DynamoDB")
-
-            # Send notification
-            logger.info(f"\n→ Step 6: send_notification()")
-            send_notification(NOTIFICATION_QUEUE_URL, {
-                "order_id": order_id,
-                "correlation_id": correlation_id,
-                "status": "processed",
-                "final_total": final_total,
-                "invoice_location": f"s3://{BUCKET}/{key}"
-            })
-            
-            logger.info(f"\n✅ ORDER {order_id} COMPLETED")
-            logger.info("="*70 + "\n")
-            
-        except Exception as e:
-            logger.error(f"\n❌ ERROR processing {order_id}: {str(e)}")
-            logger.error(f"   Order will be retried or moved to DLQ")
-            logger.info("="*70 + "\n")
-            raise  # Re-raise to trigger retry/DLQ
-
-    return {"status": "success"}
+    records = event.get("Records", [])
+    workers = min(get_worker_count(), len(records)) or 1
+    
+    if workers > 1:
+        # Opt-in: TASK_LAMBDA_WORKERS records in parallel per invocation
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            batch_item_failures = process_batch(records, BUCKET, NOTIFICATION_QUEUE_URL, pool)
+    else:
+        batch_item_failures = process_batch(records, BUCKET, NOTIFICATION_QUEUE_URL)
 
+    log_parameter_metrics()
+    return {"status": "success", "batchItemFailures": batch_item_failures}
 
 
 
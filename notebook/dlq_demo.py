@@ -2,6 +2,7 @@
 
 import time
 import json
+from app.storage import decode_s3_object
 
 # Step 1: Configure fast retries
 sqs.set_queue_attributes(QueueUrl=TASK_QUEUE_URL, Attributes={'VisibilityTimeout': '5'})
@@ -27,7 +28,7 @@ time.sleep(20)
 print(f"\n📥 Fetching recovered invoice from S3...")
 try:
     response = s3.get_object(Bucket=BUCKET_NAME, Key=f"{order_id}.json")
-    invoice = json.loads(response['Body'].read())
+    invoice = decode_s3_object(response)
     
     print(f"✅ SUCCESS - Order recovered by DLQ!")
     print(f"\n📄 Invoice Details:")
@@ -0,0 +1,41 @@
+"""
+Queue-age percentile view across task-queue, notification-queue and
+dlq-queue, merged from the queue_latency lines the handlers log once per
+invocation (app/queue_metrics.py).
+
+Per queue it reports records, retry rate and p50/p95/p99/max of:
+  queue_age_ms            sent -> processing started, including earlier attempts
+  first_receive_delay_ms  sent -> first receive (time spent waiting in the queue)
+  processing_ms           handler time per record
+
+Reads log files or stdin, e.g. exported CloudWatch Logs:
+
+  aws logs filter-log-events --log-group-name /aws/lambda/task_lambda \\
+      --filter-pattern '"queue_latency"' --query 'events[].message' --output text | python queue_latency_report.py
+
+Usage: python queue_latency_report.py [log files ...] [--output view.json]
+"""
+
+import argparse
+import fileinput
+import json
+
+from app.queue_metrics import parse_metric_lines, queue_age_view
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="log files (default: stdin)")
+    parser.add_argument("--output", help="also write the view to this JSON file")
+    args = parser.parse_args()
+
+    with fileinput.input(files=args.files or ("-",)) as lines:
+        view = queue_age_view(parse_metric_lines(lines))
+    print(json.dumps(view, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(view, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
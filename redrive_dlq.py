@@ -0,0 +1,49 @@
+"""
+Bulk DLQ redrive: drains dlq-queue with parallel long-poll receivers,
+repairs each batch with fix_order_data, resubmits the repaired orders to
+task-queue with SendMessageBatch and deletes the originals with
+DeleteMessageBatch. task_lambda then reprocesses them like new orders.
+
+Messages that cannot be repaired stay in the DLQ and are counted by reason.
+--dry-run receives and repairs without sending or deleting anything, then
+makes every message visible again.
+
+Usage: python redrive_dlq.py [--receivers 4] [--max-messages 1000] [--rate-limit 200] [--dry-run]
+"""
+
+import argparse
+import json
+import logging
+
+from app.redrive import redrive_dlq
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--receivers", type=int, default=4, help="parallel long-poll receivers")
+    parser.add_argument("--max-messages", type=int, help="stop after this many messages (default: drain)")
+    parser.add_argument("--rate-limit", type=float, help="max resubmitted messages/sec")
+    parser.add_argument("--max-seconds", type=float, help="stop receiving after this long")
+    parser.add_argument("--resubmit-unchanged", action="store_true",
+                        help="also resubmit orders fix_order_data finds nothing wrong with (transient failures)")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    if args.rate_limit is not None and args.rate_limit <= 0:
+        parser.error("--rate-limit must be greater than 0")
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    report = redrive_dlq(
+        receivers=args.receivers,
+        max_messages=args.max_messages,
+        rate_limit=args.rate_limit,
+        max_seconds=args.max_seconds,
+        resubmit_unchanged=args.resubmit_unchanged,
+        dry_run=args.dry_run,
+    )
+    print(json.dumps(report))
+    if report["errors"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""
+Long-running task-queue consumer for container deployments: the same
+processing as task_lambda (task_lambda.process_batch), without the Lambda
+event source mapping in front of it.
+
+- Each process long-polls task-queue (20s waits, 10 messages per receive)
+  from a few receiver threads. Records are processed on a per-process thread
+  pool.
+- Messages still being processed get their visibility extended in the
+  background, so slow orders are not redelivered to another worker midway.
+- Successful messages are deleted with DeleteMessageBatch, and only then are
+  their claim-checked payloads released, so a message that could not be
+  deleted is redelivered with its payload intact. Failed ones are left to
+  reappear after the visibility timeout, and the queue's RedrivePolicy moves
+  them to the DLQ exactly as with the Lambda.
+- The supervisor sizes the process count from the queue depth
+  (ApproximateNumberOfMessages / --backlog-per-process, clamped to
+  [--min-processes, --max-processes]).
+- SIGTERM/SIGINT stops receiving. In-flight batches finish and are deleted
+  before the processes exit.
+
+Usage: python task_worker.py [--min-processes 1] [--max-processes 4] [--threads 10] [--backlog-per-process 200]
+"""
+
+import argparse
+import importlib
+import logging
+import math
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.claim_check import release
+from app.config import get_aws_client
+from app.parameter_store import get_cached_parameter
+
+LAMBDAS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lambdas")
+MAX_MESSAGES = 10
+WAIT_TIME_SECONDS = 20
+VISIBILITY_TIMEOUT_SECONDS = 30
+
+logger = logging.getLogger("task_worker")
+
+
+def load_task_lambda():
+    """task_lambda as the Lambda zip exposes it; importing it prefetches Parameter Store values"""
+    if LAMBDAS_DIR not in sys.path:
+        sys.path.insert(0, LAMBDAS_DIR)
+    return importlib.import_module("task_lambda")
+
+
+def to_record(message, queue_arn):
+    """ReceiveMessage output in the shape of a Lambda SQS event record"""
+    return {
+        "messageId": message["MessageId"],
+        "receiptHandle": message["ReceiptHandle"],
+        "body": message["Body"],
+        "attributes": message.get("Attributes", {}),
+        "messageAttributes": message.get("MessageAttributes", {}),
+        "eventSource": "aws:sqs",
+        "eventSourceARN": queue_arn,
+    }
+
+
+def desired_processes(depth, backlog_per_process, min_processes, max_processes):
+    """Process count for a queue depth: one process per backlog_per_process visible messages"""
+    return max(min_processes, min(max_processes, math.ceil(depth / backlog_per_process)))
+
+
+class VisibilityExtender:
+    """
+    Keeps received messages invisible while they are being processed. Every
+    visibility_timeout / 3 seconds, handles held at least that long get a
+    fresh visibility_timeout through ChangeMessageVisibilityBatch.
+    """
+
+    def __init__(self, sqs, queue_url, visibility_timeout):
+        self.sqs = sqs
+        self.queue_url = queue_url
+        self.visibility_timeout = visibility_timeout
+        self.interval = visibility_timeout / 3
+        self.extended = 0
+        self._held = {}  # receipt handle -> time of last receive/extension
+        self._lock = threading.Lock()
+
+    def track(self, messages):
+        now = time.monotonic()
+        with self._lock:
+            for message in messages:
+                self._held[message["ReceiptHandle"]] = now
+
+    def release(self, messages):
+        with self._lock:
+            for message in messages:
+                self._held.pop(message["ReceiptHandle"], None)
+
+    def extend_due(self):
+        now = time.monotonic()
+        with self._lock:
+            due = [handle for handle, since in self._held.items() if now - since >= self.interval]
+        for offset in range(0, len(due), MAX_MESSAGES):
+            chunk = due[offset:offset + MAX_MESSAGES]
+            try:
+                response = self.sqs.change_message_visibility_batch(
+                    QueueUrl=self.queue_url,
+                    Entries=[{"Id": str(index), "ReceiptHandle": handle, "VisibilityTimeout": self.visibility_timeout}
+                             for index, handle in enumerate(chunk)]
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Visibility extension failed: {str(e)}")
+                continue
+            with self._lock:
+                for entry in response.get("Successful", []):
+                    handle = chunk[int(entry["Id"])]
+                    if handle in self._held:
+                        self._held[handle] = now
+                        self.extended += 1
+
+    def run(self, stop):
+        while not stop.wait(self.interval):
+            self.extend_due()
+
+
+class TaskWorker:
+    """
+    One worker process: receiver threads feeding a shared thread pool.
+    run(stop) blocks until stop is set and in-flight batches are finished.
+    """
+
+    def __init__(self, queue_url=None, threads=10, receivers=None, wait_seconds=WAIT_TIME_SECONDS,
+                 visibility_timeout=VISIBILITY_TIMEOUT_SECONDS):
+        self.task_lambda = load_task_lambda()
+        self.queue_url = queue_url or get_cached_parameter("poc-task-queue-url")
+        self.bucket = get_cached_parameter("poc-results-bucket-name")
+        self.notification_queue_url = get_cached_parameter("poc-notification-queue-url")
+        self.threads = threads
+        # Enough outstanding batches to keep every pool thread busy, plus one receiving ahead
+        self.receivers = receivers or math.ceil(threads / MAX_MESSAGES) + 1
+        self.wait_seconds = wait_seconds
+        self.visibility_timeout = visibility_timeout
+        self.sqs = get_aws_client("sqs")
+        self.queue_arn = self.sqs.get_queue_attributes(
+            QueueUrl=self.queue_url, AttributeNames=["QueueArn"]
+        )["Attributes"]["QueueArn"]
+        self.extender = VisibilityExtender(self.sqs, self.queue_url, visibility_timeout)
+        self.stats = {"batches": 0, "received": 0, "succeeded": 0, "failed": 0, "empty_receives": 0,
+                      "delete_failures": 0}
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def run(self, stop):
+        self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="order")
+        extender_stop = threading.Event()
+        extender = threading.Thread(target=self.extender.run, args=(extender_stop,), daemon=True)
+        extender.start()
+        receivers = [threading.Thread(target=self._receive_loop, args=(stop,), name=f"receiver-{index}")
+                     for index in range(self.receivers)]
+        for thread in receivers:
+            thread.start()
+        for thread in receivers:
+            thread.join()
+        extender_stop.set()
+        extender.join()
+        self._pool.shutdown(wait=True)
+        return {**self.stats, "visibility_extensions": self.extender.extended}
+
+    def _receive_loop(self, stop):
+        while not stop.is_set():
+            try:
+                messages = self.sqs.receive_message(
+                    QueueUrl=self.queue_url,
+                    MaxNumberOfMessages=MAX_MESSAGES,
+                    WaitTimeSeconds=self.wait_seconds,
+                    VisibilityTimeout=self.visibility_timeout,
+                    AttributeNames=["All"],
+                    MessageAttributeNames=["All"]
+                ).get("Messages", [])
+            except Exception as e:
+                logger.error(f"❌ ReceiveMessage failed: {str(e)}")
+                stop.wait(1)
+                continue
+            if not messages:
+                with self._lock:
+                    self.stats["empty_receives"] += 1
+                continue
+            self.process(messages)
+
+    def process(self, messages):
+        """Runs one received batch through task_lambda.process_batch and deletes the successes"""
+        self.extender.track(messages)
+        try:
+            failures = self.task_lambda.process_batch(
+                [to_record(message, self.queue_arn) for message in messages],
+                self.bucket, self.notification_queue_url, self._pool, release_payloads=False
+            )
+            failed_ids = {failure["itemIdentifier"] for failure in failures}
+        except Exception as e:
+            logger.error(f"❌ Batch failed, leaving {len(messages)} messages for redelivery: {str(e)}")
+            failed_ids = {message["MessageId"] for message in messages}
+        finally:
+            self.extender.release(messages)
+
+        succeeded = [message for message in messages if message["MessageId"] not in failed_ids]
+        undeleted = self.delete(succeeded)
+        # Claim-checked payloads go only once their message is gone; an undeleted one comes back and needs its own
+        undeleted_ids = {message["MessageId"] for message in undeleted}
+        release([message["Body"] for message in succeeded if message["MessageId"] not in undeleted_ids])
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["received"] += len(messages)
+            self.stats["succeeded"] += len(succeeded)
+            self.stats["failed"] += len(failed_ids)
+            self.stats["delete_failures"] += len(undeleted)
+
+    def delete(self, messages, attempts=2):
+        """DeleteMessageBatch with one retry for failed entries; returns the messages that could not be deleted"""
+        pending = list(messages)
+        for _ in range(attempts):
+            if not pending:
+                return []
+            try:
+                response = self.sqs.delete_message_batch(
+                    QueueUrl=self.queue_url,
+                    Entries=[{"Id": str(index), "ReceiptHandle": message["ReceiptHandle"]}
+                             for index, message in enumerate(pending)]
+                )
+                pending = [pending[int(entry["Id"])] for entry in response.get("Failed", [])]
+            except Exception as e:
+                logger.warning(f"⚠️ DeleteMessageBatch failed: {str(e)}")
+        if pending:
+            # Processed but not deleted: they will be redelivered and rewritten idempotently
+            logger.warning(f"⚠️ {len(pending)} processed messages could not be deleted")
+        return pending
+
+
+# Worker processes start from a fresh interpreter. A fork would copy the supervisor's
+# pooled boto3 clients (their keep-alive sockets shared with the child) and locks held
+# by background threads (parameter refresh, promo version check) that do not survive it
+_mp = multiprocessing.get_context("spawn")
+
+
+def _run_process(stop, options):
+    # The supervisor owns shutdown; children only watch their stop event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(message)s")
+    stats = TaskWorker(**options).run(stop)
+    logger.info(f"🛑 Worker stopped: {stats}")
+
+
+class WorkerSupervisor:
+    """Starts and stops worker processes to follow the task-queue depth"""
+
+    def __init__(self, min_processes=1, max_processes=4, backlog_per_process=200, scale_interval=15.0,
+                 **worker_options):
+        self.min_processes = min_processes
+        self.max_processes = max_processes
+        self.backlog_per_process = backlog_per_process
+        self.scale_interval = scale_interval
+        self.worker_options = worker_options
+        self.queue_url = worker_options.get("queue_url") or get_cached_parameter("poc-task-queue-url")
+        self.worker_options["queue_url"] = self.queue_url
+        self._workers = []  # (process, stop event)
+        self._stop = threading.Event()
+
+    def queue_depth(self):
+        attributes = get_aws_client("sqs").get_queue_attributes(
+            QueueUrl=self.queue_url, AttributeNames=["ApproximateNumberOfMessages"]
+        )["Attributes"]
+        return int(attributes.get("ApproximateNumberOfMessages", 0))
+
+    def scale_to(self, target):
+        self._workers = [(process, stop) for process, stop in self._workers if process.is_alive()]
+        while len(self._workers) < target:
+            stop = _mp.Event()
+            process = _mp.Process(target=_run_process, args=(stop, self.worker_options))
+            process.start()
+            self._workers.append((process, stop))
+            logger.info(f"📈 Started worker {process.pid} ({len(self._workers)} running)")
+        if len(self._workers) > target:
+            # Scale in one process per interval so a brief dip does not drain the fleet
+            process, stop = self._workers.pop()
+            stop.set()
+            logger.info(f"📉 Stopping worker {process.pid} ({len(self._workers)} running)")
+
+    def run(self):
+        signal.signal(signal.SIGTERM, lambda *_: self._stop.set())
+        signal.signal(signal.SIGINT, lambda *_: self._stop.set())
+        self.scale_to(self.min_processes)
+        while not self._stop.is_set():
+            try:
+                depth = self.queue_depth()
+                self.scale_to(desired_processes(depth, self.backlog_per_process,
+                                                self.min_processes, self.max_processes))
+            except Exception as e:
+                logger.error(f"❌ Scaling check failed: {str(e)}")
+            self._stop.wait(self.scale_interval)
+
+        logger.info(f"🛑 Shutting down {len(self._workers)} workers")
+        for _, stop in self._workers:
+            stop.set()
+        for process, _ in self._workers:
+            process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-processes", type=int, default=int(os.environ.get("TASK_WORKER_MIN_PROCESSES", "1")))
+    parser.add_argument("--max-processes", type=int,
+                        default=int(os.environ.get("TASK_WORKER_MAX_PROCESSES", str(os.cpu_count() or 1))))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("TASK_WORKER_THREADS", "10")),
+                        help="record threads per process")
+    parser.add_argument("--backlog-per-process", type=int,
+                        default=int(os.environ.get("TASK_WORKER_BACKLOG_PER_PROCESS", "200")),
+                        help="visible messages per running process before scaling out")
+    parser.add_argument("--scale-interval", type=float, default=15.0, help="seconds between depth checks")
+    parser.add_argument("--visibility-timeout", type=int, default=VISIBILITY_TIMEOUT_SECONDS)
+    parser.add_argument("--queue-url", help="defaults to the poc-task-queue-url parameter")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(message)s")
+    WorkerSupervisor(
+        min_processes=args.min_processes,
+        max_processes=max(args.min_processes, args.max_processes),
+        backlog_per_process=args.backlog_per_process,
+        scale_interval=args.scale_interval,
+        queue_url=args.queue_url,
+        threads=args.threads,
+        visibility_timeout=args.visibility_timeout,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ import boto3
 import json
 import time
 from api.auth import create_token, verify_token
+from app.storage import decode_s3_object
 
 ENDPOINT_URL = "http://localhost:4566"
 REGION = "us-east-1"
@@ -65,7 +66,7 @@ time.sleep(10)
 print("\n✅ Step 5: Verify Processing Result")
 try:
     obj = s3.get_object(Bucket="results-bucket", Key=f"{order_id}.json")
-    invoice = json.loads(obj['Body'].read())
+    invoice = decode_s3_object(obj)
     
     print(f"   ✅ Invoice Created Successfully!")
     print(f"   Order ID: {invoice['order_id']}")
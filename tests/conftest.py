@@ -0,0 +1,17 @@
+"""Shared fixtures: the in-memory AWS stand-ins from benchmarks/local_aws.py behind get_aws_client()"""
+import pytest
+
+from app import config, parameter_store
+from app.claim_check import payload_cache
+from app.database import order_cache
+from benchmarks.local_aws import LocalAWS
+
+
+@pytest.fixture
+def aws():
+    local = LocalAWS().install()
+    yield local
+    config.reset_clients()
+    parameter_store.parameter_cache.clear()
+    payload_cache.clear()
+    order_cache.clear()
@@ -0,0 +1,121 @@
+"""
+Claim-check (app/claim_check.py) on the in-memory S3 and DynamoDB: the
+threshold boundary, checksum verification, redeliveries after release and
+DeleteObjects chunking.
+"""
+import json
+
+import pytest
+
+from app import claim_check, database
+from app.claim_check import MAX_DELETE_KEYS, PayloadNotFound, already_processed, check_in, release, resolve
+
+BUCKET = "results-bucket"
+THRESHOLD = 1000
+ORDER = {"order_id": "ORD-1", "correlation_id": "corr-1"}
+
+
+def message_of_size(size):
+    """ORDER padded so that its JSON body is exactly size bytes"""
+    padded = dict(ORDER, padding="")
+    padded["padding"] = "x" * (size - len(json.dumps(padded)))
+    return padded
+
+
+def send(message, threshold=THRESHOLD):
+    return json.loads(check_in(json.dumps(message), message, threshold=threshold))
+
+
+def stored_keys(aws):
+    return [key for bucket, key in aws.s3.objects if key.startswith(claim_check.KEY_PREFIX)]
+
+
+def test_body_at_the_threshold_stays_inline(aws):
+    message = message_of_size(THRESHOLD)
+    assert send(message) == message
+    assert stored_keys(aws) == []
+
+
+def test_body_over_the_threshold_is_checked_in(aws):
+    message = message_of_size(THRESHOLD + 1)
+    envelope = send(message)
+
+    pointer = envelope.pop("claim_check")
+    assert envelope == ORDER
+    assert pointer["bucket"] == BUCKET and pointer["size"] == THRESHOLD + 1
+    assert stored_keys(aws) == [pointer["key"]]
+    assert resolve(dict(envelope, claim_check=pointer)) == message
+
+
+@pytest.mark.parametrize("characters, checked_in", [(THRESHOLD // 4, False), (THRESHOLD // 4 + 1, True)])
+def test_threshold_counts_utf8_bytes_not_characters(aws, characters, checked_in):
+    # Four UTF-8 bytes per character: past the length fast path, the encoded size decides
+    body = "\U0001F4E6" * characters
+    assert (check_in(body, ORDER, threshold=THRESHOLD) != body) is checked_in
+
+
+def test_tampered_payload_is_rejected(aws):
+    envelope = send(message_of_size(THRESHOLD * 2))
+    key = (BUCKET, envelope["claim_check"]["key"])
+    data, meta = aws.s3.objects[key]
+    aws.s3.objects[key] = (data[:-1] + bytes([data[-1] ^ 1]), meta)
+
+    with pytest.raises(ValueError, match="checksum mismatch"):
+        resolve(envelope)
+
+
+def test_pointer_with_a_different_checksum_is_rejected(aws):
+    envelope = send(message_of_size(THRESHOLD * 2))
+    envelope["claim_check"]["sha256"] = "0" * 64
+    with pytest.raises(ValueError):
+        resolve(envelope)
+
+
+def test_redelivery_after_release_is_already_processed(aws):
+    message = message_of_size(THRESHOLD * 2)
+    envelope = send(message)
+    assert resolve(envelope) == message
+    database.save_order("ORD-1", "COMPLETED", 10, 0, 10, [])
+
+    assert release([json.dumps(envelope)]) == [envelope["claim_check"]["key"]]
+    assert stored_keys(aws) == []
+    # release() also drops the cached copy, so the redelivery sees the object is gone
+    with pytest.raises(PayloadNotFound):
+        resolve(envelope)
+    assert already_processed(envelope)
+
+
+@pytest.mark.parametrize("status", ["FAILED", None])
+def test_released_payload_of_an_unfinished_order_is_not_processed(aws, status):
+    envelope = send(message_of_size(THRESHOLD * 2))
+    if status:
+        database.save_order("ORD-1", status, 10, 0, 10, [])
+    release([envelope])
+    assert not already_processed(envelope)
+
+
+def test_release_deletes_in_chunks_of_1000_keys(aws):
+    bodies = []
+    for index in range(2 * MAX_DELETE_KEYS + 500):
+        key = f"{claim_check.KEY_PREFIX}{index}.json.gz"
+        aws.s3.put_object(Bucket=BUCKET, Key=key, Body=b"{}")
+        bodies.append({"order_id": f"ORD-{index}", "claim_check": {"bucket": BUCKET, "key": key}})
+    # Inline bodies and unparseable strings are skipped
+    bodies += [json.dumps(ORDER), '{"claim_check": ']
+
+    deleted = release(bodies)
+
+    assert aws.calls["s3.delete_objects"] == 3
+    assert len(deleted) == len(set(deleted)) == 2 * MAX_DELETE_KEYS + 500
+    assert stored_keys(aws) == []
+
+
+def test_release_failure_is_logged_not_raised(aws, monkeypatch):
+    envelope = send(message_of_size(THRESHOLD * 2))
+
+    def failing_delete(**kwargs):
+        raise RuntimeError("access denied")
+
+    monkeypatch.setattr(aws.s3, "delete_objects", failing_delete)
+    assert release([envelope]) == []
+    assert stored_keys(aws) == [envelope["claim_check"]["key"]]
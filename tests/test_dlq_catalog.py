@@ -0,0 +1,107 @@
+"""
+DLQ catalog (app/dlq_catalog.py) on the in-memory DynamoDB: cursor
+validation, entries created once per message, counters that only count
+created entries, and FAILED entries keeping their signature.
+"""
+import base64
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from app import dlq_catalog
+from app.dlq_catalog import DLQCatalog, browse_request, decode_cursor, encode_cursor
+
+TABLE = "dlq-catalog"
+BAD_ORDER = {"order_id": "ORD-1", "correlation_id": "corr-1",
+             "items": [{"name": "Widget", "price": -5.0, "quantity": 1}]}
+
+
+def dlq_record(message_id="msg-1", body=BAD_ORDER, receive_count="3"):
+    return {"messageId": message_id, "body": json.dumps(body),
+            "attributes": {"ApproximateReceiveCount": receive_count}}
+
+
+def entry(aws, message_id="msg-1"):
+    return dlq_catalog.parse_catalog_item(aws.dynamodb.tables[TABLE][message_id])
+
+
+def flush(*additions, at=None):
+    catalog = DLQCatalog(table_name=TABLE)
+    for record, status, kwargs in additions:
+        catalog.add(record, status, at=at, **kwargs)
+    return catalog.flush()
+
+
+def test_cursor_round_trips_for_its_index():
+    key = {"message_id": {"S": "msg-1"}, "signature": {"S": "negative_price"},
+           "dead_lettered_at": {"S": "2026-01-01T00:00:00.000Z"}}
+    assert decode_cursor(encode_cursor(key), "signature-index") == key
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64 at all!",
+    base64.urlsafe_b64encode(b"{not json").decode(),
+    encode_cursor(["message_id"]),
+    # Table cursor replayed against an index, and an index cursor against the table
+    encode_cursor({"message_id": {"S": "msg-1"}}),
+    # Tampered: extra attribute, non-string value, empty value
+    encode_cursor({"message_id": {"S": "msg-1"}, "order_id": {"S": "ORD-1"},
+                   "dead_lettered_at": {"S": "x"}, "status": {"S": "FAILED"}}),
+    encode_cursor({"message_id": {"N": "1"}, "order_id": {"S": "ORD-1"}, "dead_lettered_at": {"S": "x"}}),
+    encode_cursor({"message_id": {"S": ""}, "order_id": {"S": "ORD-1"}, "dead_lettered_at": {"S": "x"}}),
+])
+def test_bad_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        browse_request(TABLE, order_id="ORD-1", cursor=cursor)
+
+
+def test_index_cursor_is_rejected_by_a_table_scan():
+    cursor = encode_cursor({"message_id": {"S": "msg-1"}, "order_id": {"S": "ORD-1"}, "dead_lettered_at": {"S": "x"}})
+    with pytest.raises(ValueError):
+        browse_request(TABLE, cursor=cursor)
+
+
+def test_redelivered_message_is_counted_once(aws):
+    first = datetime(2026, 1, 1, 10, 30, tzinfo=timezone.utc)
+    stats = flush((dlq_record(), "FAILED", {"error": "S3 timeout"}), at=first)
+    assert stats["created"] == 1
+
+    # Same message again an hour later, with a higher receive count: updated in place, not counted
+    stats = flush((dlq_record(receive_count="4"), "RECOVERED", {"fixes": ["Fixed negative price for Widget"]}),
+                  at=datetime(2026, 1, 1, 11, 45, tzinfo=timezone.utc))
+    assert stats == {"items": 1, "created": 0, "counter_updates": 0}
+
+    stored = entry(aws)
+    assert stored["status"] == "RECOVERED" and stored["receive_count"] == 4
+    assert stored["dead_lettered_at"].startswith("2026-01-01T10:30")
+    assert dlq_catalog.get_counts() == {"total_indexed": 1, "by_signature": {"negative_price": 1},
+                                        "by_hour": {"2026-01-01T10": 1}}
+
+
+def test_duplicates_within_one_invocation_keep_the_latest_outcome(aws):
+    stats = flush((dlq_record(), "FAILED", {"error": "boom"}), (dlq_record(), "RECOVERED", {}),
+                  (dlq_record("msg-2"), "MANUAL_REVIEW", {}))
+    assert stats["created"] == 2
+    assert entry(aws)["status"] == "RECOVERED"
+    assert dlq_catalog.get_counts()["by_signature"] == {"negative_price": 2}
+
+
+def test_failed_entry_keeps_signature_and_error(aws):
+    flush((dlq_record(), "FAILED", {"error": "DynamoDB throttled"}))
+    stored = entry(aws)
+    assert stored["signature"] == "negative_price"
+    assert stored["error"] == "DynamoDB throttled"
+    assert stored["order_id"] == "ORD-1" and stored["correlation_id"] == "corr-1"
+
+    # A later successful attempt clears the error and keeps the signature it was counted under
+    flush((dlq_record(), "RECOVERED", {}))
+    stored = entry(aws)
+    assert stored["signature"] == "negative_price" and stored["error"] is None
+
+
+def test_failed_claim_checked_entry_is_signed_from_the_order(aws):
+    envelope = {"order_id": "ORD-1", "claim_check": {"bucket": "b", "key": "claim-check/x.json.gz"}}
+    flush((dlq_record(body=envelope), "FAILED", {"body": BAD_ORDER, "error": "boom"}))
+    stored = entry(aws)
+    assert stored["signature"] == "negative_price" and stored["body"] == envelope
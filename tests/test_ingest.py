@@ -0,0 +1,148 @@
+"""
+Bulk ingestion (ingest_orders.py) on the in-memory SQS: resuming an
+interrupted run from its checkpoint, the checkpoint watermark and the
+rejects file.
+"""
+import json
+import os
+
+import pytest
+
+import ingest_orders
+from benchmarks.ingest import write_input
+from benchmarks.local_aws import DEFAULT_PARAMETERS
+from ingest_orders import OrderIngestor, derived_order_id
+
+QUEUE_URL = DEFAULT_PARAMETERS["poc-task-queue-url"]
+LINES = 100
+INVALID_EVERY = 10
+
+
+class InterruptAt(OrderIngestor):
+    """Ctrl-C on the reader thread when it reaches stop_line"""
+
+    def __init__(self, *args, stop_line, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stop_line = stop_line
+
+    def _encode_line(self, raw, line_number, source):
+        if line_number == self.stop_line:
+            raise KeyboardInterrupt
+        return super()._encode_line(raw, line_number, source)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    orders = tmp_path / "orders.jsonl.gz"
+    write_input(orders, LINES, invalid_every=INVALID_EVERY)
+    return {"input": str(orders), "checkpoint": str(tmp_path / "orders.checkpoint"),
+            "rejects": str(tmp_path / "orders.rejects.jsonl")}
+
+
+def ingestor(paths, cls=OrderIngestor, **kwargs):
+    return cls(QUEUE_URL, max_in_flight=4, checkpoint_path=paths["checkpoint"], rejects_path=paths["rejects"],
+               progress=None, **kwargs)
+
+
+def queued_order_ids(aws):
+    return [json.loads(message["body"])["order_id"] for message in aws.sqs.queues[QUEUE_URL]["messages"]]
+
+
+def rejects(paths):
+    with open(paths["rejects"]) as f:
+        return [json.loads(line) for line in f]
+
+
+def checkpoint(paths):
+    with open(paths["checkpoint"]) as f:
+        return json.load(f)
+
+
+def valid_lines(first=1, last=LINES):
+    return [line for line in range(first, last + 1) if line % INVALID_EVERY]
+
+
+def test_resume_after_partial_run(aws, paths):
+    first = ingestor(paths, InterruptAt, stop_line=56).run(paths["input"])
+    assert first["interrupted"]
+    saved = checkpoint(paths)
+    assert saved["complete"] is False and saved["line"] == first["checkpoint_line"]
+    # Batches close at 10 valid orders; the open batch at the interrupt is never sent
+    assert 0 < saved["line"] < 56
+    sent_first = len(queued_order_ids(aws))
+    assert sent_first == len(valid_lines(last=saved["line"]))
+
+    second = ingestor(paths).run(paths["input"])
+    assert not second["interrupted"]
+    assert second["resumed_from_line"] == saved["line"]
+    assert second["lines"] == LINES - saved["line"]
+    assert checkpoint(paths)["complete"] is True and checkpoint(paths)["line"] == LINES
+
+    # Every valid line reached the queue exactly once, under its line-derived order_id
+    source = os.path.basename(paths["input"])
+    assert sorted(queued_order_ids(aws)) == sorted(derived_order_id(source, line) for line in valid_lines())
+    # Lines before the checkpoint are not re-read, so their rejects are not written twice
+    assert [reject["line"] for reject in rejects(paths)] == list(range(INVALID_EVERY, LINES + 1, INVALID_EVERY))
+
+
+def test_checkpoint_of_another_input_is_refused(aws, paths, tmp_path):
+    ingestor(paths).run(paths["input"])
+    other = tmp_path / "other.jsonl.gz"
+    write_input(other, LINES + 1)
+    with pytest.raises(SystemExit):
+        ingestor(paths).run(str(other))
+
+
+def test_watermark_only_advances_over_contiguous_batches(paths):
+    writer = ingestor(paths)
+
+    def complete(first_line, last_line):
+        batch = ingest_orders._Batch(first_line)
+        batch.last_line, batch.end_offset = last_line, last_line * 100
+        writer._complete(batch)
+        return writer._watermark
+
+    assert complete(11, 20) == (0, 0)
+    assert complete(21, 30) == (0, 0)
+    assert complete(1, 10) == (30, 3000)
+    assert complete(41, 50) == (30, 3000)
+
+
+def test_invalid_lines_go_to_the_rejects_file(aws, tmp_path):
+    path = tmp_path / "orders.jsonl"
+    valid = {"items": [{"name": "Widget", "price": 9.99, "quantity": 1}]}
+    path.write_text("\n".join([
+        json.dumps(valid),
+        "{not json",
+        "",
+        json.dumps([valid]),
+        json.dumps({"items": [{"name": "Widget", "price": 9.99, "quantity": 0}]}),
+        json.dumps(dict(valid, order_id="ORD-7")),
+    ]) + "\n")
+    paths = {"checkpoint": None, "rejects": str(tmp_path / "rejects.jsonl")}
+
+    result = ingestor(paths).run(str(path))
+
+    assert result["sent"] == 2 and result["rejected"] == 3
+    assert [(reject["line"], reject["order"]) for reject in rejects(paths)] == [
+        (2, "{not json"), (4, json.dumps([valid])),
+        (5, json.dumps({"items": [{"name": "Widget", "price": 9.99, "quantity": 0}]}))]
+    assert all(reject["error"] for reject in rejects(paths))
+    assert queued_order_ids(aws) == [derived_order_id("orders.jsonl", 1), "ORD-7"]
+
+
+def test_entries_sqs_keeps_rejecting_go_to_the_rejects_file(aws, paths, monkeypatch):
+    def failing_send(**kwargs):
+        raise RuntimeError("throttled")
+
+    monkeypatch.setattr(aws.sqs, "send_message_batch", failing_send)
+    monkeypatch.setattr(ingest_orders.time, "sleep", lambda seconds: None)
+    result = ingestor(paths, max_attempts=2).run(paths["input"])
+
+    assert result["sent"] == 0 and result["failed"] == len(valid_lines())
+    # One retry per batch of 10 orders; the last batch holds only the invalid line 100
+    assert result["retries"] == len(valid_lines()) // 10
+    failed = [reject for reject in rejects(paths) if reject["error"] == "throttled"]
+    assert sorted(reject["line"] for reject in failed) == valid_lines()
+    # The message body that would have been sent, so the rejects file can be replayed
+    assert all(json.loads(reject["order"])["order_id"] for reject in failed)
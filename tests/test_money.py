@@ -0,0 +1,115 @@
+"""
+Integer-cents money (app/money.py) against a Decimal reference, and the
+scalar and batch pricing paths against each other.
+
+Run: python -m pytest tests
+"""
+import random
+from decimal import ROUND_HALF_EVEN, Decimal
+
+import pytest
+
+from app import pricing
+from app.money import Money, apply_rate, to_cents, to_quantity
+from app.processors import apply_discount, calculate_order_total
+from app.promotions import PROMO_DISCOUNT_BPS
+
+CENT = Decimal("0.01")
+PROMO_CODES = list(PROMO_DISCOUNT_BPS) + [None]
+CASES = 20000
+
+
+def decimal_cents(value):
+    return int(Decimal(repr(value)).quantize(CENT, rounding=ROUND_HALF_EVEN).scaleb(2))
+
+
+def decimal_rate(cents, basis_points):
+    return int((Decimal(cents) * basis_points / 10000).quantize(Decimal(1), rounding=ROUND_HALF_EVEN))
+
+
+def random_price(rng):
+    kind = rng.random()
+    if kind < 0.6:
+        return round(rng.uniform(0, 2000), 2)
+    if kind < 0.8:
+        return round(rng.uniform(0, 50), rng.randint(3, 5))
+    if kind < 0.9:
+        return rng.randint(0, 99) + rng.choice([0.005, 0.015, 0.125, 0.995])
+    return rng.uniform(-1e6, 1e6)
+
+
+def random_items(rng):
+    return [{"price": round(rng.uniform(0.01, 500), 2), "quantity": rng.randint(1, 9)}
+            for _ in range(rng.randint(1, 15))]
+
+
+def test_to_cents_matches_decimal():
+    rng = random.Random(1)
+    for _ in range(CASES):
+        price = random_price(rng)
+        assert to_cents(price) == decimal_cents(price), price
+
+
+def test_apply_rate_matches_decimal():
+    rng = random.Random(2)
+    for _ in range(CASES):
+        cents, basis_points = rng.randint(-10 ** 9, 10 ** 9), rng.randint(0, 10000)
+        assert apply_rate(cents, basis_points) == decimal_rate(cents, basis_points), (cents, basis_points)
+
+
+def test_order_pipeline_matches_decimal():
+    rng = random.Random(3)
+    for _ in range(CASES // 10):
+        items, promo_code = random_items(rng), rng.choice(PROMO_CODES)
+        subtotal = calculate_order_total(items)
+        final_total, discount_amount = apply_discount(subtotal, promo_code)
+        reference = sum(Decimal(repr(item["price"])) * item["quantity"] for item in items)
+        assert subtotal.to_decimal() == reference
+        assert discount_amount.cents == decimal_rate(int(reference.scaleb(2)), PROMO_DISCOUNT_BPS.get(promo_code, 0))
+        assert final_total + discount_amount == subtotal
+
+
+def test_money_round_trips_and_hashes_like_decimal():
+    rng = random.Random(4)
+    for _ in range(CASES):
+        cents = rng.randint(-10 ** 9, 10 ** 9)
+        money = Money(cents)
+        assert Money.of(str(money)) == money
+        assert to_cents(float(money)) == cents
+        decimal = money.to_decimal()
+        assert money == decimal and hash(money) == hash(decimal) and len({money, decimal}) == 1
+        assert money != float(money)
+
+
+@pytest.mark.parametrize("quantity", [1.5, 0.999, float("inf"), float("nan"), Decimal("2.5")])
+def test_fractional_quantity_is_rejected(quantity):
+    items = [{"price": 10.01, "quantity": quantity}]
+    with pytest.raises(ValueError):
+        calculate_order_total(items)
+    with pytest.raises(ValueError):
+        pricing.OrderBatch.from_orders([{"items": items}])
+
+
+def test_whole_float_quantity_is_accepted():
+    assert to_quantity(3.0) == 3
+    assert calculate_order_total([{"price": 10.01, "quantity": 3.0}]) == Money(3003)
+
+
+@pytest.mark.parametrize("cents", [1501.5, Decimal("0.5"), 0.1])
+def test_money_rejects_fractional_cents(cents):
+    with pytest.raises(ValueError):
+        Money(cents)
+
+
+@pytest.mark.parametrize("vectorized", [False, pytest.param(True, marks=pytest.mark.skipif(
+    pricing.np is None, reason="NumPy not installed"))])
+def test_batch_pricing_matches_scalar(vectorized):
+    rng = random.Random(6)
+    orders = [{"items": random_items(rng), "promo_code": rng.choice(PROMO_CODES + ["EXPIRED"])} for _ in range(2000)]
+    priced = pricing.price_batch(pricing.OrderBatch.from_orders(orders), vectorized=vectorized)
+    for index, order in enumerate(orders):
+        subtotal = calculate_order_total(order["items"])
+        final_total, discount_amount = apply_discount(subtotal, order["promo_code"])
+        assert int(priced["subtotal"][index]) == subtotal.cents
+        assert int(priced["discount_amount"][index]) == discount_amount.cents
+        assert int(priced["final_total"][index]) == final_total.cents
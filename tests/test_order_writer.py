@@ -0,0 +1,138 @@
+"""
+OrderWriter (app/database.py) against a stub DynamoDB client: BatchWriteItem
+chunking, collapsing of writes to the same key, the UnprocessedItems retry
+and failed_order_ids.
+"""
+import pytest
+
+from app import config, database
+from app.database import MAX_BATCH_WRITE_ITEMS, OrderWriter
+
+TABLE = "orders"
+
+
+class StubDynamoDB:
+    """
+    Records every call. responses is consumed one entry per batch_write_item
+    call: an int leaves that many of the call's requests unprocessed, an
+    exception is raised; past the end every request is processed.
+    """
+
+    def __init__(self, responses=()):
+        self.responses = list(responses)
+        self.batches = []
+        self.updates = []
+
+    def batch_write_item(self, RequestItems):
+        requests = RequestItems[TABLE]
+        self.batches.append(requests)
+        outcome = self.responses.pop(0) if self.responses else 0
+        if isinstance(outcome, Exception):
+            raise outcome
+        unprocessed = requests[len(requests) - outcome:] if outcome else []
+        return {"UnprocessedItems": {TABLE: unprocessed} if unprocessed else {}}
+
+    def update_item(self, TableName, Key, **kwargs):
+        self.updates.append(Key["order_id"]["S"])
+        if self.responses and isinstance(self.responses[0], Exception):
+            raise self.responses.pop(0)
+        return {}
+
+
+@pytest.fixture
+def dynamodb(monkeypatch):
+    def install(responses=()):
+        stub = StubDynamoDB(responses)
+        config.register_client("dynamodb", stub)
+        return stub
+
+    monkeypatch.setattr(database, "get_cached_parameter", lambda name: TABLE)
+    yield install
+    config.reset_clients()
+
+
+def save(writer, order_id, status="COMPLETED", total=10):
+    writer.save_order(order_id, status, total, 0, total, [{"name": "x", "price": total, "quantity": 1}])
+
+
+def written_ids(stub):
+    return [request["PutRequest"]["Item"]["order_id"]["S"] for batch in stub.batches for request in batch]
+
+
+def test_puts_are_sent_in_chunks_of_25(dynamodb):
+    stub = dynamodb()
+    with OrderWriter(table_name=TABLE) as writer:
+        for index in range(60):
+            save(writer, f"ORD-{index}")
+
+    assert [len(batch) for batch in stub.batches] == [MAX_BATCH_WRITE_ITEMS, MAX_BATCH_WRITE_ITEMS, 10]
+    assert sorted(written_ids(stub)) == sorted(f"ORD-{index}" for index in range(60))
+    assert writer.stats["items"] == 60 and writer.stats["round_trips"] == 3
+    assert writer.failed_order_ids == []
+
+
+def test_writes_to_the_same_key_collapse(dynamodb):
+    stub = dynamodb()
+    with OrderWriter(table_name=TABLE) as writer:
+        save(writer, "ORD-1", total=10)
+        save(writer, "ORD-1", total=20)
+        writer.update_order_status("ORD-1", "RECOVERED", recovered=True)
+
+    (item,) = [request["PutRequest"]["Item"] for request in stub.batches[0]]
+    assert item["final_total"] == {"N": "20.00"}
+    assert item["status"] == {"S": "RECOVERED"} and item["recovered_from_dlq"] == {"BOOL": True}
+    assert stub.updates == []
+    assert writer.stats["collapsed"] == 2
+
+
+def test_put_supersedes_a_pending_status_update(dynamodb):
+    stub = dynamodb()
+    with OrderWriter(table_name=TABLE) as writer:
+        writer.update_order_status("ORD-1", "FAILED")
+        save(writer, "ORD-1")
+
+    assert written_ids(stub) == ["ORD-1"] and stub.updates == []
+
+
+def test_unprocessed_items_are_retried(dynamodb):
+    stub = dynamodb(responses=[5, 2])
+    with OrderWriter(table_name=TABLE, base_delay=0) as writer:
+        for index in range(20):
+            save(writer, f"ORD-{index}")
+
+    assert [len(batch) for batch in stub.batches] == [20, 5, 2]
+    # Each retry sends only what the previous call left unprocessed
+    assert stub.batches[1] == stub.batches[0][15:] and stub.batches[2] == stub.batches[1][3:]
+    assert writer.stats["retries"] == 2 and writer.stats["items"] == 20
+    assert writer.failed_order_ids == []
+
+
+def test_items_left_unprocessed_after_all_attempts_are_reported(dynamodb):
+    stub = dynamodb(responses=[3] * 3)
+    with OrderWriter(table_name=TABLE, max_attempts=3, base_delay=0) as writer:
+        for index in range(10):
+            save(writer, f"ORD-{index}")
+
+    assert len(stub.batches) == 3
+    assert writer.failed_order_ids == ["ORD-7", "ORD-8", "ORD-9"]
+    assert writer.stats["items"] == 7
+
+
+def test_failing_batch_write_reports_every_order_of_the_chunk(dynamodb):
+    dynamodb(responses=[RuntimeError("throttled")] * 2)
+    with OrderWriter(table_name=TABLE, max_attempts=2, base_delay=0) as writer:
+        for index in range(MAX_BATCH_WRITE_ITEMS + 1):
+            save(writer, f"ORD-{index}")
+
+    assert writer.failed_order_ids == [f"ORD-{index}" for index in range(MAX_BATCH_WRITE_ITEMS)]
+    assert writer.stats["items"] == 1
+
+
+def test_status_only_changes_use_update_item(dynamodb):
+    stub = dynamodb(responses=[RuntimeError("conditional check failed")])
+    with OrderWriter(table_name=TABLE) as writer:
+        writer.update_order_status("ORD-1", "FAILED")
+        writer.update_order_status("ORD-2", "FAILED")
+
+    assert stub.batches == [] and stub.updates == ["ORD-1", "ORD-2"]
+    assert writer.failed_order_ids == ["ORD-1"]
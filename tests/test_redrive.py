@@ -0,0 +1,98 @@
+"""
+DLQRedrive (app/redrive.py) on the in-memory SQS: dry runs leave the DLQ
+as it was, messages hidden by a failed run are released, rate_limit is
+validated.
+"""
+import json
+
+import pytest
+
+from app import redrive
+from app.redrive import DLQRedrive
+from benchmarks.local_aws import DEFAULT_PARAMETERS, make_order
+
+DLQ_URL = DEFAULT_PARAMETERS["poc-dlq-queue-url"]
+TASK_QUEUE_URL = DEFAULT_PARAMETERS["poc-task-queue-url"]
+
+
+def fill_dlq(aws, count):
+    for index in range(count):
+        aws.sqs.send_message(QueueUrl=DLQ_URL, MessageBody=json.dumps(make_order(index, bad=True)))
+
+
+def visible(aws, queue_url):
+    """Messages a receive would return right now"""
+    return len(aws.sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=1000,
+                                       VisibilityTimeout=0).get("Messages", []))
+
+
+def run(**options):
+    return DLQRedrive(receivers=2, wait_seconds=0, **options).run()
+
+
+def test_redrive_repairs_and_resubmits(aws):
+    fill_dlq(aws, 25)
+    report = run()
+
+    assert report["received"] == report["resubmitted"] == report["deleted"] == 25
+    assert aws.sqs.depth(DLQ_URL) == 0 and aws.sqs.depth(TASK_QUEUE_URL) == 25
+    body = json.loads(aws.sqs.receive_message(QueueUrl=TASK_QUEUE_URL)["Messages"][0]["Body"])
+    assert body["redriven_from_dlq"] is True and all(item["price"] > 0 for item in body["items"])
+
+
+def test_dry_run_leaves_messages_visible(aws):
+    fill_dlq(aws, 25)
+    report = run(dry_run=True)
+
+    assert report["dry_run"] is True
+    assert report["received"] == report["repaired"] == 25
+    assert report["resubmitted"] == report["deleted"] == 0
+    assert aws.sqs.depth(TASK_QUEUE_URL) == 0
+    assert visible(aws, DLQ_URL) == 25
+
+
+def test_messages_are_released_when_a_batch_fails(aws, monkeypatch):
+    fill_dlq(aws, 25)
+
+    def failing_send(*args, **kwargs):
+        raise RuntimeError("task-queue unavailable")
+
+    monkeypatch.setattr(redrive, "send_batch", failing_send)
+    report = run()
+
+    assert report["errors"] and "task-queue unavailable" in report["errors"][0]
+    assert report["deleted"] == 0
+    assert visible(aws, DLQ_URL) == 25
+
+
+def test_messages_are_released_when_a_receive_fails(aws, monkeypatch):
+    fill_dlq(aws, 25)
+    receive = aws.sqs.receive_message
+    calls = []
+
+    def flaky_receive(**kwargs):
+        calls.append(kwargs)
+        if len(calls) > 1:
+            raise RuntimeError("receive throttled")
+        return receive(**kwargs)
+
+    monkeypatch.setattr(aws.sqs, "receive_message", flaky_receive)
+    # The dry run keeps the first batch hidden for the rest of the run; the failed receive must not strand it
+    report = DLQRedrive(receivers=1, wait_seconds=0, dry_run=True).run()
+    monkeypatch.setattr(aws.sqs, "receive_message", receive)
+
+    assert report["received"] == 10 and report["errors"] == ["receive throttled"]
+    assert visible(aws, DLQ_URL) == 25
+
+
+@pytest.mark.parametrize("rate_limit", [0, -5])
+def test_non_positive_rate_limit_is_rejected(aws, rate_limit):
+    with pytest.raises(ValueError):
+        DLQRedrive(rate_limit=rate_limit)
+
+
+def test_rate_limit_paces_resubmission(aws):
+    fill_dlq(aws, 30)
+    report = run(rate_limit=100)
+    # Bursts of one batch (10), then 100 messages/sec: the other 20 take about 0.2s
+    assert report["resubmitted"] == 30 and report["seconds"] >= 0.15
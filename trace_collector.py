@@ -0,0 +1,90 @@
+"""
+Local stand-in for the X-Ray daemon and console: collects the segment
+documents the handlers export (app/tracing.py) and shows one order's trace.
+
+listen   receives TRACE_EXPORTER=daemon datagrams on UDP (the daemon protocol:
+         a JSON header line, then one segment document) and appends the
+         documents to a file, one per line - the format TRACE_EXPORTER=file
+         writes directly.
+show     finds the traces of an order in such files (or stdin) and prints each
+         one's timeline, the hops between the API and the lambdas with their
+         queue and processing time, and the slowest hop and span.
+
+  TRACE_EXPORTER=daemon python -m uvicorn api.main:app &
+  python trace_collector.py listen --port 2000 --output traces.jsonl
+  python trace_collector.py show traces.jsonl --correlation-id 5f0c...
+
+Usage: python trace_collector.py listen [--host 127.0.0.1] [--port 2000] [--output traces.jsonl]
+       python trace_collector.py show [files ...] (--correlation-id ID | --order-id ID | --trace-id ID)
+"""
+
+import argparse
+import fileinput
+import json
+import socket
+
+from app.tracing import DEFAULT_DAEMON_ADDRESS, find_trace_ids, load_documents, trace_view
+
+# Largest UDP payload
+MAX_DATAGRAM = 65535
+
+
+def listen(host, port, output):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, port))
+    print(f"📡 Collecting segments on udp://{host}:{port} into {output} (Ctrl-C to stop)")
+    received = 0
+    with open(output, "a", encoding="utf-8") as f:
+        try:
+            while True:
+                data, _ = sock.recvfrom(MAX_DATAGRAM)
+                # Drop the daemon header line; the segment document is kept as sent
+                for line in data.decode("utf-8", errors="replace").splitlines():
+                    if line.startswith("{") and '"trace_id"' in line:
+                        f.write(line + "\n")
+                        received += 1
+                f.flush()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sock.close()
+    print(f"   {received} segment documents written")
+
+
+def show(files, annotations, trace_id=None):
+    with fileinput.input(files=files or ("-",)) as lines:
+        documents = load_documents(lines)
+    trace_ids = [trace_id] if trace_id else find_trace_ids(documents, **annotations)
+    views = [view for view in (trace_view(documents, trace_id) for trace_id in trace_ids) if view]
+    if not views:
+        raise SystemExit(f"No trace found for {trace_id or annotations}")
+    for view in views:
+        print(json.dumps(view, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    host, port = DEFAULT_DAEMON_ADDRESS.rsplit(":", 1)
+    listen_parser = commands.add_parser("listen", help="collect daemon datagrams into a file")
+    listen_parser.add_argument("--host", default=host)
+    listen_parser.add_argument("--port", type=int, default=int(port))
+    listen_parser.add_argument("--output", default="traces.jsonl")
+    show_parser = commands.add_parser("show", help="timeline and hops of an order's traces")
+    show_parser.add_argument("files", nargs="*", help="exported segment files (default: stdin)")
+    selector = show_parser.add_mutually_exclusive_group(required=True)
+    selector.add_argument("--correlation-id")
+    selector.add_argument("--order-id")
+    selector.add_argument("--trace-id")
+    args = parser.parse_args()
+
+    if args.command == "listen":
+        listen(args.host, args.port, args.output)
+    else:
+        annotations = {key: value for key, value in (("correlation_id", args.correlation_id),
+                                                     ("order_id", args.order_id)) if value}
+        show(args.files, annotations, args.trace_id)
+
+
+if __name__ == "__main__":
+    main()